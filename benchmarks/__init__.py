@@ -0,0 +1,14 @@
+"""
+Tekrarlanabilir performans ölçüm düzeneği.
+
+    benchmarks/corpus.py          - input_documents/ örneklerinden sentetik belge derlemi üretir
+    benchmarks/stubs.py           - Swin, EasyOCR, SentenceTransformer, Milvus ve MongoDB için
+                                    çevrimdışı çalışan hafif yedekler
+    benchmarks/run_benchmarks.py  - aşama bazlı ve uçtan uca verim ölçümü, JSON çıktı ve
+                                    önceki çalıştırmayla karşılaştırma
+
+Kullanım:
+    python -m benchmarks.corpus
+    python -m benchmarks.run_benchmarks --repeat 3 --output benchmarks/results/baseline.json
+    python -m benchmarks.run_benchmarks --repeat 3 --compare benchmarks/results/baseline.json
+"""
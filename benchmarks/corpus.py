@@ -0,0 +1,241 @@
+"""
+Sentetik belge derlemi üretici.
+
+input_documents/ altındaki örnek taramalar sayfa zemini olarak kullanılır
+(yeniden boyutlandırılıp açılır), üzerine belirli yoğunlukta rastgele metin
+satırları yazılır. Aynı tohum (seed) her zaman aynı derlemi üretir; böylece
+farklı sürümlerin ölçümleri aynı girdiler üzerinde karşılaştırılabilir.
+
+Üretilen her belge için manifest.json'a biçim, sayfa sayısı, DPI, yoğunluk ve
+sayfalara yazılan metin kaydedilir.
+
+Kullanım:
+    python -m benchmarks.corpus
+    python -m benchmarks.corpus --output /tmp/corpus --formats tif png --dpis 150 300
+"""
+import os
+import sys
+import glob
+import json
+import random
+import argparse
+import logging
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Proje dizinini Python modül yoluna ekle
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
+
+from config.settings import BENCHMARK_CONFIG
+
+logger = logging.getLogger('DocumentProcessor.Benchmark.Corpus')
+
+# A4 sayfa boyutu (inç)
+PAGE_SIZE_INCHES = (8.27, 11.69)
+
+MANIFEST_FILE = "manifest.json"
+
+# Metin satırları için kelime havuzu (Türkçe ve İngilizce karışık, OCR dillerine uygun)
+VOCABULARY = (
+    "fatura tarih tutar toplam müşteri adres telefon belge numara sayın ilgili "
+    "rapor bütçe sözleşme teslim ödeme vergi kdv şirket müdür imza onay başvuru "
+    "invoice date amount total customer address phone document number dear report "
+    "budget contract delivery payment tax company manager signature approval form "
+    "memo letter resume questionnaire specification presentation news article "
+    "2024 2025 1.250,00 TL 17.03.2025 No: 00471 Ref: A-118 %18 USD 3.400"
+).split()
+
+
+def load_samples(sample_dir=None):
+    """
+    Örnek taramaları gri tonlamalı sayfa zeminleri olarak yükler
+
+    Args:
+        sample_dir (str, optional): Örnek belge dizini. Varsayılan BENCHMARK_CONFIG['sample_dir'].
+
+    Returns:
+        list: PIL.Image listesi (her çok sayfalı örneğin tüm sayfaları dahil)
+    """
+    sample_dir = sample_dir or BENCHMARK_CONFIG['sample_dir']
+    paths = []
+    for pattern in ('*.tif', '*.tiff', '*.png', '*.jpg'):
+        paths.extend(glob.glob(os.path.join(sample_dir, pattern)))
+        paths.extend(glob.glob(os.path.join(sample_dir, '*', pattern)))
+
+    samples = []
+    for path in sorted(paths):
+        try:
+            with Image.open(path) as img:
+                for i in range(getattr(img, 'n_frames', 1)):
+                    img.seek(i)
+                    samples.append(img.convert('L'))
+        except Exception as e:
+            logger.warning(f"Örnek yüklenemedi ({path}): {e}")
+
+    if not samples:
+        # Örnek yoksa düz beyaz zemin
+        logger.warning(f"Örnek belge bulunamadı: {sample_dir}, düz zemin kullanılacak")
+        samples.append(Image.new('L', (850, 1100), 255))
+
+    logger.info(f"{len(samples)} örnek sayfa yüklendi: {sample_dir}")
+    return samples
+
+
+def _load_font(size):
+    """Varsayılan yazı tipini istenen boyutta yükler (eski Pillow'da sabit boyut)"""
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def render_page(rng, samples, dpi, line_count):
+    """
+    Tek bir sentetik sayfa üretir
+
+    Args:
+        rng (random.Random): Tohumlanmış rastgele sayı üreteci
+        samples (list): Sayfa zemini olarak kullanılacak örnekler
+        dpi (int): Sayfa çözünürlüğü
+        line_count (int): Yazılacak metin satırı sayısı
+
+    Returns:
+        tuple: (PIL.Image, [satır metinleri])
+    """
+    width = int(PAGE_SIZE_INCHES[0] * dpi)
+    height = int(PAGE_SIZE_INCHES[1] * dpi)
+
+    # Örnek taramayı zemin yap ve metnin okunabilmesi için soluklaştır
+    background = rng.choice(samples).resize((width, height), Image.BILINEAR)
+    page = background.point(lambda v: 255 - int((255 - v) * 0.3))
+
+    draw = ImageDraw.Draw(page)
+    margin = int(0.6 * dpi)
+    line_height = max(1, (height - 2 * margin) // max(line_count, 1))
+    font = _load_font(max(10, int(line_height * 0.55)))
+
+    lines = []
+    for i in range(line_count):
+        words = [rng.choice(VOCABULARY) for _ in range(rng.randint(4, 12))]
+        line = ' '.join(words)
+        draw.text((margin, margin + i * line_height), line, fill=0, font=font)
+        lines.append(line)
+
+    return page, lines
+
+
+def save_document(pages, path, fmt, dpi):
+    """Sayfaları istenen biçimde kaydeder (TIF/PDF çok sayfalı olabilir)"""
+    first, rest = pages[0], pages[1:]
+    if fmt == 'tif':
+        first.save(path, format='TIFF', save_all=True, append_images=rest,
+                   compression='tiff_deflate', dpi=(dpi, dpi))
+    elif fmt == 'pdf':
+        first.save(path, format='PDF', save_all=True, append_images=rest, resolution=dpi)
+    else:
+        first.save(path, format='PNG', dpi=(dpi, dpi))
+
+
+def generate_corpus(output_dir=None, seed=None, formats=None, page_counts=None, dpis=None,
+                    densities=None, sample_dir=None):
+    """
+    Biçim x sayfa sayısı x DPI x yoğunluk kombinasyonları için derlem üretir
+
+    Args:
+        output_dir (str, optional): Çıktı dizini. Varsayılan BENCHMARK_CONFIG['corpus_dir'].
+        seed (int, optional): Rastgelelik tohumu
+        formats (list, optional): 'tif', 'pdf', 'png'
+        page_counts (list, optional): Belge başına sayfa sayıları
+        dpis (list, optional): Çözünürlükler
+        densities (list, optional): BENCHMARK_CONFIG['densities'] anahtarları
+        sample_dir (str, optional): Örnek belge dizini
+
+    Returns:
+        dict: Manifest ({'seed': ..., 'documents': [...]})
+    """
+    output_dir = output_dir or BENCHMARK_CONFIG['corpus_dir']
+    seed = BENCHMARK_CONFIG['seed'] if seed is None else seed
+    formats = formats or BENCHMARK_CONFIG['formats']
+    page_counts = page_counts or BENCHMARK_CONFIG['page_counts']
+    dpis = dpis or BENCHMARK_CONFIG['dpis']
+    densities = densities or list(BENCHMARK_CONFIG['densities'])
+
+    os.makedirs(output_dir, exist_ok=True)
+    samples = load_samples(sample_dir)
+    rng = random.Random(seed)
+
+    documents = []
+    for fmt in formats:
+        for page_count in page_counts:
+            if fmt == 'png' and page_count > 1:
+                continue  # PNG tek sayfalıdır
+            for dpi in dpis:
+                for density in densities:
+                    line_count = BENCHMARK_CONFIG['densities'][density]
+                    pages, texts = [], []
+                    for _ in range(page_count):
+                        page, lines = render_page(rng, samples, dpi, line_count)
+                        pages.append(page)
+                        texts.append('\n'.join(lines))
+
+                    file_name = f"{fmt}_{page_count}p_{dpi}dpi_{density}.{fmt}"
+                    path = os.path.join(output_dir, file_name)
+                    save_document(pages, path, fmt, dpi)
+
+                    documents.append({
+                        'file_name': file_name,
+                        'format': fmt,
+                        'pages': page_count,
+                        'dpi': dpi,
+                        'density': density,
+                        'bytes': os.path.getsize(path),
+                        'page_texts': texts
+                    })
+                    logger.info(f"Üretildi: {file_name} ({documents[-1]['bytes']} bayt)")
+
+    manifest = {'seed': seed, 'documents': documents}
+    with open(os.path.join(output_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    logger.info(f"Derlem hazır: {len(documents)} belge, {output_dir}")
+    return manifest
+
+
+def load_manifest(corpus_dir=None):
+    """
+    Derlem manifestini okur
+
+    Args:
+        corpus_dir (str, optional): Derlem dizini
+
+    Returns:
+        dict: Manifest veya derlem yoksa None
+    """
+    corpus_dir = corpus_dir or BENCHMARK_CONFIG['corpus_dir']
+    path = os.path.join(corpus_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sentetik belge derlemi üretici")
+    parser.add_argument("--output", help="Çıktı dizini (varsayılan BENCHMARK_CONFIG['corpus_dir'])")
+    parser.add_argument("--seed", type=int, help="Rastgelelik tohumu")
+    parser.add_argument("--formats", nargs="+", choices=["tif", "pdf", "png"], help="Üretilecek biçimler")
+    parser.add_argument("--pages", nargs="+", type=int, help="Belge başına sayfa sayıları")
+    parser.add_argument("--dpis", nargs="+", type=int, help="Çözünürlükler")
+    parser.add_argument("--densities", nargs="+", choices=list(BENCHMARK_CONFIG['densities']),
+                        help="Metin yoğunlukları")
+    parser.add_argument("--samples", help="Örnek belge dizini (varsayılan input_documents/)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    generate_corpus(args.output, args.seed, args.formats, args.pages, args.dpis, args.densities, args.samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+"""
+Sınıflandırma girdisi için küçültülmüş çözme ile tam çözmenin karşılaştırması.
+
+Her belge iki yoldan yüklenir: tam çözünürlükte çözüp RGB'ye çevirme
+(DocumentClassifier._load_image_full) ve çözücüden küçültülmüş isteme
+(DocumentClassifier._load_image_reduced). İki girdi aynı modelden geçirilir;
+tahmin uyumu, olasılık farkı, piksel farkı ve çözme süreleri raporlanır.
+Tahmin uyumu BENCHMARK_CONFIG['decode_parity_min_agreement'] altındaysa
+çıkış kodu 1'dir.
+
+Varsayılan olarak eğitilmiş model (MODEL_PATH) kullanılır; --stub ile rastgele
+ağırlıklı küçük Swin kullanılır (yalnızca piksel/süre karşılaştırması için
+anlamlıdır).
+
+Kullanım:
+    python -m benchmarks.decode_parity
+    python -m benchmarks.decode_parity --input /yol/taramalar --output parity.json
+    python -m benchmarks.decode_parity --corpus --stub
+"""
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+import logging
+import statistics
+
+# Proje dizinini Python modül yoluna ekle
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
+
+import torch
+
+from config.settings import BENCHMARK_CONFIG, MODEL_PATH
+from benchmarks.corpus import generate_corpus, load_manifest
+
+logger = logging.getLogger('DocumentProcessor.Benchmark')
+
+EXTENSIONS = ('.tif', '.tiff', '.jpg', '.jpeg', '.png', '.bmp', '.pdf')
+
+
+def collect_paths(inputs, use_corpus=False):
+    """Dizin/dosya listesinden desteklenen belge yollarını toplar"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(
+                p for p in glob.glob(os.path.join(item, '*')) if p.lower().endswith(EXTENSIONS)
+            ))
+        elif os.path.isfile(item):
+            paths.append(item)
+    if use_corpus:
+        corpus_dir = BENCHMARK_CONFIG['corpus_dir']
+        manifest = load_manifest(corpus_dir) or generate_corpus(corpus_dir, seed=BENCHMARK_CONFIG['seed'])
+        paths.extend(os.path.join(corpus_dir, d['file_name']) for d in manifest['documents'])
+    return paths
+
+
+def _timed_load(loader, path):
+    start = time.perf_counter()
+    image = loader(path)
+    return image, time.perf_counter() - start
+
+
+def _predict(classifier, image):
+    pixel_values = classifier.processor(images=image, return_tensors="pt")["pixel_values"]
+    with torch.no_grad():
+        logits = classifier.model(pixel_values=pixel_values.to(classifier.device)).logits
+    return pixel_values, torch.nn.functional.softmax(logits, dim=1)[0].cpu()
+
+
+def compare_document(classifier, path):
+    """
+    Bir belgeyi iki çözme yoluyla yükleyip karşılaştırır
+
+    Args:
+        classifier (DocumentClassifier): Sınıflandırıcı
+        path (str): Belge yolu
+
+    Returns:
+        dict: Karşılaştırma satırı (tam yol yüklenemezse None)
+    """
+    full_image, full_time = _timed_load(classifier._load_image_full, path)
+    if full_image is None:
+        return None
+    reduced_image, reduced_time = _timed_load(classifier._load_image_reduced, path)
+
+    full_pixels, full_probs = _predict(classifier, full_image)
+    reduced_pixels, reduced_probs = _predict(classifier, reduced_image)
+    full_class = int(full_probs.argmax())
+    reduced_class = int(reduced_probs.argmax())
+
+    return {
+        'file': path,
+        'size': list(full_image.size),
+        'full_class': classifier.idx_to_class[full_class],
+        'reduced_class': classifier.idx_to_class[reduced_class],
+        'agree': full_class == reduced_class,
+        'max_prob_diff': float((full_probs - reduced_probs).abs().max()),
+        'pixel_mae': float((full_pixels - reduced_pixels).abs().mean()),
+        'full_decode_ms': full_time * 1000,
+        'reduced_decode_ms': reduced_time * 1000
+    }
+
+
+def summarize(rows):
+    """Karşılaştırma satırlarının özeti"""
+    full_ms = [row['full_decode_ms'] for row in rows]
+    reduced_ms = [row['reduced_decode_ms'] for row in rows]
+    return {
+        'documents': len(rows),
+        'agreement': sum(row['agree'] for row in rows) / len(rows),
+        'mean_max_prob_diff': statistics.mean(row['max_prob_diff'] for row in rows),
+        'max_prob_diff': max(row['max_prob_diff'] for row in rows),
+        'mean_pixel_mae': statistics.mean(row['pixel_mae'] for row in rows),
+        'full_decode_ms': statistics.median(full_ms),
+        'reduced_decode_ms': statistics.median(reduced_ms),
+        'speedup': statistics.median(full_ms) / max(statistics.median(reduced_ms), 1e-9)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Küçültülmüş / tam çözme doğruluk karşılaştırması")
+    parser.add_argument("--input", nargs="+", default=None,
+                        help="Belge dosyaları veya dizinleri (varsayılan BENCHMARK_CONFIG['sample_dir'])")
+    parser.add_argument("--corpus", action="store_true", help="Sentetik ölçüm derlemini de ekle")
+    parser.add_argument("--stub", action="store_true", help="Eğitilmiş model yerine rastgele küçük Swin kullan")
+    parser.add_argument("--min_agreement", type=float, default=None,
+                        help="En az tahmin uyumu (varsayılan BENCHMARK_CONFIG['decode_parity_min_agreement'])")
+    parser.add_argument("--output", help="Satır bazlı sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    paths = collect_paths(args.input or [BENCHMARK_CONFIG['sample_dir']], args.corpus)
+    if not paths:
+        logger.error("Karşılaştırılacak belge bulunamadı")
+        return 2
+
+    if args.stub:
+        from benchmarks.stubs import build_tiny_classifier
+        classifier = build_tiny_classifier(seed=BENCHMARK_CONFIG['seed'])
+    else:
+        from models.classifier import DocumentClassifier
+        classifier = DocumentClassifier(model_path=MODEL_PATH)
+
+    rows = []
+    for path in paths:
+        try:
+            row = compare_document(classifier, path)
+        except Exception as e:
+            logger.error(f"Karşılaştırma hatası ({path}): {e}")
+            continue
+        if row is None:
+            logger.warning(f"Tam çözme yolu belgeyi yükleyemedi, atlandı: {path}")
+            continue
+        rows.append(row)
+        if not row['agree']:
+            logger.warning(f"Tahmin farklı: {path} ({row['full_class']} -> {row['reduced_class']}, "
+                           f"olasılık farkı {row['max_prob_diff']:.3f})")
+
+    if not rows:
+        logger.error("Hiçbir belge karşılaştırılamadı")
+        return 2
+
+    summary = summarize(rows)
+    min_agreement = (BENCHMARK_CONFIG['decode_parity_min_agreement']
+                     if args.min_agreement is None else args.min_agreement)
+
+    print(f"{summary['documents']} belge: tahmin uyumu {summary['agreement']:.2%}, "
+          f"olasılık farkı ort./en çok {summary['mean_max_prob_diff']:.4f}/{summary['max_prob_diff']:.4f}, "
+          f"piksel MAE {summary['mean_pixel_mae']:.4f}")
+    print(f"Çözme süresi (medyan): tam {summary['full_decode_ms']:.1f} ms, "
+          f"küçültülmüş {summary['reduced_decode_ms']:.1f} ms ({summary['speedup']:.1f}x)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'documents': rows}, f, ensure_ascii=False, indent=2)
+
+    if summary['agreement'] < min_agreement:
+        logger.error(f"Tahmin uyumu eşiğin altında: {summary['agreement']:.2%} < {min_agreement:.2%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+"""
+Kademeli sınıflandırmanın ucuz modelini Swin'den damıtır ve yükseltme oranını raporlar.
+
+Belgeler toplu yükleyiciyle model girdisine çözülür, Swin olasılıkları
+öğretmen etiketi olarak toplanır. Ucuz model (models/cascade.PixelClassifier)
+eğitim kısmında bu olasılıklara göre eğitilir. Güven eşiği ayrılmış kısımda
+Swin ile uyum MODEL_CONFIG['cascade_target_agreement'] üstünde kalacak
+şekilde kalibre edilir. Rapor yükseltme oranını, Swin ile uyumu ve belge
+başına ortalama süre tahminini (ucuz model + yükseltilen kısım x Swin)
+içerir.
+
+--evaluate ile mevcut model yeniden eğitilmeden verilen belgelerde ölçülür.
+
+Kullanım:
+    python -m benchmarks.distill_cascade --input /yol/taramalar
+    python -m benchmarks.distill_cascade --input /yol/taramalar --target_agreement 0.995 --report cascade.json
+    python -m benchmarks.distill_cascade --evaluate --input /yol/yeni_taramalar
+    python -m benchmarks.distill_cascade --corpus --stub --output /tmp/cascade.npz
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+
+import numpy as np
+
+# Proje dizinini Python modül yoluna ekle
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
+
+from config.settings import BENCHMARK_CONFIG, MODEL_CONFIG, MODEL_PATH
+from benchmarks.decode_parity import collect_paths
+from models.cascade import PixelClassifier, pixel_features
+
+logger = logging.getLogger('DocumentProcessor.Benchmark')
+
+
+def collect_teacher(classifier, paths, feature_size):
+    """
+    Belgelerin ucuz model özelliklerini ve Swin olasılıklarını toplar
+
+    Args:
+        classifier (DocumentClassifier): Öğretmen sınıflandırıcı (kademeli mod kapalı)
+        paths (list): Belge yolları
+        feature_size (int): pixel_features ızgara kenarı
+
+    Returns:
+        dict: {'paths', 'features', 'probs', 'swin_seconds' (belge başına ortalama)}
+    """
+    kept, features, probs = [], [], []
+    swin_seconds = 0.0
+    for batch_paths, pixel_values, errors in classifier._get_batch_loader().iter_batches(paths):
+        rows = [index for index in range(len(batch_paths)) if index not in errors]
+        for index in errors:
+            logger.warning(f"Belge yüklenemedi, atlandı: {batch_paths[index]} ({errors[index]})")
+        if not rows:
+            continue
+        pixel_values = pixel_values[rows]
+        start = time.perf_counter()
+        batch_probs = classifier._swin_probs(pixel_values)
+        swin_seconds += time.perf_counter() - start
+        kept.extend(batch_paths[index] for index in rows)
+        features.append(pixel_features(classifier._denormalize(pixel_values), feature_size))
+        probs.append(batch_probs.numpy())
+
+    if not kept:
+        return None
+    return {
+        'paths': kept,
+        'features': np.concatenate(features),
+        'probs': np.concatenate(probs),
+        'swin_seconds': swin_seconds / len(kept)
+    }
+
+
+def cascade_seconds(model, features):
+    """Ucuz modelin belge başına ortalama süresi (özellikler hazırken)"""
+    start = time.perf_counter()
+    model.predict_proba(features)
+    return (time.perf_counter() - start) / max(len(features), 1)
+
+
+def build_report(model, features, labels, swin_seconds):
+    """Yükseltme oranı, uyum ve belge başına süre tahmini"""
+    report = model.evaluate(features, labels)
+    fast = cascade_seconds(model, features)
+    report['swin_ms'] = swin_seconds * 1000
+    report['cascade_ms'] = fast * 1000
+    report['expected_ms'] = (fast + report['escalation_rate'] * swin_seconds) * 1000
+    return report
+
+
+def print_report(title, report):
+    accepted = report['accepted_agreement']
+    print(f"{title}: {report['documents']} belge, eşik {report['threshold']:.4f}, "
+          f"yükseltme oranı {report['escalation_rate']:.2%}, "
+          f"kabul edilenlerde Swin uyumu {'-' if accepted is None else f'{accepted:.2%}'}, "
+          f"genel uyum {report['overall_agreement']:.2%}")
+    print(f"  Belge başına: Swin {report['swin_ms']:.2f} ms, ucuz model {report['cascade_ms']:.3f} ms, "
+          f"kademeli beklenen {report['expected_ms']:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kademeli sınıflandırıcı için ucuz modeli damıt / değerlendir")
+    parser.add_argument("--input", nargs="+", default=None,
+                        help="Belge dosyaları veya dizinleri (varsayılan BENCHMARK_CONFIG['sample_dir'])")
+    parser.add_argument("--corpus", action="store_true", help="Sentetik ölçüm derlemini de ekle")
+    parser.add_argument("--stub", action="store_true", help="Eğitilmiş model yerine rastgele küçük Swin kullan")
+    parser.add_argument("--output", default=None,
+                        help="Model dosyası (varsayılan MODEL_CONFIG['cascade_model_path'])")
+    parser.add_argument("--evaluate", action="store_true", help="Eğitmeden mevcut modeli değerlendir")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Eşik kalibrasyonu için ayrılan oran")
+    parser.add_argument("--target_agreement", type=float, default=None,
+                        help="Kabul edilen belgelerde Swin ile en az uyum "
+                             "(varsayılan MODEL_CONFIG['cascade_target_agreement'])")
+    parser.add_argument("--epochs", type=int, default=300, help="Eğitim adımı sayısı")
+    parser.add_argument("--report", help="Raporun yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    model_path = args.output or MODEL_CONFIG['cascade_model_path']
+    paths = collect_paths(args.input or [BENCHMARK_CONFIG['sample_dir']], args.corpus)
+    if not paths:
+        logger.error("Belge bulunamadı")
+        return 2
+
+    if args.stub:
+        from benchmarks.stubs import build_tiny_classifier
+        classifier = build_tiny_classifier(seed=BENCHMARK_CONFIG['seed'])
+    else:
+        from models.classifier import DocumentClassifier
+        classifier = DocumentClassifier(model_path=MODEL_PATH)
+    # Öğretmen etiketleri her zaman Swin'den
+    classifier.cascade = None
+
+    model = PixelClassifier.load(model_path) if args.evaluate else None
+    feature_size = model.feature_size if model else MODEL_CONFIG.get('cascade_feature_size', 32)
+    try:
+        data = collect_teacher(classifier, paths, feature_size)
+    finally:
+        classifier.close()
+    if data is None:
+        logger.error("Hiçbir belge yüklenemedi")
+        return 2
+    labels = data['probs'].argmax(axis=1)
+
+    if args.evaluate:
+        report = {'evaluation': build_report(model, data['features'], labels, data['swin_seconds'])}
+        print_report("Değerlendirme", report['evaluation'])
+    else:
+        rng = np.random.default_rng(BENCHMARK_CONFIG['seed'])
+        order = rng.permutation(len(labels))
+        holdout = max(1, int(round(len(order) * args.holdout))) if len(order) > 1 else 0
+        calibration, train = order[:holdout], order[holdout:]
+        if holdout == 0:
+            logger.warning("Tek belge var; eşik eğitim belgesinde kalibre edilecek")
+            calibration = train
+
+        model = PixelClassifier.fit(data['features'][train], data['probs'][train], epochs=args.epochs,
+                                    feature_size=feature_size, seed=BENCHMARK_CONFIG['seed'])
+        model.calibrate(data['features'][calibration], labels[calibration], args.target_agreement)
+        report = {
+            'train': build_report(model, data['features'][train], labels[train], data['swin_seconds']),
+            'holdout': build_report(model, data['features'][calibration], labels[calibration],
+                                    data['swin_seconds'])
+        }
+        print_report("Eğitim", report['train'])
+        print_report("Ayrılmış", report['holdout'])
+
+        os.makedirs(os.path.dirname(os.path.abspath(model_path)), exist_ok=True)
+        model.save(model_path)
+        print(f"Kademeli model kaydedildi: {model_path} "
+              f"(MODEL_CONFIG['cascade'] = True ile etkinleştirilir)")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
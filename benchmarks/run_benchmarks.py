@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+"""
+Aşama bazlı ve uçtan uca verim ölçümü.
+
+Sentetik derlemdeki her belge document_classifier.process_document ile (tam
+mod, vektör kontrolü ve MongoDB yazımı dahil) işlenir. Aşama süreleri
+utils.metrics zamanlayıcılarından, uçtan uca süreler belge başına duvar
+saatinden alınır. Ölçüm --repeat kez tekrarlanır; her metrik için turların
+medyanı ve standart sapması raporlanır.
+
+Varsayılan olarak tüm dış bileşenler benchmarks/stubs.py yedekleridir ve ağ
+veya model dosyası gerekmez. --real ile seçilen bileşenler gerçekleriyle
+değiştirilir (ör. --real classifier ocr).
+
+--compare ile önceki bir JSON çıktısıyla karşılaştırılır. Değişim hem göreli
+eşiği (BENCHMARK_CONFIG['regression_threshold']) hem de iki çalıştırmanın tur
+gürültüsünü (2 x standart sapma) aşıyorsa anlamlı sayılır. Anlamlı bir
+gerileme varsa çıkış kodu 1'dir.
+
+Kullanım:
+    python -m benchmarks.run_benchmarks --repeat 3 --output benchmarks/results/baseline.json
+    python -m benchmarks.run_benchmarks --repeat 3 --compare benchmarks/results/baseline.json
+    python -m benchmarks.run_benchmarks --real classifier --formats tif --mongo-latency 0.002
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import datetime
+import logging
+import statistics
+import subprocess
+
+import numpy as np
+
+# Proje dizinini Python modül yoluna ekle
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
+
+from config.settings import BENCHMARK_CONFIG, MODEL_PATH
+from utils.metrics import METRICS
+from benchmarks.corpus import generate_corpus, load_manifest
+from benchmarks import stubs
+
+logger = logging.getLogger('DocumentProcessor.Benchmark')
+
+COMPONENTS = ("classifier", "ocr", "embedding", "milvus", "mongo")
+
+
+def build_components(real=(), seed=0, ocr_latency=0.0, milvus_latency=0.0, mongo_latency=0.0, mongo_uri=None):
+    """
+    Ölçümde kullanılacak bileşenleri oluşturur
+
+    Args:
+        real (iterable): Gerçeğiyle kullanılacak bileşenler (COMPONENTS alt kümesi)
+        seed (int): Küçük Swin ağırlık tohumu
+        ocr_latency (float): Yedek OCR için sayfa başına gecikme (saniye)
+        milvus_latency (float): Yedek Milvus için çağrı başına gecikme (saniye)
+        mongo_latency (float): Yedek MongoDB için çağrı başına gecikme (saniye)
+        mongo_uri (str, optional): Gerçek MongoDB için URI
+
+    Returns:
+        dict: {'classifier', 'extractor', 'vector_db', 'mongo_client'}
+    """
+    real = set(real)
+
+    if "classifier" in real:
+        from models.classifier import DocumentClassifier
+        classifier = DocumentClassifier(model_path=MODEL_PATH)
+    else:
+        classifier = stubs.build_tiny_classifier(seed=seed)
+
+    if "ocr" in real:
+        from models.extractor import UnstructuredTextExtractor
+        extractor = UnstructuredTextExtractor()
+    else:
+        extractor = stubs.build_stub_extractor(stubs.StubOCRReader(latency=ocr_latency))
+
+    if "milvus" in real:
+        # Gerçek koleksiyonun vektör boyutu gerçek embedding modeline bağlıdır
+        from utils.vector_db import DocumentVectorDB
+        vector_db = DocumentVectorDB()
+    else:
+        embedder = None
+        if "embedding" in real:
+            from sentence_transformers import SentenceTransformer
+            from config.settings import VECTORDB_CONFIG
+            embedder = SentenceTransformer(VECTORDB_CONFIG['model_name'])
+        vector_db = stubs.build_stub_vector_db(embedder, stubs.InMemoryMilvusCollection(milvus_latency))
+
+    if "mongo" in real:
+        from utils.mongodb_client import MongoDBClient
+        mongo_client = MongoDBClient(uri=mongo_uri)
+    else:
+        mongo_client = stubs.build_stub_mongo_client(mongo_latency)
+
+    return {
+        'classifier': classifier,
+        'extractor': extractor,
+        'vector_db': vector_db,
+        'mongo_client': mongo_client
+    }
+
+
+def _summary(values):
+    """Tur değerlerinden medyan/standart sapma özeti"""
+    return {
+        'median': statistics.median(values) if values else 0.0,
+        'stdev': statistics.stdev(values) if len(values) > 1 else 0.0,
+        'runs': values
+    }
+
+
+def _percentiles(values_ms):
+    if not values_ms:
+        return {'p50': 0.0, 'p95': 0.0, 'mean': 0.0}
+    return {
+        'p50': float(np.percentile(values_ms, 50)),
+        'p95': float(np.percentile(values_ms, 95)),
+        'mean': float(np.mean(values_ms))
+    }
+
+
+def run_round(documents, corpus_dir, components, process_document):
+    """
+    Derlemi bir kez işler
+
+    Returns:
+        dict: Tur ölçümleri (duvar süresi, belge gecikmeleri, aşama özetleri)
+    """
+    METRICS.reset()
+    latencies = []
+    start = time.perf_counter()
+
+    for document in documents:
+        path = os.path.join(corpus_dir, document['file_name'])
+        doc_start = time.perf_counter()
+        result = process_document(path, mode="full", use_vector_db=True, **components)
+        elapsed = time.perf_counter() - doc_start
+
+        if result.get('status') != 'success':
+            logger.warning(f"Belge işlenemedi: {document['file_name']}: {result.get('error')}")
+        latencies.append({
+            'document': document,
+            'ms': elapsed * 1000,
+            'stage_times': (result.get('processing_info') or {}).get('stage_times', {})
+        })
+
+    wall = time.perf_counter() - start
+    return {'wall': wall, 'latencies': latencies, 'stages': METRICS.snapshot()['stages']}
+
+
+def run_benchmark(documents, corpus_dir, components, repeat=3, warmup=1):
+    """
+    Derlemi warmup sonrasında repeat kez işler ve ölçümleri özetler
+
+    Returns:
+        dict: {'end_to_end': ..., 'stages': ..., 'groups': ...}
+    """
+    from document_classifier import process_document
+
+    # Isınma: model ilk çağrı maliyetleri (bellek ayırma, JIT) ölçüme karışmasın
+    for document in documents[:warmup]:
+        process_document(os.path.join(corpus_dir, document['file_name']), mode="full",
+                         use_vector_db=True, **components)
+
+    total_pages = sum(document['pages'] for document in documents)
+    rounds = []
+    for i in range(repeat):
+        # Her tur boş depolarla başlar; aksi halde ikinci turda her belge duplike sayılır
+        milvus_collection = components['vector_db'].collection
+        if isinstance(milvus_collection, stubs.InMemoryMilvusCollection):
+            milvus_collection.rows, milvus_collection._matrix = [], None
+        mongo_collection = components['mongo_client'].collection
+        if isinstance(mongo_collection, stubs.InMemoryMongoCollection):
+            mongo_collection.documents = {}
+
+        rounds.append(run_round(documents, corpus_dir, components, process_document))
+        logger.info(f"Tur {i + 1}/{repeat}: {rounds[-1]['wall']:.2f} sn")
+
+    # Uçtan uca
+    all_latencies = [entry['ms'] for r in rounds for entry in r['latencies']]
+    end_to_end = {
+        'docs_per_sec': _summary([len(documents) / r['wall'] for r in rounds]),
+        'pages_per_sec': _summary([total_pages / r['wall'] for r in rounds]),
+        'latency_ms': _percentiles(all_latencies)
+    }
+
+    # Aşamalar: çağrı başına ortalama (tur bazında) ve belge başına dağılım
+    stage_names = sorted({stage for r in rounds for stage in r['stages']})
+    stages = {}
+    for stage in stage_names:
+        per_round = [r['stages'][stage] for r in rounds if stage in r['stages']]
+        per_doc_ms = [entry['stage_times'][stage] * 1000
+                      for r in rounds for entry in r['latencies'] if stage in entry['stage_times']]
+        stages[stage] = {
+            'calls_per_round': per_round[0]['count'] if per_round else 0,
+            'mean_ms': _summary([s['avg'] * 1000 for s in per_round]),
+            'ops_per_sec': _summary([s['count'] / s['sum'] if s['sum'] else 0.0 for s in per_round]),
+            'per_document_ms': _percentiles(per_doc_ms)
+        }
+
+    # Biçim / DPI / yoğunluk / sayfa sayısı kırılımı
+    groups = {}
+    for key in ('format', 'dpi', 'density', 'pages'):
+        buckets = {}
+        for r in rounds:
+            for entry in r['latencies']:
+                buckets.setdefault(str(entry['document'][key]), []).append(entry['ms'])
+        groups[key] = {value: _percentiles(ms) for value, ms in sorted(buckets.items())}
+
+    return {'end_to_end': end_to_end, 'stages': stages, 'groups': groups}
+
+
+def environment_info():
+    """Sonuçların karşılaştırılabilirliği için ortam bilgisi"""
+    info = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+    try:
+        from utils.resources import get_plan
+        info['resource_plan'] = get_plan()
+    except Exception:
+        info['resource_plan'] = None
+    try:
+        info['git_commit'] = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=script_dir, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        info['git_commit'] = None
+    try:
+        import torch
+        info['torch'] = torch.__version__
+        info['cuda'] = torch.cuda.get_device_name(0) if torch.cuda.is_available() else None
+    except ImportError:
+        info['torch'] = None
+    return info
+
+
+# ------------------------------------------------------------------ karşılaştırma
+
+def _comparisons(baseline, current):
+    """(metrik adı, eski özet, yeni özet, büyük mü iyi) dörtlülerini üretir"""
+    for name in ('docs_per_sec', 'pages_per_sec'):
+        yield f"end_to_end.{name}", baseline['end_to_end'][name], current['end_to_end'][name], True
+    for stage, data in current['stages'].items():
+        if stage in baseline['stages']:
+            yield f"stages.{stage}.mean_ms", baseline['stages'][stage]['mean_ms'], data['mean_ms'], False
+
+
+def compare_results(baseline, current, threshold=None):
+    """
+    İki ölçüm çıktısını karşılaştırır
+
+    Args:
+        baseline (dict): Önceki çıktı
+        current (dict): Yeni çıktı
+        threshold (float, optional): Anlamlı sayılacak en küçük göreli değişim
+
+    Returns:
+        list: [{'metric', 'baseline', 'current', 'change', 'status'}, ...]
+              status: 'regression', 'improvement' veya 'unchanged'
+    """
+    threshold = BENCHMARK_CONFIG['regression_threshold'] if threshold is None else threshold
+    rows = []
+    for metric, old, new, higher_is_better in _comparisons(baseline, current):
+        if not old['median']:
+            continue
+        change = (new['median'] - old['median']) / old['median']
+        noise = 2 * (old['stdev'] + new['stdev']) / old['median']
+
+        status = 'unchanged'
+        if abs(change) > max(threshold, noise):
+            better = change > 0 if higher_is_better else change < 0
+            status = 'improvement' if better else 'regression'
+
+        rows.append({
+            'metric': metric,
+            'baseline': old['median'],
+            'current': new['median'],
+            'change': change,
+            'status': status
+        })
+    return rows
+
+
+def print_comparison(rows):
+    print(f"{'Metrik':<40} {'Önceki':>12} {'Şimdiki':>12} {'Değişim':>9}  Durum")
+    for row in rows:
+        print(f"{row['metric']:<40} {row['baseline']:>12.3f} {row['current']:>12.3f} "
+              f"{row['change'] * 100:>8.1f}%  {row['status']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Belge işleme performans ölçümü")
+    parser.add_argument("--corpus", help="Derlem dizini (yoksa üretilir, varsayılan BENCHMARK_CONFIG['corpus_dir'])")
+    parser.add_argument("--formats", nargs="+", choices=["tif", "pdf", "png"], help="Yalnızca bu biçimleri ölç")
+    parser.add_argument("--dpis", nargs="+", type=int, help="Yalnızca bu çözünürlükleri ölç")
+    parser.add_argument("--repeat", type=int, default=3, help="Ölçüm turu sayısı")
+    parser.add_argument("--warmup", type=int, default=1, help="Ölçüm öncesi işlenecek belge sayısı")
+    parser.add_argument("--real", nargs="+", choices=COMPONENTS, default=[],
+                        help="Yedek yerine gerçeği kullanılacak bileşenler")
+    parser.add_argument("--mongo-uri", help="Gerçek MongoDB için URI (--real mongo ile)")
+    parser.add_argument("--ocr-latency", type=float, default=0.0, help="Yedek OCR sayfa gecikmesi (sn)")
+    parser.add_argument("--milvus-latency", type=float, default=0.0, help="Yedek Milvus çağrı gecikmesi (sn)")
+    parser.add_argument("--mongo-latency", type=float, default=0.0, help="Yedek MongoDB çağrı gecikmesi (sn)")
+    parser.add_argument("--seed", type=int, help="Derlem ve model tohumu")
+    parser.add_argument("--output", help="JSON çıktı yolu (varsayılan benchmarks/results/<zaman>.json)")
+    parser.add_argument("--compare", help="Karşılaştırılacak önceki JSON çıktısı")
+    parser.add_argument("--threshold", type=float, help="Anlamlı göreli değişim eşiği")
+    parser.add_argument("--verbose", action="store_true", help="İşleme loglarını göster")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # İşleme logları ölçüme gürültü ekler; yalnızca uyarılar
+    if not args.verbose:
+        logging.getLogger('DocumentClassifier').setLevel(logging.WARNING)
+        logging.getLogger('DocumentProcessor').setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    seed = BENCHMARK_CONFIG['seed'] if args.seed is None else args.seed
+    corpus_dir = args.corpus or BENCHMARK_CONFIG['corpus_dir']
+    manifest = load_manifest(corpus_dir)
+    if manifest is None:
+        logger.info(f"Derlem bulunamadı, üretiliyor: {corpus_dir}")
+        manifest = generate_corpus(corpus_dir, seed=seed)
+
+    documents = [
+        d for d in manifest['documents']
+        if (not args.formats or d['format'] in args.formats) and (not args.dpis or d['dpi'] in args.dpis)
+    ]
+    if not documents:
+        logger.error("Seçilen filtrelerle ölçülecek belge yok")
+        sys.exit(2)
+
+    components = build_components(args.real, seed, args.ocr_latency, args.milvus_latency,
+                                  args.mongo_latency, args.mongo_uri)
+    logger.info(f"{len(documents)} belge, {args.repeat} tur, gerçek bileşenler: {args.real or 'yok'}")
+
+    results = run_benchmark(documents, corpus_dir, components, args.repeat, args.warmup)
+    results['meta'] = {
+        'timestamp': datetime.datetime.now().isoformat(),
+        'environment': environment_info(),
+        'components': {name: ('real' if name in args.real else 'stub') for name in COMPONENTS},
+        'latency': {'ocr': args.ocr_latency, 'milvus': args.milvus_latency, 'mongo': args.mongo_latency},
+        'corpus': {
+            'dir': corpus_dir,
+            'seed': manifest['seed'],
+            'documents': len(documents),
+            'pages': sum(d['pages'] for d in documents)
+        },
+        'repeat': args.repeat,
+        'warmup': args.warmup
+    }
+
+    output = args.output or os.path.join(
+        BENCHMARK_CONFIG['results_dir'], f"{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    e2e = results['end_to_end']
+    print(f"Belge/sn: {e2e['docs_per_sec']['median']:.2f} (±{e2e['docs_per_sec']['stdev']:.2f}), "
+          f"sayfa/sn: {e2e['pages_per_sec']['median']:.2f}, "
+          f"gecikme p50/p95: {e2e['latency_ms']['p50']:.1f}/{e2e['latency_ms']['p95']:.1f} ms")
+    for stage, data in results['stages'].items():
+        print(f"  {stage:<16} {data['mean_ms']['median']:>10.2f} ms/çağrı  "
+              f"({data['calls_per_round']} çağrı/tur)")
+    print(f"Sonuçlar: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare_results(baseline, results, args.threshold)
+        print_comparison(rows)
+        if any(row['status'] == 'regression' for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+Ölçüm düzeneği için çevrimdışı yedek bileşenler.
+
+Gerçek sınıflar (DocumentClassifier, UnstructuredTextExtractor, DocumentVectorDB,
+MongoDBClient) kurucuları atlanarak oluşturulur ve yalnızca dış bağımlılıkları
+yedeklerle değiştirilir. Böylece ölçülen kod yolu (görüntü yükleme, ön işleme,
+sayfa döngüleri, sonuç biçimlendirme, metrik zamanlayıcıları) üretimdekiyle
+aynıdır; yalnızca model ağırlıkları, ağ bağlantıları ve dış servisler yoktur.
+
+    Swin                -> rastgele ağırlıklı küçük yapılandırmalı SwinForImageClassification
+    EasyOCR             -> satır izdüşümüyle metin bantlarını bulan StubOCRReader
+    SentenceTransformer -> kelime hash'lerinden vektör üreten StubEmbedder
+    Milvus              -> bellek içi InMemoryMilvusCollection (kaba kuvvet kosinüs araması)
+    MongoDB             -> bellek içi InMemoryMongoCollection
+
+Milvus ve MongoDB yedeklerine 'latency' verilerek ağ gidiş-dönüş süresi
+taklit edilebilir.
+"""
+import re
+import time
+import uuid
+import zlib
+
+import numpy as np
+
+from config.settings import CLASSES, MODEL_CONFIG, VECTORDB_CONFIG, OCR_CONFIG
+
+
+# ---------------------------------------------------------------- sınıflandırıcı
+
+def build_tiny_classifier(seed=0, device=None):
+    """
+    Rastgele ağırlıklı küçük bir Swin ile DocumentClassifier oluşturur.
+    Model dosyası ve önceden eğitilmiş ağırlık indirmesi gerekmez.
+
+    Args:
+        seed (int): Ağırlık başlatma tohumu
+        device (str, optional): 'cpu' veya 'cuda' (varsayılan: uygun olan)
+
+    Returns:
+        DocumentClassifier: predict() gerçek kod yoluyla çalışan sınıflandırıcı
+    """
+    import torch
+    from transformers import SwinConfig, SwinForImageClassification
+    from models.classifier import DocumentClassifier, SwinImageProcessor
+
+    torch.manual_seed(seed)
+    config = SwinConfig(
+        image_size=MODEL_CONFIG['image_size'],
+        patch_size=4,
+        embed_dim=24,
+        depths=[1, 1, 1, 1],
+        num_heads=[1, 2, 4, 8],
+        window_size=7,
+        num_labels=len(CLASSES)
+    )
+
+    classifier = DocumentClassifier.__new__(DocumentClassifier)
+    classifier.processor = SwinImageProcessor(image_size=MODEL_CONFIG['image_size'])
+    classifier.device = torch.device(device or ("cuda" if torch.cuda.is_available() else "cpu"))
+    classifier.model = SwinForImageClassification(config)
+    classifier.model.eval()
+    classifier.model.to(classifier.device)
+    classifier.idx_to_class = {i: cls for i, cls in enumerate(CLASSES)}
+    return classifier
+
+
+# ---------------------------------------------------------------- OCR
+
+class StubOCRReader:
+    def __init__(self, latency=0.0, ink_threshold=128):
+        """
+        EasyOCR Reader yerine geçen, görüntü boyutuyla orantılı iş yapan okuyucu.
+        Satır izdüşümüyle koyu bantları bulur ve her bant için piksellerden
+        türetilmiş sabit bir 'metin' döndürür (aynı sayfa -> aynı metin).
+
+        Args:
+            latency (float): Sayfa başına eklenecek sabit gecikme (saniye)
+            ink_threshold (int): Mürekkep sayılacak en yüksek gri değer
+        """
+        self.latency = latency
+        self.ink_threshold = ink_threshold
+
+    def readtext(self, image, **kwargs):
+        """
+        Args:
+            image (numpy.ndarray): Sayfa görüntüsü (gri veya RGB)
+
+        Returns:
+            list: [(kutu, metin, güven), ...] - EasyOCR ile aynı biçim
+        """
+        if self.latency:
+            time.sleep(self.latency)
+
+        gray = image if image.ndim == 2 else image[..., :3].mean(axis=2)
+        ink_rows = (gray < self.ink_threshold).mean(axis=1) > 0.01
+
+        # Ardışık mürekkepli satırları bantlara grupla
+        results = []
+        start = None
+        for y, has_ink in enumerate(np.append(ink_rows, False)):
+            if has_ink and start is None:
+                start = y
+            elif not has_ink and start is not None:
+                band = gray[start:y]
+                token = f"{zlib.crc32(np.ascontiguousarray(band, dtype=np.uint8).tobytes()):08x}"
+                box = [[0, start], [gray.shape[1], start], [gray.shape[1], y], [0, y]]
+                results.append((box, f"satir{len(results)} {token}", 0.9))
+                start = None
+        return results
+
+
+def build_stub_extractor(reader=None, timeout=None):
+    """
+    StubOCRReader kullanan UnstructuredTextExtractor oluşturur
+
+    Args:
+        reader (optional): OCR okuyucu (varsayılan StubOCRReader())
+        timeout (int, optional): Metin çıkarma zaman aşımı
+
+    Returns:
+        UnstructuredTextExtractor
+    """
+    from models.extractor import UnstructuredTextExtractor
+
+    extractor = UnstructuredTextExtractor.__new__(UnstructuredTextExtractor)
+    extractor.timeout = timeout or OCR_CONFIG['timeout']
+    extractor.languages = OCR_CONFIG.get('languages', ['tr', 'en'])
+    extractor.reader = reader or StubOCRReader()
+    return extractor
+
+
+# ---------------------------------------------------------------- embedding
+
+class StubEmbedder:
+    def __init__(self, dim=384):
+        """
+        SentenceTransformer yerine kelime hash'lerinden (hashing trick) birim
+        vektör üretir. Aynı metin her zaman aynı vektörü verir.
+
+        Args:
+            dim (int): Vektör boyutu (all-MiniLM-L6-v2 ile aynı: 384)
+        """
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def _encode_one(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            digest = zlib.crc32(word.encode('utf-8'))
+            vector[digest % self.dim] += 1.0 if digest & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, sentences, **kwargs):
+        if isinstance(sentences, str):
+            return self._encode_one(sentences)
+        return np.stack([self._encode_one(s) for s in sentences])
+
+
+# ---------------------------------------------------------------- Milvus
+
+class _Hit:
+    def __init__(self, score, entity):
+        self.score = score
+        self.entity = entity
+
+
+class InMemoryMilvusCollection:
+    # DocumentVectorDB şemasındaki alan sırası
+    FIELDS = ("doc_id", "class", "file_path", "processed_date", "text_hash", "content_preview", "embedding")
+
+    def __init__(self, latency=0.0):
+        """
+        Args:
+            latency (float): Her çağrıya eklenecek gecikme (ağ gidiş-dönüşü, saniye)
+        """
+        self.latency = latency
+        self.rows = []
+        self._matrix = None
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def load(self, *args, **kwargs):
+        self._wait()
+
+    def release(self, *args, **kwargs):
+        self._wait()
+
+    def flush(self, *args, **kwargs):
+        self._wait()
+
+    @property
+    def num_entities(self):
+        return len(self.rows)
+
+    def insert(self, entities):
+        """Sütun listeleri biçimindeki kayıtları ekler"""
+        self._wait()
+        columns = dict(zip(self.FIELDS, entities))
+        count = len(columns["doc_id"])
+        for i in range(count):
+            self.rows.append({field: columns[field][i] for field in self.FIELDS})
+        self._matrix = None
+        return {'insert_count': count}
+
+    def search(self, data, anns_field="embedding", param=None, limit=10, output_fields=None, **kwargs):
+        """Kaba kuvvet kosinüs benzerliği araması"""
+        self._wait()
+        if self._matrix is None and self.rows:
+            matrix = np.asarray([row[anns_field] for row in self.rows], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            self._matrix = matrix / np.where(norms == 0, 1, norms)
+
+        output_fields = output_fields or []
+        results = []
+        for query in data:
+            if self._matrix is None:
+                results.append([])
+                continue
+            query = np.asarray(query, dtype=np.float32)
+            query = query / (np.linalg.norm(query) or 1)
+            scores = self._matrix @ query
+            top = np.argsort(-scores)[:limit]
+            results.append([
+                _Hit(float(scores[i]), {field: self.rows[i].get(field) for field in output_fields})
+                for i in top
+            ])
+        return results
+
+    def query(self, expr, output_fields=None, **kwargs):
+        """Yalnızca 'alan == "değer"' ifadelerini destekler"""
+        self._wait()
+        match = re.fullmatch(r'\s*(\w+)\s*==\s*"(.*)"\s*', expr)
+        if not match:
+            raise ValueError(f"Desteklenmeyen sorgu ifadesi: {expr}")
+        field, value = match.groups()
+        output_fields = output_fields or list(self.FIELDS[:-1])
+        return [{f: row.get(f) for f in output_fields} for row in self.rows if row.get(field) == value]
+
+
+def build_stub_vector_db(embedder=None, collection=None):
+    """
+    Yedek embedding modeli ve bellek içi koleksiyonla DocumentVectorDB oluşturur
+
+    Args:
+        embedder (optional): Embedding modeli (varsayılan StubEmbedder())
+        collection (optional): Milvus koleksiyonu (varsayılan InMemoryMilvusCollection())
+
+    Returns:
+        DocumentVectorDB
+    """
+    from utils.vector_db import DocumentVectorDB, search_params
+
+    vector_db = DocumentVectorDB.__new__(DocumentVectorDB)
+    vector_db.collection_name = VECTORDB_CONFIG['collection_name']
+    vector_db.connect_uri = "memory"
+    vector_db.model_name = "stub"
+    vector_db.model = embedder or StubEmbedder()
+    vector_db.vector_dim = vector_db.model.get_sentence_embedding_dimension()
+    vector_db.collection = collection or InMemoryMilvusCollection()
+    vector_db.index_type = VECTORDB_CONFIG['index_type']
+    vector_db.search_params = search_params(vector_db.index_type)
+    return vector_db
+
+
+# ---------------------------------------------------------------- MongoDB
+
+class _InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class InMemoryMongoCollection:
+    def __init__(self, latency=0.0):
+        """
+        Args:
+            latency (float): Her çağrıya eklenecek gecikme (ağ gidiş-dönüşü, saniye)
+        """
+        self.latency = latency
+        self.documents = {}
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def insert_one(self, document):
+        self._wait()
+        document.setdefault('_id', uuid.uuid4().hex[:24])
+        self.documents[document['_id']] = document
+        return _InsertOneResult(document['_id'])
+
+    def find_one(self, query=None, projection=None):
+        self._wait()
+        for document in self.documents.values():
+            if all(document.get(k) == v for k, v in (query or {}).items()):
+                return document
+        return None
+
+    def count_documents(self, query=None):
+        self._wait()
+        return sum(1 for d in self.documents.values()
+                   if all(d.get(k) == v for k, v in (query or {}).items()))
+
+
+class _InMemoryMongo:
+    """MongoClient ve Database yerine geçen basit kapsayıcı"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.collections = {}
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = InMemoryMongoCollection(self.latency)
+        return self.collections[name]
+
+    def close(self):
+        pass
+
+
+def build_stub_mongo_client(latency=0.0):
+    """
+    Bellek içi koleksiyona yazan MongoDBClient oluşturur
+
+    Args:
+        latency (float): Yazma başına eklenecek gecikme (saniye)
+
+    Returns:
+        MongoDBClient
+    """
+    from utils.mongodb_client import MongoDBClient
+
+    mongo_client = MongoDBClient(uri="memory://benchmark")
+    mongo_client.client = _InMemoryMongo(latency)
+    mongo_client.db = mongo_client.client
+    mongo_client.collection = mongo_client.db[mongo_client.collection_name]
+    return mongo_client
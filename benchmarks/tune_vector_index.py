@@ -0,0 +1,457 @@
+#!/usr/bin/env python
+"""
+Milvus vektör indeksi için recall/gecikme/bellek taraması ve ayar seçimi.
+
+Kayıtlı koleksiyondaki vektörler (en fazla tuning['max_vectors']) ayrı bir
+ayarlama koleksiyonuna kopyalanır; canlı koleksiyonun indeksine dokunulmaz.
+Sorgular bu vektörlerden örneklenir. Kesin komşular NumPy ile kaba kuvvet
+kosinüs benzerliğiyle hesaplanır; sorgunun kendisi sonuçlardan çıkarılır.
+Her indeks türü ve kurulum ayarı (IVF_FLAT/IVF_SQ8: nlist, HNSW: M) için
+indeks kurulur ve her arama ayarıyla (nprobe, ef) sorgular tek tek çalıştırılır.
+Rapor recall@k, p50/p95 gecikme, kurulum süresi ve bellek (Milvus'un
+bildirdiği segment belleği, yoksa tahmin) içerir.
+
+Seçilen ayar recall@k >= target_recall sağlayanlar içinde p95 gecikmesi en
+düşük olandır. Koleksiyon ayarlama kopyasından büyükse IVF ayarları
+nlist / sqrt(n) ve nprobe / nlist oranı korunarak tam boyuta ölçeklenir.
+--apply ile canlı koleksiyonun indeksi seçilen ayarla yeniden kurulur. Arama
+parametreleri Milvus'ta saklanmadığı için seçilen ayar
+VECTORDB_CONFIG['tuned_params_path'] dosyasına koleksiyon adıyla yazılır.
+DocumentVectorDB, indeks türü uyuşuyorsa bu ayarı yapılandırmanın yerine
+kullanır. Dosya yazılamıyorsa --apply, seçilen ayar yapılandırmayla
+uyuşmadıkça indekse dokunmaz.
+
+Kullanım:
+    python -m benchmarks.tune_vector_index
+    python -m benchmarks.tune_vector_index --index_types HNSW --top_k 5 --report tuning.json
+    python -m benchmarks.tune_vector_index --target_recall 0.98 --apply
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import logging
+
+import numpy as np
+
+# Proje dizinini Python modül yoluna ekle
+script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
+
+from config.settings import BENCHMARK_CONFIG, VECTORDB_CONFIG
+
+logger = logging.getLogger('DocumentProcessor.Benchmark')
+
+IVF_TYPES = ('IVF_FLAT', 'IVF_SQ8')
+
+
+def round_pow2(value, low=1, high=65536):
+    """En yakın 2'nin kuvveti (sınırlar içinde)"""
+    return int(min(high, max(low, 2 ** round(math.log2(max(value, 1))))))
+
+
+def nlist_candidates(count, factors):
+    """
+    Vektör sayısına göre nlist adayları: faktör x sqrt(n), 2'nin kuvvetine yuvarlanmış
+
+    Args:
+        count (int): Vektör sayısı
+        factors (tuple): sqrt(n) çarpanları
+
+    Returns:
+        list: Artan sırada benzersiz nlist değerleri (en çok vektör sayısı kadar)
+    """
+    return sorted({round_pow2(factor * math.sqrt(count), high=min(65536, max(count, 1))) for factor in factors})
+
+
+def sweep_grid(count, top_k, tuning, index_types=None):
+    """
+    Taranacak kurulum ve arama ayarları
+
+    Args:
+        count (int): Ayarlama koleksiyonundaki vektör sayısı
+        top_k (int): recall@k için k
+        tuning (dict): VECTORDB_CONFIG['tuning']
+        index_types (tuple, optional): Varsayılan tuning['index_types']
+
+    Returns:
+        list: (indeks türü, kurulum parametreleri, [arama parametreleri]) demetleri
+    """
+    grid = []
+    for index_type in index_types or tuning['index_types']:
+        if index_type in IVF_TYPES:
+            for nlist in nlist_candidates(count, tuning['nlist_factors']):
+                probes = [{'nprobe': nprobe} for nprobe in tuning['nprobe'] if nprobe <= nlist]
+                grid.append((index_type, {'nlist': nlist}, probes or [{'nprobe': nlist}]))
+        elif index_type == 'HNSW':
+            # Milvus'ta ef en az istenen sonuç sayısı (k + sorgunun kendisi) olmalı
+            efs = [{'ef': ef} for ef in tuning['hnsw_ef'] if ef >= top_k + 1]
+            for m in tuning['hnsw_m']:
+                grid.append((index_type, {'M': m, 'efConstruction': tuning['hnsw_ef_construction']},
+                             efs or [{'ef': top_k + 1}]))
+        else:
+            raise ValueError(f"Desteklenmeyen indeks türü: {index_type}")
+    return grid
+
+
+def normalize(vectors):
+    """Satırları birim uzunluğa getirir (kosinüs benzerliği için)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def exact_neighbors(vectors, query_rows, k, chunk_size=256):
+    """
+    Sorgu satırlarının kesin en yakın k komşusu (kosinüs, sorgunun kendisi hariç)
+
+    Args:
+        vectors (numpy.ndarray): [N, boyut] birim vektörler
+        query_rows (numpy.ndarray): Sorgu olarak kullanılan satır sıraları
+        k (int): Komşu sayısı
+        chunk_size (int): Bir matris çarpımındaki sorgu sayısı
+
+    Returns:
+        numpy.ndarray: [Q, k] satır sıraları (benzerliğe göre azalan)
+    """
+    k = min(k, len(vectors) - 1)
+    neighbors = []
+    for start in range(0, len(query_rows), chunk_size):
+        rows = query_rows[start:start + chunk_size]
+        scores = vectors[rows] @ vectors.T
+        scores[np.arange(len(rows)), rows] = -np.inf
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind='stable')
+        neighbors.append(np.take_along_axis(top, order, axis=1))
+    return np.concatenate(neighbors)
+
+
+def recall_at_k(truth, results, k):
+    """
+    Ortalama recall@k
+
+    Args:
+        truth (numpy.ndarray): [Q, k] kesin komşular
+        results (list): Her sorgu için bulunan satır sıraları (sorgunun kendisi çıkarılmış)
+        k (int): Komşu sayısı
+
+    Returns:
+        float: 0-1 arası
+    """
+    hits = [len(set(expected[:k]) & set(found[:k])) / len(expected[:k]) for expected, found in zip(truth, results)]
+    return float(np.mean(hits)) if hits else 0.0
+
+
+def estimate_memory(index_type, params, count, dim):
+    """
+    İndeksin yaklaşık bellek kullanımı (bayt): vektör verisi, küme
+    merkezleri ve HNSW komşu listeleri
+    """
+    if index_type == 'IVF_FLAT':
+        return count * dim * 4 + params['nlist'] * dim * 4
+    if index_type == 'IVF_SQ8':
+        return count * dim + params['nlist'] * dim * 4
+    if index_type == 'HNSW':
+        # Katman 0'da 2M, üst katmanlarda M komşu (8 baytlık kimlikler)
+        return count * dim * 4 + count * params['M'] * 2 * 8
+    return count * dim * 4
+
+
+def choose_setting(rows, target_recall):
+    """
+    Hedef recall'u sağlayanlar içinde p95 gecikmesi (eşitlikte bellek) en düşük ayar.
+    Hiçbiri sağlamıyorsa recall'u en yüksek ayar.
+
+    Args:
+        rows (list): Tarama satırları
+        target_recall (float): En az recall@k
+
+    Returns:
+        dict: Seçilen satır (satır yoksa None)
+    """
+    passing = [row for row in rows if row['recall'] >= target_recall]
+    if passing:
+        return min(passing, key=lambda row: (row['p95_ms'], row['memory_bytes']))
+    if rows:
+        logger.warning(f"Hiçbir ayar recall@k >= {target_recall} sağlamadı; en yüksek recall seçildi")
+        return max(rows, key=lambda row: (row['recall'], -row['p95_ms']))
+    return None
+
+
+def scale_setting(index_type, build, search, measured_count, total_count):
+    """
+    Ayarlama kopyasında seçilen IVF ayarını tam koleksiyona ölçekler
+    (nlist / sqrt(n) ve nprobe / nlist oranları korunur; HNSW değişmez)
+
+    Returns:
+        tuple: (kurulum parametreleri, arama parametreleri)
+    """
+    if index_type not in IVF_TYPES or total_count <= measured_count:
+        return dict(build), dict(search)
+    nlist = round_pow2(build['nlist'] * math.sqrt(total_count / measured_count))
+    nprobe = max(1, min(nlist, round(search['nprobe'] * nlist / build['nlist'])))
+    return {'nlist': nlist}, {'nprobe': nprobe}
+
+
+def read_vectors(collection, max_vectors, batch_size=1000):
+    """
+    Canlı koleksiyondan en fazla max_vectors vektör okur
+
+    Returns:
+        numpy.ndarray: [N, boyut] float32
+    """
+    collection.load()
+    rows = []
+    if hasattr(collection, 'query_iterator'):
+        iterator = collection.query_iterator(batch_size=batch_size, expr='doc_id != ""',
+                                             output_fields=['embedding'])
+        try:
+            while len(rows) < max_vectors:
+                page = iterator.next()
+                if not page:
+                    break
+                rows.extend(row['embedding'] for row in page)
+        finally:
+            iterator.close()
+    else:
+        # Eski pymilvus: tek sorguda en fazla 16384 kayıt
+        page = collection.query('doc_id != ""', output_fields=['embedding'], limit=min(max_vectors, 16384))
+        rows.extend(row['embedding'] for row in page)
+    return np.asarray(rows[:max_vectors], dtype=np.float32)
+
+
+class TuningCollection:
+    def __init__(self, name, dim):
+        """
+        Ayarlama için geçici koleksiyon (aynı adda varsa silinip yeniden oluşturulur)
+
+        Args:
+            name (str): Koleksiyon adı
+            dim (int): Vektör boyutu
+        """
+        from pymilvus import Collection, CollectionSchema, FieldSchema, DataType, utility
+
+        self.name = name
+        if utility.has_collection(name):
+            utility.drop_collection(name)
+        schema = CollectionSchema([
+            FieldSchema(name="row", dtype=DataType.INT64, is_primary=True),
+            FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=dim)
+        ])
+        self.collection = Collection(name=name, schema=schema)
+        self.index_type = None
+
+    def insert(self, vectors, chunk_size=10000):
+        """Vektörleri satır sırası kimliğiyle ekler"""
+        for start in range(0, len(vectors), chunk_size):
+            chunk = vectors[start:start + chunk_size]
+            self.collection.insert([list(range(start, start + len(chunk))), chunk.tolist()])
+        self.collection.flush()
+
+    def build(self, index_type, params):
+        """
+        İndeksi kurar ve koleksiyonu belleğe yükler
+
+        Returns:
+            float: Kurulum süresi (saniye)
+        """
+        from utils.vector_db import rebuild_index
+
+        start = time.perf_counter()
+        rebuild_index(self.collection, index_type, params)
+        seconds = time.perf_counter() - start
+        self.collection.load()
+        self.index_type = index_type
+        return seconds
+
+    def memory_bytes(self):
+        """Milvus'un bildirdiği yüklü segment belleği (bildirilmiyorsa None)"""
+        from pymilvus import utility
+        try:
+            segments = utility.get_query_segment_info(self.name)
+            total = sum(getattr(segment, 'mem_size', 0) for segment in segments)
+            return int(total) or None
+        except Exception as e:
+            logger.debug(f"Segment belleği okunamadı: {e}")
+            return None
+
+    def search(self, queries, query_rows, params, k, warmup=5):
+        """
+        Sorguları tek tek çalıştırır (gecikme ölçümü için)
+
+        Returns:
+            tuple: (her sorgu için bulunan satırlar, gecikmeler saniye)
+        """
+        from utils.vector_db import search_params
+
+        param = search_params(self.index_type, params)
+        for query in queries[:warmup]:
+            self.collection.search(data=[query.tolist()], anns_field="embedding", param=param, limit=k + 1)
+
+        found, latencies = [], []
+        for query, row in zip(queries, query_rows):
+            start = time.perf_counter()
+            hits = self.collection.search(data=[query.tolist()], anns_field="embedding", param=param, limit=k + 1)
+            latencies.append(time.perf_counter() - start)
+            found.append([hit.id for hit in hits[0] if hit.id != row][:k])
+        return found, latencies
+
+    def drop(self):
+        from pymilvus import utility
+        self.collection.release()
+        utility.drop_collection(self.name)
+
+
+def run_sweep(bench, vectors, query_rows, truth, grid, k):
+    """
+    Taramayı çalıştırır
+
+    Args:
+        bench (TuningCollection): Vektörleri yüklenmiş ayarlama koleksiyonu
+        vectors (numpy.ndarray): Birim vektörler
+        query_rows (numpy.ndarray): Sorgu satırları
+        truth (numpy.ndarray): exact_neighbors() sonucu
+        grid (list): sweep_grid() sonucu
+        k (int): recall@k için k
+
+    Returns:
+        list: Her (kurulum, arama) ayarı için rapor satırı
+    """
+    rows = []
+    queries = vectors[query_rows]
+    for index_type, build, searches in grid:
+        build_seconds = bench.build(index_type, build)
+        measured = bench.memory_bytes()
+        estimated = estimate_memory(index_type, build, len(vectors), vectors.shape[1])
+        for search in searches:
+            found, latencies = bench.search(queries, query_rows, search, k)
+            row = {
+                'index_type': index_type,
+                'build_params': build,
+                'search_params': search,
+                'recall': recall_at_k(truth, found, k),
+                'p50_ms': float(np.percentile(latencies, 50) * 1000),
+                'p95_ms': float(np.percentile(latencies, 95) * 1000),
+                'build_seconds': build_seconds,
+                'memory_bytes': measured or estimated,
+                'memory_measured': measured is not None
+            }
+            rows.append(row)
+            print_row(row, k)
+    return rows
+
+
+def format_params(params):
+    return ",".join(f"{key}={value}" for key, value in params.items())
+
+
+def print_row(row, k):
+    memory = f"{row['memory_bytes'] / 1024 / 1024:.1f} MB" + ("" if row['memory_measured'] else " (tahmin)")
+    print(f"{row['index_type']:<9} {format_params(row['build_params']):<26} {format_params(row['search_params']):<11} "
+          f"recall@{k} {row['recall']:.4f}  p50 {row['p50_ms']:.2f} ms  p95 {row['p95_ms']:.2f} ms  "
+          f"bellek {memory}  kurulum {row['build_seconds']:.1f} sn")
+
+
+def main():
+    tuning = VECTORDB_CONFIG['tuning']
+    parser = argparse.ArgumentParser(description="Milvus vektör indeksi için recall/gecikme/bellek taraması")
+    parser.add_argument("--uri", default=VECTORDB_CONFIG['uri'], help="Milvus bağlantı URI'si (host:port)")
+    parser.add_argument("--collection", default=VECTORDB_CONFIG['collection_name'], help="Canlı koleksiyon adı")
+    parser.add_argument("--index_types", nargs="+", choices=('IVF_FLAT', 'IVF_SQ8', 'HNSW'), default=None,
+                        help="Taranacak indeks türleri (varsayılan tuning['index_types'])")
+    parser.add_argument("--queries", type=int, default=tuning['queries'], help="Örneklenen sorgu sayısı")
+    parser.add_argument("--top_k", type=int, default=tuning['top_k'], help="recall@k için k")
+    parser.add_argument("--target_recall", type=float, default=tuning['target_recall'],
+                        help="Seçilen ayarın en az recall@k değeri")
+    parser.add_argument("--max_vectors", type=int, default=tuning['max_vectors'],
+                        help="Ayarlama koleksiyonuna kopyalanan en fazla vektör")
+    parser.add_argument("--apply", action="store_true",
+                        help="Canlı koleksiyonun indeksini seçilen ayarla yeniden kur")
+    parser.add_argument("--keep", action="store_true", help="Ayarlama koleksiyonunu silme")
+    parser.add_argument("--report", help="Raporun yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    from pymilvus import Collection
+    from utils.vector_db import connect_milvus, rebuild_index, current_index_type, save_tuned_params
+
+    connect_milvus(args.uri)
+    live = Collection(name=args.collection)
+    total_count = live.num_entities
+    vectors = normalize(read_vectors(live, args.max_vectors))
+    if len(vectors) <= args.top_k:
+        logger.error(f"Koleksiyonda yeterli vektör yok: {len(vectors)}")
+        return 2
+    if len(vectors) < total_count:
+        logger.warning(f"Ölçüm {total_count} vektörün ilk {len(vectors)} tanesiyle yapılıyor; "
+                       f"IVF ayarları tam boyuta ölçeklenecek")
+
+    rng = np.random.default_rng(BENCHMARK_CONFIG['seed'])
+    query_rows = rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)
+    start = time.perf_counter()
+    truth = exact_neighbors(vectors, query_rows, args.top_k)
+    logger.info(f"Kesin komşular hesaplandı: {len(query_rows)} sorgu, {len(vectors)} vektör, "
+                f"{time.perf_counter() - start:.1f} sn")
+
+    grid = sweep_grid(len(vectors), args.top_k, tuning, args.index_types)
+    bench = TuningCollection(f"{args.collection}_tuning", vectors.shape[1])
+    try:
+        bench.insert(vectors)
+        rows = run_sweep(bench, vectors, query_rows, truth, grid, args.top_k)
+    finally:
+        if not args.keep:
+            bench.drop()
+
+    chosen = choose_setting(rows, args.target_recall)
+    build, search = scale_setting(chosen['index_type'], chosen['build_params'], chosen['search_params'],
+                                  len(vectors), total_count)
+    print(f"\nSeçilen ayar ({total_count} vektör için): {chosen['index_type']} {format_params(build)}, "
+          f"arama {format_params(search)} (ölçülen recall@{args.top_k} {chosen['recall']:.4f}, "
+          f"p95 {chosen['p95_ms']:.2f} ms)")
+    print(f"Canlı koleksiyon indeksi: {current_index_type(live, '-')}")
+    print("VECTORDB_CONFIG için:")
+    print(f"    'index_type': \"{chosen['index_type']}\",")
+    print(f"    'index_params': {build},")
+    print(f"    'search_params': {search},")
+
+    if args.apply:
+        # Arama ayarı kaydedilmeden indeks değişirse çalışanlar eski türün ayarıyla arar
+        try:
+            saved = save_tuned_params(args.collection, chosen['index_type'], build, search)
+        except OSError as e:
+            saved = None
+            matches = (chosen['index_type'] == VECTORDB_CONFIG['index_type']
+                       and dict(search) == dict(VECTORDB_CONFIG['search_params']))
+            if not matches:
+                logger.error(f"Arama ayarı kaydedilemedi ({e}) ve VECTORDB_CONFIG seçilen ayarla uyuşmuyor; "
+                             f"indeks yeniden kurulmadı")
+                return 1
+        rebuild_index(live, chosen['index_type'], build)
+        live.load()
+        print(f"Canlı koleksiyon indeksi yeniden kuruldu: {args.collection}")
+        if saved:
+            print(f"Arama ayarı kaydedildi: {saved} (çalışanlar yeniden başlatıldığında geçerli olur)")
+
+    if args.report:
+        report = {
+            'collection': args.collection,
+            'total_vectors': total_count,
+            'measured_vectors': len(vectors),
+            'queries': len(query_rows),
+            'top_k': args.top_k,
+            'target_recall': args.target_recall,
+            'rows': rows,
+            'chosen': {'index_type': chosen['index_type'], 'index_params': build, 'search_params': search},
+            'applied': args.apply
+        }
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
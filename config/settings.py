@@ -14,12 +14,32 @@ CLASSES = [
 # Model yolu - eğitilmiş modelin yolu
 MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 
                          'models_saved', 'best_document_classifier.pth')
+CASCADE_MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'models_saved', 'cascade_pixel.npz')
 
 # Model ayarları
 MODEL_CONFIG = {
     'pretrained_model': "microsoft/swin-base-patch4-window7-224-in22k",
     'image_size': 224,
-    'num_classes': 16
+    'num_classes': 16,
+    'fast_decode': True,       # Görüntüyü çözücüden küçültülmüş iste (JPEG draft, Image.reduce, düşük DPI PDF)
+    'decode_oversample': 2,    # Hızlı çözmede son boyuta inmeden önce korunacak en küçük kenar (image_size katı)
+    'pdf_dpi': 72,             # Hızlı yolda PDF ilk sayfasının çizim çözünürlüğü
+    'pdf_render_chunk': 8,     # Bir pdftoppm çağrısında çizilen en fazla sayfa (seyrek örneklenen sayfalar ayrı çizilir)
+    'batch_size': 16,          # predict_batch: bir ileri geçişteki görüntü sayısı
+    'loader_workers': 2,       # predict_batch: görüntüleri önden çözen süreç sayısı (0: aynı süreçte)
+    'prefetch_batches': 2,     # Model çalışırken önden doldurulan paylaşılan bellek grup tamponu sayısı
+    'loader_start_method': "spawn",  # Yükleyici süreç başlatma yöntemi (torch ile fork güvenli değil)
+    'loader_timeout': 60,      # Yükleyici süreçlerden yanıt beklenecek en uzun süre (saniye)
+    'document_level': True,    # Çok sayfalı TIFF/PDF'leri sayfa bazında sınıflandırıp birleştir
+    'page_aggregation': "mean",  # mean, max veya first_confident
+    'max_pages': 8,            # Sınıflandırılacak en fazla sayfa (fazlası eşit aralıkla örneklenir)
+    'page_confidence_threshold': 0.8,  # first_confident: kararı verecek sayfanın en düşük güveni
+    'cascade': False,          # Ucuz piksel modeli eminse Swin'i atla (model: benchmarks/distill_cascade.py)
+    'cascade_model_path': CASCADE_MODEL_PATH,
+    'cascade_feature_size': 32,  # Ucuz model özellik ızgarası (224 / 32 = 7 piksellik bloklar)
+    'cascade_target_agreement': 0.99,  # Kalibrasyon: ucuz modelin cevapladığı belgelerde Swin ile en az uyum
+    'cascade_threshold': None  # Kalibre edilmiş eşiğin üzerine yazmak için (None: model dosyasındaki)
 }
 
 # LLM analiz ayarları
@@ -28,14 +48,32 @@ LLM_CONFIG = {
     'timeout': 120,
     'max_tokens': 800,
     'temperature': 0.1,
-    'max_chars': 500
+    'max_chars': 500,
+    'batch_size': 8,          # BatchedAnalyzerService: bir üretim grubundaki en fazla istek
+    'batch_max_wait': 0.05,   # BatchedAnalyzerService: grubu doldurmak için en fazla bekleme (saniye)
+    'structured_output': False,  # Sınıf alanlarını 'alan: değer' olarak üret ve sözlüğe ayrıştır
+    'structured_max_tokens': 300,  # Yapılandırılmış modda üst sınır (alanlar dolunca daha erken durur)
+    'prefix_cache': True,     # Şablon öneklerinin KV durumunu bir kez hesaplayıp yeniden kullan
+    'prefix_cache_size': 16,  # Bellekte tutulacak en fazla önek KV durumu
+    'prefix_cache_max_failures': 3,  # Art arda bu kadar hatadan sonra önek cache'ini kapat
+    'result_cache': True,     # (model, şablon, metin hash'i) anahtarlı kalıcı sonuç önbelleği
+    'result_cache_path': os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                      'logs', 'analysis_cache.sqlite3'),
+    'result_cache_max_entries': 10000,
+    'result_cache_ttl': 30 * 24 * 60 * 60,  # saniye
+    'cancel_grace': 5         # Zaman aşımından sonra üretimin durması için beklenecek süre (saniye)
 }
 
 # OCR ayarları
 OCR_CONFIG = {
     'timeout': 60,
     'languages': ['tr', 'en'],  # EasyOCR dil listesi (Türkçe ve İngilizce)
-    'use_gpu': True,          # GPU kullanımı
+    'use_gpu': 'auto',        # GPU kullanımı: 'auto' (kaynak planına göre), True veya False
+    'cancel_grace': 10,       # Zaman aşımından sonra işçinin sayfa arasında durması için beklenecek süre (saniye)
+    'pdf_render_chunk': 4,    # Bir pdftoppm çağrısında çizilen en fazla sayfa (300 DPI'da sayfa başına ~25 MB)
+    'batched_recognition': True,     # Algılama sayfa başına, tanıma sayfalar/belgeler arası toplu
+    'recognition_batch_size': 64,    # Bir tanıma grubundaki satır kesiti sayısı
+    'recognition_pool_batches': 4,   # Bekleyen kesitler bu kadar grup dolunca genişliğe göre sıralanıp tanınır
     'tesseract_path': r"C:\Program Files\Tesseract-OCR\tesseract.exe"  # Uyumluluk için tutulan eski değer
 }
 
@@ -43,17 +81,130 @@ OCR_CONFIG = {
 MONGODB_CONFIG = {
     'uri': "mongodb://localhost:27017/",
     'db_name': "document_db",
-    'collection_name': "processed_documents"
+    'collection_name': "processed_documents",
+    'schema_version': 2,                        # 1: eski düz yapı, 2: paketli olasılıklar + sıkıştırılmış metin
+    'text_compress_threshold': 2048,            # Bu uzunluktan (karakter) büyük metinler zlib ile sıkıştırılır
+    'text_gridfs_threshold': 4 * 1024 * 1024,   # Sıkıştırılmış metin bu boyutu (bayt) aşarsa GridFS'e taşınır
+    'text_gridfs_bucket': "document_texts"
+}
+
+# Aşama zamanlayıcı (utils/pipeline.py): classify -> ocr -> index -> persist
+SCHEDULER_CONFIG = {
+    'stage_workers': {'classify': 1, 'ocr': 2, 'index': 1, 'persist': 1},  # Aşama başına iş parçacığı
+    'queue_size': {'classify': 32, 'ocr': 8, 'index': 16, 'persist': 16},  # Aşama kuyruk sınırları
+    'reserved_workers': 1,      # Aşama başına bulk işlere verilmeyen iş parçacığı sayısı
+    'high_watermark': 0.8,      # Kuyruk bu dolulukta ise alım yavaşlatılır
+    'express_pages': 2,         # Bu kadar veya daha az sayfalı ...
+    'express_bytes': 5 * 1024 * 1024,   # ... ve bu boyuttan küçük belgeler 'express'
+    'bulk_pages': 50,           # Bu kadar veya daha çok sayfalı ...
+    'bulk_bytes': 50 * 1024 * 1024,     # ... veya bu boyuttan büyük belgeler 'bulk'
+    'folder_priorities': {}     # Kaynak klasör adı -> öncelik sınıfı (ör. {'acil': 'express', 'arsiv': 'bulk'})
+}
+
+# Dağıtık iş kuyruğu (document_worker.py)
+JOB_QUEUE_CONFIG = {
+    'uri': MONGODB_CONFIG['uri'],
+    'db_name': MONGODB_CONFIG['db_name'],
+    'collection_name': "document_jobs",
+    'lease_seconds': 300,       # İşçi bu süre kalp atışı göndermezse iş başka işçiye geçer
+    'heartbeat_interval': 60,   # Kira yenileme aralığı (saniye; en çok lease_seconds / 3)
+    'max_attempts': 3,          # Bu kadar denemeden sonra iş 'failed' olur
+    'retry_backoff': 30,        # Başarısız işin yeniden denenmesinden önce bekleme (saniye, her denemede 2 katı)
+    'poll_interval': 2,         # Kuyruk boşken bekleme (saniye)
+    'scan_interval': 10,        # Giriş klasörünü tarama aralığı (saniye)
+    'extensions': ('.pdf', '.tif', '.tiff', '.jpg', '.jpeg', '.png')
 }
 
 VECTORDB_CONFIG = {
     'uri': "localhost:19530",
     'collection_name': "document_vectors",
     'model_name': "all-MiniLM-L6-v2",  # SentenceTransformer modeli
-    'nlist': 128,  # IVF indeksi için küme sayısı
-    'nprobe': 10,  # Arama sırasında kontrol edilecek küme sayısı
+    'metric_type': "COSINE",
+    'index_type': "IVF_FLAT",         # IVF_FLAT, IVF_SQ8 veya HNSW (seçim: benchmarks/tune_vector_index.py)
+    'index_params': {'nlist': 128},   # Kurulum: IVF için nlist (küme sayısı), HNSW için M ve efConstruction
+    'search_params': {'nprobe': 10},  # Arama: IVF için nprobe (bakılan küme), HNSW için ef (aday listesi)
+    # tune_vector_index.py --apply ile uygulanan ayar (koleksiyon adına göre); indeks türü uyuşursa
+    # search_params'ın yerine geçer. Birden fazla makinede çalışılıyorsa paylaşılan bir yol verilmelidir.
+    'tuned_params_path': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vector_index_tuning.json'),
+    'tuning': {
+        'queries': 200,            # Koleksiyondan örneklenen sorgu vektörü sayısı
+        'top_k': 10,               # recall@k için k
+        'target_recall': 0.95,     # Seçilen ayarın en az recall@k değeri
+        'max_vectors': 200000,     # Ayarlama koleksiyonuna kopyalanan en fazla vektör
+        'index_types': ('IVF_FLAT', 'IVF_SQ8', 'HNSW'),
+        'nlist_factors': (1, 2, 4),     # nlist adayları: faktör x sqrt(vektör sayısı), 2'nin kuvvetine yuvarlanır
+        'nprobe': (1, 4, 8, 16, 32, 64, 128),
+        'hnsw_m': (8, 16, 32),
+        'hnsw_ef_construction': 200,
+        'hnsw_ef': (16, 32, 64, 128, 256)
+    }
 }
 
+# Aşama kökeni (utils/provenance.py) ve model yükseltmesi sonrası yeniden işleme (document_reprocessor.py)
+PROVENANCE_CONFIG = {
+    'versions': {'classifier': None, 'ocr': None, 'embedding': None},  # Elle verilen sürüm etiketleri (parmak izine girer)
+    'hash_chunk_bytes': 4 * 1024 * 1024,  # Model dosyası özetlenirken okunan parça boyutu
+    'trust_unknown': (),        # Kökeni olmayan eski kayıtlarda güncel sayılacak aşamalar (ör. ('ocr',))
+    'batch_size': 32            # Yeniden işlemede bir grupta ele alınan belge sayısı
+}
+
+# Sonuç günlüğü (JSON Lines segmentleri)
+RESULT_LOG_CONFIG = {
+    'directory': os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'processed_results'),
+    'max_segment_bytes': 64 * 1024 * 1024,  # Segment bu boyutu aşınca yenisi açılır
+    'max_segment_age': 24 * 60 * 60,        # Segment bu süreden (saniye) eskiyse yenisi açılır
+    'max_segments': None                    # Tutulacak en fazla segment (None: hepsi); eskiler silinir, indeksleri budanır
+}
+
+# Metrik ayarları
+METRICS_CONFIG = {
+    'prefix': "docflow",
+    'port': 9108,  # Sürekli modda Prometheus uç noktası portu
+    'buckets': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+    'file': os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'metrics.prom')
+}
+
+# Çalışma zamanı kaynak planı (utils/resources.py)
+RESOURCE_CONFIG = {
+    'workers_per_host': None,   # Aynı makinedeki işçi süreci sayısı (None: DOCFLOW_WORKERS ortam değişkeni veya 1)
+    'worker_index': None,       # Bu işçinin sırası (None: DOCFLOW_WORKER_INDEX ortam değişkeni veya 0)
+    'reserved_cores': 0,        # İşletim sistemi / Milvus / MongoDB için ayrılacak çekirdek sayısı
+    'concurrent_stages': 1,     # Aynı anda model çalıştıran aşama iş parçacığı sayısı; torch havuzu
+                                # işçinin çekirdeklerinin bu sayıya bölümüyle bir kez ayarlanır
+                                # (sırayla çalışan aşamalarda 1; --pipeline bunu SCHEDULER_CONFIG'ten belirler)
+    'use_gpu': True,            # CUDA varsa modeller GPU'ya yerleştirilir (işçiler GPU'lara sırayla dağıtılır)
+    'interop_threads': 1,       # torch inter-op iş parçacığı sayısı
+    'pin_cores': False          # İşçiyi kendi çekirdek dilimine sabitle (os.sched_setaffinity)
+}
+
+# Belge bazlı profil çıkarma (--profile ve Robot kütüphanesi)
+PROFILING_CONFIG = {
+    'directory': os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs', 'profiles'),
+    'mode': "sampling",        # sampling: yalnızca yığın örnekleme (düşük ek yük), full: + cProfile ve torch profiler
+    'sample_interval': 0.01,   # Yığın örnekleme aralığı (saniye)
+    'top_functions': 25        # Aşama özetindeki en pahalı fonksiyon/operatör sayısı
+}
+
+# Performans ölçüm düzeneği (benchmarks/)
+BENCHMARK_CONFIG = {
+    'seed': 1234,
+    'corpus_dir': os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'corpus'),
+    'results_dir': os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'results'),
+    'sample_dir': os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'input_documents'),
+    'formats': ('tif', 'pdf', 'png'),
+    'page_counts': (1, 4),          # Tek ve çok sayfalı belgeler (PNG her zaman tek sayfa)
+    'dpis': (150, 200, 300),
+    'densities': {'sparse': 8, 'normal': 25, 'dense': 50},  # Sayfa başına metin satırı
+    'regression_threshold': 0.10,   # Karşılaştırmada anlamlı sayılan göreli değişim
+    'decode_parity_min_agreement': 0.98  # Hızlı/tam çözme yollarının en az tahmin uyumu (decode_parity.py)
+}
+
+# Yönlendirme kuralları - Python kural motoru ve Drools eşdeğeri
+ROUTING_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'routing_rules.json')
+ROUTING_DRL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'drools-project', 'src', 'main', 'resources', 'com', 'mercedes',
+                                'documentprocessing', 'DocumentRouting.drl')
+
 # Geçici dosyalar için dizin
 TEMP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp')
 os.makedirs(TEMP_DIR, exist_ok=True)
@@ -9,6 +9,10 @@ Kullanım:
     python document_classifier.py --file /yol/belge.pdf --mode full
     python document_classifier.py --file /yol/belge.pdf --mode classify --output sonuc.json
     python document_classifier.py --file /yol/belge.pdf --mode full --save_to_mongo
+    python document_classifier.py --file /yol/belge.pdf --mode full --result_log processed_results
+    python document_classifier.py --file /yol/belge.pdf --mode full --metrics_file logs/metrics.prom
+    python document_classifier.py --file /yol/belge.pdf --mode full --output sonuc.json --profile
+    python document_classifier.py --file /yol/belge.pdf --mode full --workers 4 --worker_index 1
 """
 import os
 import sys
@@ -16,6 +20,7 @@ import json
 import argparse
 import traceback
 import logging
+from contextlib import nullcontext
 from datetime import datetime
 from utils.vector_db import DocumentVectorDB
 
@@ -28,9 +33,14 @@ if script_dir not in sys.path:
 from models.classifier import DocumentClassifier
 from models.extractor import UnstructuredTextExtractor
 # from models.analyzer import DocumentAnalyzer  # <-- LLM analiz kodu kapalı
-from utils.helpers import process_single_document, save_result_to_json, format_result_for_mongodb
+from utils.helpers import (process_single_document, save_result_to_json, format_result_for_mongodb,
+                           add_processing_summary, skipped_extraction)
 from utils.mongodb_client import MongoDBClient
-from config.settings import MODEL_PATH
+from utils.result_log import ResultLog
+from utils.metrics import METRICS
+from utils.profiling import DocumentProfiler
+from utils import resources
+from config.settings import MODEL_PATH, METRICS_CONFIG
 
 
 logging.basicConfig(
@@ -44,7 +54,9 @@ logging.basicConfig(
 logger = logging.getLogger('DocumentClassifier')
 
 
-def process_document(file_path, mode="full", mongo_uri=None,use_vector_db=True):
+def process_document(file_path, mode="full", mongo_uri=None,use_vector_db=True,
+                     classifier=None, extractor=None, vector_db=None, mongo_client=None, profiler=None,
+                     extraction=None, classification=None):
     """
     Belgeyi işle ve sonuçları döndür
     
@@ -56,6 +68,13 @@ def process_document(file_path, mode="full", mongo_uri=None,use_vector_db=True):
                    "full"     - (LLM analizi kapalı, ancak metin çıkarma + sınıflandırma)
         mongo_uri (str, optional): MongoDB URI (belirtilirse sonuçlar MongoDB'ye kaydedilir)
         use_vector_db (bool): Vektör veritabanı kullanılacak mı
+        classifier (optional): Önceden yüklenmiş DocumentClassifier (verilmezse yüklenir)
+        extractor (optional): Önceden yüklenmiş UnstructuredTextExtractor (verilmezse yüklenir)
+        vector_db (optional): Önceden bağlanmış DocumentVectorDB (verilmezse bağlanılır)
+        mongo_client (optional): Açık MongoDBClient (verilirse mongo_uri yerine kullanılır, kapatılmaz)
+        profiler (DocumentProfiler, optional): Verilirse belge işleme profili çıkarılır
+        extraction (dict, optional): Önceden çıkarılmış metin (extract_text_batch sonucu); verilirse OCR atlanır
+        classification (dict, optional): Önceden yapılmış sınıflandırma (predict_batch sonucu); verilirse model atlanır
     
     Returns:
         dict: İşleme sonuçları (JSON serileştirilebilir biçimde)
@@ -68,6 +87,7 @@ def process_document(file_path, mode="full", mongo_uri=None,use_vector_db=True):
         if not os.path.exists(file_path):
             error_msg = f"Dosya bulunamadı: {file_path}"
             logger.error(error_msg)
+            METRICS.inc('documents_total', status='not_found')
             return {
                 "status": "error",
                 "error": error_msg,
@@ -75,36 +95,52 @@ def process_document(file_path, mode="full", mongo_uri=None,use_vector_db=True):
             }
         
         
-        classifier = DocumentClassifier(model_path=MODEL_PATH)
-        extractor = UnstructuredTextExtractor()
+        classifier = classifier or DocumentClassifier(model_path=MODEL_PATH)
+        extractor = extractor or UnstructuredTextExtractor()
         
+        # classify modunda OCR çalıştırılmaz
+        if mode == "classify" and extraction is None:
+            extraction = skipped_extraction("classify_mode")
         
-        vector_db = None
-        if use_vector_db:
+        
+        if use_vector_db and vector_db is None:
             try:
                 vector_db = DocumentVectorDB()
                 logger.info("Vektör veritabanı başlatıldı")
             except Exception as e:
                 logger.error(f"Vektör veritabanı başlatma hatası: {e}")
+        if not use_vector_db:
+            vector_db = None
         
-        # Belgeyi işle
-        result = process_single_document(
-            file_path,
-            classifier=classifier,
-            extractor=extractor,
-            analyzer=None,
-            vector_db=vector_db,
-            skip_analysis=True,
-            check_duplicates=use_vector_db
-        )
+        # Belgeyi işle (istenirse profil çıkararak)
+        with (profiler.profile(file_path) if profiler else nullcontext()) as profile_session:
+            result = process_single_document(
+                file_path,
+                classifier=classifier,
+                extractor=extractor,
+                analyzer=None,
+                vector_db=vector_db,
+                skip_analysis=True,
+                check_duplicates=use_vector_db,
+                extraction_result=extraction,
+                classification_result=classification
+            )
+        if profile_session is not None:
+            try:
+                result['processing_info']['profile'] = profile_session.save(result)
+            except Exception as e:
+                logger.error(f"Profil yazma hatası: {e}")
         
         
-        if mongo_uri:
+        if mongo_uri or mongo_client:
             try:
                 mongo_doc = format_result_for_mongodb(result)
-                mongo_client = MongoDBClient(uri=mongo_uri)
-                doc_id = mongo_client.save_document(mongo_doc)
-                mongo_client.close()
+                if mongo_client:
+                    doc_id = mongo_client.save_document(mongo_doc)
+                else:
+                    mongo_client = MongoDBClient(uri=mongo_uri)
+                    doc_id = mongo_client.save_document(mongo_doc)
+                    mongo_client.close()
                 
                 if doc_id:
                     result['mongodb_id'] = doc_id
@@ -116,27 +152,16 @@ def process_document(file_path, mode="full", mongo_uri=None,use_vector_db=True):
                 result['mongodb_error'] = str(e)
         
         # İşleme süresi
-        end_time = datetime.now()
-        processing_time = (end_time - start_time).total_seconds()
-        
-        result['status'] = "success"
-        result['processing_summary'] = {
-            'mode': mode,
-            'start_time': start_time.isoformat(),
-            'end_time': end_time.isoformat(),
-            'total_time': processing_time,
-            'class': result['classification']['class'],
-            'confidence': result['classification']['confidence'],
-            'text_length': len(result['extraction']['text']) if 'extraction' in result else 0,
-            'has_analysis': False  # LLM analizi kapalı
-        }
+        processing_time = add_processing_summary(result, mode, start_time)
         
+        METRICS.inc('documents_total', status='success')
         logger.info(f"Belge işleme tamamlandı: {file_path}, Süre: {processing_time:.2f} sn")
         return result
         
     except Exception as e:
         error_info = traceback.format_exc()
         logger.error(f"Belge işleme hatası: {e}\n{error_info}")
+        METRICS.inc('documents_total', status='error')
         
         return {
             "status": "error",
@@ -154,6 +179,16 @@ def main():
     parser.add_argument("--output", help="Sonuçları JSON dosyasına yazılacak dosya yolu (stdout yerine)")
     parser.add_argument("--save_to_mongo", help="MongoDB bağlantı URI'si (belirtilirse sonuçlar MongoDB'ye de kaydedilir)")
     parser.add_argument("--use_vector_db", action="store_true", help="Vektör veritabanını kullan")
+    parser.add_argument("--result_log", nargs="?", const="", default=None,
+                        help="Sonucu JSON Lines sonuç günlüğüne ekle (dizin verilmezse RESULT_LOG_CONFIG['directory'])")
+    parser.add_argument("--metrics_file", nargs="?", const="", default=None,
+                        help="Aşama metriklerini Prometheus textfile olarak yaz (yol verilmezse METRICS_CONFIG['file'])")
+    parser.add_argument("--profile", nargs="?", const="full", choices=["full", "sampling"], default=None,
+                        help="Belge işleme profilini çıkar (full: cProfile + torch profiler + yığın örnekleme)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Makinede eşzamanlı çalışan işçi sayısı (çekirdekler buna göre paylaştırılır; varsayılan DOCFLOW_WORKERS)")
+    parser.add_argument("--worker_index", type=int, default=None,
+                        help="Bu işçinin sırası (varsayılan DOCFLOW_WORKER_INDEX)")
     parser.add_argument("--verbose", action="store_true", help="Detaylı log çıktısı (stderr'e)")
 
     args = parser.parse_args()
@@ -162,8 +197,28 @@ def main():
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
     
+    # Modeller yüklenmeden önce çekirdek/cihaz planını çıkar ve uygula
+    resources.configure(args.workers, args.worker_index)
+    
+    # Profil dosyaları sonuç dosyasının yanına, sonuç stdout'a gidiyorsa profil dizinine yazılır
+    profiler = None
+    if args.profile:
+        prefix = f"{os.path.splitext(args.output)[0]}.profile" if args.output else None
+        profiler = DocumentProfiler(mode=args.profile, prefix=prefix)
+    
     # Belgeyi işle
-    result = process_document(args.file, args.mode, args.save_to_mongo, args.use_vector_db) 
+    result = process_document(args.file, args.mode, args.save_to_mongo, args.use_vector_db,
+                              profiler=profiler)
+    
+    # Sonuç günlüğüne ekle
+    if args.result_log is not None:
+        with ResultLog(args.result_log or None) as result_log:
+            location = result_log.append(result)
+        logger.info(f"Sonuç günlüğe eklendi: {location['segment']} (ofset: {location['offset']})")
+    
+    # Aşama metriklerini yaz
+    if args.metrics_file is not None:
+        METRICS.write_file(args.metrics_file or METRICS_CONFIG['file'])
     
     # Sonucu JSON olarak çıktıla
     if args.output:
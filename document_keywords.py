@@ -0,0 +1,217 @@
+# document_keywords.py
+"""
+Robot Framework için süreç içi belge işleme anahtar kelime kütüphanesi.
+
+Modeller Robot sürecinde bir kez yüklenir ve her belge için doğrudan
+process_document çağrılır; alt süreç başlatılmaz, stdout/stderr dosyaya
+yazılıp geri okunmaz, sonuç JSON'a çevrilip yeniden ayrıştırılmaz.
+Anahtar kelimeler doğal Python sözlükleri döndürür.
+
+Kullanım (robot):
+    Evaluate          sys.path.insert(0, $CURDIR)    modules=sys
+    Import Library    document_keywords.DocumentKeywords
+    ${result}=        Process Document    ${path}    ${mongo_uri}    ${db_name}    ${collection_name}
+    ${results}=       Process Documents    ${paths}    ${mongo_uri}    ${db_name}    ${collection_name}
+"""
+import os
+import sys
+import logging
+
+# Proje dizinini Python modül yoluna ekle
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
+
+from document_classifier import process_document
+from models.classifier import DocumentClassifier
+from models.extractor import UnstructuredTextExtractor
+from utils.vector_db import DocumentVectorDB
+from utils.mongodb_client import MongoDBClient
+from utils.result_log import ResultLog
+from utils.metrics import start_http_server
+from utils.profiling import DocumentProfiler
+from utils import resources
+from config.settings import MODEL_PATH
+
+logger = logging.getLogger('DocumentClassifier.Keywords')
+
+
+class DocumentKeywords:
+    # Tek örnek tüm suite boyunca yaşar; modeller bir kez yüklenir
+    ROBOT_LIBRARY_SCOPE = 'GLOBAL'
+
+    def __init__(self, use_vector_db=True, result_log_dir=None, metrics_port=None, profile_rate=0.0,
+                 profile_mode=None, workers=None, worker_index=None):
+        """
+        Args:
+            use_vector_db (bool): Vektör veritabanı kullanılacak mı
+            result_log_dir (str, optional): Sonuçların ekleneceği JSON Lines günlük dizini
+            metrics_port (int, optional): Belirtilirse aşama metrikleri bu porttan /metrics ile sunulur
+            profile_rate (float): Profili çıkarılacak belge oranı (0 kapalı, 1 her belge)
+            profile_mode (str, optional): 'sampling' veya 'full' (varsayılan PROFILING_CONFIG['mode'])
+            workers (int, optional): Makinede eşzamanlı çalışan Robot süreci sayısı (varsayılan DOCFLOW_WORKERS)
+            worker_index (int, optional): Bu sürecin sırası (varsayılan DOCFLOW_WORKER_INDEX)
+        """
+        self.use_vector_db = str(use_vector_db).lower() not in ('false', '0', 'no')
+        self.result_log_dir = result_log_dir
+        self.metrics_port = int(metrics_port) if metrics_port else None
+        self.metrics_server = None
+        self.profiler = None
+        self.set_profiling(profile_rate, profile_mode)
+        self.classifier = None
+        self.extractor = None
+        self.vector_db = None
+        self.result_log = None
+        self.mongo_clients = {}
+        self.workers = int(workers) if workers else None
+        self.worker_index = int(worker_index) if worker_index not in (None, '') else None
+
+    def load_models(self):
+        """Sınıflandırıcı, OCR ve (isteğe bağlı) vektör veritabanını yükler"""
+        if self.metrics_port and self.metrics_server is None:
+            try:
+                self.metrics_server = start_http_server(self.metrics_port)
+            except OSError as e:
+                logger.error(f"Metrik uç noktası başlatılamadı: {e}")
+                self.metrics_port = None
+
+        if self.classifier is None:
+            # Modeller yüklenmeden önce çekirdek/cihaz planını çıkar ve uygula
+            resources.configure(self.workers, self.worker_index)
+            self.classifier = DocumentClassifier(model_path=MODEL_PATH)
+
+        if self.extractor is None:
+            self.extractor = UnstructuredTextExtractor()
+
+        if self.use_vector_db and self.vector_db is None:
+            try:
+                self.vector_db = DocumentVectorDB()
+                logger.info("Vektör veritabanı başlatıldı")
+            except Exception as e:
+                # Bağlantı yoksa vektör kontrolü olmadan devam et, sonraki çağrıda tekrar denenmez
+                logger.error(f"Vektör veritabanı başlatma hatası: {e}")
+                self.use_vector_db = False
+
+    def _get_mongo_client(self, mongo_uri, db_name=None, collection_name=None):
+        """Aynı bağlantı bilgileri için açık MongoDB istemcisini yeniden kullanır"""
+        key = (mongo_uri, db_name, collection_name)
+        if key not in self.mongo_clients:
+            self.mongo_clients[key] = MongoDBClient(uri=mongo_uri, db_name=db_name,
+                                                    collection_name=collection_name)
+        return self.mongo_clients[key]
+
+    def process_document(self, document_path, mongo_uri=None, db_name=None, collection_name=None, mode="full"):
+        """
+        Belgeyi süreç içinde işler ve sonucu sözlük olarak döndürür
+
+        Args:
+            document_path (str): İşlenecek belge dosyasının yolu
+            mongo_uri (str, optional): MongoDB URI (belirtilirse sonuç kaydedilir)
+            db_name (str, optional): Veritabanı adı
+            collection_name (str, optional): Koleksiyon adı
+            mode (str): İşleme modu (classify, extract, full)
+
+        Returns:
+            dict: İşleme sonuçları
+        """
+        self.load_models()
+
+        mongo_client = self._get_mongo_client(mongo_uri, db_name, collection_name) if mongo_uri else None
+        result = process_document(
+            document_path,
+            mode=mode,
+            use_vector_db=self.use_vector_db,
+            classifier=self.classifier,
+            extractor=self.extractor,
+            vector_db=self.vector_db,
+            mongo_client=mongo_client,
+            profiler=self.profiler
+        )
+
+        if self.result_log_dir:
+            if self.result_log is None:
+                self.result_log = ResultLog(self.result_log_dir)
+            self.result_log.append(result)
+
+        return result
+
+    def process_documents(self, document_paths, mongo_uri=None, db_name=None, collection_name=None, mode="full"):
+        """
+        Birden çok belgeyi işler; sınıflandırma ve OCR tanıma adımları belgeler arasında toplu çalışır
+
+        Args:
+            document_paths (list): İşlenecek belge dosyalarının yolları
+            mongo_uri (str, optional): MongoDB URI (belirtilirse sonuçlar kaydedilir)
+            db_name (str, optional): Veritabanı adı
+            collection_name (str, optional): Koleksiyon adı
+            mode (str): İşleme modu (classify, extract, full)
+
+        Returns:
+            list: Her belge için işleme sonuçları
+        """
+        self.load_models()
+
+        document_paths = list(document_paths)
+        existing = [path for path in document_paths if os.path.exists(path)]
+        classifications = dict(zip(existing, self.classifier.predict_batch(existing)))
+        # classify modunda process_document OCR çalıştırmaz
+        extractions = {} if mode == "classify" else dict(zip(existing, self.extractor.extract_text_batch(existing)))
+
+        mongo_client = self._get_mongo_client(mongo_uri, db_name, collection_name) if mongo_uri else None
+        results = []
+        for document_path in document_paths:
+            result = process_document(
+                document_path,
+                mode=mode,
+                use_vector_db=self.use_vector_db,
+                classifier=self.classifier,
+                extractor=self.extractor,
+                vector_db=self.vector_db,
+                mongo_client=mongo_client,
+                profiler=self.profiler,
+                extraction=extractions.get(document_path),
+                classification=classifications.get(document_path)
+            )
+            if self.result_log_dir:
+                if self.result_log is None:
+                    self.result_log = ResultLog(self.result_log_dir)
+                self.result_log.append(result)
+            results.append(result)
+
+        return results
+
+    def get_resource_plan(self):
+        """
+        Süreç için seçilen çekirdek/cihaz planını döndürür
+
+        Returns:
+            dict: Kaynak planı (utils.resources.plan_resources biçiminde)
+        """
+        return resources.get_plan()
+
+    def set_profiling(self, rate=1.0, mode=None):
+        """
+        Çalışan süreçte profil çıkarmayı açar/kapatır
+
+        Args:
+            rate (float): Profili çıkarılacak belge oranı (0 kapatır)
+            mode (str, optional): 'sampling' veya 'full'
+        """
+        rate = float(rate or 0)
+        self.profiler = DocumentProfiler(mode=mode, rate=rate) if rate > 0 else None
+        if self.profiler:
+            logger.info(f"Profil çıkarma açık: oran={rate}, mod={self.profiler.mode}")
+
+    def close_document_library(self):
+        """Açık bağlantıları, dosyaları ve yükleyici süreçlerini kapatır"""
+        if self.classifier is not None:
+            self.classifier.close()
+        for mongo_client in self.mongo_clients.values():
+            mongo_client.close()
+        self.mongo_clients = {}
+        if self.result_log is not None:
+            self.result_log.close()
+            self.result_log = None
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+            self.metrics_server = None
@@ -0,0 +1,485 @@
+#!/usr/bin/env python
+"""
+Model yükseltmesinden sonra kayıtlı sonuçları aşama bazında yeniden işler.
+
+Her kayıt, sonucu üreten modellerin kimliğini 'provenance' altında taşır
+(bkz. utils/provenance.py). Komut kayıtlardaki kimlikleri yapılandırmadaki
+güncel modellerle karşılaştırır. Yalnızca kimliği değişen aşamaları yeniden
+çalıştırır:
+
+    classifier : Belge dosyasından yeniden sınıflandırılır; kayıtlı OCR metni korunur
+    ocr        : Metin yeniden çıkarılır (belge dosyası gerekir)
+    embedding  : Kayıtlı (veya yeni) metin yeniden vektörleştirilir
+
+Vektör kaydı sınıfı ve metni taşıdığından sınıf ya da metin değişen indeksli
+belgeler de yeniden indekslenir (aynı doc_id ile; grup başına tek silme, tek
+ekleme ve tek flush). İçerik analizi yeniden çalıştırılmaz; sınıfı veya metni
+değişen analizli kayıtlar 'analysis_stale' ile işaretlenir. Sınıfı değişen
+kayıtların yönlendirme durumu sıfırlanır; document_router.py belgeyi yeni
+sınıfına göre yeniden yerleştirir (eski hedef 'previous_target_path' alanında
+kalır).
+
+Kayıtlar _id sırasıyla gruplar hâlinde taranır. Sınıflandırma ve OCR grup
+başına predict_batch / extract_text_batch ile yapılır. Başarısız aşamanın
+kimliği güncellenmez; komut yeniden çalıştırıldığında kayıt tekrar ele alınır.
+Kimliği olmayan eski kayıtlarda --trust_unknown ile verilen aşamalar güncel
+sayılır (ör. OCR'ı yeniden çalıştırmadan yalnızca sınıflandırıcıyı yükseltmek için).
+
+Kullanım:
+    python document_reprocessor.py --dry_run
+    python document_reprocessor.py --mongo_uri mongodb://localhost:27017/
+    python document_reprocessor.py --stages classifier --trust_unknown ocr --limit 10000
+    python document_reprocessor.py --use_vector_db --metrics_file
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+from collections import Counter
+from datetime import datetime
+
+# Proje dizinini Python modül yoluna ekle
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
+
+from utils.provenance import STAGES, current_provenance, stale_stages
+from utils.document_schema import encode_text, load_text, offload_large_text, pack_probs
+from utils.helpers import format_page_classification
+from utils.metrics import METRICS, timed
+from utils import resources
+from config.settings import MODEL_PATH, MONGODB_CONFIG, METRICS_CONFIG, PROVENANCE_CONFIG
+
+logger = logging.getLogger('DocumentReprocessor')
+
+TEXT_FIELDS = ('extracted_text', 'extracted_text_z', 'extracted_text_ref')
+# document_router.py'nin yerleştirme sonucu yazdığı alanlar
+ROUTING_FIELDS = ('target_folder', 'target_path', 'placement_method', 'needs_review', 'ocr_failed',
+                  'routing_time', 'routing_error', 'routing_retry_at', 'routing_attempts')
+
+
+def build_query(current, stages, trust_unknown):
+    """
+    Seçilen aşamalardan en az birinin kimliği eskimiş kayıtları bulan sorgu
+
+    Args:
+        current (dict): current_provenance() sonucu
+        stages (tuple): Bakılacak aşamalar
+        trust_unknown (tuple): Kimliği kayıtta yoksa güncel sayılacak aşamalar
+
+    Returns:
+        dict: MongoDB sorgusu
+    """
+    conditions = []
+    for stage in stages:
+        field = f'provenance.{stage}'
+        condition = {f'{field}.fingerprint': {'$ne': current[stage]['fingerprint']}}
+        if stage in trust_unknown:
+            condition[field] = {'$exists': True}
+        if stage == 'embedding':
+            # Gömme yalnızca vektör veritabanına eklenmiş kayıtlar için anlamlı
+            condition['vector_indexing.doc_id'] = {'$exists': True}
+        conditions.append(condition)
+    return {'$or': conditions}
+
+
+def plan_stages(document, current, stages, trust_unknown):
+    """
+    Kayıt için yeniden çalıştırılacak aşamalar
+
+    Args:
+        document (dict): MongoDB kaydı
+        current (dict): current_provenance() sonucu
+        stages (tuple): Bakılacak aşamalar
+        trust_unknown (tuple): Kimliği kayıtta yoksa güncel sayılacak aşamalar
+
+    Returns:
+        set: Aşama adları
+    """
+    plan = stale_stages(document.get('provenance'), current, stages, trust_unknown)
+    if not (document.get('vector_indexing') or {}).get('doc_id'):
+        plan.discard('embedding')
+    elif plan & {'classifier', 'ocr'}:
+        # Vektör kaydındaki sınıf ve metin de güncellenmeli
+        plan.add('embedding')
+    return plan
+
+
+def stage_record(component, stage, current):
+    """Aşamayı çalıştıran bileşenin kimliği (yoksa güncel kimlik) ve kayıt zamanı"""
+    record = dict(getattr(component, 'provenance', None) or current[stage])
+    record['recorded_at'] = datetime.now().isoformat()
+    return record
+
+
+def classification_update(document, classification):
+    """
+    Yeni sınıflandırmanın kayda yazılacak alanları ($set, $unset)
+
+    Args:
+        document (dict): MongoDB kaydı (sürüm 1 veya 2)
+        classification (dict): predict / predict_batch sonucu
+
+    Returns:
+        tuple: (dict, dict)
+    """
+    updates = {
+        'document_class': classification['class'],
+        'confidence': classification['confidence']
+    }
+    removals = {}
+    if document.get('schema_version', 1) >= 2:
+        updates['class_probs'] = pack_probs(classification.get('all_probs'))
+    else:
+        updates['metadata.classification_details'] = {
+            'all_probs': classification.get('all_probs', {}),
+            'sorted_probs': classification.get('sorted_probs', [])
+        }
+    if classification.get('pages'):
+        updates['metadata.page_classification'] = format_page_classification(classification)
+    else:
+        removals['metadata.page_classification'] = ""
+    return updates, removals
+
+
+def text_update(document, extraction, db):
+    """
+    Yeni OCR metninin kayda yazılacak alanları ($set, $unset). Sürüm 2
+    kayıtlarda metin şemanın eşiklerine göre sıkıştırılır veya GridFS'e taşınır.
+
+    Args:
+        document (dict): MongoDB kaydı
+        extraction (dict): extract_text / extract_text_batch sonucu
+        db: pymongo Database nesnesi
+
+    Returns:
+        tuple: (dict, dict)
+    """
+    text = extraction['text']
+    if document.get('schema_version', 1) >= 2:
+        fields = {'file_name': document.get('file_name')}
+        fields.update(encode_text(text))
+        offload_large_text(fields, db)
+        del fields['file_name']
+    else:
+        fields = {'extracted_text': text}
+
+    updates = dict(fields)
+    updates['text_length'] = len(text)
+    updates['metadata.ocr_metadata'] = extraction['metadata']
+    removals = {field: "" for field in TEXT_FIELDS if field not in fields}
+    return updates, removals
+
+
+def routing_reset(document):
+    """
+    Sınıfı değişen kaydın yönlendirme durumunu sıfırlayan alanlar ($set, $unset)
+
+    Args:
+        document (dict): MongoDB kaydı
+
+    Returns:
+        tuple: (dict, dict)
+    """
+    updates = {'processed_for_routing': False}
+    if document.get('target_path'):
+        updates['previous_target_path'] = document['target_path']
+    removals = {field: "" for field in ROUTING_FIELDS if field in document}
+    return updates, removals
+
+
+def reindex_batch(vector_db, tasks):
+    """
+    Grubun vektörlerini aynı doc_id'lerle yeniden yazar: tek silme, tek ekleme
+    ve grup sonunda tek flush. İndeksleme koşulunu (metin > 50 karakter,
+    güven > 0.5) artık sağlamayan belgelerin vektörü yalnızca silinir.
+
+    Args:
+        vector_db (DocumentVectorDB): Vektör veritabanı
+        tasks (list): (kayıt, sınıf, güven, metin) demetleri
+
+    Returns:
+        dict: doc_id -> vektör yeniden yazıldıysa True, silindiyse False (hata ise istisna)
+    """
+    doc_ids = [document['vector_indexing']['doc_id'] for document, _, _, _ in tasks]
+    if not vector_db.delete_documents(doc_ids):
+        raise RuntimeError(f"Eski vektörler silinemedi: {len(doc_ids)} belge")
+    records = [
+        {'doc_id': document['vector_indexing']['doc_id'], 'doc_class': doc_class,
+         'file_path': document['file_path'], 'text_content': text}
+        for document, doc_class, confidence, text in tasks
+        if len(text) > 50 and confidence > 0.5
+    ]
+    added = set(vector_db.add_documents(records))
+    vector_db.flush()
+    for doc_id in doc_ids:
+        if doc_id not in added:
+            logger.info(f"Belge indeksleme koşulunu artık sağlamıyor, vektörü silindi: {doc_id}")
+    return {doc_id: doc_id in added for doc_id in doc_ids}
+
+
+def load_components(plan_counts, use_vector_db, model_path):
+    """
+    Yalnızca işi olan aşamaların modellerini yükler
+
+    Args:
+        plan_counts (Counter): Aşama -> kayıt sayısı
+        use_vector_db (bool): Vektör veritabanına bağlanılsın mı
+        model_path (str): Swin ağırlık dosyası
+
+    Returns:
+        dict: {'classifier', 'extractor', 'vector_db'} (gerekmeyenler None)
+    """
+    components = {'classifier': None, 'extractor': None, 'vector_db': None}
+    if plan_counts['classifier']:
+        from models.classifier import DocumentClassifier
+        components['classifier'] = DocumentClassifier(model_path=model_path)
+    if plan_counts['ocr']:
+        from models.extractor import UnstructuredTextExtractor
+        components['extractor'] = UnstructuredTextExtractor()
+    if plan_counts['embedding'] and use_vector_db:
+        from utils.vector_db import DocumentVectorDB
+        components['vector_db'] = DocumentVectorDB()
+    return components
+
+
+def reprocess_batch(documents, plans, components, current, collection, stats):
+    """
+    Bir grup kaydın eskimiş aşamalarını çalıştırır ve kayıtları günceller
+
+    Args:
+        documents (list): MongoDB kayıtları
+        plans (list): Her kayıt için plan_stages() sonucu
+        components (dict): load_components() sonucu
+        current (dict): current_provenance() sonucu
+        collection: pymongo Collection
+        stats (Counter): (aşama, durum) sayaçları
+    """
+    db = collection.database
+    runnable = []
+    for document, plan in zip(documents, plans):
+        if plan & {'classifier', 'ocr'} and not os.path.exists(document['file_path']):
+            logger.warning(f"Belge dosyası bulunamadı, atlandı: {document['file_path']}")
+            stats['document', 'missing_file'] += 1
+            continue
+        runnable.append((document, plan))
+
+    # Sınıflandırma ve OCR grup hâlinde (yükleyici grupları, toplu tanıma)
+    classifications, extractions = {}, {}
+    classify = [index for index, (_, plan) in enumerate(runnable) if 'classifier' in plan]
+    if classify:
+        paths = [runnable[index][0]['file_path'] for index in classify]
+        with timed('reprocess_classify'):
+            classifications = dict(zip(classify, components['classifier'].predict_batch(paths)))
+    extract = [index for index, (_, plan) in enumerate(runnable) if 'ocr' in plan]
+    if extract:
+        paths = [runnable[index][0]['file_path'] for index in extract]
+        with timed('reprocess_ocr'):
+            extractions = dict(zip(extract, components['extractor'].extract_text_batch(paths)))
+
+    entries = []
+    for index, (document, plan) in enumerate(runnable):
+        updates, removals, done = {}, {}, []
+        doc_class, confidence = document.get('document_class'), document.get('confidence', 0.0)
+        text = None
+
+        classification = classifications.get(index)
+        if classification is not None:
+            if classification.get('class') == 'error':
+                logger.error(f"Yeniden sınıflandırma hatası ({document['file_path']}): {classification.get('error')}")
+                stats['classifier', 'failed'] += 1
+            else:
+                stage_updates, stage_removals = classification_update(document, classification)
+                updates.update(stage_updates)
+                removals.update(stage_removals)
+                if classification['class'] != doc_class:
+                    stats['classifier', 'changed'] += 1
+                    # Belge eski sınıfının klasöründe kalmasın
+                    stage_updates, stage_removals = routing_reset(document)
+                    updates.update(stage_updates)
+                    removals.update(stage_removals)
+                doc_class, confidence = classification['class'], classification['confidence']
+                done.append('classifier')
+
+        extraction = extractions.get(index)
+        if extraction is not None:
+            if 'error' in extraction['metadata']:
+                # Kayıtlı metin hatalı çıktıyla ezilmez
+                logger.error(f"Yeniden metin çıkarma hatası ({document['file_path']}): "
+                             f"{extraction['metadata']['error']}")
+                stats['ocr', 'failed'] += 1
+            else:
+                stage_updates, stage_removals = text_update(document, extraction, db)
+                updates.update(stage_updates)
+                removals.update(stage_removals)
+                text = extraction['text']
+                done.append('ocr')
+
+        entries.append({'document': document, 'plan': plan, 'updates': updates, 'removals': removals,
+                        'done': done, 'doc_class': doc_class, 'confidence': confidence, 'text': text})
+
+    # Vektörler grup hâlinde yeniden yazılır
+    if components['vector_db'] is not None:
+        tasks = []
+        for entry in entries:
+            if 'embedding' not in entry['plan']:
+                continue
+            try:
+                if entry['text'] is None:
+                    entry['text'] = load_text(entry['document'], db)
+                tasks.append(entry)
+            except Exception as e:
+                logger.error(f"Metin okunamadı, yeniden indeksleme atlandı ({entry['document']['file_path']}): {e}")
+                stats['embedding', 'failed'] += 1
+        if tasks:
+            try:
+                with timed('reprocess_embedding'):
+                    indexed = reindex_batch(components['vector_db'], [
+                        (entry['document'], entry['doc_class'], entry['confidence'], entry['text'])
+                        for entry in tasks
+                    ])
+                for entry in tasks:
+                    if not indexed[entry['document']['vector_indexing']['doc_id']]:
+                        entry['removals']['vector_indexing'] = ""
+                        entry['removals']['provenance.embedding'] = ""
+                    entry['done'].append('embedding')
+            except Exception as e:
+                logger.error(f"Yeniden indeksleme hatası ({len(tasks)} belge): {e}")
+                stats['embedding', 'failed'] += len(tasks)
+
+    for entry in entries:
+        document, updates, removals, done = entry['document'], entry['updates'], entry['removals'], entry['done']
+        if not done:
+            continue
+        for stage in done:
+            if f'provenance.{stage}' not in removals:
+                component = components['vector_db' if stage == 'embedding' else
+                                       'classifier' if stage == 'classifier' else 'extractor']
+                updates[f'provenance.{stage}'] = stage_record(component, stage, current)
+            stats[stage, 'done'] += 1
+            METRICS.inc('reprocess_stages_total', stage=stage)
+        if document.get('analysis') and ('ocr' in done or entry['doc_class'] != document.get('document_class')):
+            updates['analysis_stale'] = True
+        updates['reprocessed_date'] = datetime.now()
+        updates['reprocessed_stages'] = sorted(done)
+
+        operation = {'$set': updates}
+        if removals:
+            operation['$unset'] = removals
+        with timed('mongo_write'):
+            collection.update_one({'_id': document['_id']}, operation)
+
+        # Yeni metin yazıldıysa eski GridFS dosyası artık kullanılmıyor
+        old_ref = document.get('extracted_text_ref')
+        if 'ocr' in done and old_ref is not None and updates.get('extracted_text_ref') != old_ref:
+            import gridfs
+            gridfs.GridFS(db, collection=MONGODB_CONFIG['text_gridfs_bucket']).delete(old_ref)
+        stats['document', 'updated'] += 1
+
+
+def iter_batches(collection, query, batch_size, limit=None, projection=None):
+    """
+    Sorguya uyan kayıtları _id sırasıyla gruplar hâlinde döndürür. Güncellenen
+    kayıtlar sorgudan çıktığı, başarısız olanlar ise _id sınırının gerisinde
+    kaldığı için aynı kayıt bir çalıştırmada iki kez ele alınmaz.
+    """
+    last_id = None
+    remaining = limit
+    while remaining is None or remaining > 0:
+        page_query = query if last_id is None else {'$and': [query, {'_id': {'$gt': last_id}}]}
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        documents = list(collection.find(page_query, projection).sort('_id', 1).limit(size))
+        if not documents:
+            return
+        yield documents
+        last_id = documents[-1]['_id']
+        if remaining is not None:
+            remaining -= len(documents)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model yükseltmesi sonrası kayıtlı sonuçları aşama bazında yeniden işle")
+    parser.add_argument("--mongo_uri", default=MONGODB_CONFIG['uri'], help="MongoDB bağlantı URI'si")
+    parser.add_argument("--db", default=MONGODB_CONFIG['db_name'], help="Veritabanı adı")
+    parser.add_argument("--collection", default=MONGODB_CONFIG['collection_name'], help="Koleksiyon adı")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES),
+                        help="Modeli değişmiş olabilecek aşamalar (varsayılan hepsi)")
+    parser.add_argument("--trust_unknown", nargs="*", choices=STAGES, default=None,
+                        help="Kimliği olmayan eski kayıtlarda güncel sayılacak aşamalar "
+                             "(varsayılan PROVENANCE_CONFIG['trust_unknown'])")
+    parser.add_argument("--model_path", default=MODEL_PATH, help="Swin ağırlık dosyası")
+    parser.add_argument("--use_vector_db", action="store_true",
+                        help="İndeksli kayıtların vektörlerini de güncelle")
+    parser.add_argument("--batch_size", type=int, default=PROVENANCE_CONFIG.get('batch_size', 32),
+                        help="Bir grupta ele alınan kayıt sayısı")
+    parser.add_argument("--limit", type=int, default=None, help="En fazla bu kadar kaydı işle")
+    parser.add_argument("--dry_run", action="store_true", help="Model yüklemeden yalnızca planı raporla")
+    parser.add_argument("--metrics_file", nargs="?", const="", default=None,
+                        help="Çıkışta metrikleri Prometheus textfile olarak yaz (yol verilmezse METRICS_CONFIG['file'])")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Makinede eşzamanlı çalışan işçi sayısı (varsayılan DOCFLOW_WORKERS)")
+    parser.add_argument("--worker_index", type=int, default=None,
+                        help="Bu işçinin sırası (varsayılan DOCFLOW_WORKER_INDEX)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    stages = tuple(args.stages)
+    trust_unknown = tuple(PROVENANCE_CONFIG.get('trust_unknown', ()) if args.trust_unknown is None
+                          else args.trust_unknown)
+    current = current_provenance(args.model_path)
+    for stage in stages:
+        logger.info(f"Güncel {stage} kimliği: {current[stage]['fingerprint']}")
+    query = build_query(current, stages, trust_unknown)
+
+    from pymongo import MongoClient
+    client = MongoClient(args.mongo_uri)
+    collection = client[args.db][args.collection]
+    try:
+        # Plan: hangi aşamada kaç kayıt var (modeller yalnızca gerekiyorsa yüklenir)
+        plan_counts, combinations = Counter(), Counter()
+        projection = {'provenance': 1, 'vector_indexing': 1}
+        for documents in iter_batches(collection, query, 1000, args.limit, projection):
+            for document in documents:
+                plan = plan_stages(document, current, stages, trust_unknown)
+                plan_counts.update(plan)
+                combinations[tuple(sorted(plan))] += 1
+        print(f"Yeniden işlenecek kayıt: {sum(combinations.values())}")
+        for combination, count in combinations.most_common():
+            print(f"  {' + '.join(combination) or '-'}: {count}")
+        if plan_counts['embedding'] and not args.use_vector_db:
+            print("Not: --use_vector_db verilmedi; vektörler güncellenmeyecek")
+        if args.dry_run or not combinations:
+            return 0
+
+        resources.configure(args.workers, args.worker_index)
+        components = load_components(plan_counts, args.use_vector_db, args.model_path)
+        stats = Counter()
+        start = time.time()
+        try:
+            for documents in iter_batches(collection, query, args.batch_size, args.limit):
+                plans = [plan_stages(document, current, stages, trust_unknown) for document in documents]
+                reprocess_batch(documents, plans, components, current, collection, stats)
+                logger.info(f"{stats['document', 'updated']} kayıt güncellendi "
+                            f"({time.time() - start:.1f} sn)")
+        finally:
+            if components['classifier'] is not None:
+                components['classifier'].close()
+
+        print(f"Güncellenen kayıt: {stats['document', 'updated']}, "
+              f"dosyası bulunamayan: {stats['document', 'missing_file']}, "
+              f"süre: {time.time() - start:.1f} sn")
+        for stage in STAGES:
+            if plan_counts[stage]:
+                print(f"  {stage}: {stats[stage, 'done']} yeniden çalıştı, {stats[stage, 'failed']} başarısız"
+                      + (f", {stats[stage, 'changed']} kaydın sınıfı değişti" if stage == 'classifier' else ""))
+        return 0
+    finally:
+        client.close()
+        if args.metrics_file is not None:
+            METRICS.write_file(args.metrics_file or METRICS_CONFIG['file'])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
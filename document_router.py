@@ -7,13 +7,21 @@ RPA sürecinden çağrılır.
 
 Kullanım:
     python document_router.py
+    python document_router.py --watch
 """
 import os
 import sys
+import signal
 import logging
-import shutil
-from datetime import datetime
-from pymongo import MongoClient
+import argparse
+import threading
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import OperationFailure, PyMongoError
+
+from utils.file_placement import FilePlacer
+from utils.rule_engine import RuleEngine
 
 # Logları yapılandır
 logging.basicConfig(
@@ -31,6 +39,50 @@ MONGO_URI = "mongodb://localhost:27017/"
 DB_NAME = "document_db"
 COLLECTION_NAME = "processed_documents"
 
+# Yönlendirme turu ayarları
+CURSOR_BATCH_SIZE = 1000   # Sunucudan tek seferde çekilecek belge sayısı
+BULK_FLUSH_SIZE = 500      # Kaç güncellemede bir bulk_write yapılacağı
+
+# Dosya yerleştirme ayarları
+PLACEMENT_WORKERS = 8      # Eşzamanlı dosya yerleştirme iş parçacığı sayısı
+PLACEMENT_MODE = "link"    # "link": kaynak yerinde kalır, "move": kaynak taşınır
+
+# Sürekli (--watch) mod ayarları
+CHECKPOINT_COLLECTION = "routing_checkpoints"  # Change stream resume token kayıtları
+CHECKPOINT_ID = "document_router"
+WATCH_MAX_AWAIT_MS = 200   # Change stream'de yeni olay için en fazla bekleme süresi
+WATCH_POLL_INTERVAL = 0.5  # Replica set yoksa bekleyen belge sorgu aralığı (saniye)
+WATCH_BATCH_SIZE = 100     # Tek seferde yönlendirilecek en fazla yeni belge
+RETRY_BACKOFF = 60         # Yerleştirilemeyen belgenin yeniden denenmesinden önce bekleme (saniye)
+WRITE_ERROR_BACKOFF = 5    # MongoDB'ye yazılamayan turdan sonra ilk bekleme (saniye); art arda hatalarda ikiye katlanır
+RETRY_SWEEP_INTERVAL = 30  # Change stream modunda kaçan/başarısız belgeler için tarama aralığı (saniye)
+RETRY_SWEEP_GRACE = 60     # Bu süreden (saniye) eski ve hiç denenmemiş bekleyen belgeler taramaya girer
+
+# İşlenmemiş belgeler için sorgu - genişletilmiş
+PENDING_QUERY = {
+    "$or": [
+        {"processed_for_routing": {"$ne": True}},
+        {"processed_for_routing": {"$exists": False}}
+    ]
+}
+
+# Yönlendirme için okunan alanlar - extracted_text ve metadata gibi büyük alanlar çekilmez
+ROUTING_PROJECTION = {
+    "_id": 1,
+    "file_path": 1,
+    "filepath": 1,
+    "path": 1,
+    "file_name": 1,
+    "filename": 1,
+    "document_class": 1,
+    "class": 1,
+    "confidence": 1,
+    "text_length": 1
+}
+
+# Yönlendirme kuralları (config/routing_rules.json) - Drools kurallarıyla eşdeğer
+ROUTING_ENGINE = RuleEngine()
+
 # Klasör yolu
 BASE_PATH = os.path.dirname(os.path.abspath(__file__))
 
@@ -43,6 +95,42 @@ DOCUMENT_CLASSES = [
     'review', 'ocr_failed'
 ]
 
+def due_query(now=None):
+    """
+    Yönlendirilmeyi bekleyen ve yeniden deneme zamanı gelmiş belgeler için sorgu.
+    Yerleştirilemeyen belgeler routing_retry_at zamanına kadar atlanır; böylece
+    kalıcı olarak başarısız bir grup yeni belgelerin önünü tıkamaz.
+    """
+    now = now or datetime.now()
+    return {"$and": [
+        PENDING_QUERY,
+        {"$or": [
+            {"routing_retry_at": {"$exists": False}},
+            {"routing_retry_at": {"$lte": now}}
+        ]}
+    ]}
+
+def sweep_query(now=None):
+    """
+    Change stream modunda ayrıca taranacak belgeler: yeniden deneme zamanı
+    gelenler ve RETRY_SWEEP_GRACE süresinden eski olup hiç denenmemiş olanlar
+    (ör. grup yazımı başarısız olduğu için işaretlenmemiş kalanlar). Yeni
+    eklenen belgeler change stream'den geldiğinden iki kez yerleştirilmez.
+    """
+    now = now or datetime.now()
+    grace_id = ObjectId.from_datetime(datetime.utcnow() - timedelta(seconds=RETRY_SWEEP_GRACE))
+    return {"$and": [
+        PENDING_QUERY,
+        {"$or": [
+            {"routing_retry_at": {"$lte": now}},
+            {"routing_retry_at": {"$exists": False}, "_id": {"$lt": grace_id}}
+        ]}
+    ]}
+
+def ensure_indexes(collection):
+    """Bekleyen belge sorgularının koleksiyonu baştan taramaması için indeks"""
+    collection.create_index("processed_for_routing")
+
 def create_directories():
     """Gerekli tüm klasörleri oluştur"""
     for doc_class in DOCUMENT_CLASSES:
@@ -50,6 +138,201 @@ def create_directories():
         os.makedirs(class_dir, exist_ok=True)
         logger.info(f"Klasör kontrol edildi: {class_dir}")
 
+def flush_updates(collection, operations):
+    """
+    Biriken güncellemeleri tek bir sırasız bulk_write ile MongoDB'ye yazar
+
+    Args:
+        collection: MongoDB koleksiyonu
+        operations (list): UpdateOne işlemleri listesi (yazıldıktan sonra boşaltılır)
+
+    Returns:
+        int: Güncellenen belge sayısı; yazma başarısız olduysa None
+    """
+    if not operations:
+        return 0
+
+    try:
+        result = collection.bulk_write(operations, ordered=False)
+        logger.info(f"{len(operations)} belge güncellemesi MongoDB'ye yazıldı")
+        return result.modified_count
+    except Exception as e:
+        logger.error(f"Toplu güncelleme hatası: {e}")
+        return None
+    finally:
+        operations.clear()
+
+def routing_record(doc):
+    """
+    MongoDB belgesinden kural motorunun kullandığı yönlendirme kaydını çıkarır
+
+    Args:
+        doc (dict): Yönlendirme projeksiyonuyla okunan MongoDB belgesi
+
+    Returns:
+        dict: file_path, file_name, document_class, confidence, text_length
+    """
+    file_path = doc.get("file_path") or doc.get("filepath") or doc.get("path")
+    file_name = doc.get("file_name") or doc.get("filename") or os.path.basename(str(file_path)) if file_path else "bilinmeyen.dosya"
+    
+    return {
+        "file_path": file_path,
+        "file_name": file_name,
+        "document_class": doc.get("document_class") or doc.get("class") or "review",
+        "confidence": float(doc.get("confidence", 0.0)),
+        "text_length": int(doc.get("text_length", 0))
+    }
+
+def decide_targets(docs):
+    """
+    Bir grup belge için hedef klasörleri ve durum bayraklarını kural motoruyla belirler
+
+    Args:
+        docs (list): Yönlendirme projeksiyonuyla okunan MongoDB belgeleri
+
+    Returns:
+        list: Her belge için file_path, file_name, target_folder, needs_review, ocr_failed
+    """
+    records = [routing_record(doc) for doc in docs]
+    decisions = ROUTING_ENGINE.evaluate_batch(records)
+    
+    for record, decision in zip(records, decisions):
+        decision["file_path"] = record["file_path"]
+        decision["file_name"] = record["file_name"]
+        logger.debug(f"Belge bilgileri: {record} -> {decision['target_folder']}")
+    
+    return decisions
+
+def route_batch(collection, batch, placer):
+    """
+    Bir grup belgenin hedeflerini belirler, dosyalarını paralel yerleştirir ve
+    sonuçları topluca MongoDB'ye yazar
+
+    Args:
+        collection: MongoDB koleksiyonu
+        batch (list): Yönlendirme projeksiyonuyla okunan MongoDB belgeleri
+        placer (FilePlacer): Dosya yerleştirme motoru
+
+    Returns:
+        int: Yerleştirilen dosya sayısı; sonuçlar MongoDB'ye yazılamadıysa None
+    """
+    updates = []
+    jobs = []
+    job_docs = []
+    routing_time = datetime.now()
+    
+    for doc, decision in zip(batch, decide_targets(batch)):
+        file_path = decision["file_path"]
+        
+        if file_path and isinstance(file_path, str):
+            if os.path.exists(file_path):
+                target_dir = os.path.join(BASE_PATH, decision["target_folder"])
+                jobs.append((file_path, target_dir, decision["file_name"]))
+                job_docs.append((doc, decision))
+            else:
+                logger.warning(f"Dosya bulunamadı: {file_path}")
+                # Belge işlenmiş olarak işaretle ama hata durumunu belirt
+                updates.append(UpdateOne(
+                    {"_id": doc["_id"]},
+                    {"$set": {
+                        "processed_for_routing": True,
+                        "routing_error": f"Dosya bulunamadı: {file_path}",
+                        "routing_time": routing_time
+                    }}
+                ))
+        else:
+            error_msg = "Dosya yolu bilgisi bulunamadı veya geçersiz"
+            logger.warning(f"{error_msg}: {file_path}")
+            # Belge işlenmiş olarak işaretle ama hata durumunu belirt
+            updates.append(UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {
+                    "processed_for_routing": True,
+                    "routing_error": error_msg,
+                    "routing_time": routing_time
+                }}
+            ))
+    
+    # Dosyaları paralel yerleştir
+    placed = 0
+    for (doc, decision), placement in zip(job_docs, placer.place_many(jobs)):
+        if placement["status"] != "placed":
+            # Yerleştirilemeyen belge işlenmemiş kalır; RETRY_BACKOFF sonra tarama ile yeniden denenir
+            logger.warning(f"Dosya yerleştirilemedi: {decision['file_name']} ({placement.get('error')})")
+            updates.append(UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {
+                    "routing_error": placement.get("error"),
+                    "routing_retry_at": routing_time + timedelta(seconds=RETRY_BACKOFF)
+                },
+                 "$inc": {"routing_attempts": 1}}
+            ))
+            continue
+        
+        placed += 1
+        logger.info(f"Dosya yerleştirildi ({placement['method']}): {decision['file_name']} -> {decision['target_folder']}")
+        
+        # MongoDB'de işlendiği işaretle
+        updates.append(UpdateOne(
+            {"_id": doc["_id"]},
+            {"$set": {
+                "processed_for_routing": True,
+                "target_folder": decision["target_folder"],
+                "target_path": placement["target_path"],
+                "placement_method": placement["method"],
+                "needs_review": decision["needs_review"],
+                "ocr_failed": decision["ocr_failed"],
+                "routing_time": routing_time
+            },
+             "$unset": {"routing_error": "", "routing_retry_at": ""}}
+        ))
+    
+    if flush_updates(collection, updates) is None:
+        return None
+    return placed
+
+def route_pending(collection, placer, query=None):
+    """
+    Henüz yönlendirilmemiş tüm belgeleri tarar ve yönlendirir
+
+    Args:
+        collection: MongoDB koleksiyonu
+        placer (FilePlacer): Dosya yerleştirme motoru
+        query (dict, optional): Bekleyen belge sorgusu. Varsayılan PENDING_QUERY.
+
+    Returns:
+        int: Taranan belge sayısı
+    """
+    # Belgeleri sadece yönlendirme için gereken alanlarla getir
+    cursor = collection.find(query or PENDING_QUERY, ROUTING_PROJECTION).batch_size(CURSOR_BATCH_SIZE)
+    
+    count = 0
+    batch = []
+    
+    # Her belge için kuralları uygula
+    for doc in cursor:
+        count += 1
+        
+        # Belge ID'sini log'la
+        doc_id = str(doc.get("_id", "Bilinmeyen ID"))
+        logger.debug(f"Belge işleniyor: {doc_id}")
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Belge alanları: {list(doc.keys())}")
+        
+        batch.append(doc)
+        
+        # Belgeleri gruplar halinde yerleştir ve güncelle
+        if len(batch) >= BULK_FLUSH_SIZE:
+            route_batch(collection, batch, placer)
+            batch = []
+    
+    # Kalan belgeleri işle
+    if batch:
+        route_batch(collection, batch, placer)
+    
+    return count
+
 def route_documents():
     """Belgeleri sınıflarına göre uygun klasörlere yönlendir"""
     try:
@@ -60,109 +343,8 @@ def route_documents():
         
         logger.info(f"MongoDB bağlantısı kuruldu: {MONGO_URI}, DB: {DB_NAME}, Collection: {COLLECTION_NAME}")
         
-        
-        total_docs = collection.count_documents({})
-        logger.info(f"MongoDB'de toplam {total_docs} belge var")
-        
-        # İşlenmemiş belgeleri bul - genişletilmiş sorgu
-        query = {
-            "$or": [
-                {"processed_for_routing": {"$ne": True}},
-                {"processed_for_routing": {"$exists": False}}
-            ]
-        }
-        matching_docs = collection.count_documents(query)
-        logger.info(f"İşlenmemiş {matching_docs} belge bulundu")
-        
-        # Belgeleri getir
-        cursor = collection.find(query)
-        
-        count = 0
-        
-        # Her belge için kuralları uygula
-        for doc in cursor:
-            count += 1
-            
-            # Belge ID'sini log'la
-            doc_id = str(doc.get("_id", "Bilinmeyen ID"))
-            logger.info(f"Belge işleniyor: {doc_id}")
-            
-            
-            logger.info(f"Belge alanları: {list(doc.keys())}")
-            
-            
-            file_path = doc.get("file_path") or doc.get("filepath") or doc.get("path")
-            file_name = doc.get("file_name") or doc.get("filename") or os.path.basename(str(file_path)) if file_path else "bilinmeyen.dosya"
-            document_class = doc.get("document_class") or doc.get("class") or "review"
-            confidence = float(doc.get("confidence", 0.0))
-            text_length = int(doc.get("text_length", 0))
-            
-            logger.info(f"Belge bilgileri: file_path={file_path}, file_name={file_name}, class={document_class}")
-            
-            # Hedef klasörü belirle
-            target_folder = document_class
-            needs_review = False
-            ocr_failed = False
-            
-            # Kural 1: Düşük güven skoru -> inceleme klasörü
-            if confidence < 0.75:
-                target_folder = "review"
-                needs_review = True
-                logger.info(f"Düşük güven skoru tespit edildi: {confidence}")
-            
-            # Kural 2: Kısa/eksik metin -> OCR hatası klasörü
-            if text_length < 50:
-                target_folder = "ocr_failed"
-                ocr_failed = True
-                logger.info(f"Az/eksik metin tespit edildi: {text_length} karakter")
-            
-            # Dosyayı hedef klasöre taşı
-            if file_path and isinstance(file_path, str):
-                if os.path.exists(file_path):
-                    target_dir = os.path.join(BASE_PATH, target_folder)
-                    target_path = os.path.join(target_dir, file_name)
-                    
-                    try:
-                        shutil.copy2(file_path, target_path)
-                        logger.info(f"Dosya kopyalandı: {file_name} -> {target_folder}")
-                        
-                        # MongoDB'de işlendiği işaretle
-                        collection.update_one(
-                            {"_id": doc["_id"]},
-                            {"$set": {
-                                "processed_for_routing": True,
-                                "target_folder": target_folder,
-                                "needs_review": needs_review,
-                                "ocr_failed": ocr_failed,
-                                "routing_time": datetime.now()
-                            }}
-                        )
-                        logger.info(f"Belge MongoDB'de güncellendi: {doc_id}")
-                    except Exception as e:
-                        logger.error(f"Dosya kopyalama hatası: {e}")
-                else:
-                    logger.warning(f"Dosya bulunamadı: {file_path}")
-                    # Belge işlenmiş olarak işaretle ama hata durumunu belirt
-                    collection.update_one(
-                        {"_id": doc["_id"]},
-                        {"$set": {
-                            "processed_for_routing": True,
-                            "routing_error": f"Dosya bulunamadı: {file_path}",
-                            "routing_time": datetime.now()
-                        }}
-                    )
-            else:
-                error_msg = "Dosya yolu bilgisi bulunamadı veya geçersiz"
-                logger.warning(f"{error_msg}: {file_path}")
-                # Belge işlenmiş olarak işaretle ama hata durumunu belirt
-                collection.update_one(
-                    {"_id": doc["_id"]},
-                    {"$set": {
-                        "processed_for_routing": True,
-                        "routing_error": error_msg,
-                        "routing_time": datetime.now()
-                    }}
-                )
+        with FilePlacer(max_workers=PLACEMENT_WORKERS, mode=PLACEMENT_MODE) as placer:
+            count = route_pending(collection, placer)
         
         logger.info(f"Toplam {count} belge işlendi")
         
@@ -180,7 +362,164 @@ def route_documents():
         logger.error(traceback.format_exc())
         return 0
 
+def load_checkpoint(db):
+    """Kayıtlı resume token bilgisini getirir"""
+    return db[CHECKPOINT_COLLECTION].find_one({"_id": CHECKPOINT_ID}) or {}
+
+def save_checkpoint(db, **fields):
+    """Resume token bilgisini kalıcı olarak kaydeder"""
+    fields["updated_at"] = datetime.now()
+    db[CHECKPOINT_COLLECTION].update_one(
+        {"_id": CHECKPOINT_ID},
+        {"$set": fields},
+        upsert=True
+    )
+
+def supports_change_streams(client):
+    """Sunucu change stream destekliyor mu (replica set veya sharded cluster)"""
+    try:
+        hello = client.admin.command("hello")
+    except OperationFailure:
+        hello = client.admin.command("isMaster")
+    return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+def watch_change_stream(db, collection, placer, stop_event):
+    """
+    Yeni eklenen belgeleri change stream üzerinden anında yönlendirir
+
+    Her yönlendirilen gruptan sonra resume token kaydedilir; süreç yeniden
+    başladığında kaldığı yerden devam eder. Token yerleştirilemeyen belgelerin
+    de ötesine geçtiğinden bunlar RETRY_SWEEP_INTERVAL aralıklı taramayla
+    (sweep_query) yeniden denenir.
+    """
+    # Sadece insert olayları ve yönlendirme için gereken alanlar
+    pipeline = [
+        {"$match": {"operationType": "insert"}},
+        {"$project": {"operationType": 1, "documentKey": 1,
+                      **{f"fullDocument.{field}": 1 for field in ROUTING_PROJECTION}}}
+    ]
+    resume_token = load_checkpoint(db).get("resume_token")
+    
+    try:
+        stream = collection.watch(pipeline, resume_after=resume_token, max_await_time_ms=WATCH_MAX_AWAIT_MS)
+    except OperationFailure as e:
+        # Resume token oplog dışına düşmüşse baştan başla; bekleyenler tarama ile yakalanır
+        logger.warning(f"Resume token kullanılamadı, yeni change stream açılıyor: {e}")
+        route_pending(collection, placer)
+        stream = collection.watch(pipeline, max_await_time_ms=WATCH_MAX_AWAIT_MS)
+    
+    logger.info("Change stream dinleniyor (replica set modu)")
+    
+    last_sweep = datetime.now()
+    with stream:
+        batch = []
+        while not stop_event.is_set() and stream.alive:
+            if (datetime.now() - last_sweep).total_seconds() >= RETRY_SWEEP_INTERVAL:
+                swept = route_pending(collection, placer, sweep_query())
+                if swept:
+                    logger.info(f"Yeniden deneme taraması: {swept} belge")
+                last_sweep = datetime.now()
+            
+            change = stream.try_next()
+            
+            if change is not None:
+                batch.append(change["fullDocument"])
+            
+            # Yeni olay kalmadığında veya grup dolduğunda hemen yönlendir
+            if batch and (change is None or len(batch) >= WATCH_BATCH_SIZE):
+                route_batch(collection, batch, placer)
+                logger.info(f"{len(batch)} yeni belge yönlendirildi")
+                batch = []
+            
+            if change is None and stream.resume_token is not None:
+                save_checkpoint(db, resume_token=stream.resume_token, mode="change_stream")
+        
+        if stream.resume_token is not None:
+            save_checkpoint(db, resume_token=stream.resume_token, mode="change_stream")
+
+def watch_polling(collection, placer, stop_event):
+    """
+    Replica set yoksa bekleyen belgeleri processed_for_routing indeksi üzerinden yoklar
+
+    _id watermark kullanılmaz: farklı süreç ve düğümlerin ObjectId'leri
+    yalnızca kabaca sıralıdır, geç gelen küçük _id'li bir belge watermark'ın
+    gerisinde kalıp hiç yönlendirilmezdi. Yerleştirilemeyen belgeler
+    routing_retry_at zamanı gelene kadar sorgudan çıkar (bkz. due_query).
+    """
+    logger.info("Bekleyen belgeler yoklanıyor (replica set yok)")
+    
+    write_failures = 0
+    while not stop_event.is_set():
+        docs = list(collection.find(due_query(), ROUTING_PROJECTION)
+                    .sort("_id", 1)
+                    .limit(WATCH_BATCH_SIZE))
+        
+        if docs:
+            if route_batch(collection, docs, placer) is None:
+                # Sonuçlar yazılamadı: aynı belgeler yeniden gelir, beklemeden denemek
+                # dosyaları art arda yeniden yerleştirir
+                write_failures += 1
+                backoff = min(WRITE_ERROR_BACKOFF * 2 ** (write_failures - 1), RETRY_BACKOFF)
+                logger.warning(f"Yönlendirme sonuçları yazılamadı, {backoff} saniye sonra yeniden denenecek")
+                stop_event.wait(backoff)
+                continue
+            write_failures = 0
+            logger.info(f"{len(docs)} yeni belge yönlendirildi")
+        
+        # Grup dolu geldiyse beklemeden devam et
+        if len(docs) < WATCH_BATCH_SIZE:
+            stop_event.wait(WATCH_POLL_INTERVAL)
+
+def watch_documents(stop_event=None):
+    """
+    Sürekli yönlendirme modu: bağlantı ve klasörler bir kez hazırlanır, yeni
+    belgeler eklendikçe yönlendirilir.
+
+    Args:
+        stop_event (threading.Event, optional): Durdurma sinyali
+
+    Returns:
+        int: Çıkış kodu
+    """
+    stop_event = stop_event or threading.Event()
+    
+    client = MongoClient(MONGO_URI)
+    db = client[DB_NAME]
+    collection = db[COLLECTION_NAME]
+    logger.info(f"MongoDB bağlantısı kuruldu: {MONGO_URI}, DB: {DB_NAME}, Collection: {COLLECTION_NAME}")
+    
+    try:
+        ensure_indexes(collection)
+        with FilePlacer(max_workers=PLACEMENT_WORKERS, mode=PLACEMENT_MODE) as placer:
+            # Başlangıçta kapalıyken eklenmiş belgeleri yakala
+            count = route_pending(collection, placer)
+            logger.info(f"Başlangıç taraması tamamlandı: {count} belge")
+            
+            while not stop_event.is_set():
+                try:
+                    if supports_change_streams(client):
+                        watch_change_stream(db, collection, placer, stop_event)
+                    else:
+                        watch_polling(collection, placer, stop_event)
+                except PyMongoError as e:
+                    logger.error(f"İzleme hatası, yeniden bağlanılıyor: {e}")
+                    stop_event.wait(WATCH_POLL_INTERVAL)
+        return 0
+    except Exception as e:
+        logger.error(f"Sürekli yönlendirme hatası: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+        return 1
+    finally:
+        client.close()
+        logger.info("Sürekli yönlendirme durduruldu")
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Belge Yönlendirme Scripti")
+    parser.add_argument("--watch", action="store_true",
+                        help="Sürekli mod: yeni belgeleri change stream veya bekleyen belge yoklamasıyla anında yönlendir")
+    args = parser.parse_args()
+    
     print("Belge yönlendirme sistemi başlatılıyor...")
     
     # logs klasörünü kontrol et
@@ -189,7 +528,14 @@ if __name__ == "__main__":
     # Klasörleri kontrol et
     create_directories()
     
+    if args.watch:
+        stop_event = threading.Event()
+        # SIGTERM/SIGINT ile düzgün kapan, checkpoint kaydedilsin
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda signum, frame: stop_event.set())
+        sys.exit(watch_documents(stop_event))
+    
     # Belgeleri yönlendir
     num_routed = route_documents()
     
-    print(f"Yönlendirme tamamlandı: {num_routed} belge işlendi.")
\ No newline at end of file
+    print(f"Yönlendirme tamamlandı: {num_routed} belge işlendi.")
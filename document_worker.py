@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+"""
+Dağıtık belge işleme işçisi.
+
+Ortak bir giriş klasörünü paylaşan birden çok düğümde çalıştırılır. İşler
+MongoDB kuyruğundan (utils/job_queue.py) kiralanır. Her belge tek bir işçi
+tarafından işlenir. Çöken işçinin işi kira süresi dolunca başka bir işçiye
+geçer, başarısız işler sınırlı sayıda yeniden denenir. --watch_dir verilirse
+işçi klasörü düzenli tarayıp yeni dosyaları kuyruğa da ekler; her düğümün
+taraması güvenlidir, aynı dosya iki kez eklenmez.
+
+Sonuç MongoDB'ye yazılmadan hemen önce kira yenilenir. Kira kaybedildiyse
+(işçi çok uzun takıldıysa) sonuç yazılmaz; iş artık başka işçidedir.
+Sonuç kaydı iş kimliğini (job_id) taşır. Aynı iş için ikinci bir kayıt
+eklenmez.
+
+Kullanım:
+    python document_worker.py --watch_dir input_documents --save_to_mongo mongodb://localhost:27017/
+    python document_worker.py --save_to_mongo mongodb://db:27017/ --queue_uri mongodb://db:27017/ --use_vector_db
+    python document_worker.py --watch_dir input_documents --mode classify --once
+    python document_worker.py --watch_dir input_documents --save_to_mongo mongodb://localhost:27017/ --pipeline
+"""
+import os
+import sys
+import time
+import signal
+import argparse
+import logging
+import threading
+
+# Proje dizinini Python modül yoluna ekle
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
+
+from document_classifier import process_document
+from models.classifier import DocumentClassifier
+from models.extractor import UnstructuredTextExtractor
+from utils.helpers import format_result_for_mongodb
+from utils.mongodb_client import MongoDBClient
+from utils.job_queue import MongoJobQueue, LeaseKeeper, default_worker_id
+from utils.pipeline import PipelineScheduler, model_stage_threads
+from utils.result_log import ResultLog
+from utils.metrics import METRICS
+from utils import resources
+from config.settings import MODEL_PATH, JOB_QUEUE_CONFIG, METRICS_CONFIG
+
+logger = logging.getLogger('DocumentWorker')
+
+
+def save_result(mongo_client, result, job):
+    """
+    Sonucu MongoDB'ye yazar; aynı iş için kayıt zaten varsa onun kimliğini döndürür
+
+    Args:
+        mongo_client (MongoDBClient): Sonuç koleksiyonu istemcisi
+        result (dict): process_document sonucu
+        job (dict): Kiralanan iş
+
+    Returns:
+        str: Kayıt kimliği veya None
+    """
+    if mongo_client.collection is None and not mongo_client.connect():
+        return None
+    existing = mongo_client.collection.find_one({'job_id': job['_id']}, {'_id': 1})
+    if existing is not None:
+        logger.info(f"İş için sonuç kaydı zaten var: {job['path']}")
+        return str(existing['_id'])
+    mongo_doc = format_result_for_mongodb(result)
+    mongo_doc['job_id'] = job['_id']
+    return mongo_client.save_document(mongo_doc)
+
+
+def finish_job(job, queue, worker_id, lease, result, mongo_client=None, result_log=None):
+    """
+    İşin sonucunu yazar ve kuyruğa bildirir
+
+    Args:
+        job (dict): Kiralanan iş
+        queue (MongoJobQueue): İş kuyruğu
+        worker_id (str): Bu işçinin kimliği
+        lease (LeaseKeeper): İşin kirasını yenileyen nesne
+        result (dict): process_document sonucu
+        mongo_client (MongoDBClient, optional): Sonuç koleksiyonu istemcisi
+        result_log (ResultLog, optional): Sonuçların ekleneceği günlük
+
+    Returns:
+        dict: İşleme sonucu
+    """
+    result['job'] = {'id': job['_id'], 'attempt': job['attempts'], 'worker': worker_id}
+
+    if result.get('status') != 'success':
+        queue.fail(job, worker_id, result.get('error', "Bilinmeyen hata"))
+        return result
+
+    # Sonuç yazılmadan önce kira hâlâ bu işçide olmalı
+    if not lease.renew():
+        logger.warning(f"Kira kaybedildi, sonuç yazılmadı: {job['path']}")
+        METRICS.inc('queue_jobs_total', status='lease_lost')
+        return result
+
+    result_id = None
+    if mongo_client is not None:
+        result_id = save_result(mongo_client, result, job)
+        if result_id is None:
+            queue.fail(job, worker_id, "Sonuç MongoDB'ye kaydedilemedi")
+            return result
+        result['mongodb_id'] = result_id
+
+    if result_log is not None:
+        result_log.append(result)
+
+    queue.complete(job, worker_id, result_id=result_id)
+    return result
+
+
+def process_job(job, queue, worker_id, components, mode, mongo_client=None, result_log=None):
+    """
+    Kiralanan işi işler ve kuyruğa sonucunu bildirir
+
+    Args:
+        job (dict): Kiralanan iş
+        queue (MongoJobQueue): İş kuyruğu
+        worker_id (str): Bu işçinin kimliği
+        components (dict): {'classifier', 'extractor', 'vector_db'}
+        mode (str): İşleme modu (classify, extract, full)
+        mongo_client (MongoDBClient, optional): Sonuç koleksiyonu istemcisi
+        result_log (ResultLog, optional): Sonuçların ekleneceği günlük
+
+    Returns:
+        dict: İşleme sonucu
+    """
+    with queue.keep_alive(job, worker_id) as lease:
+        result = process_document(
+            job['path'],
+            mode=mode,
+            use_vector_db=components['vector_db'] is not None,
+            classifier=components['classifier'],
+            extractor=components['extractor'],
+            vector_db=components['vector_db']
+        )
+        return finish_job(job, queue, worker_id, lease, result, mongo_client, result_log)
+
+
+def submit_job(job, queue, worker_id, scheduler, mongo_client=None, result_log=None):
+    """
+    Kiralanan işi aşama zamanlayıcısına verir; sonuç, iş bitince zamanlayıcının
+    iş parçacığında yazılır. Kira iş boyunca arka planda yenilenir.
+
+    Args:
+        job (dict): Kiralanan iş
+        queue (MongoJobQueue): İş kuyruğu
+        worker_id (str): Bu işçinin kimliği
+        scheduler (PipelineScheduler): Aşama zamanlayıcı
+        mongo_client (MongoDBClient, optional): Sonuç koleksiyonu istemcisi
+        result_log (ResultLog, optional): Sonuçların ekleneceği günlük
+    """
+    lease = LeaseKeeper(queue, job, worker_id, queue.heartbeat_interval).start()
+
+    def on_done(future):
+        try:
+            result = finish_job(job, queue, worker_id, lease, future.result(), mongo_client, result_log)
+            logger.info(f"İş bitti: {job['path']}, durum: {result.get('status')}")
+        except Exception as e:
+            logger.error(f"İş sonuçlandırma hatası ({job['path']}): {e}")
+            queue.fail(job, worker_id, e)
+        finally:
+            lease.stop()
+
+    try:
+        future = scheduler.submit(job['path'])
+    except Exception:
+        lease.stop()
+        raise
+    future.add_done_callback(on_done)
+
+
+def run_worker(args, stop_event):
+    """
+    Kuyruk boşalana (--once) veya durdurma sinyaline kadar iş kiralayıp işler
+
+    Args:
+        args (argparse.Namespace): Komut satırı argümanları
+        stop_event (threading.Event): Durdurma sinyali
+
+    Returns:
+        int: Çıkış kodu
+    """
+    worker_id = args.worker_id or default_worker_id()
+    queue = MongoJobQueue(uri=args.queue_uri)
+
+    # Modeller yüklenmeden önce çekirdek/cihaz planını çıkar ve uygula; aşama
+    # zamanlayıcısında model aşamaları aynı anda çalıştığından torch havuzu bölünür
+    resources.configure(args.workers, args.worker_index,
+                        config={'concurrent_stages': model_stage_threads()} if args.pipeline else None)
+    components = {
+        'classifier': DocumentClassifier(model_path=MODEL_PATH),
+        'extractor': UnstructuredTextExtractor(),
+        'vector_db': None
+    }
+    if args.use_vector_db:
+        try:
+            from utils.vector_db import DocumentVectorDB
+            components['vector_db'] = DocumentVectorDB()
+        except Exception as e:
+            logger.error(f"Vektör veritabanı başlatma hatası: {e}")
+
+    mongo_client = MongoDBClient(uri=args.save_to_mongo) if args.save_to_mongo else None
+    result_log = ResultLog(args.result_log or None) if args.result_log is not None else None
+
+    # Aşama zamanlayıcıyla birden çok belge aynı anda farklı aşamalarda ilerler;
+    # sonuçlar job_id ile finish_job'da yazıldığından zamanlayıcıya MongoDB verilmez
+    scheduler = None
+    if args.pipeline:
+        scheduler = PipelineScheduler(components['classifier'], components['extractor'], components['vector_db'],
+                                      mode=args.mode, check_duplicates=components['vector_db'] is not None)
+
+    logger.info(f"İşçi başlatıldı: {worker_id}, kuyruk durumu: {queue.stats()}")
+    processed = 0
+    last_scan = None
+    try:
+        while not stop_event.is_set():
+            if args.watch_dir and (last_scan is None or time.monotonic() - last_scan >= args.scan_interval):
+                added = queue.enqueue_directory(args.watch_dir)
+                if added:
+                    logger.info(f"{added} yeni belge kuyruğa eklendi")
+                queue.reap_expired()
+                last_scan = time.monotonic()
+
+            # Geri basınç: aşama kuyrukları doluysa yeni iş kiralanmaz, iş diğer düğümlere kalır
+            if scheduler is not None and not scheduler.wait_for_capacity(timeout=args.poll_interval):
+                continue
+
+            job = queue.acquire(worker_id)
+            if job is None:
+                if args.once and (scheduler is None or scheduler.in_flight() == 0):
+                    break
+                stop_event.wait(args.poll_interval)
+                continue
+
+            logger.info(f"İş kiralandı: {job['path']} (deneme {job['attempts']})")
+            try:
+                if scheduler is not None:
+                    submit_job(job, queue, worker_id, scheduler, mongo_client, result_log)
+                else:
+                    result = process_job(job, queue, worker_id, components, args.mode, mongo_client, result_log)
+                    logger.info(f"İş bitti: {job['path']}, durum: {result.get('status')}")
+            except Exception as e:
+                logger.error(f"İş işleme hatası ({job['path']}): {e}")
+                queue.fail(job, worker_id, e)
+
+            processed += 1
+            if args.max_jobs and processed >= args.max_jobs:
+                break
+        return 0
+    finally:
+        if scheduler is not None:
+            # Kabul edilmiş işler bitirilir; sonuçları kira geçerliyken yazılır
+            scheduler.close(wait=True)
+        components['classifier'].close()
+        if mongo_client is not None:
+            mongo_client.close()
+        if result_log is not None:
+            result_log.close()
+        if args.metrics_file is not None:
+            METRICS.write_file(args.metrics_file or METRICS_CONFIG['file'])
+        logger.info(f"İşçi durdu: {worker_id}, {processed} iş işlendi, kuyruk durumu: {queue.stats()}")
+        queue.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dağıtık belge işleme işçisi (MongoDB iş kuyruğu)")
+    parser.add_argument("--watch_dir", help="Yeni dosyaları kuyruğa eklemek için taranacak giriş klasörü")
+    parser.add_argument("--mode", choices=["classify", "extract", "full"], default="full",
+                        help="İşleme modu: classify, extract veya full")
+    parser.add_argument("--save_to_mongo", help="Sonuçların kaydedileceği MongoDB URI'si")
+    parser.add_argument("--queue_uri", help="İş kuyruğu MongoDB URI'si (varsayılan JOB_QUEUE_CONFIG['uri'])")
+    parser.add_argument("--use_vector_db", action="store_true", help="Vektör veritabanını kullan")
+    parser.add_argument("--result_log", nargs="?", const="", default=None,
+                        help="Sonuçları JSON Lines sonuç günlüğüne ekle (dizin verilmezse RESULT_LOG_CONFIG['directory'])")
+    parser.add_argument("--metrics_file", nargs="?", const="", default=None,
+                        help="Çıkışta metrikleri Prometheus textfile olarak yaz (yol verilmezse METRICS_CONFIG['file'])")
+    parser.add_argument("--worker_id", help="İşçi kimliği (varsayılan makine adı:süreç numarası)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Belgeleri öncelikli aşama zamanlayıcısıyla işle (küçük belgeler büyüklerin önüne geçer)")
+    parser.add_argument("--once", action="store_true", help="Kuyruk boşalınca çık")
+    parser.add_argument("--max_jobs", type=int, default=None, help="Bu kadar işten sonra çık")
+    parser.add_argument("--poll_interval", type=float, default=JOB_QUEUE_CONFIG['poll_interval'],
+                        help="Kuyruk boşken bekleme (saniye)")
+    parser.add_argument("--scan_interval", type=float, default=JOB_QUEUE_CONFIG['scan_interval'],
+                        help="Giriş klasörünü tarama aralığı (saniye)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Makinede eşzamanlı çalışan işçi sayısı (varsayılan DOCFLOW_WORKERS)")
+    parser.add_argument("--worker_index", type=int, default=None,
+                        help="Bu işçinin sırası (varsayılan DOCFLOW_WORKER_INDEX)")
+    args = parser.parse_args()
+
+    stop_event = threading.Event()
+    # SIGTERM/SIGINT ile elindeki işi bitirip düzgün kapan
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda signum, frame: stop_event.set())
+
+    return run_worker(args, stop_event)
+
+
+if __name__ == "__main__":
+    os.makedirs(os.path.join(script_dir, 'logs'), exist_ok=True)
+    sys.exit(main())
@@ -2,12 +2,18 @@ package com.mercedes.documentprocessing;
 
 import org.kie.api.KieServices;
 import org.kie.api.runtime.KieContainer;
-import org.kie.api.runtime.KieSession;
+import org.kie.api.runtime.StatelessKieSession;
+import com.mongodb.MongoBulkWriteException;
+import com.mongodb.MongoException;
 import com.mongodb.client.MongoClients;
 import com.mongodb.client.MongoClient;
 import com.mongodb.client.MongoDatabase;
 import com.mongodb.client.MongoCollection;
 import com.mongodb.client.MongoCursor;
+import com.mongodb.client.model.BulkWriteOptions;
+import com.mongodb.client.model.Projections;
+import com.mongodb.client.model.UpdateOneModel;
+import com.mongodb.client.model.WriteModel;
 import org.bson.Document;
 import java.io.File;
 import java.nio.file.Files;
@@ -27,6 +33,9 @@ public class DocumentProcessor {
     // Klasör yolları
     private static String BASE_ARCHIVE_PATH = "C:/Users/Erdem/OneDrive/Masaüstü/Mercedes/";
     
+    // Tek seferde kurallardan geçirilecek ve MongoDB'ye topluca yazılacak belge sayısı
+    private static int BATCH_SIZE = 500;
+    
     public static void main(String[] args) {
         // Komut satırı parametrelerini işle
         for (int i = 0; i < args.length; i++) {
@@ -38,6 +47,8 @@ public class DocumentProcessor {
                 COLLECTION_NAME = args[i + 1];
             } else if (args[i].equals("--base-path") && i + 1 < args.length) {
                 BASE_ARCHIVE_PATH = args[i + 1];
+            } else if (args[i].equals("--batch-size") && i + 1 < args.length) {
+                BATCH_SIZE = Math.max(1, Integer.parseInt(args[i + 1]));
             }
         }
         
@@ -46,11 +57,15 @@ public class DocumentProcessor {
         System.out.println("Database: " + DB_NAME);
         System.out.println("Collection: " + COLLECTION_NAME);
         System.out.println("Temel Klasör Yolu: " + BASE_ARCHIVE_PATH);
+        System.out.println("Grup boyutu: " + BATCH_SIZE);
 
-        // Drools KieSession oluştur
+        // Drools durumsuz oturumu oluştur: her grup kendi çalışma belleğinde
+        // değerlendirilir ve sonrasında atılır, böylece bellek belge sayısıyla büyümez
+        long startTime = System.nanoTime();
         KieServices ks = KieServices.Factory.get();
         KieContainer kContainer = ks.getKieClasspathContainer();
-        KieSession kSession = kContainer.newKieSession("documentRulesSession");
+        StatelessKieSession kSession = kContainer.newStatelessKieSession("documentRulesStatelessSession");
+        System.out.printf("Kie container hazır: %.1f ms%n", (System.nanoTime() - startTime) / 1e6);
         
         // MongoDB'ye bağlan
         try (MongoClient mongoClient = MongoClients.create(MONGO_URI)) {
@@ -60,15 +75,18 @@ public class DocumentProcessor {
             // Hedef klasörleri oluştur
             createTargetFolders();
             
-            // İşlenmemiş belgeleri al
+            // İşlenmemiş belgeleri sadece kuralların kullandığı alanlarla al
             MongoCursor<Document> cursor = collection.find(
                 new Document("processed_for_routing", new Document("$ne", true))
-            ).iterator();
+            ).projection(Projections.include(
+                "file_path", "file_name", "document_class", "confidence", "text_length"
+            )).batchSize(BATCH_SIZE).iterator();
             
-            List<com.mercedes.documentprocessing.Document> processedDocuments = new ArrayList<>();
+            List<com.mercedes.documentprocessing.Document> batch = new ArrayList<>(BATCH_SIZE);
             int documentCount = 0;
+            int batchCount = 0;
             
-            // Her belge için kuralları uygula
+            // Belgeleri gruplar halinde kurallardan geçir
             while (cursor.hasNext()) {
                 Document mongoDoc = cursor.next();
                 documentCount++;
@@ -77,11 +95,10 @@ public class DocumentProcessor {
                 String filePath = mongoDoc.getString("file_path");
                 String fileName = mongoDoc.getString("file_name");
                 String documentClass = mongoDoc.getString("document_class");
-                double confidence = mongoDoc.getDouble("confidence");
-                String text = mongoDoc.getString("extracted_text");
-                int textLength = text != null ? text.length() : 0;
-                
-                System.out.println("Belge işleniyor: " + fileName + " (Sınıf: " + documentClass + ")");
+                Object confidenceValue = mongoDoc.get("confidence");
+                double confidence = confidenceValue instanceof Number ? ((Number) confidenceValue).doubleValue() : 0.0;
+                Object textLengthValue = mongoDoc.get("text_length");
+                int textLength = textLengthValue instanceof Number ? ((Number) textLengthValue).intValue() : 0;
                 
                 // Drools için belge nesnesini oluştur
                 com.mercedes.documentprocessing.Document doc = new com.mercedes.documentprocessing.Document();
@@ -90,30 +107,24 @@ public class DocumentProcessor {
                 doc.setFileName(fileName);
                 doc.setDocumentClass(documentClass);
                 doc.setConfidence(confidence);
-                doc.setExtractedText(text);
                 doc.setTextLength(textLength);
+                batch.add(doc);
                 
-                // Kuralları uygula
-                kSession.insert(doc);
-                kSession.fireAllRules();
-                
-                // Belgeyi taşı
-                boolean moved = moveDocumentToTargetFolder(doc);
-                
-                // MongoDB'yi güncelle
-                collection.updateOne(
-                    new Document("_id", mongoDoc.getObjectId("_id")),
-                    new Document("$set", new Document("processed_for_routing", true)
-                        .append("target_folder", doc.getTargetFolder())
-                        .append("needs_review", doc.isNeedsReview())
-                        .append("ocr_failed", doc.isOcrFailed()))
-                );
-                
-                processedDocuments.add(doc);
-                System.out.println("Belge işlendi ve MongoDB güncellendi: " + fileName);
+                if (batch.size() >= BATCH_SIZE) {
+                    processBatch(kSession, collection, batch, ++batchCount);
+                    batch.clear();
+                }
             }
             
+            if (!batch.isEmpty()) {
+                processBatch(kSession, collection, batch, ++batchCount);
+                batch.clear();
+            }
+            
+            double totalSeconds = (System.nanoTime() - startTime) / 1e9;
             System.out.println("İşlenen toplam belge sayısı: " + documentCount);
+            System.out.printf("Toplam süre: %.2f sn, %d grup, %.1f belge/sn%n",
+                totalSeconds, batchCount, documentCount / Math.max(totalSeconds, 1e-9));
             if (documentCount == 0) {
                 System.out.println("İşlenecek yeni belge bulunamadı.");
             }
@@ -122,11 +133,53 @@ public class DocumentProcessor {
             System.err.println("Hata oluştu: " + e.getMessage());
             e.printStackTrace();
         } finally {
-            kSession.dispose();
             System.out.println("Belge yönlendirme tamamlandı.");
         }
     }
     
+    private static void processBatch(StatelessKieSession kSession, MongoCollection<Document> collection,
+                                     List<com.mercedes.documentprocessing.Document> batch, int batchNumber) {
+        // Kuralları uygula: grup tek seferde eklenir, kurallar çalıştırılır ve oturum atılır
+        long rulesStart = System.nanoTime();
+        kSession.execute(batch);
+        long rulesEnd = System.nanoTime();
+        
+        // Belgeleri taşı ve güncellemeleri biriktir
+        List<WriteModel<Document>> updates = new ArrayList<>(batch.size());
+        int movedCount = 0;
+        for (com.mercedes.documentprocessing.Document doc : batch) {
+            boolean moved = moveDocumentToTargetFolder(doc);
+            if (moved) {
+                movedCount++;
+            }
+            
+            updates.add(new UpdateOneModel<>(
+                new Document("_id", new org.bson.types.ObjectId(doc.getId())),
+                new Document("$set", new Document("processed_for_routing", true)
+                    .append("target_folder", doc.getTargetFolder())
+                    .append("needs_review", doc.isNeedsReview())
+                    .append("ocr_failed", doc.isOcrFailed()))
+            ));
+        }
+        long moveEnd = System.nanoTime();
+        
+        // MongoDB'yi tek bir sırasız toplu yazma ile güncelle. Yazılamayan grup
+        // yönlendirme turunu durdurmaz; belgeleri işlenmemiş kalır ve sonraki turda yeniden denenir
+        try {
+            collection.bulkWrite(updates, new BulkWriteOptions().ordered(false));
+        } catch (MongoBulkWriteException e) {
+            System.err.printf("Grup #%d: %d/%d güncelleme yazılamadı: %s%n",
+                batchNumber, e.getWriteErrors().size(), updates.size(), e.getMessage());
+        } catch (MongoException e) {
+            System.err.printf("Grup #%d: toplu güncelleme hatası: %s%n", batchNumber, e.getMessage());
+        }
+        long writeEnd = System.nanoTime();
+        
+        System.out.printf("Grup #%d: %d belge (%d taşındı) - kurallar %.1f ms, taşıma %.1f ms, MongoDB %.1f ms%n",
+            batchNumber, batch.size(), movedCount,
+            (rulesEnd - rulesStart) / 1e6, (moveEnd - rulesEnd) / 1e6, (writeEnd - moveEnd) / 1e6);
+    }
+    
     private static void createTargetFolders() {
         // Tüm belge sınıfları için klasörler oluştur
         String[] classes = {
@@ -162,8 +215,6 @@ public class DocumentProcessor {
             
             Path targetPath = Paths.get(targetFolder + doc.getFileName());
             Files.move(sourceFile.toPath(), targetPath, StandardCopyOption.REPLACE_EXISTING);
-            
-            System.out.println("Dosya taşındı: " + doc.getFileName() + " -> " + targetPath);
             return true;
             
         } catch (Exception e) {
@@ -1,28 +1,327 @@
 """
 Belge içerik analizi için LLM entegrasyonu.
+
+DocumentAnalyzer tek istekleri işler. Çok sayıda belge eşzamanlı analiz
+edilecekse BatchedAnalyzerService istekleri kısa bir pencerede toplayıp tek
+bir dolgulu (padded) üretim grubunda çalıştırır; her çağıran sonucunu kendi
+Future nesnesinden alır:
+
+    service = BatchedAnalyzerService(DocumentAnalyzer())
+    future = service.submit(text, 'invoice')
+    result = future.result()
 """
+import re
+import copy
 import time
 import threading
-from queue import Queue
+from collections import OrderedDict
+from queue import Queue, Empty
+from concurrent.futures import Future
 import torch
 
 from config.settings import LLM_CONFIG
+from utils.cancellation import CancelToken, StageTimeout, stop_worker
+from utils.metrics import METRICS, timed
+from utils.profiling import profiled_target
+from utils.analysis_cache import AnalysisCache, cache_key
+from utils.resources import component_device, get_plan
+
+
+def cancel_stopping_criteria(token):
+    """
+    Üretimi her token sonrasında CancelToken'a göre durduran StoppingCriteriaList
+
+    Args:
+        token (CancelToken): Zaman aşımı/iptal token'ı
+
+    Returns:
+        transformers.StoppingCriteriaList
+    """
+    from transformers import StoppingCriteria, StoppingCriteriaList
+
+    class CancelCriteria(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return torch.full((input_ids.shape[0],), token.cancelled, dtype=torch.bool, device=input_ids.device)
+
+    return StoppingCriteriaList([CancelCriteria()])
+
+
+def analysis_stopping_criteria(token=None, tokenizer=None, prompt_length=0, fields=None, row_fields=None):
+    """
+    İptal ve (yapılandırılmış modda) tüm alanlar dolunca üretimi durduran kriterler
+
+    Args:
+        token (CancelToken, optional): Zaman aşımı/iptal token'ı
+        tokenizer (optional): Üretilen token'ları metne çevirmek için
+        prompt_length (int): input_ids içindeki prompt token sayısı (dolgu dahil)
+        fields (list, optional): Beklenen alan adları (bütün satırlar için)
+        row_fields (list, optional): Grup üretiminde her satırın beklenen alanları
+
+    Returns:
+        transformers.StoppingCriteriaList
+    """
+    from transformers import StoppingCriteria, StoppingCriteriaList
+
+    criteria = cancel_stopping_criteria(token) if token is not None else StoppingCriteriaList()
+    if fields or row_fields:
+        class FieldsFilledCriteria(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                done = [fields_filled(tokenizer.decode(row[prompt_length:], skip_special_tokens=True),
+                                      row_fields[i] if row_fields else fields)
+                        for i, row in enumerate(input_ids)]
+                return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+        criteria.append(FieldsFilledCriteria())
+    return criteria
+
+
+# Sınıf-spesifik analiz şablonları ({text} belge metni ile doldurulur)
+CLASS_TEMPLATES = {
+    'letter': """
+    Bu belge "letter" (mektup) olarak sınıflandırılmıştır.
+    Lütfen aşağıdaki mektubu analiz et ve şu bilgileri çıkar:
+
+    1. Mektubun kimden geldiği ve kime hitap ettiği
+    2. Mektubun yazılış tarihi
+    3. Mektubun ana konusu ve amacı
+    4. Mektupta belirtilen önemli bilgiler
+    5. Mektupta bahsedilen kişiler, kurumlar veya yerler
+    6. Mektubun tonu ve üslubu (resmi, gayri resmi, iş mektubu vb.)
+    7. Mektubun içeriğinin kısa bir özeti
+
+    Mektup İçeriği:
+    {text}
+    """,
+
+    'form': """
+    Bu belge "form" (form) olarak sınıflandırılmıştır.
+    Lütfen aşağıdaki formu analiz et ve şu bilgileri çıkar:
+
+    1. Formun türü ve amacı
+    2. Formda bulunan ana bölümler
+    3. Formdaki önemli alanlar ve bilgiler (varsa)
+    4. Form ile ilgili kurumsal bilgiler
+    5. Formun doldurulması için gereken bilgiler
+    6. Formun genel yapısı ve organizasyonu
+    7. Formun içeriğinin kısa bir özeti
+
+    Form İçeriği:
+    {text}
+    """,
+
+    'invoice': """
+    Bu belge "invoice" (fatura) olarak sınıflandırılmıştır.
+    Lütfen aşağıdaki faturayı analiz et ve şu bilgileri çıkar:
+
+    1. Fatura tarihi ve numarası
+    2. Satıcı/sağlayıcı bilgileri
+    3. Alıcı bilgileri
+    4. Fatura kalemleri (ürünler/hizmetler ve fiyatları)
+    5. Toplam tutar, vergi tutarı ve varsa indirimler
+    6. Ödeme koşulları ve son ödeme tarihi
+    7. Faturanın içeriğinin kısa bir özeti
+
+    Fatura İçeriği:
+    {text}
+    """,
+
+    'email': """
+    Bu belge "email" (e-posta) olarak sınıflandırılmıştır.
+    Lütfen aşağıdaki e-postayı analiz et ve şu bilgileri çıkar:
+
+    1. E-postanın kimden geldiği ve kime gönderildiği
+    2. E-postanın tarihi ve saati
+    3. E-postanın konusu
+    4. E-postada belirtilen önemli bilgiler veya talepler
+    5. E-postada bahsedilen kişiler, kurumlar veya projeler
+    6. E-postanın tonu ve amacı
+    7. E-postanın içeriğinin kısa bir özeti
+
+    E-posta İçeriği:
+    {text}
+    """
+}
+
+# Sınıfa özel şablonu olmayan belgeler için genel şablon
+DEFAULT_TEMPLATE = """
+    Bu belge "{document_class}" olarak sınıflandırılmıştır.
+    Lütfen aşağıdaki belgeyi analiz et ve şu bilgileri çıkar:
+
+    1. Belge tipi ve amacı nedir?
+    2. Ana konusu veya içeriği nedir?
+    3. Önemli anahtar-değer çiftleri (varsa)
+    4. Belgedeki önemli varlıklar (kişiler, şirketler, tarihler vb.)
+    5. Belgenin yapısı ve formatı nasıldır?
+    6. Belgenin hedef kitlesi kimdir?
+    7. Belgenin içeriğinin özeti
+
+    Belge İçeriği:
+    {text}
+    """
+
+
+def template_for(document_class):
+    """Sınıfa özel şablonu, yoksa genel şablonu döndürür"""
+    return CLASS_TEMPLATES.get(document_class, DEFAULT_TEMPLATE)
+
+
+# Yapılandırılmış analiz: her sınıfın çıkarılacak alanları (alan adı, açıklama)
+STRUCTURED_FIELDS = {
+    'letter': [
+        ('gonderen', "Mektubun kimden geldiği"),
+        ('alici', "Mektubun kime hitap ettiği"),
+        ('tarih', "Mektubun yazılış tarihi"),
+        ('konu', "Mektubun ana konusu ve amacı"),
+        ('kisiler_kurumlar', "Bahsedilen kişiler, kurumlar veya yerler"),
+        ('ton', "Mektubun tonu (resmi, gayri resmi, iş mektubu)"),
+        ('ozet', "Tek cümlelik özet"),
+    ],
+    'form': [
+        ('form_turu', "Formun türü"),
+        ('amac', "Formun amacı"),
+        ('kurum', "Formla ilgili kurum"),
+        ('onemli_alanlar', "Formdaki önemli alanlar ve değerleri"),
+        ('ozet', "Tek cümlelik özet"),
+    ],
+    'invoice': [
+        ('fatura_no', "Fatura numarası"),
+        ('fatura_tarihi', "Fatura tarihi"),
+        ('satici', "Satıcı/sağlayıcı"),
+        ('alici', "Alıcı"),
+        ('toplam_tutar', "Toplam tutar ve para birimi"),
+        ('vergi_tutari', "Vergi tutarı"),
+        ('son_odeme_tarihi', "Son ödeme tarihi"),
+        ('ozet', "Tek cümlelik özet"),
+    ],
+    'email': [
+        ('gonderen', "E-postanın kimden geldiği"),
+        ('alicilar', "E-postanın kime gönderildiği"),
+        ('tarih', "E-postanın tarihi"),
+        ('konu', "E-postanın konusu"),
+        ('talepler', "Belirtilen talepler veya önemli bilgiler"),
+        ('ozet', "Tek cümlelik özet"),
+    ],
+}
+
+DEFAULT_STRUCTURED_FIELDS = [
+    ('belge_tipi', "Belge tipi"),
+    ('amac', "Belgenin amacı"),
+    ('ana_konu', "Ana konusu"),
+    ('varliklar', "Önemli kişiler, şirketler, tarihler"),
+    ('ozet', "Tek cümlelik özet"),
+]
+
+# Alan bulunmadığında modelden beklenen değer
+EMPTY_FIELD_VALUE = "yok"
+
+_FIELD_LINE = re.compile(r'^\s*(?:[-*•]|\d+[.)])?\s*([a-z_]+)\s*:\s*(.*?)\s*$')
+
+
+def fields_for(document_class):
+    """Sınıfın yapılandırılmış alan tanımlarını döndürür"""
+    return STRUCTURED_FIELDS.get(document_class, DEFAULT_STRUCTURED_FIELDS)
+
+
+def structured_template(document_class):
+    """
+    Sınıfın alanlarını 'alan: değer' satırları olarak isteyen şablonu üretir
+
+    Returns:
+        str: {document_class} ve {text} yer tutuculu şablon
+    """
+    field_lines = '\n'.join(f"{name}: {description}" for name, description in fields_for(document_class))
+    return (
+        'Bu belge "{document_class}" olarak sınıflandırılmıştır.\n'
+        'Aşağıdaki belgeden istenen alanları çıkar. Yanıtı yalnızca her satıra bir alan gelecek '
+        f'şekilde "alan: değer" biçiminde, aşağıdaki sırayla ver. Bilgi yoksa "{EMPTY_FIELD_VALUE}" '
+        'yaz. Başka açıklama ekleme.\n\n'
+        f'Alanlar:\n{field_lines}\n\n'
+        'Belge İçeriği:\n{text}\n\n'
+        'Yanıt:\n'
+    )
+
+
+def _present_fields(text, fields):
+    """Metinde tamamlanmış 'alan: değer' satırlarını bulur (ilk geçiş geçerli)"""
+    found = {}
+    for line in text.splitlines():
+        match = _FIELD_LINE.match(line.lower())
+        if match and match.group(1) in fields and match.group(1) not in found:
+            # Değerin özgün büyük/küçük harfini koru
+            found[match.group(1)] = line.split(':', 1)[1].strip()
+    return found
+
+
+def fields_filled(text, fields):
+    """Tüm alanların satırı yazılıp son satır bitti mi"""
+    return text.endswith('\n') and len(_present_fields(text, fields)) == len(fields)
+
+
+def parse_structured(text, fields):
+    """
+    Yapılandırılmış yanıtı sözlüğe çevirir
+
+    Args:
+        text (str): Model yanıtı
+        fields (list): Beklenen alan adları
+
+    Returns:
+        dict: {alan: değer veya None}
+    """
+    found = _present_fields(text, fields)
+    parsed = {}
+    for field in fields:
+        value = found.get(field)
+        parsed[field] = None if not value or value.lower() == EMPTY_FIELD_VALUE else value
+    return parsed
+
+
+def split_template(prompt_template, document_class):
+    """
+    Şablonu belge metninden önceki sabit önek ve sonraki sonek olarak ayırır
+
+    Returns:
+        tuple: (önek, sonek) - ikisi de document_class ile doldurulmuş
+    """
+    head, _, tail = prompt_template.partition('{text}')
+    return (head.format(document_class=document_class),
+            tail.format(document_class=document_class))
+
 
 class DocumentAnalyzer:
-    def __init__(self, model=None, timeout=None):
+    def __init__(self, model=None, timeout=None, result_cache=None):
         """
         DeepSeek LLM kullanarak belge analizi sınıfı.
         
         Args:
             model (str, optional): Kullanılacak LLM modeli. Varsayılan LLM_CONFIG['model'].
             timeout (int, optional): Analiz işlemi için zaman aşımı (saniye). Varsayılan LLM_CONFIG['timeout'].
+            result_cache (AnalysisCache, optional): Sonuç önbelleği. Verilmezse
+                LLM_CONFIG['result_cache'] açıksa varsayılan dosyayla oluşturulur.
         """
         self.model = model or LLM_CONFIG['model']
         self.timeout = timeout or LLM_CONFIG['timeout']
         self.max_chars = LLM_CONFIG['max_chars']
         self.pipe = None
+
+        # Şablon önekleri için hesaplanmış KV durumu: önek -> (token id'leri, cache)
+        self.prefix_cache_enabled = LLM_CONFIG.get('prefix_cache', True)
+        self._prefix_cache = OrderedDict()
+        self._prefix_lock = threading.Lock()
+        self._prefix_failures = 0
+        # Paylaşılan tokenizer'ın dolgu ayarları yalnızca bu kilit altında geçici değiştirilir
+        self._tokenizer_lock = threading.Lock()
+
+        self.result_cache = result_cache
+        if self.result_cache is None and LLM_CONFIG.get('result_cache', True):
+            try:
+                self.result_cache = AnalysisCache()
+            except Exception as e:
+                print(f"Analiz önbelleği açılamadı: {e}")
         
-        device = "cuda" if torch.cuda.is_available() else "cpu"
+        # Tek işçi GPU'ları paylaşmıyorsa model "auto" ile dağıtılır, değilse işçiye düşen cihaza yerleşir
+        device = component_device('analyzer')
+        device_map = "auto" if device != "cpu" and get_plan()['workers'] == 1 else device
         print(f"LLM için kullanılan cihaz: {device}")
 
         try:
@@ -33,22 +332,211 @@ class DocumentAnalyzer:
                 "text-generation",
                 model=self.model,
                 torch_dtype=torch.bfloat16,
-                device_map="auto",
+                device_map=device_map,
             )
             print(f"LLM modeli başarıyla yüklendi: {self.model}")
         except Exception as e:
             print(f"LLM modeli yüklenirken hata oluştu: {e}")
             print("Analiz işlevi kullanılamayacak.")
 
-    def analyze_document(self, text, document_class, prompt_template=None):
+    def _truncate(self, text):
+        """Metni LLM_CONFIG['max_chars'] sınırına kısaltır"""
+        return text[:self.max_chars] if len(text) > self.max_chars else text
+
+    def build_prompt(self, text, document_class, prompt_template=None):
+        """
+        Belge metnini kısaltıp şablona yerleştirir
+
+        Args:
+            text (str): Belge metni
+            document_class (str): Belgenin sınıfı
+            prompt_template (str, optional): Özel şablon (varsayılan sınıf şablonu)
+
+        Returns:
+            str: Prompt
+        """
+        prompt_template = prompt_template or template_for(document_class)
+        return prompt_template.format(document_class=document_class, text=self._truncate(text))
+
+    def result_cache_key(self, text, document_class, prompt_template=None):
+        """Sonuç önbelleği anahtarı; önbellek kapalıysa None"""
+        if self.result_cache is None:
+            return None
+        prompt_template = prompt_template or template_for(document_class)
+        return cache_key(self.model, document_class, prompt_template, self._truncate(text))
+
+    def _get_prefix_state(self, prefix):
+        """
+        Şablon önekinin KV durumunu döndürür; ilk kullanımda hesaplar
+
+        Returns:
+            tuple: (önek token id'leri, önek KV cache'i)
+        """
+        with self._prefix_lock:
+            if prefix in self._prefix_cache:
+                self._prefix_cache.move_to_end(prefix)
+                METRICS.inc('llm_prefix_cache_total', result='hit')
+                return self._prefix_cache[prefix]
+
+        from transformers import DynamicCache
+
+        model, tokenizer = self.pipe.model, self.pipe.tokenizer
+        prefix_ids = tokenizer(prefix, return_tensors='pt').input_ids.to(model.device)
+        prefix_kv = DynamicCache()
+        with torch.no_grad(), timed('llm_prefill_prefix'):
+            model(input_ids=prefix_ids, past_key_values=prefix_kv, use_cache=True)
+
+        METRICS.inc('llm_prefix_cache_total', result='miss')
+        with self._prefix_lock:
+            self._prefix_cache[prefix] = (prefix_ids, prefix_kv)
+            while len(self._prefix_cache) > LLM_CONFIG.get('prefix_cache_size', 16):
+                self._prefix_cache.popitem(last=False)
+        return prefix_ids, prefix_kv
+
+    def _decoding_kwargs(self, fields=None):
+        """Serbest analizde örnekleme, yapılandırılmış analizde kısa açgözlü (greedy) çözümleme"""
+        if fields:
+            return {'max_new_tokens': LLM_CONFIG['structured_max_tokens'], 'do_sample': False}
+        return {
+            'max_new_tokens': LLM_CONFIG['max_tokens'],
+            'temperature': LLM_CONFIG['temperature'],
+            'top_p': 0.9,
+            'do_sample': True
+        }
+
+    def generate_with_prefix_cache(self, text, document_class, prompt_template, token=None, fields=None):
+        """
+        Şablonun sabit önekini önceden hesaplanmış KV durumundan devam ettirerek üretir.
+        Yalnızca belge metni ve şablon soneki için prefill yapılır.
+
+        Args:
+            text (str): Belge metni
+            document_class (str): Belgenin sınıfı
+            prompt_template (str): Şablon
+            token (CancelToken, optional): Süre dolunca üretimi token arasında durdurur
+            fields (list, optional): Yapılandırılmış modda beklenen alanlar (hepsi dolunca durur)
+
+        Returns:
+            str: Üretilen yanıt metni (prompt hariç)
+        """
+        model, tokenizer = self.pipe.model, self.pipe.tokenizer
+        prefix, suffix = split_template(prompt_template, document_class)
+        prefix_ids, prefix_kv = self._get_prefix_state(prefix)
+
+        # Önek ayrı token'laştırıldığı için cache ile birebir eşleşir; metin özel token'sız eklenir
+        text_ids = tokenizer(self._truncate(text) + suffix, add_special_tokens=False,
+                             return_tensors='pt').input_ids.to(model.device)
+        input_ids = torch.cat([prefix_ids, text_ids], dim=1)
+
+        with torch.no_grad(), timed('llm_generate'):
+            output = model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                # generate cache'i yerinde genişletir; paylaşılan önek kopyalanır
+                past_key_values=copy.deepcopy(prefix_kv),
+                pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id,
+                stopping_criteria=analysis_stopping_criteria(token, tokenizer, input_ids.shape[1], fields),
+                **self._decoding_kwargs(fields)
+            )
+        return tokenizer.decode(output[0, input_ids.shape[1]:], skip_special_tokens=True).strip()
+
+    # Model/transformers sürümünün önek cache'ini desteklemediğini gösteren hatalar
+    PREFIX_CACHE_UNSUPPORTED = (ImportError, NotImplementedError, TypeError, AttributeError)
+
+    def _prefix_cache_failed(self, error):
+        """
+        Önek cache'li üretimin hatasını kaydeder. Tek bir hata yalnızca o isteği
+        normal yola düşürür; cache desteklenmiyorsa veya art arda
+        LLM_CONFIG['prefix_cache_max_failures'] hata olursa cache kapatılır.
+
+        Args:
+            error (Exception): generate_with_prefix_cache'in fırlattığı hata
+        """
+        METRICS.inc('llm_prefix_cache_total', result='error')
+        with self._prefix_lock:
+            self._prefix_failures += 1
+            failures = self._prefix_failures
+            disable = (isinstance(error, self.PREFIX_CACHE_UNSUPPORTED) or
+                       failures >= LLM_CONFIG.get('prefix_cache_max_failures', 3))
+            if disable:
+                self.prefix_cache_enabled = False
+        if disable:
+            print(f"Önek KV cache kullanılamadı, devre dışı bırakılıyor ({failures}. hata): {error}")
+        else:
+            print(f"Önek KV cache hatası, bu istek normal yoldan işlenecek ({failures}. hata): {error}")
+
+    def _prefix_cache_succeeded(self):
+        """Başarılı önek cache'li üretimden sonra art arda hata sayacını sıfırlar"""
+        with self._prefix_lock:
+            self._prefix_failures = 0
+
+    def encode_batch(self, prompts):
+        """
+        Prompt'ları sola dolgulu tek bir girdi grubuna çevirir. Decoder-only
+        modellerde grup üretimi sola dolgu ve pad token ister; paylaşılan
+        tokenizer'ın ayarları kilit altında geçici değiştirilip hemen geri alınır.
+
+        Args:
+            prompts (list): Prompt listesi
+
+        Returns:
+            tuple: (input_ids, attention_mask, pad_token_id)
+        """
+        tokenizer = self.pipe.tokenizer
+        with self._tokenizer_lock:
+            padding_side, pad_token = tokenizer.padding_side, tokenizer.pad_token
+            tokenizer.padding_side = 'left'
+            if tokenizer.pad_token_id is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            try:
+                inputs = tokenizer(prompts, return_tensors='pt', padding=True)
+                pad_token_id = tokenizer.pad_token_id
+            finally:
+                tokenizer.padding_side = padding_side
+                tokenizer.pad_token = pad_token
+        device = self.pipe.model.device
+        return inputs.input_ids.to(device), inputs.attention_mask.to(device), pad_token_id
+
+    def generate_batch(self, prompts, token=None, row_fields=None):
+        """
+        Birden fazla prompt'u tek bir dolgulu üretim grubunda çalıştırır
+
+        Args:
+            prompts (list): Prompt listesi
+            token (CancelToken, optional): Süre dolunca üretimi token arasında durdurur
+            row_fields (list, optional): Yapılandırılmış modda her prompt'un beklenen alanları.
+                Verilirse grup açgözlü çözümlenir ve her satır alanları dolunca durur.
+
+        Returns:
+            list: Her prompt için üretilen yanıt metni (prompt hariç)
+        """
+        model, tokenizer = self.pipe.model, self.pipe.tokenizer
+        input_ids, attention_mask, pad_token_id = self.encode_batch(prompts)
+        prompt_length = input_ids.shape[1]
+
+        with torch.no_grad(), timed('llm_generate'):
+            output = model.generate(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                pad_token_id=pad_token_id,
+                stopping_criteria=analysis_stopping_criteria(token, tokenizer, prompt_length,
+                                                             row_fields=row_fields),
+                **self._decoding_kwargs(row_fields)
+            )
+        return [tokenizer.decode(row[prompt_length:], skip_special_tokens=True).strip() for row in output]
+
+    def analyze_document(self, text, document_class, prompt_template=None, structured=None):
         """
         Belge metnini analiz et ve önemli bilgileri çıkar.
-        Gelişmiş hata yakalama ve zaman aşımı kontrolü içerir.
+        Zaman aşımında üretim bir sonraki token'da durdurulur; arka planda sürmez.
         
         Args:
             text (str): Analiz edilecek belge metni
             document_class (str): Belgenin sınıfı
             prompt_template (str, optional): Özel bir prompt şablonu
+            structured (bool, optional): Yapılandırılmış mod - sınıfın alanları açgözlü
+                çözümlemeyle üretilir, tüm alanlar dolunca üretim durur ve sonuç
+                'fields' sözlüğüne ayrıştırılır. Varsayılan LLM_CONFIG['structured_output'].
             
         Returns:
             dict: Analiz sonuçları
@@ -64,92 +552,22 @@ class DocumentAnalyzer:
         # Sonuç ve hata kuyrukları
         result_queue = Queue()
         exception_queue = Queue()
+        token = CancelToken(self.timeout)
 
-        # Prompt şablonunu belirle
+        # Prompt şablonunu ve (yapılandırılmış modda) beklenen alanları belirle
+        if structured is None:
+            structured = LLM_CONFIG.get('structured_output', False)
+        fields = [name for name, _ in fields_for(document_class)] if structured else None
         if prompt_template is None:
-            # Sınıf-spesifik özel şablonlar
-            class_specific_templates = {
-                'letter': """
-                Bu belge "letter" (mektup) olarak sınıflandırılmıştır.
-                Lütfen aşağıdaki mektubu analiz et ve şu bilgileri çıkar:
-
-                1. Mektubun kimden geldiği ve kime hitap ettiği
-                2. Mektubun yazılış tarihi
-                3. Mektubun ana konusu ve amacı
-                4. Mektupta belirtilen önemli bilgiler
-                5. Mektupta bahsedilen kişiler, kurumlar veya yerler
-                6. Mektubun tonu ve üslubu (resmi, gayri resmi, iş mektubu vb.)
-                7. Mektubun içeriğinin kısa bir özeti
-
-                Mektup İçeriği:
-                {text}
-                """,
-
-                'form': """
-                Bu belge "form" (form) olarak sınıflandırılmıştır.
-                Lütfen aşağıdaki formu analiz et ve şu bilgileri çıkar:
-
-                1. Formun türü ve amacı
-                2. Formda bulunan ana bölümler
-                3. Formdaki önemli alanlar ve bilgiler (varsa)
-                4. Form ile ilgili kurumsal bilgiler
-                5. Formun doldurulması için gereken bilgiler
-                6. Formun genel yapısı ve organizasyonu
-                7. Formun içeriğinin kısa bir özeti
-
-                Form İçeriği:
-                {text}
-                """,
-
-                'invoice': """
-                Bu belge "invoice" (fatura) olarak sınıflandırılmıştır.
-                Lütfen aşağıdaki faturayı analiz et ve şu bilgileri çıkar:
-
-                1. Fatura tarihi ve numarası
-                2. Satıcı/sağlayıcı bilgileri
-                3. Alıcı bilgileri
-                4. Fatura kalemleri (ürünler/hizmetler ve fiyatları)
-                5. Toplam tutar, vergi tutarı ve varsa indirimler
-                6. Ödeme koşulları ve son ödeme tarihi
-                7. Faturanın içeriğinin kısa bir özeti
-
-                Fatura İçeriği:
-                {text}
-                """,
-
-                'email': """
-                Bu belge "email" (e-posta) olarak sınıflandırılmıştır.
-                Lütfen aşağıdaki e-postayı analiz et ve şu bilgileri çıkar:
-
-                1. E-postanın kimden geldiği ve kime gönderildiği
-                2. E-postanın tarihi ve saati
-                3. E-postanın konusu
-                4. E-postada belirtilen önemli bilgiler veya talepler
-                5. E-postada bahsedilen kişiler, kurumlar veya projeler
-                6. E-postanın tonu ve amacı
-                7. E-postanın içeriğinin kısa bir özeti
-
-                E-posta İçeriği:
-                {text}
-                """
-            }
-
-            # Sınıfa özel şablon varsa kullan, yoksa genel şablonu kullan
-            prompt_template = class_specific_templates.get(document_class, """
-            Bu belge "{document_class}" olarak sınıflandırılmıştır.
-            Lütfen aşağıdaki belgeyi analiz et ve şu bilgileri çıkar:
-
-            1. Belge tipi ve amacı nedir?
-            2. Ana konusu veya içeriği nedir?
-            3. Önemli anahtar-değer çiftleri (varsa)
-            4. Belgedeki önemli varlıklar (kişiler, şirketler, tarihler vb.)
-            5. Belgenin yapısı ve formatı nasıldır?
-            6. Belgenin hedef kitlesi kimdir?
-            7. Belgenin içeriğinin özeti
+            prompt_template = structured_template(document_class) if structured else template_for(document_class)
 
-            Belge İçeriği:
-            {text}
-            """)
+        # Aynı metin aynı model ve şablonla daha önce analiz edildiyse üretimi atla
+        key = self.result_cache_key(text, document_class, prompt_template)
+        if key is not None:
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                cached['cached'] = True
+                return cached
 
         # Analiz çalışanı
         def analyze_worker():
@@ -158,37 +576,53 @@ class DocumentAnalyzer:
                 start_time = time.time()
                 print(f"LLM analizi başlıyor, metin uzunluğu: {len(text)} karakter")
 
-                # Metni kısalt (çok uzunsa)
-                truncated_text = text[:self.max_chars] if len(text) > self.max_chars else text
-
-                # Prompt oluştur
-                prompt = prompt_template.format(document_class=document_class, text=truncated_text)
-
-                # LLM yanıtı al
-                response = self.pipe(
-                    prompt,
-                    max_new_tokens=LLM_CONFIG['max_tokens'],
-                    temperature=LLM_CONFIG['temperature'],
-                    top_p=0.9,
-                    do_sample=True
-                )
-
-                generated_text = response[0]['generated_text']
-
-                # Prompt'u çıkar ve sadece yanıtı al
-                response_text = generated_text[len(prompt):].strip()
+                response_text = None
+                if self.prefix_cache_enabled:
+                    try:
+                        response_text = self.generate_with_prefix_cache(text, document_class,
+                                                                        prompt_template, token, fields)
+                        self._prefix_cache_succeeded()
+                    except StageTimeout:
+                        raise
+                    except Exception as e:
+                        # Bu istek normal yoldan işlenir; cache yalnızca desteklenmiyorsa kapatılır
+                        self._prefix_cache_failed(e)
+
+                if response_text is None:
+                    # Prompt oluştur (metin çok uzunsa kısaltılır)
+                    prompt = self.build_prompt(text, document_class, prompt_template)
+
+                    # LLM yanıtı al
+                    prompt_length = len(self.pipe.tokenizer(prompt).input_ids) if fields else 0
+                    response = self.pipe(
+                        prompt,
+                        stopping_criteria=analysis_stopping_criteria(token, self.pipe.tokenizer,
+                                                                     prompt_length, fields),
+                        **self._decoding_kwargs(fields)
+                    )
+                    generated_text = response[0]['generated_text']
+
+                    # Prompt'u çıkar ve sadece yanıtı al
+                    response_text = generated_text[len(prompt):].strip()
+                token.raise_if_cancelled('llm')
 
                 # İşlem süresini hesapla
                 elapsed_time = time.time() - start_time
                 print(f"LLM analizi tamamlandı: {len(response_text)} karakter, {elapsed_time:.2f} saniye")
 
                 # Sonucu kuyruğa ekle
-                result_queue.put({
+                result = {
                     'analysis': response_text,
                     'model': self.model,
                     'processing_time': elapsed_time
-                })
-
+                }
+                if fields:
+                    result['structured'] = True
+                    result['fields'] = parse_structured(response_text, fields)
+                result_queue.put(result)
+
+            except StageTimeout as e:
+                print(f"LLM analizi iptal edildi: {e}")
             except Exception as e:
                 print(f"LLM analiz hatası: {e}")
                 import traceback
@@ -196,20 +630,23 @@ class DocumentAnalyzer:
                 exception_queue.put(e)
 
         # İş parçacığını başlat
-        thread = threading.Thread(target=analyze_worker)
+        thread = threading.Thread(target=profiled_target(analyze_worker))
         thread.daemon = True
         thread.start()
 
         # Zaman aşımı ile bekle
         thread.join(timeout=self.timeout)
 
-        # Thread hala çalışıyorsa zaman aşımına uğradı
-        if thread.is_alive():
+        # Thread hala çalışıyorsa (veya süre dolunca kendisi durduysa) zaman aşımına uğradı:
+        # iptal et ve üretimin durmasını bekle
+        if thread.is_alive() or (token.cancelled and result_queue.empty()):
             print(f"LLM analizi zaman aşımına uğradı ({self.timeout} saniye)")
+            stopped = stop_worker(thread, token, 'llm', LLM_CONFIG.get('cancel_grace', 5))
             return {
                 'analysis': f"[LLM analizi zaman aşımına uğradı ({self.timeout} saniye). Belge çok karmaşık veya LLM işlem kapasitesini aşıyor olabilir.]",
                 'model': self.model,
-                'error': 'timeout'
+                'error': 'timeout',
+                'worker_stopped': stopped
             }
 
         # İstisna olup olmadığını kontrol et
@@ -221,12 +658,190 @@ class DocumentAnalyzer:
                 'error': str(e)
             }
 
-        # Sonuçları döndür
+        # Sonuçları döndür (başarılı sonuç önbelleğe yazılır)
         if not result_queue.empty():
-            return result_queue.get()
+            result = result_queue.get()
+            if key is not None:
+                self.result_cache.put(key, self.model, result)
+            return result
         else:
             return {
                 'analysis': "[LLM analizi tamamlandı ancak sonuç bulunamadı]",
                 'model': self.model,
                 'error': 'no_result'
             }
+
+
+class _AnalysisRequest:
+    def __init__(self, prompt, cache_key=None, fields=None):
+        self.prompt = prompt
+        self.cache_key = cache_key
+        self.fields = fields
+        self.future = Future()
+        self.submitted = time.time()
+
+
+class BatchedAnalyzerService:
+    # Kuyruğu kapatmak için işaret
+    _STOP = object()
+
+    def __init__(self, analyzer, max_batch_size=None, max_wait=None):
+        """
+        Eşzamanlı analiz isteklerini gruplayarak çalıştıran kuyruk servisi
+
+        Args:
+            analyzer (DocumentAnalyzer): Yüklenmiş analizör
+            max_batch_size (int, optional): Bir gruptaki en fazla istek. Varsayılan LLM_CONFIG['batch_size'].
+            max_wait (float, optional): İlk istekten sonra grubu doldurmak için beklenecek
+                en uzun süre (saniye). Varsayılan LLM_CONFIG['batch_max_wait'].
+        """
+        self.analyzer = analyzer
+        self.max_batch_size = max_batch_size or LLM_CONFIG['batch_size']
+        self.max_wait = LLM_CONFIG['batch_max_wait'] if max_wait is None else max_wait
+        self._queue = Queue()
+        self._thread = threading.Thread(target=self._run, name='llm-batcher', daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def submit(self, text, document_class, prompt_template=None, structured=None):
+        """
+        Analiz isteğini kuyruğa ekler
+
+        Args:
+            text (str): Analiz edilecek belge metni
+            document_class (str): Belgenin sınıfı
+            prompt_template (str, optional): Özel bir prompt şablonu
+            structured (bool, optional): Yapılandırılmış mod (bkz. DocumentAnalyzer.analyze_document).
+                Varsayılan LLM_CONFIG['structured_output'].
+
+        Returns:
+            concurrent.futures.Future: Sonuç sözlüğü (analyze_document ile aynı biçim)
+        """
+        if self.analyzer.pipe is None:
+            future = Future()
+            future.set_result({
+                'analysis': "LLM modeli yüklenemediği için analiz yapılamadı.",
+                'model': "None",
+                'error': "Model yüklenemedi"
+            })
+            return future
+
+        # Prompt şablonunu ve (yapılandırılmış modda) beklenen alanları belirle
+        if structured is None:
+            structured = LLM_CONFIG.get('structured_output', False)
+        fields = [name for name, _ in fields_for(document_class)] if structured else None
+        if prompt_template is None:
+            prompt_template = structured_template(document_class) if structured else template_for(document_class)
+
+        # Önbellekte varsa kuyruğa hiç girmeden dön
+        key = self.analyzer.result_cache_key(text, document_class, prompt_template)
+        if key is not None:
+            cached = self.analyzer.result_cache.get(key)
+            if cached is not None:
+                cached['cached'] = True
+                future = Future()
+                future.set_result(cached)
+                return future
+
+        request = _AnalysisRequest(self.analyzer.build_prompt(text, document_class, prompt_template), key, fields)
+        self._queue.put(request)
+        return request.future
+
+    def analyze_document(self, text, document_class, prompt_template=None, structured=None):
+        """DocumentAnalyzer.analyze_document ile aynı arayüz; istek grup içinde çalışır"""
+        return self.submit(text, document_class, prompt_template, structured).result()
+
+    def close(self):
+        """Kuyruktaki istekleri bitirir ve servisi durdurur"""
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def _collect(self):
+        """İlk isteği bekler, ardından max_wait süresince grubu doldurur"""
+        first = self._queue.get()
+        if first is self._STOP:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except Empty:
+                break
+            if request is self._STOP:
+                # Kapatma isteği mevcut gruptan sonra işlenir
+                self._queue.put(self._STOP)
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+
+            # Çağıranın iptal ettiği istekleri atla
+            batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            # Serbest ve yapılandırılmış istekler farklı çözümlendiği için ayrı gruplarda üretilir
+            for structured in (False, True):
+                group = [request for request in batch if bool(request.fields) == structured]
+                if group:
+                    self._run_group(group, structured)
+
+    def _run_group(self, batch, structured):
+        """Aynı çözümleme kipindeki istekleri tek üretim grubunda çalıştırır ve sonuçları dağıtır"""
+        METRICS.inc('llm_batches_total')
+        METRICS.inc('llm_batch_requests_total', value=len(batch))
+        token = CancelToken(self.analyzer.timeout)
+        start_time = time.time()
+        try:
+            responses = self.analyzer.generate_batch([request.prompt for request in batch], token,
+                                                     [request.fields for request in batch] if structured else None)
+        except Exception as e:
+            print(f"LLM grup analizi hatası: {e}")
+            for request in batch:
+                request.future.set_result({
+                    'analysis': f"[LLM analiz hatası: {str(e)}]",
+                    'model': self.analyzer.model,
+                    'error': str(e)
+                })
+            return
+
+        elapsed_time = time.time() - start_time
+        if token.cancelled:
+            METRICS.inc('stage_timeouts_total', stage='llm')
+        for request, response_text in zip(batch, responses):
+            if token.cancelled:
+                result = {
+                    'analysis': f"[LLM analizi zaman aşımına uğradı ({self.analyzer.timeout} saniye)]",
+                    'model': self.analyzer.model,
+                    'error': 'timeout',
+                    'worker_stopped': True
+                }
+            else:
+                result = {
+                    'analysis': response_text,
+                    'model': self.analyzer.model,
+                    'processing_time': elapsed_time
+                }
+                if structured:
+                    result['structured'] = True
+                    result['fields'] = parse_structured(response_text, request.fields)
+                if request.cache_key is not None:
+                    self.analyzer.result_cache.put(request.cache_key, self.analyzer.model, result)
+            result['batch_size'] = len(batch)
+            result['queue_time'] = start_time - request.submitted
+            request.future.set_result(result)
@@ -0,0 +1,262 @@
+"""
+Sınıflandırma için önden yüklemeli toplu ön işleme.
+
+Birikmiş belgeler sınıflandırılırken görüntü çözme ve küçültme (PIL) model
+ileri geçişiyle aynı iş parçacığında sırayla yapılırsa model her grupta PIL'i
+bekler. BatchLoader ayrı yükleyici süreçleri başlatır; süreçler belgeleri
+çözüp model boyutuna indirir ve sonucu önceden ayrılmış paylaşılan bellek
+grup tamponlarına (uint8, [yuva, grup, H, W, 3]) doğrudan yazar. Ana süreç
+hazır tamponu tek bir vektörel işlemle normalize edip modele verirken
+süreçler sonraki grupları doldurur.
+
+spawn ile başlatılan süreçler ana modülü (__main__) yeniden içe aktarır; ana
+modül document_classifier.py gibi bir giriş betiğiyse her yükleyici torch ve
+modelleri de içe aktarır. Süreçler başlatılırken ana modül yerine küçük
+models/loader_entry.py gösterilir.
+
+Kullanım:
+    with BatchLoader(batch_size=16, workers=2) as loader:
+        for paths, pixel_values, errors in loader.iter_batches(image_paths):
+            logits = model(pixel_values=pixel_values).logits
+"""
+import sys
+import time
+import queue
+import importlib
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+import torch
+
+from config.settings import MODEL_CONFIG
+from models.image_io import load_model_array, loader_worker
+from utils.metrics import timed
+
+LOADER_ENTRY_MODULE = 'models.loader_entry'
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+def normalize_batch(batch, mean=IMAGENET_MEAN, std=IMAGENET_STD):
+    """
+    uint8 [N, H, W, 3] grubu model girdisine çevirir. ToTensor (/255) ve
+    Normalize ((x - ortalama) / std) adımları kanal başına tek bir ölçek ve
+    kaydırmaya indirgenip bütün gruba birlikte uygulanır.
+
+    Args:
+        batch (numpy.ndarray veya torch.Tensor): uint8 [N, H, W, 3]
+        mean (sequence): Kanal ortalamaları
+        std (sequence): Kanal standart sapmaları
+
+    Returns:
+        torch.Tensor: float32 [N, 3, H, W]
+    """
+    mean = torch.tensor(mean, dtype=torch.float32).view(1, 3, 1, 1)
+    std = torch.tensor(std, dtype=torch.float32).view(1, 3, 1, 1)
+    pixels = torch.as_tensor(batch).permute(0, 3, 1, 2)
+    # Paylaşılan tampondan kopya burada alınır; tampon hemen yeniden kullanılabilir
+    pixels = pixels.to(torch.float32, memory_format=torch.contiguous_format)
+    return pixels.mul_(1.0 / (255.0 * std)).sub_(mean / std)
+
+
+@contextmanager
+def _loader_main(start_method):
+    """
+    Süreç başlatılırken ana modülü LOADER_ENTRY_MODULE ile değiştirir. spawn ve
+    forkserver hazırlık verisini start() içinde ana modülden okur; alt süreç
+    giriş betiği yerine bu modülü içe aktarır.
+    """
+    if start_method == 'fork':
+        yield
+        return
+    main = sys.modules.get('__main__')
+    sys.modules['__main__'] = importlib.import_module(LOADER_ENTRY_MODULE)
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main
+
+
+class BatchLoader:
+    def __init__(self, batch_size=None, workers=None, prefetch=None, image_size=None, start_method=None):
+        """
+        Args:
+            batch_size (int, optional): Grup boyutu. Varsayılan MODEL_CONFIG['batch_size'].
+            workers (int, optional): Yükleyici süreç sayısı (0: aynı süreçte sırayla).
+                Varsayılan MODEL_CONFIG['loader_workers'].
+            prefetch (int, optional): Model çalışırken önden doldurulacak grup sayısı.
+                Varsayılan MODEL_CONFIG['prefetch_batches'].
+            image_size (int, optional): Model girdi kenarı. Varsayılan MODEL_CONFIG['image_size'].
+            start_method (str, optional): multiprocessing başlatma yöntemi.
+                Varsayılan MODEL_CONFIG['loader_start_method'].
+        """
+        self.batch_size = batch_size or MODEL_CONFIG.get('batch_size', 16)
+        self.workers = MODEL_CONFIG.get('loader_workers', 2) if workers is None else workers
+        self.prefetch = MODEL_CONFIG.get('prefetch_batches', 2) if prefetch is None else prefetch
+        self.image_size = image_size or MODEL_CONFIG['image_size']
+        self.timeout = MODEL_CONFIG.get('loader_timeout', 60)
+        self.num_slots = self.prefetch + 1
+        self._lock = threading.Lock()
+        self.shm = None
+        self.processes = []
+        self.start_method = start_method or MODEL_CONFIG.get('loader_start_method', 'spawn')
+
+        if self.workers > 0:
+            self.shape = (self.num_slots, self.batch_size, self.image_size, self.image_size, 3)
+            self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.shape)))
+            self.buffer = np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf)
+            self._start_workers()
+            print(f"Toplu yükleyici başlatıldı: {self.workers} süreç, grup {self.batch_size}, "
+                  f"önden {self.prefetch} grup")
+
+    def _start_workers(self):
+        """Kuyrukları ve yükleyici süreçleri oluşturur"""
+        context = multiprocessing.get_context(self.start_method)
+        self.task_queue = context.Queue()
+        self.result_queue = context.Queue()
+        with _loader_main(self.start_method):
+            for i in range(self.workers):
+                process = context.Process(
+                    target=loader_worker,
+                    args=(self.shm.name, self.shape, self.image_size, self.task_queue, self.result_queue),
+                    name=f"batch-loader-{i}",
+                    daemon=True
+                )
+                process.start()
+                self.processes.append(process)
+
+    def _stop_workers(self, grace=5):
+        """Süreçleri durdurur; süre içinde çıkmayanlar sonlandırılır"""
+        for _ in self.processes:
+            self.task_queue.put(None)
+        for process in self.processes:
+            process.join(timeout=grace)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=5)
+        self.processes = []
+        for q in (self.task_queue, self.result_queue):
+            q.close()
+            q.cancel_join_thread()
+
+    def _restart_workers(self):
+        """
+        Yanıt vermeyen süreçleri sonlandırıp kuyruklarla birlikte yeniden oluşturur.
+        Önceki çalıştırmadan geç gelen sonuçlar sonraki çalıştırmaya karışmaz,
+        eski görevler tamponlara yazmaya devam etmez.
+        """
+        print("Toplu yükleyici süreçleri yeniden başlatılıyor")
+        self._stop_workers(grace=0)
+        self._start_workers()
+
+    def iter_batches(self, image_paths):
+        """
+        Belgeleri gruplar hâlinde çözer ve normalize eder
+
+        Args:
+            image_paths (list): Görüntü dosyalarının yolları
+
+        Yields:
+            tuple: (gruptaki yollar, float32 [N, 3, H, W] tensör, {gruptaki sıra: hata mesajı})
+                Yüklenemeyen görüntülerin satırı sıfırdır ve hata sözlüğünde yer alır.
+        """
+        image_paths = list(image_paths)
+        batches = [image_paths[i:i + self.batch_size] for i in range(0, len(image_paths), self.batch_size)]
+        with self._lock:
+            if self.workers > 0:
+                yield from self._iter_prefetched(batches)
+            else:
+                yield from self._iter_inline(batches)
+
+    def _iter_inline(self, batches):
+        for batch in batches:
+            arrays = np.zeros((len(batch), self.image_size, self.image_size, 3), dtype=np.uint8)
+            errors = {}
+            with timed('decode'):
+                for index, path in enumerate(batch):
+                    try:
+                        arrays[index] = load_model_array(path, self.image_size)
+                    except Exception as e:
+                        errors[index] = f"{type(e).__name__}: {e}"
+            with timed('preprocess'):
+                pixel_values = normalize_batch(arrays)
+            yield batch, pixel_values, errors
+
+    def _iter_prefetched(self, batches):
+        remaining = {}
+        errors = {}
+
+        def submit(batch_number):
+            slot = batch_number % self.num_slots
+            remaining[slot] = len(batches[batch_number])
+            errors[slot] = {}
+            for index, path in enumerate(batches[batch_number]):
+                self.task_queue.put((slot, index, path))
+
+        def wait(slot):
+            deadline = time.monotonic() + self.timeout
+            while remaining.get(slot, 0) > 0:
+                try:
+                    done_slot, index, error = self.result_queue.get(timeout=1)
+                except queue.Empty:
+                    if not any(process.is_alive() for process in self.processes):
+                        raise RuntimeError("Yükleyici süreçler beklenmedik şekilde sonlandı")
+                    if time.monotonic() > deadline:
+                        raise RuntimeError(f"Yükleyici süreçler {self.timeout} saniyedir yanıt vermiyor")
+                    continue
+                remaining[done_slot] -= 1
+                if error:
+                    errors[done_slot][index] = error
+
+        for batch_number in range(min(self.num_slots, len(batches))):
+            submit(batch_number)
+
+        failed = False
+        try:
+            for batch_number, batch in enumerate(batches):
+                slot = batch_number % self.num_slots
+                # Süre modelin yükleyiciyi beklediği süredir; önden yükleme yeterliyse sıfıra yakındır
+                with timed('loader_wait'):
+                    try:
+                        wait(slot)
+                    except RuntimeError:
+                        failed = True
+                        raise
+                with timed('preprocess'):
+                    pixel_values = normalize_batch(self.buffer[slot, :len(batch)])
+                batch_errors = errors[slot]
+                # Tampon kopyalandı; yuva sıradaki grup için serbest
+                if batch_number + self.num_slots < len(batches):
+                    submit(batch_number + self.num_slots)
+                yield batch, pixel_values, batch_errors
+        finally:
+            # Tüketici erken bırakırsa süreçlerin yazmaya devam ettiği yuvalar boşaltılır
+            if not failed:
+                try:
+                    for slot in list(remaining):
+                        wait(slot)
+                except RuntimeError as e:
+                    print(f"Yükleyici yuvaları boşaltılamadı: {e}")
+                    failed = True
+            if failed:
+                self._restart_workers()
+
+    def close(self):
+        """Yükleyici süreçleri durdurur ve paylaşılan belleği serbest bırakır"""
+        if self.processes:
+            self._stop_workers()
+        if self.shm is not None:
+            del self.buffer
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
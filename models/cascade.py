@@ -0,0 +1,208 @@
+"""
+Kademeli sınıflandırma için ucuz ilk geçiş modeli.
+
+Gelen belgelerin çoğu düzeni kolayca tanınan birkaç baskın sınıftandır; bunlar
+için Swin-base ileri geçişi gereksizdir. PixelClassifier model girdisi
+görüntünün küçültülmüş gri piksellerinden ve satır/sütun mürekkep
+izdüşümlerinden oluşan özellikler üzerinde doğrusal bir softmax katmanıdır.
+Ağırlıklar Swin'in kendi tahminlerinden damıtılır (yumuşak etiketler).
+Güven eşiği ayrılmış kümede Swin ile uyum hedefini sağlayacak şekilde
+kalibre edilir. Güveni eşiğin altındaki belgeler Swin'e yükseltilir.
+
+torch'a bağımlı değildir; model NumPy .npz dosyası olarak saklanır.
+Damıtma ve yükseltme oranı raporu için: python -m benchmarks.distill_cascade
+"""
+import numpy as np
+
+from config.settings import CLASSES, MODEL_CONFIG
+
+
+def pixel_features(images, size=None):
+    """
+    Model boyutundaki görüntülerden ucuz model özelliklerini çıkarır:
+    size x size blok ortalamalı gri pikseller ile satır ve sütun ortalamaları
+
+    Args:
+        images (numpy.ndarray): [N, H, W, 3] RGB, 0-255 ölçeğinde (uint8 veya float)
+        size (int, optional): Izgara kenarı. Varsayılan MODEL_CONFIG['cascade_feature_size'].
+
+    Returns:
+        numpy.ndarray: float32 [N, size * size + 2 * size]
+    """
+    size = size or MODEL_CONFIG.get('cascade_feature_size', 32)
+    images = np.asarray(images)
+    gray = images.mean(axis=3, dtype=np.float32) / 255.0
+    n, height, width = gray.shape
+    # Blok ortalaması için kenarlar size'ın katına kırpılır (224 / 32 = 7 tam bölünür)
+    block_h, block_w = height // size, width // size
+    gray = gray[:, :block_h * size, :block_w * size]
+    grid = gray.reshape(n, size, block_h, size, block_w).mean(axis=(2, 4))
+    return np.concatenate([
+        grid.reshape(n, -1),
+        grid.mean(axis=2),
+        grid.mean(axis=1)
+    ], axis=1).astype(np.float32)
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class PixelClassifier:
+    def __init__(self, weights, bias, feature_mean, feature_std, threshold=1.0, classes=None, feature_size=32):
+        """
+        Args:
+            weights (numpy.ndarray): [özellik, sınıf] ağırlıklar
+            bias (numpy.ndarray): [sınıf] sapmalar
+            feature_mean (numpy.ndarray): Özellik ortalamaları (standartlaştırma)
+            feature_std (numpy.ndarray): Özellik standart sapmaları
+            threshold (float): Kalibre edilmiş güven eşiği; altında kalan belgeler Swin'e yükseltilir
+            classes (list, optional): Sınıf adları. Varsayılan CLASSES.
+            feature_size (int): pixel_features ızgara kenarı
+        """
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.feature_mean = np.asarray(feature_mean, dtype=np.float32)
+        self.feature_std = np.asarray(feature_std, dtype=np.float32)
+        self.threshold = float(threshold)
+        self.classes = list(classes or CLASSES)
+        self.feature_size = int(feature_size)
+
+    @classmethod
+    def fit(cls, features, targets, epochs=300, learning_rate=0.05, l2=1e-4, feature_size=32, seed=0):
+        """
+        Softmax katmanını Swin olasılıklarına (yumuşak etiketler) göre eğitir.
+        Tam grup Adam ile çapraz entropi en aza indirilir.
+
+        Args:
+            features (numpy.ndarray): [N, özellik] pixel_features çıktısı
+            targets (numpy.ndarray): [N, sınıf] Swin olasılıkları
+            epochs (int): Adım sayısı
+            learning_rate (float): Adam öğrenme oranı
+            l2 (float): Ağırlık cezası
+            feature_size (int): Özelliklerin ızgara kenarı
+            seed (int): Başlatma tohumu
+
+        Returns:
+            PixelClassifier: Eğitilmiş model (eşik henüz kalibre edilmemiş)
+        """
+        features = np.asarray(features, dtype=np.float32)
+        targets = np.asarray(targets, dtype=np.float32)
+        mean = features.mean(axis=0)
+        std = features.std(axis=0) + 1e-6
+        x = (features - mean) / std
+        n, num_features = x.shape
+
+        rng = np.random.default_rng(seed)
+        weights = rng.normal(0, 0.01, (num_features, targets.shape[1])).astype(np.float32)
+        bias = np.zeros(targets.shape[1], dtype=np.float32)
+        params = [weights, bias]
+        moments = [np.zeros_like(p) for p in params]
+        velocities = [np.zeros_like(p) for p in params]
+        beta1, beta2 = 0.9, 0.999
+
+        for step in range(1, epochs + 1):
+            probs = _softmax(x @ weights + bias)
+            error = (probs - targets) / n
+            grads = [x.T @ error + l2 * weights, error.sum(axis=0)]
+            for param, grad, m, v in zip(params, grads, moments, velocities):
+                m *= beta1
+                m += (1 - beta1) * grad
+                v *= beta2
+                v += (1 - beta2) * grad * grad
+                param -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + 1e-8)
+
+        return cls(weights, bias, mean, std, classes=CLASSES[:targets.shape[1]], feature_size=feature_size)
+
+    def predict_proba(self, features):
+        """
+        Args:
+            features (numpy.ndarray): [N, özellik] pixel_features çıktısı
+
+        Returns:
+            numpy.ndarray: [N, sınıf] olasılıklar
+        """
+        x = (np.asarray(features, dtype=np.float32) - self.feature_mean) / self.feature_std
+        return _softmax(x @ self.weights + self.bias)
+
+    def accepts(self, probs):
+        """Güveni eşiği geçen satırların maskesi"""
+        return probs.max(axis=1) >= self.threshold
+
+    def calibrate(self, features, teacher_labels, target_agreement=None):
+        """
+        Ucuz modelin cevap verdiği belgelerde Swin ile uyumu hedefin üstünde
+        tutan en düşük güven eşiğini seçer (yükseltme oranı en aza iner)
+
+        Args:
+            features (numpy.ndarray): Ayrılmış kümenin özellikleri
+            teacher_labels (numpy.ndarray): Ayrılmış kümede Swin'in sınıf sıraları
+            target_agreement (float, optional): Varsayılan MODEL_CONFIG['cascade_target_agreement'].
+
+        Returns:
+            dict: evaluate() raporu (seçilen eşikle)
+        """
+        target_agreement = target_agreement or MODEL_CONFIG.get('cascade_target_agreement', 0.99)
+        probs = self.predict_proba(features)
+        confidence = probs.max(axis=1)
+        correct = probs.argmax(axis=1) == np.asarray(teacher_labels)
+
+        # Güvene göre azalan sırada kabul edilen ilk k belgenin uyumu
+        order = np.argsort(-confidence, kind='stable')
+        agreement = np.cumsum(correct[order]) / np.arange(1, len(order) + 1)
+        passing = np.nonzero(agreement >= target_agreement)[0]
+        if len(passing):
+            k = passing[-1]
+            # Aynı güvendeki belgeler birlikte kabul edilir; eşik bir sonraki belgenin üstünde kalmalı
+            self.threshold = float(confidence[order[k]])
+            if k + 1 < len(order) and confidence[order[k + 1]] == self.threshold:
+                self.threshold = float(np.nextafter(np.float32(self.threshold), np.float32(2)))
+        else:
+            # Hedef hiçbir eşikte sağlanamıyor: her belge Swin'e gider
+            self.threshold = float('inf')
+        return self.evaluate(features, teacher_labels)
+
+    def evaluate(self, features, teacher_labels):
+        """
+        Geçerli eşikle yükseltme oranı ve Swin ile uyum
+
+        Args:
+            features (numpy.ndarray): Özellikler
+            teacher_labels (numpy.ndarray): Swin'in sınıf sıraları
+
+        Returns:
+            dict: {'documents', 'threshold', 'escalation_rate', 'accepted_agreement', 'overall_agreement'}
+        """
+        probs = self.predict_proba(features)
+        accepted = self.accepts(probs)
+        correct = probs.argmax(axis=1) == np.asarray(teacher_labels)
+        return {
+            'documents': int(len(correct)),
+            'threshold': self.threshold,
+            'escalation_rate': float(1 - accepted.mean()) if len(correct) else 0.0,
+            'accepted_agreement': float(correct[accepted].mean()) if accepted.any() else None,
+            # Kademeli sonucun Swin ile uyumu (yükseltilen belgeler Swin'in kendi kararıdır)
+            'overall_agreement': float((correct | ~accepted).mean()) if len(correct) else None
+        }
+
+    def save(self, path):
+        """Modeli .npz dosyasına yazar"""
+        np.savez(path, weights=self.weights, bias=self.bias, feature_mean=self.feature_mean,
+                 feature_std=self.feature_std, threshold=self.threshold,
+                 classes=np.array(self.classes), feature_size=self.feature_size)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Args:
+            path (str): save() ile yazılmış .npz dosyası
+
+        Returns:
+            PixelClassifier: Yüklenen model
+        """
+        with np.load(path) as data:
+            return cls(data['weights'], data['bias'], data['feature_mean'], data['feature_std'],
+                       threshold=float(data['threshold']), classes=[str(c) for c in data['classes']],
+                       feature_size=int(data['feature_size']))
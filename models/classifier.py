@@ -6,45 +6,88 @@ import os
 import torch
 import numpy as np
 from PIL import Image
-from torchvision import transforms
 
-from config.settings import CLASSES, MODEL_CONFIG, MODEL_PATH
+from config.settings import CLASSES, MODEL_CONFIG, MODEL_PATH, CASCADE_MODEL_PATH
+from models.image_io import (load_model_image, load_reduced_image, load_full_image, load_model_pages,
+                             document_page_count)
+from models.batch_loader import BatchLoader, normalize_batch, IMAGENET_MEAN, IMAGENET_STD
+from models.cascade import PixelClassifier, pixel_features
+from utils.metrics import timed, METRICS
+from utils.resources import component_device
+from utils.provenance import classifier_provenance
+
+# Birden çok sayfa içerebilen biçimler
+MULTI_PAGE_EXTENSIONS = ('.tif', '.tiff', '.pdf')
+PAGE_AGGREGATIONS = ('mean', 'max', 'first_confident')
+
+
+def aggregate_page_probs(probs, method='mean', threshold=None):
+    """
+    Sayfa olasılıklarını belge olasılığına birleştirir
+
+    Args:
+        probs (torch.Tensor): [sayfa, sınıf] olasılıklar
+        method (str): 'mean' (ortalama), 'max' (sınıf başına en yüksek, yeniden normalize)
+            veya 'first_confident' (güveni eşiği geçen ilk sayfa; yoksa ortalama)
+        threshold (float, optional): 'first_confident' eşiği.
+            Varsayılan MODEL_CONFIG['page_confidence_threshold'].
+
+    Returns:
+        tuple: ([sınıf] olasılıklar, kararı veren sayfanın sırası veya None)
+    """
+    if method == 'mean':
+        return probs.mean(dim=0), None
+    if method == 'max':
+        document_probs = probs.max(dim=0).values
+        return document_probs / document_probs.sum(), None
+    if method == 'first_confident':
+        threshold = MODEL_CONFIG.get('page_confidence_threshold', 0.8) if threshold is None else threshold
+        confident = (probs.max(dim=1).values >= threshold).nonzero()
+        if len(confident):
+            index = int(confident[0])
+            return probs[index], index
+        return probs.mean(dim=0), None
+    raise ValueError(f"Geçersiz sayfa birleştirme yöntemi: {method}")
+
 
 class SwinImageProcessor:
-    def __init__(self, image_size=224, mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]):
+    def __init__(self, image_size=224, mean=IMAGENET_MEAN, std=IMAGENET_STD):
         self.image_size = image_size
         self.mean = mean
         self.std = std
 
-        # Temel dönüşüm
-        self.transform = transforms.Compose([
-            transforms.Resize((image_size, image_size)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=mean, std=std)
-        ])
-
     def __call__(self, images, return_tensors="pt"):
         """
-        Görüntüleri işleyip model için hazırlar
+        Görüntüleri işleyip model için hazırlar. Görüntüler model boyutuna
+        indirilir, normalizasyon bütün gruba tek işlemde uygulanır.
+
+        Returns:
+            dict: {'pixel_values': [N, 3, H, W] girdi, 'errors': {satır: hata mesajı}}.
+                Dönüştürülemeyen satırlar sıfır tensördür ve sınıflandırılmamalıdır
+                (BatchLoader.iter_batches ile aynı sözleşme).
         """
         if not isinstance(images, list):
             images = [images]
 
-        pixel_values = []
-        for image in images:
+        arrays = np.zeros((len(images), self.image_size, self.image_size, 3), dtype=np.uint8)
+        errors = {}
+        for index, image in enumerate(images):
             try:
-                pixel_value = self.transform(image)
-                pixel_values.append(pixel_value)
+                if image.size != (self.image_size, self.image_size):
+                    image = image.resize((self.image_size, self.image_size), Image.BILINEAR)
+                arrays[index] = np.asarray(image if image.mode == 'RGB' else image.convert('RGB'))
             except Exception as e:
                 print(f"Görüntü dönüşüm hatası: {e}")
-                # Hata durumunda varsayılan bir tensör oluştur
-                pixel_values.append(torch.zeros((3, self.image_size, self.image_size)))
+                errors[index] = f"Görüntü dönüştürülemedi: {e}"
 
-        # Tensörleri yığınla
-        if return_tensors == "pt":
-            pixel_values = torch.stack(pixel_values)
+        pixel_values = normalize_batch(arrays, self.mean, self.std)
+        # Dönüştürülemeyen satırlar sıfır tensör olarak kalır; çağıran 'errors' ile atlar
+        pixel_values[list(errors)] = 0
 
-        return {"pixel_values": pixel_values}
+        if return_tensors != "pt":
+            pixel_values = list(pixel_values)
+
+        return {"pixel_values": pixel_values, "errors": errors}
 
 
 class DocumentClassifier:
@@ -65,7 +108,8 @@ class DocumentClassifier:
         model_path = model_path or MODEL_PATH
         
         self.processor = SwinImageProcessor(image_size=MODEL_CONFIG['image_size'])
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        # Cihaz ve iş parçacığı sayısı kaynak planından (çok işçili makinelerde paylaştırılmış)
+        self.device = torch.device(component_device('classifier'))
         
         print(f"Cihaz: {self.device}")
 
@@ -113,9 +157,43 @@ class DocumentClassifier:
         
         # Sınıf index eşleştirmesi
         self.idx_to_class = {i: cls for i, cls in enumerate(CLASSES)}
+
+        # Kademeli mod: ucuz ilk geçiş modeli (yoksa her belge Swin'den geçer)
+        self.cascade = self._load_cascade() if MODEL_CONFIG.get('cascade', False) else None
+
+        # Aşama kökeni: sonuçlara bu ağırlıkların kimliği yazılır (bkz. utils/provenance.py)
+        self.provenance = classifier_provenance(
+            model_path,
+            MODEL_CONFIG.get('cascade_model_path', CASCADE_MODEL_PATH) if self.cascade else None,
+            self.cascade.threshold if self.cascade else None
+        )
         
         print("Sınıflandırıcı hazır!")
 
+    def _load_cascade(self, path=None):
+        """
+        Kademeli modun ucuz modelini yükler
+
+        Args:
+            path (str, optional): .npz model dosyası. Varsayılan MODEL_CONFIG['cascade_model_path'].
+
+        Returns:
+            PixelClassifier: Model veya None (dosya yoksa ya da yüklenemezse)
+        """
+        path = path or MODEL_CONFIG.get('cascade_model_path', CASCADE_MODEL_PATH)
+        if not os.path.exists(path):
+            print(f"Kademeli model bulunamadı, yalnızca Swin kullanılacak: {path}")
+            return None
+        try:
+            cascade = PixelClassifier.load(path)
+        except Exception as e:
+            print(f"Kademeli model yüklenemedi, yalnızca Swin kullanılacak ({path}): {e}")
+            return None
+        if MODEL_CONFIG.get('cascade_threshold') is not None:
+            cascade.threshold = MODEL_CONFIG['cascade_threshold']
+        print(f"Kademeli model yüklendi: {path} (güven eşiği {cascade.threshold:.3f})")
+        return cascade
+
     def predict(self, image_path):
         """
         Bir belge görüntüsünü sınıflandırır
@@ -126,9 +204,18 @@ class DocumentClassifier:
         Returns:
             dict: Sınıflandırma sonuçları
         """
+        # Çok sayfalı biçimler sayfa bazlı sınıflandırılır (tek sayfalıysa sonuç aynıdır)
+        if (MODEL_CONFIG.get('document_level', True)
+                and os.path.splitext(image_path)[1].lower() in MULTI_PAGE_EXTENSIONS):
+            try:
+                return self.predict_document(image_path)
+            except Exception as e:
+                print(f"Sayfa bazlı sınıflandırma başarısız, ilk sayfaya dönülüyor ({image_path}): {e}")
+
         try:
             # Görüntüyü yükle
-            image = self._load_image(image_path)
+            with timed('decode'):
+                image = self._load_image(image_path)
             if image is None:
                 return {
                     'class': 'error',
@@ -139,31 +226,31 @@ class DocumentClassifier:
                 }
                 
             # İşle
-            inputs = self.processor(images=image, return_tensors="pt")
-            pixel_values = inputs["pixel_values"].to(self.device)
-
-            # Tahmin yap
-            with torch.no_grad():
-                outputs = self.model(pixel_values=pixel_values)
-                probs = torch.nn.functional.softmax(outputs.logits, dim=1)
-
-                # En yüksek olasılığa sahip sınıfı ve güveni al
-                confidence, predicted_class_idx = torch.max(probs, 1)
-                predicted_class = self.idx_to_class[predicted_class_idx.item()]
-                confidence = confidence.item()
-
-                # Tüm sınıf olasılıklarını al
-                class_probs = {self.idx_to_class[i]: prob.item() for i, prob in enumerate(probs[0])}
-
-                # Olasılıkları sırala
-                sorted_probs = sorted(class_probs.items(), key=lambda x: x[1], reverse=True)
-
+            with timed('preprocess'):
+                inputs = self.processor(images=image, return_tensors="pt")
+                pixel_values = inputs["pixel_values"].to(self.device)
+            if inputs["errors"]:
                 return {
-                    'class': predicted_class,
-                    'confidence': confidence,
-                    'all_probs': class_probs,
-                    'sorted_probs': sorted_probs
+                    'class': 'error',
+                    'confidence': 0.0,
+                    'error': inputs["errors"][0],
+                    'all_probs': {},
+                    'sorted_probs': []
                 }
+
+            # Ucuz model yeterince eminse Swin atlanır
+            cascade_probs, accepted = self._run_cascade(pixel_values)
+            if accepted is not None and accepted[0]:
+                result = self._format_prediction(torch.from_numpy(cascade_probs[0]))
+                result['cascade'] = 'accepted'
+                return result
+
+            # Tahmin yap
+            probs = self._swin_probs(pixel_values)
+            result = self._format_prediction(probs[0])
+            if accepted is not None:
+                result['cascade'] = 'escalated'
+            return result
         except Exception as e:
             import traceback
             print(f"Tahmin hatası: {e}")
@@ -176,37 +263,222 @@ class DocumentClassifier:
                 'sorted_probs': []
             }
             
+    def _swin_probs(self, pixel_values):
+        """Swin ileri geçişi; [N, sınıf] olasılıklar (CPU)"""
+        with torch.no_grad(), timed('swin_forward'):
+            outputs = self.model(pixel_values=pixel_values.to(self.device))
+            # CPU'ya almak GPU senkronizasyonunu zorlar; süre gerçek ileri geçişi yansıtır
+            return torch.nn.functional.softmax(outputs.logits, dim=1).cpu()
+
+    def _denormalize(self, pixel_values):
+        """Normalize edilmiş [N, 3, H, W] girdiyi 0-255 ölçeğinde [N, H, W, 3] diziye geri çevirir"""
+        mean = torch.tensor(self.processor.mean, dtype=torch.float32).view(1, 3, 1, 1)
+        std = torch.tensor(self.processor.std, dtype=torch.float32).view(1, 3, 1, 1)
+        pixels = pixel_values.detach().cpu() * std + mean
+        return (pixels * 255.0).permute(0, 2, 3, 1).numpy()
+
+    def _run_cascade(self, pixel_values):
+        """
+        Kademeli modda ucuz modeli çalıştırır
+
+        Args:
+            pixel_values (torch.Tensor): Normalize edilmiş [N, 3, H, W] girdi
+
+        Returns:
+            tuple: ([N, sınıf] olasılıklar, kabul maskesi); kademeli mod kapalıysa (None, None)
+        """
+        cascade = getattr(self, 'cascade', None)
+        if cascade is None:
+            return None, None
+        with timed('cascade'):
+            features = pixel_features(self._denormalize(pixel_values), cascade.feature_size)
+            probs = cascade.predict_proba(features)
+            accepted = cascade.accepts(probs)
+        METRICS.inc('classifier_cascade_total', int(accepted.sum()), result='accepted')
+        METRICS.inc('classifier_cascade_total', int((~accepted).sum()), result='escalated')
+        return probs, accepted
+
+    def predict_document(self, document_path, aggregation=None, max_pages=None):
+        """
+        Çok sayfalı belgeyi sayfa bazında sınıflandırır. Sayfalar (fazlaysa
+        örneklenerek) tek bir grup olarak Swin'den geçirilir ve olasılıklar
+        birleştirilir; kapak sayfası farklı görünen belgeler böylece ilk
+        sayfaya göre yanlış yönlendirilmez.
+
+        Args:
+            document_path (str): Belge dosyasının yolu
+            aggregation (str, optional): 'mean', 'max' veya 'first_confident'.
+                Varsayılan MODEL_CONFIG['page_aggregation'].
+            max_pages (int, optional): Sınıflandırılacak en fazla sayfa. Varsayılan MODEL_CONFIG['max_pages'].
+
+        Returns:
+            dict: predict() alanlarına ek olarak 'aggregation', 'page_count',
+                'pages' (sayfa bazlı sonuçlar) ve varsa 'decided_by_page'
+        """
+        aggregation = aggregation or MODEL_CONFIG.get('page_aggregation', 'mean')
+        if aggregation not in PAGE_AGGREGATIONS:
+            raise ValueError(f"Geçersiz sayfa birleştirme yöntemi: {aggregation}")
+
+        with timed('decode'):
+            indices, images, page_count = load_model_pages(document_path, self.processor.image_size, max_pages)
+
+        with timed('preprocess'):
+            inputs = self.processor(images=images, return_tensors="pt")
+        errors = inputs["errors"]
+        # Dönüştürülemeyen sayfalar sınıflandırılmaz ve birleştirmeye girmez
+        valid = [row for row in range(len(indices)) if row not in errors]
+        if not valid:
+            raise RuntimeError(f"Hiçbir sayfa dönüştürülemedi: {errors[0]}")
+
+        probs = self._swin_probs(inputs["pixel_values"][valid])
+
+        document_probs, decided_by = aggregate_page_probs(probs, aggregation)
+        result = self._format_prediction(document_probs)
+        result['aggregation'] = aggregation
+        result['page_count'] = page_count
+        result['pages'] = []
+        page_probs = dict(zip(valid, probs))
+        for row, index in enumerate(indices):
+            if row in errors:
+                result['pages'].append({'page': index + 1, 'class': 'error', 'confidence': 0.0,
+                                        'error': errors[row]})
+                continue
+            page = self._format_prediction(page_probs[row])
+            result['pages'].append({
+                'page': index + 1,
+                'class': page['class'],
+                'confidence': page['confidence'],
+                'top_probs': page['sorted_probs'][:3]
+            })
+        if decided_by is not None:
+            result['decided_by_page'] = indices[valid[decided_by]] + 1
+        return result
+
+    def _format_prediction(self, probs):
+        """
+        Tek görüntünün olasılık vektörünü sonuç sözlüğüne çevirir
+
+        Args:
+            probs (torch.Tensor): [sınıf sayısı] olasılıklar
+
+        Returns:
+            dict: Sınıflandırma sonuçları
+        """
+        # En yüksek olasılığa sahip sınıfı ve güveni al
+        confidence, predicted_class_idx = torch.max(probs, 0)
+        predicted_class = self.idx_to_class[predicted_class_idx.item()]
+
+        # Tüm sınıf olasılıklarını al
+        class_probs = {self.idx_to_class[i]: prob.item() for i, prob in enumerate(probs)}
+
+        # Olasılıkları sırala
+        sorted_probs = sorted(class_probs.items(), key=lambda x: x[1], reverse=True)
+
+        return {
+            'class': predicted_class,
+            'confidence': confidence.item(),
+            'all_probs': class_probs,
+            'sorted_probs': sorted_probs
+        }
+
+    def _get_batch_loader(self):
+        """Yükleyici süreçleri ilk toplu tahminde başlatır ve sonraki çağrılarda yeniden kullanır"""
+        loader = getattr(self, '_batch_loader', None)
+        if loader is None:
+            loader = BatchLoader(image_size=self.processor.image_size)
+            self._batch_loader = loader
+        return loader
+
+    def predict_batch(self, image_paths):
+        """
+        Birden çok belge görüntüsünü gruplar hâlinde sınıflandırır. Görüntüler
+        yükleyici süreçlerde önden çözülür; model bir grubu işlerken sonraki
+        gruplar hazırlanır.
+
+        Args:
+            image_paths (list): Belge görüntülerinin dosya yolları
+
+        Returns:
+            list: Her görüntü için predict() ile aynı biçimde sonuç (aynı sırada)
+        """
+        image_paths = list(image_paths)
+        results = [None] * len(image_paths)
+
+        # Çok sayfalı belgeler kendi sayfa grubuyla, diğerleri yükleyici gruplarıyla sınıflandırılır
+        single_page = []
+        for position, path in enumerate(image_paths):
+            if (MODEL_CONFIG.get('document_level', True)
+                    and os.path.splitext(path)[1].lower() in MULTI_PAGE_EXTENSIONS):
+                try:
+                    if document_page_count(path) > 1:
+                        results[position] = self.predict_document(path)
+                        continue
+                except Exception as e:
+                    print(f"Sayfa bazlı sınıflandırma başarısız, ilk sayfaya dönülüyor ({path}): {e}")
+            single_page.append(position)
+
+        batch_results = self._predict_loaded([image_paths[position] for position in single_page])
+        for position, result in zip(single_page, batch_results):
+            results[position] = result
+        return results
+
+    def _predict_loaded(self, image_paths):
+        """Görüntüleri yükleyici gruplarıyla sınıflandırır (her belgenin ilk sayfası)"""
+        results = []
+        for batch_paths, pixel_values, errors in self._get_batch_loader().iter_batches(image_paths):
+            # Kademeli modda Swin yalnızca ucuz modelin emin olmadığı satırlarla çalışır
+            cascade_probs, accepted = self._run_cascade(pixel_values)
+            escalated = [index for index in range(len(batch_paths))
+                         if index not in errors and (accepted is None or not accepted[index])]
+            swin_probs = {}
+            if escalated:
+                probs = self._swin_probs(pixel_values[escalated])
+                swin_probs = dict(zip(escalated, probs))
+
+            for index, path in enumerate(batch_paths):
+                if index in errors:
+                    print(f"Görüntü yüklenemedi ({path}): {errors[index]}")
+                    results.append({
+                        'class': 'error',
+                        'confidence': 0.0,
+                        'error': errors[index],
+                        'all_probs': {},
+                        'sorted_probs': []
+                    })
+                elif index in swin_probs:
+                    result = self._format_prediction(swin_probs[index])
+                    if accepted is not None:
+                        result['cascade'] = 'escalated'
+                    results.append(result)
+                else:
+                    result = self._format_prediction(torch.from_numpy(cascade_probs[index]))
+                    result['cascade'] = 'accepted'
+                    results.append(result)
+        return results
+
+    def close(self):
+        """Toplu yükleyici süreçlerini durdurur"""
+        loader = getattr(self, '_batch_loader', None)
+        if loader is not None:
+            loader.close()
+            self._batch_loader = None
+
     def _load_image(self, image_path):
         """
-        Görüntü dosyasını yükler, çeşitli formatlara destek verir
+        Görüntüyü sınıflandırma girdisi olarak yükler (bkz. image_io.load_model_image)
         
         Args:
             image_path (str): Görüntü dosyasının yolu
             
         Returns:
-            PIL.Image: Yüklenen görüntü veya None (hata durumunda)
+            PIL.Image: RGB görüntü veya None (hata durumunda)
         """
-        try:
-            # PIL ile görüntüyü açma
-            with Image.open(image_path) as img:
-                return img.convert('RGB')
-        except Exception as e:
-            print(f"PIL ile yükleme hatası ({image_path}): {e}")
+        return load_model_image(image_path, self.processor.image_size)
 
-            # TIF dosyaları için alternatif yöntem
-            try:
-                import imageio.v2 as imageio 
-                img_array = imageio.imread(image_path)
-
-                # 2D (gri tonlamalı) bir görüntüyse 3 kanala dönüştür
-                if len(img_array.shape) == 2:
-                    img_array = np.stack([img_array, img_array, img_array], axis=2)
-                elif len(img_array.shape) == 3 and img_array.shape[2] > 3:
-                    # RGBA veya başka çok kanallı formatta ise, ilk 3 kanalı al
-                    img_array = img_array[:, :, :3]
-
-                # NumPy dizisini PIL görüntüsüne dönüştür
-                return Image.fromarray(np.uint8(img_array))
-            except Exception as e2:
-                print(f"Alternatif yükleme hatası ({image_path}): {e2}")
-                return None
+    def _load_image_reduced(self, image_path):
+        """Küçültülmüş çözme yolu (bkz. image_io.load_reduced_image)"""
+        return load_reduced_image(image_path, self.processor.image_size)
+
+    def _load_image_full(self, image_path):
+        """Tam çözünürlük yolu (bkz. image_io.load_full_image)"""
+        return load_full_image(image_path)
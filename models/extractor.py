@@ -1,7 +1,21 @@
 """
 Belge metin çıkarma modülleri - EasyOCR Entegrasyonu.
+
+EasyOCR'ın readtext() çağrısı her sayfada algılama (CRAFT) ve tanıma (CRNN)
+adımlarını birlikte çalıştırır; tanıma modeli sayfadaki birkaç satırla
+çağrıldığı için büyük ölçüde boş kalır. Toplu tanıma açıkken (OCR_CONFIG
+['batched_recognition']) algılama her sayfada ayrı yapılır, satır kesitleri
+ise sayfalar ve belgeler arasında biriktirilip genişliğe göre sıralanmış büyük
+gruplar hâlinde tanınır ve sonuçlar sayfalarına geri dağıtılır.
+
+Toplu yolda bir sayfanın satırları kesitlerin üst kenarına göre yukarıdan
+aşağı sıralanır (readtext'in batch_size > 1 yolundaki sıra). Varsayılan
+readtext (batch_size=1) ise algılayıcının satır sırasını korur ve eğik
+(free) kutuları sona ekler. Bu yüzden çok sütunlu veya eğik satırlı
+sayfalarda aynı satır metinleri farklı sırayla birleşebilir.
 """
 import os
+import math
 import time
 import threading
 from queue import Queue
@@ -10,6 +24,124 @@ import numpy as np
 import easyocr  # Yeni eklenen import
 
 from config.settings import OCR_CONFIG, TEMP_DIR
+from utils.metrics import METRICS, timed
+from utils.profiling import profiled_target
+from utils.cancellation import CancelToken, StageTimeout, stop_worker
+from utils.resources import component_device
+from utils.provenance import ocr_provenance
+from models.image_io import render_pdf_pages
+
+try:
+    from easyocr.config import imgH as RECOGNITION_HEIGHT
+    from easyocr.utils import reformat_input, get_image_list
+    from easyocr.recognition import get_text
+    EASYOCR_INTERNALS_AVAILABLE = True
+except ImportError:
+    EASYOCR_INTERNALS_AVAILABLE = False
+
+SUPPORTED_EXTENSIONS = ['.pdf', '.tif', '.tiff', '.jpg', '.jpeg', '.png', '.bmp']
+
+
+class _RecognitionBatcher:
+    def __init__(self, reader, token=None, batch_size=None, pool_batches=None):
+        """
+        Sayfalardan gelen satır kesitlerini biriktirir ve toplu tanır.
+
+        Args:
+            reader (easyocr.Reader): Algılama/tanıma modellerini taşıyan okuyucu
+            token (CancelToken, optional): Sayfa ve grup aralarında kontrol edilir; süre
+                dolunca bütün iş durur. Belge başına sınır için add_page'e token verilir.
+            batch_size (int, optional): Bir tanıma grubundaki kesit sayısı.
+                Varsayılan OCR_CONFIG['recognition_batch_size'].
+            pool_batches (int, optional): Bekleyen kesitler kaç grup dolunca tanınır.
+                Varsayılan OCR_CONFIG['recognition_pool_batches'].
+        """
+        self.reader = reader
+        self.token = token
+        self.batch_size = batch_size or OCR_CONFIG.get('recognition_batch_size', 64)
+        self.pool_size = self.batch_size * (pool_batches or OCR_CONFIG.get('recognition_pool_batches', 4))
+        self.ignore_char = ''.join(set(reader.character) - set(reader.lang_char))
+        self.pending = []   # (sayfa anahtarı, satır sırası, kesit)
+        self.pages = {}     # sayfa anahtarı -> satır metinleri (yukarıdan aşağı)
+
+    def _check(self):
+        if self.token is not None:
+            self.token.raise_if_cancelled('ocr')
+
+    def add_page(self, key, img_array, token=None):
+        """
+        Sayfada metin bölgelerini algılar ve kesitleri tanıma havuzuna ekler
+
+        Args:
+            key: Sayfanın benzersiz anahtarı (ör. (belge sırası, sayfa sırası))
+            img_array (numpy.ndarray): Sayfa görüntüsü
+            token (CancelToken, optional): Sayfanın belgesine ait süre sınırı; dolduysa
+                algılamaya başlamadan StageTimeout fırlatılır
+        """
+        self._check()
+        if token is not None:
+            token.raise_if_cancelled('ocr')
+        with timed('ocr_detect'):
+            img, img_cv_grey = reformat_input(img_array)
+            horizontal_list, free_list = self.reader.detect(img, reformat=False)
+            # Kesitler get_image_list içinde üst kenara göre yukarıdan aşağı sıralanır; varsayılan
+            # readtext (batch_size=1) algılayıcı sırasını korur, çok sütunlu sayfalarda sıra farklı olabilir
+            image_list, _ = get_image_list(horizontal_list[0], free_list[0], img_cv_grey,
+                                           model_height=RECOGNITION_HEIGHT)
+        METRICS.inc('ocr_pages_total')
+
+        self.pages[key] = [None] * len(image_list)
+        for index, (_, crop) in enumerate(image_list):
+            self.pending.append((key, index, crop))
+        if len(self.pending) >= self.pool_size:
+            self.flush()
+
+    def flush(self):
+        """Bekleyen tüm kesitleri tanır ve metinleri sayfalarına yerleştirir"""
+        # Benzer genişlikteki kesitler aynı gruba düşsün diye sıralanır; grup
+        # genişliği en geniş kesite göre doldurulduğundan boşa hesap azalır
+        pending = sorted(self.pending, key=lambda item: item[2].shape[1])
+        self.pending = []
+        for start in range(0, len(pending), self.batch_size):
+            self._check()
+            chunk = pending[start:start + self.batch_size]
+            self._recognize(chunk)
+
+    def discard(self, keys):
+        """
+        Verilen sayfaların bekleyen kesitlerini tanımadan atar (ör. süresi dolan belge)
+
+        Args:
+            keys (iterable): Sayfa anahtarları
+        """
+        keys = set(keys)
+        self.pending = [item for item in self.pending if item[0] not in keys]
+        for key in keys:
+            self.pages.pop(key, None)
+
+    def _recognize(self, chunk):
+        max_ratio = max(crop.shape[1] / crop.shape[0] for _, _, crop in chunk)
+        img_width = math.ceil(max(max_ratio, 1)) * RECOGNITION_HEIGHT
+        reader = self.reader
+        with timed('ocr_recognize'):
+            results = get_text(
+                reader.character, RECOGNITION_HEIGHT, img_width, reader.recognizer, reader.converter,
+                [(None, crop) for _, _, crop in chunk], self.ignore_char,
+                batch_size=len(chunk), workers=0, device=reader.device
+            )
+        METRICS.inc('ocr_recognition_batches_total')
+        METRICS.inc('ocr_recognition_crops_total', value=len(chunk))
+        for (key, index, _), (_, text, _) in zip(chunk, results):
+            self.pages[key][index] = text
+
+    def page_text(self, key):
+        """Sayfanın metni (satırlar yukarıdan aşağı, boşlukla birleştirilmiş)"""
+        return ' '.join(text for text in self.pages[key] if text is not None)
+
+    def page_done(self, key):
+        """Sayfanın bütün kesitleri tanındı mı"""
+        return key in self.pages and all(text is not None for text in self.pages[key])
+
 
 class UnstructuredTextExtractor:
     def __init__(self, timeout=None):
@@ -28,20 +160,110 @@ class UnstructuredTextExtractor:
         print(f"EasyOCR dilleri: {self.languages}")
         
         try:
-            # EasyOCR reader'ı GPU kullanılabilirse GPU ile başlat
+            # 'auto' ise cihaz kaynak planından seçilir (GPU varsa işçiye düşen GPU)
+            use_gpu = OCR_CONFIG.get('use_gpu', 'auto')
+            if use_gpu == 'auto':
+                device = component_device('ocr')
+                use_gpu = False if device == 'cpu' else device
             self.reader = easyocr.Reader(
                 self.languages, 
-                gpu=OCR_CONFIG.get('use_gpu', True)
+                gpu=use_gpu
             )
             print(f"EasyOCR başarıyla başlatıldı: {self.languages} dilleri için.")
         except Exception as e:
             print(f"UYARI: EasyOCR başlatılamadı: {e}")
             self.reader = None
 
+        # Aşama kökeni: okuyucu yoksa metin üretilmez, kimlik de yazılmaz
+        self.provenance = ocr_provenance(self.languages) if self.reader is not None else None
+
+    def _ocr_page(self, img_array, token=None):
+        """
+        Tek bir sayfa görüntüsüne OCR uygular ve metni döndürür
+
+        Args:
+            img_array (numpy.ndarray): Sayfa görüntüsü
+            token (CancelToken, optional): Süre dolduysa sayfaya başlamadan durur
+
+        Returns:
+            str: Sayfadaki metin (okuma sırasıyla, boşlukla birleştirilmiş)
+        """
+        if token is not None:
+            token.raise_if_cancelled('ocr')
+        with timed('ocr_page'):
+            results = self.reader.readtext(img_array)
+        METRICS.inc('ocr_pages_total')
+        return ' '.join([text for _, text, _ in results])
+
+    def _batched_recognition_enabled(self):
+        """Toplu tanıma açık ve okuyucu algılama/tanıma adımlarını ayrı destekliyor mu"""
+        return (OCR_CONFIG.get('batched_recognition', True) and EASYOCR_INTERNALS_AVAILABLE
+                and hasattr(self.reader, 'detect') and hasattr(self.reader, 'recognizer'))
+
+    def _iter_pages(self, document_path, token=None):
+        """
+        Belgenin sayfa görüntülerini sırayla üretir. PDF sayfaları
+        OCR_CONFIG['pdf_render_chunk'] sayfalık aralıklarla çizilir, iptal sayfa
+        aralarında kontrol edilir.
+
+        Args:
+            document_path (str): Belge dosyasının yolu
+            token (CancelToken, optional): İptal token'ı
+
+        Yields:
+            numpy.ndarray: Sayfa görüntüsü
+        """
+        ext = os.path.splitext(document_path)[1].lower()
+        if ext == '.pdf':
+            import pdf2image
+            page_count = pdf2image.pdfinfo_from_path(document_path)['Pages']
+            pages = render_pdf_pages(document_path, 300, range(page_count), OCR_CONFIG.get('pdf_render_chunk', 4))
+            for i in range(1, page_count + 1):
+                print(f"PDF sayfa {i}/{page_count} işleniyor...")
+                if token is not None:
+                    token.raise_if_cancelled('ocr')
+                # Aralığın ilk sayfasında bütün aralık çizilir
+                with timed('pdf_render'):
+                    _, img = next(pages)
+                with img:
+                    img_array = np.array(img)
+                yield img_array
+        else:
+            img = Image.open(document_path)
+            n_frames = getattr(img, 'n_frames', 1)
+            for i in range(n_frames):
+                if n_frames > 1:
+                    print(f"TIF sayfa {i+1}/{n_frames} işleniyor...")
+                    img.seek(i)
+                yield np.array(img)
+
+    def _ocr_pages(self, pages, token=None):
+        """
+        Sayfalara OCR uygular. Toplu tanıma açıksa belgenin bütün satır
+        kesitleri birlikte tanınır, değilse her sayfa readtext ile okunur.
+
+        Args:
+            pages (iterable): Sayfa görüntüleri
+            token (CancelToken, optional): İptal token'ı
+
+        Returns:
+            list: Sayfa metinleri
+        """
+        if not self._batched_recognition_enabled():
+            return [self._ocr_page(img_array, token) for img_array in pages]
+
+        batcher = _RecognitionBatcher(self.reader, token)
+        page_count = 0
+        for img_array in pages:
+            batcher.add_page(page_count, img_array)
+            page_count += 1
+        batcher.flush()
+        return [batcher.page_text(i) for i in range(page_count)]
+
     def extract_text(self, document_path):
         """
         Belge dosyasından metin çıkarma işlemi - EasyOCR ile.
-        Güvenlik için zaman aşımı ve hata yönetimi eklenmiştir.
+        Zaman aşımında işçi sayfa aralarında iptal edilir; arka planda OCR sürmez.
         
         Args:
             document_path (str): İşlenecek belge dosyasının yolu
@@ -51,8 +273,15 @@ class UnstructuredTextExtractor:
         """
         result_queue = Queue()
         exception_queue = Queue()
+        token = CancelToken(self.timeout)
+        # Sayfa sürelerinin çağıran belgenin aşama dökümüne eklenmesi için
+        stage_collector = METRICS.current_collector()
 
         def extraction_worker():
+            with METRICS.collect_stage_times(stage_collector):
+                _extraction_worker()
+
+        def _extraction_worker():
             try:
                 # Hata ayıklama için başlangıç zamanı
                 start_time = time.time()
@@ -76,50 +305,13 @@ class UnstructuredTextExtractor:
                 # PDF veya TIF dosyalarını işle
                 if ext in ['.pdf', '.tif', '.tiff']:
                     try:
-                        # Görüntüyü PIL ile aç (PDF ise ilk sayfası alınır)
                         print(f"{ext.upper()} dosyası işleniyor: {document_path}")
-                        
-                        # PDF dosyası için
-                        if ext == '.pdf':
-                            import pdf2image
-                            pages = pdf2image.convert_from_path(document_path, dpi=300)
-                            
-                            all_text = []
-                            for i, img in enumerate(pages):
-                                print(f"PDF sayfa {i+1}/{len(pages)} işleniyor...")
-                                # EasyOCR ile OCR uygula
-                                results = self.reader.readtext(np.array(img))
-                                page_text = ' '.join([text for _, text, _ in results])
-                                all_text.append(page_text)
-                            
-                            # Tüm sayfaları birleştir
-                            text = '\n\n'.join(all_text)
-                            print(f"PDF OCR tamamlandı. Metin uzunluğu: {len(text)} karakter")
-                            
-                        # TIF/TIFF dosyası için
-                        else:
-                            img = Image.open(document_path)
-                            img_array = np.array(img)
-                            
-                            # Çok sayfalı TIF için
-                            if hasattr(img, 'n_frames') and img.n_frames > 1:
-                                all_text = []
-                                for i in range(img.n_frames):
-                                    print(f"TIF sayfa {i+1}/{img.n_frames} işleniyor...")
-                                    img.seek(i)
-                                    img_array = np.array(img)
-                                    results = self.reader.readtext(img_array)
-                                    page_text = ' '.join([text for _, text, _ in results])
-                                    all_text.append(page_text)
-                                
-                                text = '\n\n'.join(all_text)
-                            else:
-                                # Tek sayfalı TIF
-                                results = self.reader.readtext(img_array)
-                                text = ' '.join([text for _, text, _ in results])
-                            
-                            print(f"TIF OCR tamamlandı. Metin uzunluğu: {len(text)} karakter")
+                        # Sayfaları birleştir
+                        text = '\n\n'.join(self._ocr_pages(self._iter_pages(document_path, token), token))
+                        print(f"{ext.upper()[1:]} OCR tamamlandı. Metin uzunluğu: {len(text)} karakter")
                     
+                    except StageTimeout:
+                        raise
                     except Exception as e:
                         print(f"{ext.upper()} işleme hatası: {e}")
                         text = f"[OCR hatası: {str(e)}]"
@@ -130,10 +322,11 @@ class UnstructuredTextExtractor:
                         img = Image.open(document_path)
                         img_array = np.array(img)
                         
-                        results = self.reader.readtext(img_array)
-                        text = ' '.join([text for _, text, _ in results])
+                        text = self._ocr_page(img_array, token)
                         print(f"Görüntü OCR tamamlandı. Metin uzunluğu: {len(text)} karakter")
                     
+                    except StageTimeout:
+                        raise
                     except Exception as e:
                         print(f"Görüntü işleme hatası: {e}")
                         text = f"[Görüntü işleme hatası: {str(e)}]"
@@ -158,6 +351,8 @@ class UnstructuredTextExtractor:
                     }
                 })
 
+            except StageTimeout as e:
+                print(f"Metin çıkarma iptal edildi: {e}")
             except Exception as e:
                 print(f"Metin çıkarma thread hatası: {e}")
                 import traceback
@@ -165,19 +360,21 @@ class UnstructuredTextExtractor:
                 exception_queue.put(e)
 
         # İş parçacığını başlat
-        thread = threading.Thread(target=extraction_worker)
+        thread = threading.Thread(target=profiled_target(extraction_worker))
         thread.daemon = True
         thread.start()
 
         # Zaman aşımı ile bekle
         thread.join(timeout=self.timeout)
 
-        # Thread hala çalışıyorsa zaman aşımına uğradı
-        if thread.is_alive():
+        # Thread hala çalışıyorsa (veya süre dolunca kendisi durduysa) zaman aşımına uğradı:
+        # iptal et ve sayfa arasında durmasını bekle
+        if thread.is_alive() or (token.cancelled and result_queue.empty()):
             print(f"Metin çıkarma zaman aşımına uğradı ({self.timeout} saniye)")
+            stopped = stop_worker(thread, token, 'ocr', OCR_CONFIG.get('cancel_grace', 10))
             return {
                 'text': f"[Metin çıkarma zaman aşımına uğradı ({self.timeout} saniye)]",
-                'metadata': {'error': 'timeout', 'file_path': document_path}
+                'metadata': {'error': 'timeout', 'worker_stopped': stopped, 'file_path': document_path}
             }
 
         # İstisna olup olmadığını kontrol et
@@ -195,4 +392,96 @@ class UnstructuredTextExtractor:
             return {
                 'text': "[Metin çıkarma işlemi tamamlandı ancak sonuç bulunamadı]",
                 'metadata': {'error': 'no_result', 'file_path': document_path}
-            }
\ No newline at end of file
+            }
+    def extract_text_batch(self, document_paths):
+        """
+        Birden çok belgeden metin çıkarır. Her sayfada algılama ayrı yapılır,
+        satır kesitleri ise bütün belgeler boyunca biriktirilip büyük gruplar
+        hâlinde tanınır. Toplu tanıma kullanılamıyorsa belgeler extract_text
+        ile tek tek işlenir.
+
+        Zaman sınırı extract_text'teki gibi belge başına self.timeout
+        saniyedir. Belgenin sayfaları çizilip algılanırken kontrol edilir; süresi
+        dolan belgenin bekleyen kesitleri atılır ve belge zaman aşımı sonucu
+        alır, diğer belgeler etkilenmez. Belgeler arasında paylaşılan tanıma
+        grupları toplam self.timeout x belge sayısı sınırıyla çalışır; bu sınır
+        dolarsa tanınmamış sayfası kalan belgeler zaman aşımı sonucu alır.
+
+        Args:
+            document_paths (list): İşlenecek belge dosyalarının yolları
+
+        Returns:
+            list: Her belge için extract_text ile aynı biçimde sonuç (aynı sırada)
+        """
+        if self.reader is None or not self._batched_recognition_enabled():
+            return [self.extract_text(path) for path in document_paths]
+
+        start_time = time.time()
+        batcher = _RecognitionBatcher(self.reader, CancelToken(self.timeout * max(1, len(document_paths))))
+        page_counts = {}
+        errors = {}
+
+        print(f"EasyOCR ile toplu metin çıkarma başlıyor: {len(document_paths)} belge")
+        for doc_index, document_path in enumerate(document_paths):
+            ext = os.path.splitext(document_path)[1].lower()
+            if ext not in SUPPORTED_EXTENSIONS:
+                print(f"Desteklenmeyen dosya formatı: {ext}")
+                errors[doc_index] = f"[Desteklenmeyen dosya formatı: {ext}]"
+                continue
+            token = CancelToken(self.timeout)
+            page_count = 0
+            try:
+                for img_array in self._iter_pages(document_path, token):
+                    batcher.add_page((doc_index, page_count), img_array, token)
+                    page_count += 1
+            except StageTimeout as e:
+                print(f"Metin çıkarma iptal edildi: {document_path}: {e}")
+                batcher.discard((doc_index, i) for i in range(page_count + 1))
+                if batcher.token.cancelled:
+                    break
+                continue
+            except Exception as e:
+                print(f"{ext.upper()} işleme hatası: {e}")
+                batcher.discard((doc_index, i) for i in range(page_count + 1))
+                errors[doc_index] = f"[OCR hatası: {str(e)}]"
+                continue
+            page_counts[doc_index] = page_count
+        try:
+            batcher.flush()
+        except StageTimeout as e:
+            print(f"Toplu metin çıkarma iptal edildi: {e}")
+
+        elapsed_time = time.time() - start_time
+        results = []
+        for doc_index, document_path in enumerate(document_paths):
+            if doc_index in errors:
+                text = errors[doc_index]
+                results.append({
+                    'text': text,
+                    'metadata': {'error': text, 'file_path': document_path}
+                })
+                continue
+
+            keys = [(doc_index, i) for i in range(page_counts.get(doc_index, 0))]
+            if doc_index not in page_counts or not all(batcher.page_done(key) for key in keys):
+                METRICS.inc('stage_timeouts_total', stage='ocr')
+                results.append({
+                    'text': f"[Metin çıkarma zaman aşımına uğradı ({self.timeout} saniye)]",
+                    'metadata': {'error': 'timeout', 'file_path': document_path}
+                })
+                continue
+
+            text = '\n\n'.join(batcher.page_text(key) for key in keys)
+            results.append({
+                'text': text,
+                'metadata': {
+                    'num_characters': len(text),
+                    'processing_time': elapsed_time,
+                    'file_path': document_path,
+                    'ocr_engine': 'EasyOCR',
+                    'batch_size': len(document_paths)
+                }
+            })
+
+        print(f"Toplu metin çıkarma tamamlandı: {len(document_paths)} belge, {elapsed_time:.2f} saniye")
+        return results
@@ -0,0 +1,297 @@
+"""
+Sınıflandırma girdisi için görüntü çözme fonksiyonları.
+
+torch'a bağımlı değildir; yükleyici işçi süreçleri (models/batch_loader.py)
+bu modülü model yüklemeden içe aktarır.
+"""
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+from config.settings import MODEL_CONFIG
+
+
+def load_full_image(image_path):
+    """
+    Görüntü dosyasını tam çözünürlükte yükler, çeşitli formatlara destek verir
+
+    Args:
+        image_path (str): Görüntü dosyasının yolu
+
+    Returns:
+        PIL.Image: Yüklenen görüntü veya None (hata durumunda)
+    """
+    try:
+        # PIL ile görüntüyü açma
+        with Image.open(image_path) as img:
+            return img.convert('RGB')
+    except Exception as e:
+        print(f"PIL ile yükleme hatası ({image_path}): {e}")
+
+        # TIF dosyaları için alternatif yöntem
+        try:
+            import imageio.v2 as imageio
+            img_array = imageio.imread(image_path)
+
+            # 2D (gri tonlamalı) bir görüntüyse 3 kanala dönüştür
+            if len(img_array.shape) == 2:
+                img_array = np.stack([img_array, img_array, img_array], axis=2)
+            elif len(img_array.shape) == 3 and img_array.shape[2] > 3:
+                # RGBA veya başka çok kanallı formatta ise, ilk 3 kanalı al
+                img_array = img_array[:, :, :3]
+
+            # NumPy dizisini PIL görüntüsüne dönüştür
+            return Image.fromarray(np.uint8(img_array))
+        except Exception as e2:
+            print(f"Alternatif yükleme hatası ({image_path}): {e2}")
+            return None
+
+
+def reduce_to_model_size(img, image_size, target):
+    """
+    Açık bir görüntüyü model boyutuna indirir. Gri görüntüler son boyuta
+    indirildikten sonra RGB'ye genişletilir.
+
+    Args:
+        img (PIL.Image): Görüntü
+        image_size (int): Model girdi kenarı
+        target (int): Son boyuta inmeden önce korunacak en küçük kenar
+
+    Returns:
+        PIL.Image: image_size x image_size RGB görüntü
+    """
+    # reduce yalnızca L/RGB gibi 8 bit modlarda çalışır; renk bilgisi olan modlar RGB'ye çevrilir
+    if img.mode not in ('L', 'RGB'):
+        img = img.convert('RGB' if img.mode in ('P', 'PA', 'RGBA', 'RGBX', 'CMYK', 'YCbCr', 'LAB', 'HSV') else 'L')
+
+    factor = int(min(img.width // target, img.height // target))
+    if factor > 1:
+        img = img.reduce(factor)
+
+    img = img.resize((image_size, image_size), Image.BILINEAR)
+    return img if img.mode == 'RGB' else img.convert('RGB')
+
+
+def load_reduced_image(image_path, image_size=None):
+    """
+    Görüntüyü doğrudan model boyutuna yakın çözer. Swin girdisi 224x224
+    olduğundan 300 DPI taramanın tamamını çözüp RGB'ye çevirmek gereksizdir:
+    JPEG'ler DCT ölçeklemeyle (draft), diğer biçimler Image.reduce ile
+    küçültülür, PDF'ler düşük DPI'da çizilir.
+
+    Args:
+        image_path (str): Görüntü dosyasının yolu
+        image_size (int, optional): Model girdi kenarı. Varsayılan MODEL_CONFIG['image_size'].
+
+    Returns:
+        PIL.Image: image_size x image_size RGB görüntü
+    """
+    image_size = image_size or MODEL_CONFIG['image_size']
+    target = image_size * MODEL_CONFIG.get('decode_oversample', 2)
+
+    if os.path.splitext(image_path)[1].lower() == '.pdf':
+        import pdf2image
+        img = pdf2image.convert_from_path(image_path, dpi=MODEL_CONFIG.get('pdf_dpi', 72),
+                                          first_page=1, last_page=1)[0]
+    else:
+        img = Image.open(image_path)
+        if img.format == 'JPEG':
+            # Çözücü en az target boyutunu koruyan en büyük 1/2, 1/4, 1/8 ölçeği seçer
+            img.draft(img.mode, (target, target))
+
+    with img:
+        return reduce_to_model_size(img, image_size, target)
+
+
+def load_model_image(image_path, image_size=None):
+    """
+    Görüntüyü sınıflandırma girdisi olarak yükler. MODEL_CONFIG['fast_decode']
+    açıksa küçültülmüş çözme denenir, başarısız olursa tam çözmeye dönülür.
+
+    Args:
+        image_path (str): Görüntü dosyasının yolu
+        image_size (int, optional): Model girdi kenarı. Varsayılan MODEL_CONFIG['image_size'].
+
+    Returns:
+        PIL.Image: RGB görüntü veya None (hata durumunda)
+    """
+    if MODEL_CONFIG.get('fast_decode', True):
+        try:
+            return load_reduced_image(image_path, image_size)
+        except Exception as e:
+            print(f"Küçültülmüş çözme başarısız, tam çözmeye dönülüyor ({image_path}): {e}")
+    return load_full_image(image_path)
+
+
+def document_page_count(image_path):
+    """
+    Belgenin sayfa sayısı (PDF sayfaları veya TIFF çerçeveleri)
+
+    Args:
+        image_path (str): Belge dosyasının yolu
+
+    Returns:
+        int: Sayfa sayısı
+    """
+    if os.path.splitext(image_path)[1].lower() == '.pdf':
+        import pdf2image
+        return pdf2image.pdfinfo_from_path(image_path)['Pages']
+    with Image.open(image_path) as img:
+        return getattr(img, 'n_frames', 1)
+
+
+def sample_pages(page_count, max_pages=None):
+    """
+    Sınıflandırılacak sayfaların sırası (0 tabanlı). Sayfa sayısı sınırı
+    aşıyorsa ilk ve son sayfa dahil eşit aralıklı örnek alınır.
+
+    Args:
+        page_count (int): Belgedeki sayfa sayısı
+        max_pages (int, optional): En fazla sayfa. Varsayılan MODEL_CONFIG['max_pages'].
+
+    Returns:
+        list: Sayfa sıraları
+    """
+    max_pages = max_pages or MODEL_CONFIG.get('max_pages', 8)
+    if page_count <= max_pages:
+        return list(range(page_count))
+    if max_pages == 1:
+        return [0]
+    return sorted({round(i * (page_count - 1) / (max_pages - 1)) for i in range(max_pages)})
+
+
+def page_runs(indices, chunk_size):
+    """
+    Sayfa sıralarını en fazla chunk_size sayfalık ardışık aralıklara böler.
+    Aralık içindeki istenmeyen sayfalar da çizilir; seyrek örneklemede her
+    aralık tek bir sayfa olabilir.
+
+    Args:
+        indices (iterable): 0 tabanlı sayfa sıraları
+        chunk_size (int): Bir aralıktaki en fazla sayfa
+
+    Returns:
+        list: (ilk, son) 0 tabanlı, iki ucu dahil aralıklar
+    """
+    runs = []
+    for index in sorted(set(indices)):
+        if runs and index - runs[-1][0] < chunk_size:
+            runs[-1][1] = index
+        else:
+            runs.append([index, index])
+    return [tuple(run) for run in runs]
+
+
+def render_pdf_pages(pdf_path, dpi, indices=None, chunk_size=4):
+    """
+    PDF sayfalarını sırayla çizer. pdftoppm her aralık için bir kez
+    çalıştırılır; her sayfa için ayrı süreç başlatılmaz. Aralık çizimi ilgili
+    ilk sayfa istendiğinde yapılır, böylece çağıran sayfalar arasında iptal
+    kontrolü yapabilir ve bellekte en fazla bir aralık tutulur.
+
+    Args:
+        pdf_path (str): PDF dosyasının yolu
+        dpi (int): Çizim çözünürlüğü
+        indices (iterable, optional): 0 tabanlı sayfa sıraları. Varsayılan bütün sayfalar.
+        chunk_size (int): Bir pdftoppm çağrısında çizilen en fazla sayfa
+
+    Yields:
+        tuple: (sayfa sırası, PIL.Image)
+    """
+    import pdf2image
+
+    if indices is None:
+        indices = range(pdf2image.pdfinfo_from_path(pdf_path)['Pages'])
+    wanted = set(indices)
+    for first, last in page_runs(wanted, max(1, int(chunk_size))):
+        pages = pdf2image.convert_from_path(pdf_path, dpi=dpi, first_page=first + 1, last_page=last + 1)
+        for offset, img in enumerate(pages):
+            pages[offset] = None
+            if first + offset in wanted:
+                yield first + offset, img
+            else:
+                img.close()
+
+
+def load_model_pages(image_path, image_size=None, max_pages=None):
+    """
+    Çok sayfalı belgenin (örneklenmiş) sayfalarını model boyutunda çözer.
+    PDF sayfaları MODEL_CONFIG['pdf_render_chunk'] sayfalık aralıklarla
+    çizilir, TIFF çerçeveleri tek tek okunur.
+
+    Args:
+        image_path (str): Belge dosyasının yolu
+        image_size (int, optional): Model girdi kenarı. Varsayılan MODEL_CONFIG['image_size'].
+        max_pages (int, optional): En fazla sayfa. Varsayılan MODEL_CONFIG['max_pages'].
+
+    Returns:
+        tuple: (sayfa sıraları, image_size x image_size RGB görüntüler, toplam sayfa sayısı)
+    """
+    image_size = image_size or MODEL_CONFIG['image_size']
+    fast = MODEL_CONFIG.get('fast_decode', True)
+    # Hızlı çözme kapalıysa sayfalar tam çözünürlükten doğrudan model boyutuna indirilir
+    target = image_size * MODEL_CONFIG.get('decode_oversample', 2) if fast else float('inf')
+    images = []
+
+    if os.path.splitext(image_path)[1].lower() == '.pdf':
+        import pdf2image
+        page_count = pdf2image.pdfinfo_from_path(image_path)['Pages']
+        indices = sample_pages(page_count, max_pages)
+        dpi = MODEL_CONFIG.get('pdf_dpi', 72) if fast else 300
+        for _, img in render_pdf_pages(image_path, dpi, indices, MODEL_CONFIG.get('pdf_render_chunk', 8)):
+            with img:
+                images.append(reduce_to_model_size(img, image_size, target))
+    else:
+        with Image.open(image_path) as img:
+            page_count = getattr(img, 'n_frames', 1)
+            indices = sample_pages(page_count, max_pages)
+            if fast and img.format == 'JPEG' and page_count == 1:
+                img.draft(img.mode, (target, target))
+            for i in indices:
+                img.seek(i)
+                images.append(reduce_to_model_size(img, image_size, target))
+
+    return indices, images, page_count
+
+
+def load_model_array(image_path, image_size):
+    """
+    Belgeyi image_size x image_size RGB uint8 diziye çözer
+
+    Args:
+        image_path (str): Görüntü dosyasının yolu
+        image_size (int): Model girdi kenarı
+
+    Returns:
+        numpy.ndarray: uint8 [image_size, image_size, 3]
+    """
+    image = load_model_image(image_path, image_size)
+    if image is None:
+        raise ValueError("Görüntü yüklenemedi")
+    if image.size != (image_size, image_size):
+        # Tam çözme yolu görüntüyü özgün boyutunda döndürür
+        image = image.resize((image_size, image_size), Image.BILINEAR)
+    return np.asarray(image.convert('RGB') if image.mode != 'RGB' else image)
+
+
+def loader_worker(shm_name, shape, image_size, task_queue, result_queue):
+    """BatchLoader süreci: görevleri (yuva, sıra, yol) paylaşılan tampona çözer"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    buffer = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            slot, index, path = task
+            try:
+                buffer[slot, index] = load_model_array(path, image_size)
+                result_queue.put((slot, index, None))
+            except Exception as e:
+                buffer[slot, index] = 0
+                result_queue.put((slot, index, f"{type(e).__name__}: {e}"))
+    finally:
+        del buffer
+        shm.close()
@@ -0,0 +1,8 @@
+"""
+Yükleyici süreçlerin ana modülü.
+
+spawn ile başlatılan süreçler ana modülü yeniden içe aktarır. BatchLoader
+süreçleri başlatırken giriş betiği yerine bu modülü gösterir; böylece
+yükleyiciler yalnızca models/image_io.py'yi (torch'suz) içe aktarır.
+Bu modülde içe aktarma ve üst düzey kod bulunmamalıdır.
+"""
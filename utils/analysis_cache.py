@@ -0,0 +1,127 @@
+"""
+LLM analiz sonuçları için kalıcı önbellek.
+
+Aynı OCR metni aynı model ve şablonla yeniden analiz edildiğinde üretim
+tamamen atlanır. Anahtar (model, sınıf, şablon, kısaltılmış metin hash'i)
+dörtlüsünden türetilir; şablon veya model değişince eski kayıtlar kendiliğinden
+kullanılmaz olur. Kayıtlar SQLite dosyasında tutulur, en eski erişilenden
+başlayarak kayıt sayısı sınırına göre ve yaş sınırına (TTL) göre silinir.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+
+from config.settings import LLM_CONFIG
+from utils.metrics import METRICS
+
+logger = logging.getLogger('DocumentProcessor.AnalysisCache')
+
+
+def cache_key(model, document_class, prompt_template, text):
+    """
+    Önbellek anahtarı
+
+    Args:
+        model (str): LLM model adı
+        document_class (str): Belge sınıfı
+        prompt_template (str): Kullanılan şablon
+        text (str): Kısaltılmış belge metni
+
+    Returns:
+        str: SHA-256 anahtar
+    """
+    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
+    material = '\0'.join([model, document_class or '', prompt_template, text_hash])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, path=None, max_entries=None, ttl=None):
+        """
+        Args:
+            path (str, optional): SQLite dosyası. Varsayılan LLM_CONFIG['result_cache_path'].
+            max_entries (int, optional): En fazla kayıt sayısı
+            ttl (int, optional): Kayıt ömrü (saniye)
+        """
+        self.path = path or LLM_CONFIG['result_cache_path']
+        self.max_entries = max_entries or LLM_CONFIG['result_cache_max_entries']
+        self.ttl = ttl or LLM_CONFIG['result_cache_ttl']
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                created REAL,
+                last_access REAL,
+                result TEXT
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON analysis_cache(last_access)")
+        self._conn.commit()
+
+    def get(self, key):
+        """
+        Anahtarın sonucunu döndürür; yoksa veya süresi dolmuşsa None
+
+        Args:
+            key (str): cache_key() ile üretilen anahtar
+
+        Returns:
+            dict: Analiz sonucu veya None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, created FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                METRICS.inc('llm_cache_total', result='miss')
+                return None
+            self._conn.execute("UPDATE analysis_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+
+        METRICS.inc('llm_cache_total', result='hit')
+        return json.loads(row[0])
+
+    def put(self, key, model, result):
+        """
+        Sonucu kaydeder ve gerekirse eski kayıtları siler
+
+        Args:
+            key (str): cache_key() ile üretilen anahtar
+            model (str): LLM model adı
+            result (dict): Analiz sonucu
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, model, created, last_access, result) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, now, now, json.dumps(result, ensure_ascii=False))
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        """Süresi dolan ve sınırı aşan (en eski erişilen) kayıtları siler"""
+        self._conn.execute("DELETE FROM analysis_cache WHERE created < ?", (now - self.ttl,))
+        count = self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM analysis_cache WHERE key IN "
+                "(SELECT key FROM analysis_cache ORDER BY last_access ASC LIMIT ?)", (excess,)
+            )
+            logger.debug(f"Analiz önbelleğinden {excess} kayıt silindi")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,91 @@
+"""
+Aşama zaman aşımları için işbirlikçi iptal.
+
+Python iş parçacıkları dışarıdan durdurulamaz; thread.join(timeout) yalnızca
+beklemeyi bırakır, iş arka planda sürer. Bunun yerine uzun süren aşamalar
+güvenli noktalarda (OCR'de sayfa aralarında, LLM üretiminde her token sonrası)
+CancelToken'ı kontrol eder ve süre dolduğunda kendiliğinden durur. Böylece
+zaman aşımına uğrayan iş CPU/GPU'yu bir sonraki belgeye bırakır.
+
+Kullanım:
+    token = CancelToken(timeout=60)
+    for page in pages:
+        token.raise_if_cancelled('ocr')
+        ...
+"""
+import time
+import threading
+import logging
+
+from utils.metrics import METRICS
+
+logger = logging.getLogger('DocumentProcessor.Cancellation')
+
+
+class StageTimeout(Exception):
+    """Aşama süre sınırını aştığında veya iptal edildiğinde fırlatılır"""
+
+    def __init__(self, stage, timeout=None):
+        self.stage = stage
+        self.timeout = timeout
+        super().__init__(f"{stage} aşaması iptal edildi (zaman aşımı: {timeout} saniye)")
+
+
+class CancelToken:
+    def __init__(self, timeout=None):
+        """
+        Args:
+            timeout (float, optional): Süre sınırı (saniye). None ise yalnızca cancel() ile iptal edilir.
+        """
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self._event = threading.Event()
+
+    def cancel(self):
+        """İşin bir sonraki kontrol noktasında durmasını ister"""
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self._event.set()
+            return True
+        return False
+
+    def remaining(self):
+        """Kalan süre (saniye); sınır yoksa None"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def raise_if_cancelled(self, stage):
+        """İptal edildiyse StageTimeout fırlatır"""
+        if self.cancelled:
+            raise StageTimeout(stage, self.timeout)
+
+
+def stop_worker(thread, token, stage, grace):
+    """
+    Süresi dolan işçiyi iptal eder ve bir sonraki kontrol noktasına kadar bekler.
+    Zaman aşımları ve süre içinde durmayan işçiler metriklere sayılır.
+
+    Args:
+        thread (threading.Thread): İşçi iş parçacığı
+        token (CancelToken): İşçinin kontrol ettiği token
+        stage (str): Aşama adı (metrik etiketi)
+        grace (float): İptalden sonra beklenecek en uzun süre (saniye)
+
+    Returns:
+        bool: İşçi durduysa True
+    """
+    token.cancel()
+    METRICS.inc('stage_timeouts_total', stage=stage)
+    thread.join(timeout=grace)
+    if thread.is_alive():
+        # Kontrol noktası arası tek bir adım (ör. çok büyük bir sayfa) hâlâ sürüyor
+        METRICS.inc('stage_cancel_overruns_total', stage=stage)
+        logger.warning(f"{stage} işçisi iptalden sonra {grace} saniye içinde durmadı")
+        return False
+    return True
@@ -0,0 +1,241 @@
+"""
+İşlenmiş belgeler için sıkıştırılmış, sürümlü MongoDB şeması.
+
+Şema sürüm 2:
+    - Sınıf olasılıkları 16 elemanlı float32 vektör olarak paketlenir
+      ('class_probs', CLASSES sırasıyla). all_probs/sorted_probs ayrıca saklanmaz.
+    - Eşik üzerindeki metin zlib ile sıkıştırılır ('extracted_text_z').
+      Sıkıştırılmış hali de çok büyükse GridFS'e taşınır ('extracted_text_ref').
+
+Okuma katmanı (from_storage) her iki sürümü de eski (sürüm 1) sözlük yapısına
+çevirir; bu sayede mevcut tüketiciler değişmeden çalışır.
+
+Kullanım:
+    python -m utils.document_schema --migrate
+    python -m utils.document_schema --migrate --dry-run --uri mongodb://localhost:27017/
+"""
+import sys
+import zlib
+import struct
+import logging
+import argparse
+
+from config.settings import CLASSES, MONGODB_CONFIG
+
+logger = logging.getLogger('DocumentProcessor.Schema')
+
+SCHEMA_VERSION = 2
+PROBS_FORMAT = f"<{len(CLASSES)}f"
+
+
+def pack_probs(all_probs):
+    """
+    Sınıf olasılıklarını CLASSES sırasında float32 ikili vektöre paketler
+
+    Args:
+        all_probs (dict): {sınıf: olasılık}
+
+    Returns:
+        bytes: Paketlenmiş vektör veya olasılık yoksa None
+    """
+    if not all_probs:
+        return None
+    return struct.pack(PROBS_FORMAT, *[float(all_probs.get(cls, 0.0)) for cls in CLASSES])
+
+
+def unpack_probs(blob):
+    """
+    Paketlenmiş vektörü eski all_probs ve sorted_probs yapısına çevirir
+
+    Returns:
+        tuple: (all_probs dict, sorted_probs list)
+    """
+    if not blob:
+        return {}, []
+    values = struct.unpack(PROBS_FORMAT, bytes(blob))
+    all_probs = dict(zip(CLASSES, values))
+    sorted_probs = [list(item) for item in sorted(all_probs.items(), key=lambda x: x[1], reverse=True)]
+    return all_probs, sorted_probs
+
+
+def encode_text(text, compress_threshold=None):
+    """
+    Metni eşik üzerindeyse zlib ile sıkıştırır
+
+    Returns:
+        dict: {'extracted_text': ...} veya {'extracted_text_z': bytes}
+    """
+    if compress_threshold is None:
+        compress_threshold = MONGODB_CONFIG['text_compress_threshold']
+    if text and len(text) >= compress_threshold:
+        return {'extracted_text_z': zlib.compress(text.encode('utf-8'), 6)}
+    return {'extracted_text': text}
+
+
+def offload_large_text(document, db, gridfs_threshold=None):
+    """
+    Sıkıştırılmış metni eşikten büyükse GridFS'e taşır (belgeyi yerinde değiştirir)
+
+    Args:
+        document (dict): Sürüm 2 belge
+        db: pymongo Database nesnesi
+        gridfs_threshold (int, optional): Bayt cinsinden eşik
+
+    Returns:
+        dict: Aynı belge
+    """
+    if gridfs_threshold is None:
+        gridfs_threshold = MONGODB_CONFIG['text_gridfs_threshold']
+    blob = document.get('extracted_text_z')
+    if blob is not None and len(blob) >= gridfs_threshold:
+        import gridfs
+        fs = gridfs.GridFS(db, collection=MONGODB_CONFIG['text_gridfs_bucket'])
+        document['extracted_text_ref'] = fs.put(bytes(blob), encoding=None,
+                                                filename=document.get('file_name'))
+        del document['extracted_text_z']
+        logger.info(f"Büyük metin GridFS'e taşındı: {document.get('file_name')} ({len(blob)} bayt)")
+    return document
+
+
+def to_storage(document, compress_threshold=None):
+    """
+    Sürüm 1 yapısındaki belgeyi sürüm 2 saklama biçimine çevirir
+
+    Args:
+        document (dict): extracted_text ve metadata.classification_details içeren belge
+
+    Returns:
+        dict: Sürüm 2 belge (girdi değiştirilmez)
+    """
+    stored = {key: value for key, value in document.items() if key != 'extracted_text'}
+    text = document.get('extracted_text') or ""
+    stored.update(encode_text(text, compress_threshold))
+    stored['text_length'] = document.get('text_length', len(text))
+
+    metadata = dict(document.get('metadata') or {})
+    details = metadata.pop('classification_details', None) or {}
+    stored['metadata'] = metadata
+    stored['class_probs'] = pack_probs(details.get('all_probs'))
+    stored['schema_version'] = SCHEMA_VERSION
+    return stored
+
+
+def load_text(document, db=None):
+    """Belgenin metnini hangi biçimde saklandığına bakmadan döndürür"""
+    if 'extracted_text' in document:
+        return document['extracted_text']
+    if document.get('extracted_text_z') is not None:
+        return zlib.decompress(bytes(document['extracted_text_z'])).decode('utf-8')
+    if document.get('extracted_text_ref') is not None:
+        if db is None:
+            raise ValueError("GridFS'teki metni okumak için veritabanı bağlantısı gerekli")
+        import gridfs
+        fs = gridfs.GridFS(db, collection=MONGODB_CONFIG['text_gridfs_bucket'])
+        blob = fs.get(document['extracted_text_ref']).read()
+        return zlib.decompress(blob).decode('utf-8')
+    return ""
+
+
+def from_storage(document, db=None):
+    """
+    Saklanan belgeyi (sürüm 1 veya 2) eski sözlük yapısına çevirir
+
+    Args:
+        document (dict): MongoDB'den okunan belge
+        db (optional): GridFS'teki metinler için pymongo Database nesnesi
+
+    Returns:
+        dict: extracted_text ve metadata.classification_details içeren belge
+    """
+    if document is None or document.get('schema_version', 1) < 2:
+        return document
+
+    legacy = {key: value for key, value in document.items()
+              if key not in ('extracted_text_z', 'extracted_text_ref', 'class_probs', 'schema_version')}
+
+    # Projeksiyonla çekilmeyen alanlara dokunma
+    if any(key in document for key in ('extracted_text', 'extracted_text_z', 'extracted_text_ref')):
+        legacy['extracted_text'] = load_text(document, db)
+
+    if 'class_probs' in document:
+        all_probs, sorted_probs = unpack_probs(document['class_probs'])
+        metadata = dict(legacy.get('metadata') or {})
+        metadata['classification_details'] = {
+            'all_probs': all_probs,
+            'sorted_probs': sorted_probs
+        }
+        legacy['metadata'] = metadata
+
+    return legacy
+
+
+def migrate_collection(collection, batch_size=500, dry_run=False):
+    """
+    Sürüm 1 belgeleri yerinde sürüm 2'ye dönüştürür
+
+    Args:
+        collection: pymongo Collection
+        batch_size (int): Toplu yazma boyutu
+        dry_run (bool): True ise sadece boyut kazancı hesaplanır
+
+    Returns:
+        dict: {'migrated': n, 'bytes_before': ..., 'bytes_after': ...}
+    """
+    from bson import BSON
+    from pymongo import ReplaceOne
+
+    stats = {'migrated': 0, 'bytes_before': 0, 'bytes_after': 0}
+    operations = []
+    cursor = collection.find({'schema_version': {'$exists': False}}).batch_size(batch_size)
+
+    for document in cursor:
+        stored = to_storage(document)
+        if not dry_run:
+            offload_large_text(stored, collection.database)
+        stats['migrated'] += 1
+        stats['bytes_before'] += len(BSON.encode(document))
+        stats['bytes_after'] += len(BSON.encode(stored))
+
+        if not dry_run:
+            # Yarışma durumunda başka bir süreç dönüştürmüşse üzerine yazma
+            operations.append(ReplaceOne({'_id': document['_id'], 'schema_version': {'$exists': False}}, stored))
+            if len(operations) >= batch_size:
+                collection.bulk_write(operations, ordered=False)
+                operations = []
+                logger.info(f"{stats['migrated']} belge dönüştürüldü")
+
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MongoDB belge şeması araçları")
+    parser.add_argument("--migrate", action="store_true", help="Sürüm 1 belgeleri sürüm 2 şemasına dönüştür")
+    parser.add_argument("--dry-run", action="store_true", help="Yazmadan sadece boyut kazancını raporla")
+    parser.add_argument("--uri", default=MONGODB_CONFIG['uri'], help="MongoDB bağlantı URI'si")
+    parser.add_argument("--db", default=MONGODB_CONFIG['db_name'], help="Veritabanı adı")
+    parser.add_argument("--collection", default=MONGODB_CONFIG['collection_name'], help="Koleksiyon adı")
+    parser.add_argument("--batch-size", type=int, default=500, help="Toplu yazma boyutu")
+    args = parser.parse_args()
+
+    if not args.migrate:
+        parser.print_help()
+        return 0
+
+    from pymongo import MongoClient
+    client = MongoClient(args.uri)
+    try:
+        stats = migrate_collection(client[args.db][args.collection], args.batch_size, args.dry_run)
+    finally:
+        client.close()
+
+    ratio = stats['bytes_after'] / stats['bytes_before'] if stats['bytes_before'] else 1.0
+    action = "dönüştürülecek" if args.dry_run else "dönüştürüldü"
+    print(f"{stats['migrated']} belge {action}: {stats['bytes_before']} -> {stats['bytes_after']} bayt (oran: {ratio:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Dosya yerleştirme motoru.
+
+Yönlendirilen belgeleri hedef klasörlere sınırlı bir iş parçacığı havuzunda
+yerleştirir. Kaynak ve hedef aynı dosya sistemindeyse dosya yeniden yazılmaz
+(hard link veya taşıma), farklı cihazlarda kopyalamaya geri dönülür. Her yazım
+önce geçici bir dosyaya yapılır ve os.replace ile yerine konur; böylece hedef
+klasörde hiçbir zaman yarım dosya görünmez.
+"""
+import os
+import uuid
+import errno
+import shutil
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('DocumentRouter.FilePlacement')
+
+PLACEMENT_MODES = ("link", "move")
+
+
+class FilePlacer:
+    def __init__(self, max_workers=None, mode="link"):
+        """
+        Dosya yerleştirme motorunu başlatır
+
+        Args:
+            max_workers (int, optional): Eşzamanlı yerleştirme iş parçacığı sayısı.
+                                         Belirtilmezse çekirdek sayısına göre seçilir.
+            mode (str): "link" - kaynak dosya yerinde kalır (hard link, olmazsa kopya)
+                        "move" - kaynak dosya hedefe taşınır
+        """
+        if mode not in PLACEMENT_MODES:
+            raise ValueError(f"Geçersiz yerleştirme modu: {mode} (seçenekler: {PLACEMENT_MODES})")
+
+        self.mode = mode
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 1) * 2)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                           thread_name_prefix="file-placer")
+        self._device_cache = {}
+
+        logger.info(f"Dosya yerleştirme motoru başlatıldı: mod={self.mode}, iş parçacığı={self.max_workers}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def close(self):
+        """İş parçacığı havuzunu kapatır"""
+        self.executor.shutdown(wait=True)
+
+    def _device_of(self, directory):
+        """Klasörün bulunduğu cihaz numarasını (önbellekli) döndürür"""
+        device = self._device_cache.get(directory)
+        if device is None:
+            device = os.stat(directory).st_dev
+            self._device_cache[directory] = device
+        return device
+
+    def _temp_path(self, target_dir, file_name):
+        """Hedef klasörde benzersiz, gizli bir geçici dosya yolu üretir"""
+        return os.path.join(target_dir, f".{file_name}.{uuid.uuid4().hex}.tmp")
+
+    def _copy_into_place(self, source, target_path, target_dir, file_name):
+        """Dosyayı geçici isme kopyalar ve atomik olarak yerine koyar"""
+        temp_path = self._temp_path(target_dir, file_name)
+        try:
+            shutil.copy2(source, temp_path)
+            os.replace(temp_path, target_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def place(self, source, target_dir, file_name):
+        """
+        Tek bir dosyayı hedef klasöre yerleştirir
+
+        Args:
+            source (str): Kaynak dosya yolu
+            target_dir (str): Hedef klasör
+            file_name (str): Hedefteki dosya adı
+
+        Returns:
+            dict: {'status': 'placed' | 'error', 'method': ..., 'target_path': ..., 'error': ...}
+        """
+        target_path = os.path.join(target_dir, file_name)
+        try:
+            same_device = self._device_of(os.path.dirname(os.path.abspath(source))) == self._device_of(target_dir)
+
+            if self.mode == "move":
+                if same_device:
+                    # Aynı dosya sisteminde yeniden adlandırma zaten atomiktir
+                    os.replace(source, target_path)
+                    method = "rename"
+                else:
+                    self._copy_into_place(source, target_path, target_dir, file_name)
+                    os.remove(source)
+                    method = "copy"
+            else:
+                method = "copy"
+                if same_device:
+                    temp_path = self._temp_path(target_dir, file_name)
+                    try:
+                        os.link(source, temp_path)
+                        os.replace(temp_path, target_path)
+                        method = "link"
+                    except OSError as e:
+                        # Hard link desteklenmiyorsa (FAT, ağ sürücüsü vb.) kopyalamaya geri dön
+                        if os.path.exists(temp_path):
+                            os.remove(temp_path)
+                        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EACCES):
+                            raise
+                        logger.debug(f"Hard link oluşturulamadı, kopyalanacak: {source} ({e})")
+                if method == "copy":
+                    self._copy_into_place(source, target_path, target_dir, file_name)
+
+            return {
+                'status': 'placed',
+                'method': method,
+                'source': source,
+                'target_path': target_path
+            }
+        except Exception as e:
+            logger.error(f"Dosya yerleştirme hatası ({source} -> {target_path}): {e}")
+            return {
+                'status': 'error',
+                'method': None,
+                'source': source,
+                'target_path': target_path,
+                'error': str(e)
+            }
+
+    def place_many(self, jobs):
+        """
+        Birden çok dosyayı paralel olarak yerleştirir
+
+        Args:
+            jobs (list): (source, target_dir, file_name) demetlerinin listesi
+
+        Returns:
+            list: Her iş için place() sonucu, girişle aynı sırada
+        """
+        futures = [self.executor.submit(self.place, source, target_dir, file_name)
+                   for source, target_dir, file_name in jobs]
+        return [future.result() for future in futures]
@@ -5,7 +5,10 @@ import os
 import json
 import datetime
 import logging
-from config.settings import LOG_DIR
+from config.settings import LOG_DIR, MONGODB_CONFIG
+from utils.document_schema import to_storage
+from utils.metrics import METRICS
+from utils.provenance import record_stage
 
 # Loglama yapılandırması
 logging.basicConfig(
@@ -18,7 +21,39 @@ logging.basicConfig(
 )
 logger = logging.getLogger('DocumentProcessor')
 
-def process_single_document(document_path, classifier, extractor, analyzer=None, vector_db=None, skip_analysis=False, check_duplicates=True):
+def process_single_document(document_path, classifier, extractor, analyzer=None, vector_db=None, skip_analysis=False, check_duplicates=True,
+                            extraction_result=None, classification_result=None):
+    """
+    Tek bir belgeyi işle ve sonuçları döndür.
+    Aşama süreleri results['processing_info']['stage_times'] altına eklenir.
+    
+    Args:
+        document_path (str): İşlenecek belge dosyasının yolu
+        classifier: DocumentClassifier nesnesi
+        extractor: UnstructuredTextExtractor nesnesi
+        analyzer (optional): DocumentAnalyzer nesnesi
+        vector_db (optional): DocumentVectorDB nesnesi
+        skip_analysis (bool): İçerik analizi atlanacak mı
+        check_duplicates (bool): Duplikasyon kontrolü yapılacak mı
+        extraction_result (dict, optional): Önceden (ör. extract_text_batch ile) çıkarılmış metin;
+                                            verilirse OCR yeniden çalıştırılmaz
+        classification_result (dict, optional): Önceden (ör. predict_batch ile) yapılmış sınıflandırma;
+                                                verilirse model yeniden çalıştırılmaz
+        
+    Returns:
+        dict: İşleme sonuçları
+    """
+    with METRICS.collect_stage_times() as stage_times:
+        results = _process_single_document(document_path, classifier, extractor, analyzer,
+                                           vector_db, skip_analysis, check_duplicates, extraction_result,
+                                           classification_result)
+    results['processing_info']['stage_times'] = {
+        stage: round(seconds, 4) for stage, seconds in stage_times.items()
+    }
+    return results
+
+def _process_single_document(document_path, classifier, extractor, analyzer=None, vector_db=None, skip_analysis=False, check_duplicates=True,
+                             extraction_result=None, classification_result=None):
     """
     Tek bir belgeyi işle ve sonuçları döndür
     
@@ -30,6 +65,10 @@ def process_single_document(document_path, classifier, extractor, analyzer=None,
         vector_db (optional): DocumentVectorDB nesnesi
         skip_analysis (bool): İçerik analizi atlanacak mı
         check_duplicates (bool): Duplikasyon kontrolü yapılacak mı
+        extraction_result (dict, optional): Önceden (ör. extract_text_batch ile) çıkarılmış metin;
+                                            verilirse OCR yeniden çalıştırılmaz
+        classification_result (dict, optional): Önceden (ör. predict_batch ile) yapılmış sınıflandırma;
+                                                verilirse model yeniden çalıştırılmaz
         
     Returns:
         dict: İşleme sonuçları
@@ -39,11 +78,35 @@ def process_single_document(document_path, classifier, extractor, analyzer=None,
     
     logger.info(f"Belge işleniyor: {document_path}")
 
-    # Adım 1: Görsel sınıflandırma
+    classify_step(results, document_path, classifier, classification_result)
+    if extract_step(results, document_path, extractor, extraction_result):
+        duplicate_step(results, vector_db, check_duplicates)
+    analysis_step(results, analyzer, skip_analysis)
+    finish_step(results, document_path, start_time)
+    index_step(results, document_path, vector_db, check_duplicates)
+
+    return results
+
+# Aşama adımları: _process_single_document bunları sırayla, utils/pipeline.py
+# ayrı aşama iş parçacıklarında çağırır. Her adım sonucu results'a yazar.
+
+def classify_step(results, document_path, classifier, classification_result=None):
+    """
+    Adım 1: Görsel sınıflandırma
+
+    Args:
+        results (dict): Doldurulan sonuç sözlüğü
+        document_path (str): Belge dosyasının yolu
+        classifier: DocumentClassifier nesnesi
+        classification_result (dict, optional): Önceden yapılmış sınıflandırma
+    """
     logger.info("Adım 1: Görsel sınıflandırma...")
     try:
-        classification_result = classifier.predict(document_path)
+        if classification_result is None:
+            classification_result = classifier.predict(document_path)
         results['classification'] = classification_result
+        if classification_result.get('class') != 'error':
+            record_stage(results, 'classifier', classifier)
 
         doc_class = classification_result['class']
         confidence = classification_result['confidence']
@@ -55,48 +118,93 @@ def process_single_document(document_path, classifier, extractor, analyzer=None,
             'confidence': 0.0,
             'error': str(e)
         }
-        doc_class = 'error'
-        confidence = 0.0
 
-    # Adım 2: Metin çıkarma
+def skipped_extraction(reason):
+    """
+    Metin çıkarma atlandığında (ör. classify modu) extract_step'e verilen boş sonuç.
+    OCR çalışmadığı için aşama kökeni yazılmaz.
+
+    Args:
+        reason (str): Atlanma nedeni (metadata['skipped'])
+
+    Returns:
+        dict: extract_text biçiminde sonuç
+    """
+    return {'text': "", 'metadata': {'skipped': reason}}
+
+def extract_step(results, document_path, extractor, extraction_result=None):
+    """
+    Adım 2: Metin çıkarma
+
+    Args:
+        results (dict): Doldurulan sonuç sözlüğü
+        document_path (str): Belge dosyasının yolu
+        extractor: UnstructuredTextExtractor nesnesi
+        extraction_result (dict, optional): Önceden çıkarılmış metin
+
+    Returns:
+        bool: Metin çıkarıldıysa True
+    """
     logger.info("Adım 2: Metin çıkarma...")
     try:
-        extraction_result = extractor.extract_text(document_path)
+        if extraction_result is None:
+            extraction_result = extractor.extract_text(document_path)
         results['extraction'] = {
             'text': extraction_result['text'],
             'metadata': extraction_result['metadata']
         }
+        # Hata metinleri (desteklenmeyen biçim, zaman aşımı) ve atlanan çıkarma OCR çıktısı sayılmaz
+        if 'error' not in extraction_result['metadata'] and 'skipped' not in extraction_result['metadata']:
+            record_stage(results, 'ocr', extractor)
 
         text_length = len(extraction_result['text'])
         logger.info(f"Çıkarılan metin uzunluğu: {text_length} karakter")
-
-        # Duplikasyon kontrolü (opsiyonel)
-        if vector_db and check_duplicates and text_length > 50:
-            try:
-                duplicate_check = vector_db.check_duplicate_document(
-                    extraction_result['text'],
-                    min_similarity=0.95  # %95 benzerlik eşiği
-                )
-                results['duplicate_check'] = duplicate_check
-                
-                if duplicate_check["is_duplicate"]:
-                    logger.warning(f"DİKKAT: Bu belge muhtemelen sistemde zaten var!")
-                    logger.warning(f"Benzerlik: {duplicate_check['similarity']:.2f}, Tip: {duplicate_check['match_type']}")
-                    logger.warning(f"Duplike belge yolu: {duplicate_check['file_path']}")
-            except Exception as e:
-                logger.error(f"Duplikasyon kontrolü hatası: {e}")
-                results['duplicate_check'] = {"error": str(e)}
-
+        return True
     except Exception as e:
         logger.error(f"Metin çıkarma hatası: {e}")
         results['extraction'] = {
             'text': "[Metin çıkarma başarısız oldu]",
             'metadata': {'error': str(e)}
         }
-        text_length = 0
+        return False
+
+def duplicate_step(results, vector_db=None, check_duplicates=True):
+    """
+    Duplikasyon kontrolü (opsiyonel)
+
+    Args:
+        results (dict): extract_step sonrası sonuç sözlüğü
+        vector_db (optional): DocumentVectorDB nesnesi
+        check_duplicates (bool): Duplikasyon kontrolü yapılacak mı
+    """
+    if vector_db and check_duplicates and len(results['extraction']['text']) > 50:
+        try:
+            duplicate_check = vector_db.check_duplicate_document(
+                results['extraction']['text'],
+                min_similarity=0.95  # %95 benzerlik eşiği
+            )
+            results['duplicate_check'] = duplicate_check
+            
+            if duplicate_check["is_duplicate"]:
+                logger.warning(f"DİKKAT: Bu belge muhtemelen sistemde zaten var!")
+                logger.warning(f"Benzerlik: {duplicate_check['similarity']:.2f}, Tip: {duplicate_check['match_type']}")
+                logger.warning(f"Duplike belge yolu: {duplicate_check['file_path']}")
+        except Exception as e:
+            logger.error(f"Duplikasyon kontrolü hatası: {e}")
+            results['duplicate_check'] = {"error": str(e)}
+
+def analysis_step(results, analyzer=None, skip_analysis=False):
+    """
+    Adım 3: İçerik analizi (opsiyonel)
 
-    # Adım 3: İçerik analizi (opsiyonel)
-    if analyzer and not skip_analysis and confidence > 0.5 and text_length > 50:
+    Args:
+        results (dict): Sınıflandırma ve metin çıkarma sonrası sonuç sözlüğü
+        analyzer (optional): DocumentAnalyzer nesnesi
+        skip_analysis (bool): İçerik analizi atlanacak mı
+    """
+    doc_class = results['classification']['class']
+    confidence = results['classification']['confidence']
+    if analyzer and not skip_analysis and confidence > 0.5 and len(results['extraction']['text']) > 50:
         logger.info("Adım 3: İçerik analizi...")
         try:
             analysis_result = analyzer.analyze_document(
@@ -118,7 +226,15 @@ def process_single_document(document_path, classifier, extractor, analyzer=None,
             logger.info("İçerik analizi atlandı (düşük güven veya yetersiz metin veya analizör yok).")
         results['analysis'] = None
 
-    # İşleme süresini ekle
+def finish_step(results, document_path, start_time):
+    """
+    İşleme süresini ekler
+
+    Args:
+        results (dict): Sonuç sözlüğü
+        document_path (str): Belge dosyasının yolu
+        start_time (datetime.datetime): İşleme başlangıcı
+    """
     end_time = datetime.datetime.now()
     processing_time = (end_time - start_time).total_seconds()
     results['processing_info'] = {
@@ -131,8 +247,17 @@ def process_single_document(document_path, classifier, extractor, analyzer=None,
     
     logger.info(f"Belge işleme tamamlandı. Süre: {processing_time:.2f} saniye.")
 
-    # Vektör veritabanına ekleme işlemi
-    if vector_db and text_length > 50 and results['classification']['confidence'] > 0.5:
+def index_step(results, document_path, vector_db=None, check_duplicates=True):
+    """
+    Vektör veritabanına ekleme işlemi
+
+    Args:
+        results (dict): finish_step sonrası sonuç sözlüğü
+        document_path (str): Belge dosyasının yolu
+        vector_db (optional): DocumentVectorDB nesnesi
+        check_duplicates (bool): Duplike belgeler eklenmesin mi
+    """
+    if vector_db and len(results['extraction']['text']) > 50 and results['classification']['confidence'] > 0.5:
         try:
             import time
             doc_id = f"{os.path.basename(document_path)}_{int(time.time())}"
@@ -152,12 +277,39 @@ def process_single_document(document_path, classifier, extractor, analyzer=None,
                     processed_date=results['processing_info']['end_time']
                 )
                 results['vector_indexing'] = {"status": "indexed", "doc_id": doc_id}
+                record_stage(results, 'embedding', vector_db)
                 logger.info(f"Belge vektör veritabanına eklendi, ID: {doc_id}")
         except Exception as e:
             logger.error(f"Vektör veritabanı ekleme hatası: {e}")
             results['vector_indexing'] = {"status": "error", "error": str(e)}
 
-    return results
+def add_processing_summary(result, mode, start_time):
+    """
+    Başarılı sonuca durum ve işleme özetini ekler
+
+    Args:
+        result (dict): İşleme sonucu
+        mode (str): İşleme modu
+        start_time (datetime.datetime): İşleme başlangıcı
+
+    Returns:
+        float: Toplam süre (saniye)
+    """
+    end_time = datetime.datetime.now()
+    processing_time = (end_time - start_time).total_seconds()
+    
+    result['status'] = "success"
+    result['processing_summary'] = {
+        'mode': mode,
+        'start_time': start_time.isoformat(),
+        'end_time': end_time.isoformat(),
+        'total_time': processing_time,
+        'class': result['classification']['class'],
+        'confidence': result['classification']['confidence'],
+        'text_length': len(result['extraction']['text']) if 'extraction' in result else 0,
+        'has_analysis': False  # LLM analizi kapalı
+    }
+    return processing_time
 
 def save_result_to_json(result, output_path=None):
     """
@@ -193,9 +345,30 @@ def save_result_to_json(result, output_path=None):
     logger.info(f"Sonuç kaydedildi: {output_path}")
     return output_path
 
+def format_page_classification(classification):
+    """
+    Sayfa bazlı sınıflandırmanın MongoDB'de saklanan özeti
+
+    Args:
+        classification (dict): 'pages' içeren predict_document sonucu
+
+    Returns:
+        dict: {'aggregation', 'page_count', 'pages'}
+    """
+    return {
+        'aggregation': classification.get('aggregation'),
+        'page_count': classification.get('page_count'),
+        'pages': [
+            {'page': page['page'], 'class': page['class'], 'confidence': page['confidence']}
+            for page in classification['pages']
+        ]
+    }
+
 def format_result_for_mongodb(result):
     """
-    İşleme sonucunu MongoDB formatına dönüştür
+    İşleme sonucunu MongoDB formatına dönüştür.
+    MONGODB_CONFIG['schema_version'] 2 ise sıkıştırılmış şema kullanılır
+    (bkz. utils/document_schema.py).
     
     Args:
         result (dict): İşleme sonucu
@@ -215,11 +388,21 @@ def format_result_for_mongodb(result):
         'metadata': {
             'ocr_metadata': result['extraction']['metadata'],
             'classification_details': {
-                'all_probs': result['classification']['all_probs'],
-                'sorted_probs': result['classification']['sorted_probs']
+                'all_probs': result['classification'].get('all_probs', {}),
+                'sorted_probs': result['classification'].get('sorted_probs', [])
             }
         }
     }
+
+    # Çok sayfalı belgelerde sayfa bazlı sınıflar
+    if result['classification'].get('pages'):
+        document['metadata']['page_classification'] = format_page_classification(result['classification'])
+
+    # Aşama kökeni ve vektör kaydı (model yükseltmesinde document_reprocessor.py kullanır)
+    if result.get('provenance'):
+        document['provenance'] = result['provenance']
+    if result.get('vector_indexing', {}).get('status') == 'indexed':
+        document['vector_indexing'] = result['vector_indexing']
     
     # Eğer analiz yapıldıysa ekle
     if result['analysis']:
@@ -229,4 +412,7 @@ def format_result_for_mongodb(result):
             "processing_time": result['analysis'].get('processing_time', 0)
         }
     
+    if MONGODB_CONFIG.get('schema_version', 1) >= 2:
+        document = to_storage(document)
+    
     return document
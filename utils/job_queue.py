@@ -0,0 +1,385 @@
+"""
+MongoDB üzerinde kiralamalı (lease) dağıtık iş kuyruğu.
+
+Ortak bir giriş klasörünü izleyen birden çok düğüm aynı dosyayı iki kez
+işlememelidir. Her dosya için kuyruk koleksiyonunda tek bir iş kaydı tutulur
+(_id dosya yolu, boyutu ve değiştirilme zamanından türetilir; aynı dosyayı
+birden çok düğümün kuyruğa eklemesi zararsızdır). İşçiler işi tek bir atomik
+find_one_and_update ile kiralar. Kira süresince işçi düzenli kalp atışı
+gönderir; işçi çökerse kira dolar ve iş başka bir işçiye geçer. Her kiralama
+deneme sayısını artırır, başarısız işler artan bekleme süresiyle yeniden
+denenir, deneme sınırını aşanlar 'failed' olarak kalır. Tamamlama ve kalp
+atışı yalnızca kirayı hâlâ tutan işçi için geçerlidir.
+
+Kira süreleri düğüm saatleriyle yazılır; düğümlerin saatleri (NTP) eşit
+olmalı ve lease_seconds saat farkından çok büyük seçilmelidir.
+
+İş durumları:
+    pending  -> kiralanmayı bekliyor (available_at sonrasında)
+    leased   -> bir işçide (lease_until'e kadar)
+    done     -> tamamlandı
+    failed   -> deneme sınırı aşıldı
+
+Kullanım:
+    queue = MongoJobQueue()
+    queue.enqueue('/paylasim/giris/belge.pdf')
+    job = queue.acquire(worker_id)
+    with queue.keep_alive(job, worker_id) as lease:
+        ...
+    queue.complete(job, worker_id, result_id=doc_id)
+"""
+import os
+import socket
+import hashlib
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from config.settings import JOB_QUEUE_CONFIG
+from utils.metrics import METRICS
+
+logger = logging.getLogger('DocumentProcessor.JobQueue')
+
+JOB_STATUSES = ('pending', 'leased', 'done', 'failed')
+
+
+def _utcnow():
+    # pymongo tarihleri UTC olarak saklar ve saat dilimsiz döndürür
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def default_worker_id():
+    """Düğüm ve süreç bazında benzersiz işçi kimliği"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def job_id(path):
+    """
+    Dosyanın iş kimliği. Aynı yola sonradan konan farklı bir dosya yeni iş olur.
+
+    Args:
+        path (str): Belge yolu (tüm düğümlerde aynı bağlama noktası olmalı)
+
+    Returns:
+        str: İş kimliği
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    material = f"{path}\0{stat.st_size}\0{int(stat.st_mtime)}"
+    return hashlib.sha1(material.encode('utf-8')).hexdigest()
+
+
+class LeaseKeeper:
+    def __init__(self, queue, job, worker_id, interval):
+        """
+        İş sürerken kirayı arka planda yeniler
+
+        Args:
+            queue (MongoJobQueue): Kuyruk
+            job (dict): Kiralanan iş
+            worker_id (str): Kirayı tutan işçi
+            interval (float): Kalp atışı aralığı (saniye)
+        """
+        self.queue = queue
+        self.job = job
+        self.worker_id = worker_id
+        self.interval = interval
+        # Kira başka işçiye geçtiyse set edilir; sonuç yazılmamalıdır
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{job['_id'][:8]}", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self.renew():
+                break
+
+    def renew(self):
+        """Kirayı hemen yeniler; kira kaybedildiyse False"""
+        if self.lost.is_set():
+            return False
+        try:
+            if self.queue.heartbeat(self.job, self.worker_id):
+                return True
+        except Exception as e:
+            # Geçici bağlantı hatası: kira henüz dolmamış olabilir, sonraki atışta tekrar denenir
+            logger.warning(f"Kalp atışı gönderilemedi ({self.job['_id']}): {e}")
+            return True
+        logger.warning(f"Kira kaybedildi: {self.job['_id']} ({self.job.get('path')})")
+        self.lost.set()
+        return False
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=self.interval)
+
+
+class MongoJobQueue:
+    def __init__(self, uri=None, db_name=None, collection_name=None, lease_seconds=None, max_attempts=None,
+                 collection=None):
+        """
+        Args:
+            uri (str, optional): MongoDB bağlantı URI'si. Varsayılan JOB_QUEUE_CONFIG['uri'].
+            db_name (str, optional): Veritabanı adı
+            collection_name (str, optional): Kuyruk koleksiyonu
+            lease_seconds (float, optional): Kira süresi. Varsayılan JOB_QUEUE_CONFIG['lease_seconds'].
+            max_attempts (int, optional): En fazla deneme. Varsayılan JOB_QUEUE_CONFIG['max_attempts'].
+            collection (optional): Hazır koleksiyon nesnesi (verilirse bağlantı açılmaz)
+        """
+        self.lease_seconds = lease_seconds or JOB_QUEUE_CONFIG['lease_seconds']
+        self.max_attempts = max_attempts or JOB_QUEUE_CONFIG['max_attempts']
+        self.retry_backoff = JOB_QUEUE_CONFIG['retry_backoff']
+        self.heartbeat_interval = min(JOB_QUEUE_CONFIG['heartbeat_interval'], self.lease_seconds / 3)
+        self.client = None
+
+        if collection is None:
+            from pymongo import MongoClient
+            uri = uri or JOB_QUEUE_CONFIG['uri']
+            self.client = MongoClient(uri)
+            collection = self.client[db_name or JOB_QUEUE_CONFIG['db_name']][
+                collection_name or JOB_QUEUE_CONFIG['collection_name']]
+            logger.info(f"İş kuyruğu bağlantısı kuruldu: {uri}, Collection: {collection.name}")
+        self.collection = collection
+        self.ensure_indexes()
+
+    def ensure_indexes(self):
+        """Kiralama ve süresi dolan kira sorguları için indeksler"""
+        self.collection.create_index([('status', 1), ('available_at', 1), ('priority', -1)])
+        self.collection.create_index([('status', 1), ('lease_until', 1)])
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+    def enqueue(self, path, priority=0):
+        """
+        Dosyayı kuyruğa ekler; aynı dosya zaten kuyruktaysa değişiklik yapmaz
+
+        Args:
+            path (str): Belge yolu
+            priority (int): Büyük öncelik önce kiralanır
+
+        Returns:
+            bool: Yeni iş eklendiyse True
+        """
+        from pymongo.errors import DuplicateKeyError
+
+        now = _utcnow()
+        try:
+            result = self.collection.update_one(
+                {'_id': job_id(path)},
+                {'$setOnInsert': {
+                    'path': os.path.abspath(path),
+                    'status': 'pending',
+                    'priority': priority,
+                    'attempts': 0,
+                    'available_at': now,
+                    'created_at': now
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Başka bir düğüm aynı anda ekledi
+            return False
+        if result.upserted_id is not None:
+            METRICS.inc('queue_jobs_total', status='enqueued')
+            return True
+        return False
+
+    def enqueue_directory(self, directory, extensions=None):
+        """
+        Klasördeki desteklenen dosyaları kuyruğa ekler
+
+        Args:
+            directory (str): Giriş klasörü
+            extensions (tuple, optional): Uzantılar. Varsayılan JOB_QUEUE_CONFIG['extensions'].
+
+        Returns:
+            int: Yeni eklenen iş sayısı
+        """
+        extensions = extensions or JOB_QUEUE_CONFIG['extensions']
+        added = 0
+        for entry in os.scandir(directory):
+            if not entry.is_file() or not entry.name.lower().endswith(extensions):
+                continue
+            try:
+                added += self.enqueue(entry.path)
+            except FileNotFoundError:
+                # Başka bir düğüm dosyayı taşımış olabilir
+                continue
+        return added
+
+    def acquire(self, worker_id):
+        """
+        Sıradaki işi atomik olarak kiralar: bekleyen veya kirası dolmuş (ve
+        deneme hakkı kalmış) işlerden en yüksek öncelikli, en eski olan
+
+        Args:
+            worker_id (str): Kiralayan işçi
+
+        Returns:
+            dict: İş kaydı veya None (kiralanacak iş yoksa)
+        """
+        from pymongo import ReturnDocument
+
+        now = _utcnow()
+        job = self.collection.find_one_and_update(
+            {'$or': [
+                {'status': 'pending', 'available_at': {'$lte': now}},
+                {'status': 'leased', 'lease_until': {'$lt': now}, 'attempts': {'$lt': self.max_attempts}}
+            ]},
+            {
+                '$set': {
+                    'status': 'leased',
+                    'owner': worker_id,
+                    'leased_at': now,
+                    'heartbeat_at': now,
+                    'lease_until': now + timedelta(seconds=self.lease_seconds)
+                },
+                '$inc': {'attempts': 1}
+            },
+            sort=[('priority', -1), ('created_at', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if job is not None:
+            METRICS.inc('queue_jobs_total', status='leased')
+            if job['attempts'] > 1:
+                logger.info(f"İş yeniden deneniyor: {job['path']} (deneme {job['attempts']}/{self.max_attempts})")
+        return job
+
+    def heartbeat(self, job, worker_id):
+        """
+        Kirayı uzatır
+
+        Args:
+            job (dict): Kiralanan iş
+            worker_id (str): Kirayı tutan işçi
+
+        Returns:
+            bool: Kira hâlâ bu işçideyse True
+        """
+        now = _utcnow()
+        result = self.collection.update_one(
+            {'_id': job['_id'], 'status': 'leased', 'owner': worker_id},
+            {'$set': {'heartbeat_at': now, 'lease_until': now + timedelta(seconds=self.lease_seconds)}}
+        )
+        return result.matched_count == 1
+
+    @contextmanager
+    def keep_alive(self, job, worker_id):
+        """
+        Blok süresince kirayı arka planda yeniler
+
+        Yields:
+            LeaseKeeper: lost olayı kiranın kaybedildiğini bildirir
+        """
+        keeper = LeaseKeeper(self, job, worker_id, self.heartbeat_interval).start()
+        try:
+            yield keeper
+        finally:
+            keeper.stop()
+
+    def complete(self, job, worker_id, result_id=None):
+        """
+        İşi tamamlandı olarak işaretler
+
+        Args:
+            job (dict): Kiralanan iş
+            worker_id (str): Kirayı tutan işçi
+            result_id (str, optional): Sonuç kaydının kimliği
+
+        Returns:
+            bool: Kira bu işçideyse ve iş kapatıldıysa True
+        """
+        result = self.collection.update_one(
+            {'_id': job['_id'], 'status': 'leased', 'owner': worker_id},
+            {'$set': {'status': 'done', 'finished_at': _utcnow(), 'result_id': result_id},
+             '$unset': {'lease_until': ''}}
+        )
+        if result.matched_count != 1:
+            logger.warning(f"İş tamamlanamadı, kira başka işçide: {job['path']}")
+            return False
+        METRICS.inc('queue_jobs_total', status='done')
+        return True
+
+    def fail(self, job, worker_id, error):
+        """
+        Başarısız denemeyi kaydeder. Deneme hakkı kalmışsa iş artan bekleme
+        süresinden sonra yeniden kiralanabilir, kalmamışsa 'failed' olur.
+
+        Args:
+            job (dict): Kiralanan iş
+            worker_id (str): Kirayı tutan işçi
+            error (str): Hata mesajı
+
+        Returns:
+            str: Yeni durum ('pending' veya 'failed'); kira başka işçideyse None
+        """
+        now = _utcnow()
+        if job['attempts'] >= self.max_attempts:
+            update = {'status': 'failed', 'finished_at': now}
+        else:
+            delay = self.retry_backoff * 2 ** (job['attempts'] - 1)
+            update = {'status': 'pending', 'available_at': now + timedelta(seconds=delay)}
+        update['last_error'] = str(error)[:2000]
+
+        result = self.collection.update_one(
+            {'_id': job['_id'], 'status': 'leased', 'owner': worker_id},
+            {'$set': update, '$unset': {'lease_until': '', 'owner': ''}}
+        )
+        if result.matched_count != 1:
+            logger.warning(f"Hata kaydedilemedi, kira başka işçide: {job['path']}")
+            return None
+        METRICS.inc('queue_jobs_total', status='failed' if update['status'] == 'failed' else 'retried')
+        return update['status']
+
+    def release(self, job, worker_id):
+        """
+        İşi denemeyi saymadan kuyruğa geri bırakır (düzgün kapanışta)
+
+        Returns:
+            bool: Kira bu işçideyse True
+        """
+        result = self.collection.update_one(
+            {'_id': job['_id'], 'status': 'leased', 'owner': worker_id},
+            {'$set': {'status': 'pending', 'available_at': _utcnow()},
+             '$unset': {'lease_until': '', 'owner': ''},
+             '$inc': {'attempts': -1}}
+        )
+        return result.matched_count == 1
+
+    def reap_expired(self):
+        """
+        Kirası dolmuş ve deneme hakkı bitmiş işleri 'failed' yapar (kiralama
+        sorgusu bunları zaten atlar; bu yalnızca durumu görünür kılar)
+
+        Returns:
+            int: 'failed' yapılan iş sayısı
+        """
+        now = _utcnow()
+        result = self.collection.update_many(
+            {'status': 'leased', 'lease_until': {'$lt': now}, 'attempts': {'$gte': self.max_attempts}},
+            {'$set': {'status': 'failed', 'finished_at': now,
+                      'last_error': "Kira süresi doldu (işçi yanıt vermedi)"},
+             '$unset': {'lease_until': '', 'owner': ''}}
+        )
+        if result.modified_count:
+            METRICS.inc('queue_jobs_total', result.modified_count, status='failed')
+            logger.warning(f"Kirası dolan {result.modified_count} iş deneme sınırını aştı")
+        return result.modified_count
+
+    def stats(self):
+        """
+        Returns:
+            dict: Durum başına iş sayısı
+        """
+        counts = {status: 0 for status in JOB_STATUSES}
+        for row in self.collection.aggregate([{'$group': {'_id': '$status', 'count': {'$sum': 1}}}]):
+            counts[row['_id']] = row['count']
+        return counts
@@ -0,0 +1,229 @@
+"""
+Aşama bazlı gecikme ve verim metrikleri.
+
+Her işleme aşaması (görüntü çözme, ön işleme, Swin ileri geçişi, sayfa başına
+OCR, embedding, Milvus sorgu/ekleme, MongoDB yazma) için süre histogramları ve
+sayaçlar tutulur. Metrikler sürekli çalışan modda (Robot kütüphanesi) bir HTTP
+uç noktasından Prometheus metin biçiminde sunulur, CLI/toplu modda ise
+Prometheus textfile biçiminde bir dosyaya yazılır.
+
+Kullanım:
+    from utils.metrics import timed, METRICS
+
+    with timed('swin_forward'):
+        outputs = model(pixel_values)
+
+    METRICS.inc('documents_total', status='success')
+"""
+import os
+import time
+import math
+import threading
+import logging
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config.settings import METRICS_CONFIG
+
+logger = logging.getLogger('DocumentProcessor.Metrics')
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+    def cumulative(self):
+        """Prometheus 'le' kovaları için birikimli sayılar"""
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            yield bound, running
+        yield math.inf, self.count
+
+
+class MetricsRegistry:
+    def __init__(self, prefix=None, buckets=None):
+        """
+        Args:
+            prefix (str, optional): Metrik adı öneki. Varsayılan METRICS_CONFIG['prefix'].
+            buckets (tuple, optional): Histogram kova sınırları (saniye)
+        """
+        self.prefix = prefix or METRICS_CONFIG['prefix']
+        self.buckets = buckets or METRICS_CONFIG['buckets']
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        # İşlenmekte olan belgenin aşama süreleri (iş parçacığı başına)
+        self._local = threading.local()
+
+    def observe(self, stage, seconds):
+        """Bir aşama süresini kaydeder"""
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+        collector = getattr(self._local, 'collector', None)
+        if collector is not None:
+            collector[stage] = collector.get(stage, 0.0) + seconds
+
+    def inc(self, name, value=1, **labels):
+        """Bir sayacı artırır"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, stage):
+        """Bloğun süresini aşama histogramına kaydeden bağlam yöneticisi"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def current_collector(self):
+        """Bu iş parçacığında etkin aşama toplayıcısını döndürür (yoksa None)"""
+        return getattr(self._local, 'collector', None)
+
+    @contextmanager
+    def collect_stage_times(self, collector=None):
+        """
+        Blok içinde (aynı iş parçacığında) ölçülen aşama sürelerini toplar.
+        Belge sonucuna aşama dökümü eklemek için kullanılır.
+
+        Args:
+            collector (dict, optional): Yazılacak mevcut toplayıcı. Yardımcı iş
+                parçacıklarının (ör. OCR zaman aşımı thread'i) süreleri çağıran
+                belgenin dökümüne eklemesi için current_collector() ile alınır.
+
+        Yields:
+            dict: {aşama: toplam saniye}
+        """
+        previous = getattr(self._local, 'collector', None)
+        collector = {} if collector is None else collector
+        self._local.collector = collector
+        try:
+            yield collector
+        finally:
+            self._local.collector = previous
+
+    def reset(self):
+        """Tüm histogram ve sayaçları sıfırlar (ölçüm turları arasında)"""
+        with self._lock:
+            self._stages = {}
+            self._counters = {}
+
+    def snapshot(self):
+        """Metriklerin sözlük kopyasını döndürür"""
+        with self._lock:
+            return {
+                'stages': {
+                    stage: {
+                        'count': histogram.count,
+                        'sum': histogram.total,
+                        'avg': histogram.total / histogram.count if histogram.count else 0.0
+                    }
+                    for stage, histogram in self._stages.items()
+                },
+                'counters': {
+                    name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                    for name, series in self._counters.items()
+                }
+            }
+
+    def render_prometheus(self):
+        """Metrikleri Prometheus metin biçiminde döndürür"""
+        lines = []
+        with self._lock:
+            name = f"{self.prefix}_stage_duration_seconds"
+            lines.append(f"# HELP {name} İşleme aşaması süresi (saniye)")
+            lines.append(f"# TYPE {name} histogram")
+            for stage, histogram in sorted(self._stages.items()):
+                for bound, count in histogram.cumulative():
+                    le = "+Inf" if bound == math.inf else repr(float(bound))
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {count}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+
+            for counter, series in sorted(self._counters.items()):
+                full_name = f"{self.prefix}_{counter}"
+                lines.append(f"# TYPE {full_name} counter")
+                for key, value in sorted(series.items()):
+                    labels = ",".join(f'{k}="{v}"' for k, v in key)
+                    lines.append(f"{full_name}{{{labels}}} {value}" if labels else f"{full_name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        """
+        Metrikleri Prometheus textfile biçiminde dosyaya yazar (atomik)
+
+        Args:
+            path (str): Çıktı dosyası (ör. logs/metrics.prom)
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(temp_path, path)
+        logger.info(f"Metrikler yazıldı: {path}")
+
+
+def start_http_server(port=None, registry=None, host="0.0.0.0"):
+    """
+    Metrikleri /metrics adresinden sunan arka plan HTTP sunucusunu başlatır
+
+    Args:
+        port (int, optional): Dinlenecek port. Varsayılan METRICS_CONFIG['port'].
+        registry (MetricsRegistry, optional): Sunulacak kayıt. Varsayılan METRICS.
+
+    Returns:
+        ThreadingHTTPServer: Çalışan sunucu (durdurmak için shutdown())
+    """
+    port = port or METRICS_CONFIG['port']
+    registry = registry or METRICS
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    logger.info(f"Metrik uç noktası başlatıldı: http://{host}:{port}/metrics")
+    return server
+
+
+# Süreç genelindeki varsayılan kayıt
+METRICS = MetricsRegistry()
+
+
+def timed(stage):
+    """METRICS.timer kısayolu"""
+    return METRICS.timer(stage)
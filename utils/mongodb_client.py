@@ -4,6 +4,8 @@ MongoDB yardımcı fonksiyonları ve bağlantı yönetimi.
 import logging
 from datetime import datetime
 from config.settings import MONGODB_CONFIG
+from utils.document_schema import from_storage, offload_large_text
+from utils.metrics import timed
 
 logger = logging.getLogger('DocumentProcessor.MongoDB')
 
@@ -59,12 +61,17 @@ class MongoDBClient:
         Returns:
             str: Eklenen belgenin ID'si veya None
         """
-        if not self.collection:
+        if self.collection is None:
             if not self.connect():
                 return None
                 
         try:
-            result = self.collection.insert_one(document_data)
+            # Sürüm 2 belgelerde çok büyük metinleri GridFS'e taşı
+            if document_data.get('schema_version', 1) >= 2:
+                offload_large_text(document_data, self.db)
+            
+            with timed('mongo_write'):
+                result = self.collection.insert_one(document_data)
             document_id = str(result.inserted_id)
             logger.info(f"Belge MongoDB'ye kaydedildi: {document_id}")
             return document_id
@@ -82,7 +89,7 @@ class MongoDBClient:
         Returns:
             dict: Belge verileri veya None
         """
-        if not self.collection:
+        if self.collection is None:
             if not self.connect():
                 return None
                 
@@ -90,6 +97,8 @@ class MongoDBClient:
             from bson import ObjectId
             result = self.collection.find_one({"_id": ObjectId(document_id)})
             if result:
+                # Sıkıştırılmış şemayı eski yapıya çevir
+                result = from_storage(result, self.db)
                 # ObjectId'yi string'e dönüştür
                 result["_id"] = str(result["_id"])
                 return result
@@ -109,13 +118,13 @@ class MongoDBClient:
         Returns:
             list: Belge listesi
         """
-        if not self.collection:
+        if self.collection is None:
             if not self.connect():
                 return []
                 
         try:
             cursor = self.collection.find({"document_class": document_class}).limit(limit)
-            documents = list(cursor)
+            documents = [from_storage(doc, self.db) for doc in cursor]
             
             # ObjectId'leri string'e dönüştür
             for doc in documents:
@@ -133,7 +142,7 @@ class MongoDBClient:
         Returns:
             dict: Sınıf istatistikleri
         """
-        if not self.collection:
+        if self.collection is None:
             if not self.connect():
                 return {}
                 
@@ -175,7 +184,7 @@ class MongoDBClient:
         Returns:
             list: Belge listesi
         """
-        if not self.collection:
+        if self.collection is None:
             if not self.connect():
                 return []
                 
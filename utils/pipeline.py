@@ -0,0 +1,445 @@
+"""
+Aşamalar arası öncelikli zamanlama ve geri basınç.
+
+Belgeler sırayla uçtan uca işlendiğinde 200 sayfalık bir PDF'in OCR'ı,
+arkasındaki tek sayfalık faturaları dakikalarca bekletir. PipelineScheduler
+işi aşamalara böler; her aşamanın kendi iş parçacıkları ve sınırlı kuyruğu
+vardır:
+
+    classify (çözme + Swin) -> ocr (çözme + EasyOCR) -> index (duplikasyon + vektör) -> persist
+
+Çözme ayrı bir aşama değildir. Sınıflandırıcı görüntüyü küçültülmüş, OCR ise
+300 DPI çözer; ortak bir çözme aşaması tam çözünürlüklü sayfaları kuyrukta
+bekletip belleği şişirirdi.
+
+Her belge kabulde bir öncelik sınıfına girer (express, normal, bulk;
+sayfa sayısı, dosya boyutu veya kaynak klasöre göre). Aşama kuyrukları her
+sınıfı ayrı FIFO olarak tutar ve her zaman en öncelikli sınıftan alır.
+Böylece hızlı işler yavaşların önüne geçer. Bir aşamada aynı anda en fazla
+(iş parçacığı - reserved_workers) bulk iş çalışır; kalan iş parçacıkları
+büyük belgeler sürerken küçük belgelere ayrılmıştır. Kuyrukta yalnızca bulk
+iş varken ayrılmış iş parçacıkları boşta bekler. Karışık yükte verim
+değişmez; reserved_workers=0 ile bu ayırma kapatılır.
+
+Kuyruklar sınırlıdır. Dolan kuyruk önceki aşamayı, o da kabulü (submit)
+bekletir. Alımı yapan döngü saturated() / wait_for_capacity() ile yeni iş
+çekmeyi yavaşlatır. Dağıtık kuyrukta işler böylece boşta olan düğümlere kalır.
+
+Kullanım:
+    with PipelineScheduler(classifier, extractor, vector_db) as scheduler:
+        futures = [scheduler.submit(path) for path in paths]
+        results = [future.result() for future in futures]
+"""
+import os
+import time
+import queue
+import datetime
+import threading
+import logging
+from collections import deque
+from concurrent.futures import Future
+
+from config.settings import SCHEDULER_CONFIG
+from models.image_io import document_page_count
+from utils.helpers import (classify_step, extract_step, duplicate_step, analysis_step, finish_step, index_step,
+                           format_result_for_mongodb, add_processing_summary)
+from utils.metrics import METRICS
+
+logger = logging.getLogger('DocumentProcessor.Pipeline')
+
+STAGES = ('classify', 'ocr', 'index', 'persist')
+PRIORITY_CLASSES = ('express', 'normal', 'bulk')
+
+
+def model_stage_threads(config=None):
+    """
+    Aynı anda model çalıştırabilen aşama iş parçacığı sayısı (classify, ocr, index).
+    resources.configure'a RESOURCE_CONFIG['concurrent_stages'] olarak verilir.
+
+    Args:
+        config (dict, optional): SCHEDULER_CONFIG üzerine yazılacak değerler
+
+    Returns:
+        int: İş parçacığı sayısı
+    """
+    config = {**SCHEDULER_CONFIG, **(config or {})}
+    return sum(config['stage_workers'][stage] for stage in ('classify', 'ocr', 'index'))
+
+
+def priority_class(document_path, config=None):
+    """
+    Belgenin öncelik sınıfı. Kaynak klasör kuralı varsa o kullanılır, yoksa
+    sayfa sayısı ve dosya boyutuna bakılır.
+
+    Args:
+        document_path (str): Belge dosyasının yolu
+        config (dict, optional): SCHEDULER_CONFIG üzerine yazılacak değerler
+
+    Returns:
+        tuple: (sınıf, sayfa sayısı, dosya boyutu)
+    """
+    config = {**SCHEDULER_CONFIG, **(config or {})}
+    size = os.path.getsize(document_path)
+    try:
+        pages = document_page_count(document_path)
+    except Exception:
+        # Sayfa sayısı okunamıyorsa boyuta göre karar verilir
+        pages = 1
+
+    folder = os.path.basename(os.path.dirname(os.path.abspath(document_path)))
+    if folder in config['folder_priorities']:
+        priority = config['folder_priorities'][folder]
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Geçersiz öncelik sınıfı: {priority} (seçenekler: {PRIORITY_CLASSES})")
+        return priority, pages, size
+    if pages >= config['bulk_pages'] or size >= config['bulk_bytes']:
+        return 'bulk', pages, size
+    if pages <= config['express_pages'] and size <= config['express_bytes']:
+        return 'express', pages, size
+    return 'normal', pages, size
+
+
+class StageQueue:
+    def __init__(self, name, maxsize, bulk_limit):
+        """
+        Öncelik sınıfı başına FIFO tutan sınırlı kuyruk
+
+        Args:
+            name (str): Aşama adı
+            maxsize (int): Kuyruktaki en fazla iş (tüm sınıflar)
+            bulk_limit (int): Aşamada aynı anda çalışabilecek en fazla bulk iş
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.bulk_limit = bulk_limit
+        self._queues = {cls: deque() for cls in PRIORITY_CLASSES}
+        self._size = 0
+        self._closed = False
+        self.active = {cls: 0 for cls in PRIORITY_CLASSES}
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return self._size
+
+    def put(self, item, priority, timeout=None):
+        """
+        İşi kuyruğa ekler; kuyruk doluysa yer açılana kadar bekler (geri basınç)
+
+        Args:
+            item: İş
+            priority (str): Öncelik sınıfı
+            timeout (float, optional): En fazla bekleme (saniye)
+
+        Raises:
+            queue.Full: Süre içinde yer açılmadıysa
+        """
+        with self._cond:
+            if self._size >= self.maxsize:
+                METRICS.inc('pipeline_backpressure_total', stage=self.name)
+            if not self._cond.wait_for(lambda: self._size < self.maxsize or self._closed, timeout):
+                raise queue.Full(f"{self.name} kuyruğu dolu")
+            if self._closed:
+                raise RuntimeError(f"{self.name} kuyruğu kapatıldı")
+            self._queues[priority].append(item)
+            self._size += 1
+            self._cond.notify_all()
+
+    def _pop(self):
+        for cls in PRIORITY_CLASSES:
+            if not self._queues[cls]:
+                continue
+            if cls == 'bulk' and self.active['bulk'] >= self.bulk_limit:
+                continue
+            self._size -= 1
+            self.active[cls] += 1
+            return cls, self._queues[cls].popleft()
+        return None
+
+    def get(self):
+        """
+        En öncelikli alınabilir işi döndürür; kuyruk kapatılıp boşalınca None
+
+        Returns:
+            tuple: (öncelik sınıfı, iş) veya None
+        """
+        with self._cond:
+            while True:
+                got = self._pop()
+                if got is not None:
+                    self._cond.notify_all()
+                    return got
+                if self._closed and self._size == 0:
+                    return None
+                self._cond.wait()
+
+    def task_done(self, priority):
+        """Alınan işin bittiğini bildirir (bulk sınırı için)"""
+        with self._cond:
+            self.active[priority] -= 1
+            self._cond.notify_all()
+
+    def close(self):
+        """Yeni iş kabulünü durdurur; kuyruktaki işler yine de işlenir"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def fill_ratio(self):
+        return self._size / self.maxsize
+
+    def stats(self):
+        with self._cond:
+            return {
+                'queued': {cls: len(self._queues[cls]) for cls in PRIORITY_CLASSES},
+                'active': dict(self.active),
+                'maxsize': self.maxsize
+            }
+
+
+class _Job:
+    def __init__(self, document_path, priority, pages, size):
+        self.path = document_path
+        self.priority = priority
+        self.pages = pages
+        self.size = size
+        self.future = Future()
+        self.results = {}
+        self.stage_times = {}
+        self.start_time = datetime.datetime.now()
+        self.enqueued_at = time.perf_counter()
+        self.failed = False
+
+
+class PipelineScheduler:
+    def __init__(self, classifier, extractor, vector_db=None, analyzer=None, mongo_client=None, result_log=None,
+                 mode="full", check_duplicates=True, config=None):
+        """
+        Aşama iş parçacıklarını başlatır
+
+        Args:
+            classifier: DocumentClassifier nesnesi
+            extractor: UnstructuredTextExtractor nesnesi
+            vector_db (optional): DocumentVectorDB nesnesi
+            analyzer (optional): DocumentAnalyzer nesnesi (verilmezse analiz atlanır)
+            mongo_client (MongoDBClient, optional): Verilirse sonuçlar persist aşamasında kaydedilir
+            result_log (ResultLog, optional): Verilirse sonuçlar günlüğe eklenir
+            mode (str): Sonuç özetine yazılacak işleme modu
+            check_duplicates (bool): Duplikasyon kontrolü yapılacak mı
+            config (dict, optional): SCHEDULER_CONFIG üzerine yazılacak değerler
+        """
+        self.config = {**SCHEDULER_CONFIG, **(config or {})}
+        self.classifier = classifier
+        self.extractor = extractor
+        self.vector_db = vector_db
+        self.analyzer = analyzer
+        self.mongo_client = mongo_client
+        self.result_log = result_log
+        self.mode = mode
+        self.check_duplicates = check_duplicates
+        self._handlers = {
+            'classify': self._classify,
+            'ocr': self._ocr,
+            'index': self._index,
+            'persist': self._persist
+        }
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._capacity = threading.Condition()
+
+        self.queues = {}
+        self.threads = []
+        for stage in STAGES:
+            workers = self.config['stage_workers'][stage]
+            # Tek iş parçacıklı aşamada ayrılacak yer yoktur; öncelik sırası yine geçerlidir
+            bulk_limit = max(1, workers - self.config['reserved_workers'])
+            self.queues[stage] = StageQueue(stage, self.config['queue_size'][stage], bulk_limit)
+            for i in range(workers):
+                thread = threading.Thread(target=self._run_stage, args=(stage,), name=f"pipeline-{stage}-{i}",
+                                          daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+        logger.info("Aşama zamanlayıcı başlatıldı: " + ", ".join(
+            f"{stage}={self.config['stage_workers'][stage]} iş parçacığı/{self.config['queue_size'][stage]} kuyruk"
+            for stage in STAGES))
+
+    # ------------------------------------------------------------ kabul
+
+    def submit(self, document_path, priority=None, timeout=None):
+        """
+        Belgeyi işlenmek üzere kabul eder. İlk aşama kuyruğu doluysa bekler.
+
+        Args:
+            document_path (str): Belge dosyasının yolu
+            priority (str, optional): Öncelik sınıfı (verilmezse priority_class ile belirlenir)
+            timeout (float, optional): Kuyrukta yer için en fazla bekleme (saniye)
+
+        Returns:
+            concurrent.futures.Future: Sonucu process_document biçiminde döndürür
+
+        Raises:
+            queue.Full: Süre içinde yer açılmadıysa
+        """
+        if not os.path.exists(document_path):
+            future = Future()
+            METRICS.inc('documents_total', status='not_found')
+            future.set_result({
+                "status": "error",
+                "error": f"Dosya bulunamadı: {document_path}",
+                "file_path": document_path
+            })
+            return future
+
+        detected, pages, size = priority_class(document_path, self.config)
+        job = _Job(document_path, priority or detected, pages, size)
+        with self._in_flight_lock:
+            self._in_flight += 1
+        try:
+            self.queues['classify'].put(job, job.priority, timeout)
+        except Exception:
+            self._job_finished()
+            raise
+        METRICS.inc('pipeline_jobs_total', priority=job.priority)
+        logger.info(f"Belge kabul edildi: {document_path} ({job.priority}, {pages} sayfa, {size} bayt)")
+        return job.future
+
+    def saturated(self):
+        """Herhangi bir aşama kuyruğu yüksek doluluk eşiğini aştıysa True"""
+        watermark = self.config['high_watermark']
+        return any(stage_queue.fill_ratio() >= watermark for stage_queue in self.queues.values())
+
+    def wait_for_capacity(self, timeout=None):
+        """
+        Kuyruklar yüksek doluluk eşiğinin altına inene kadar bekler
+
+        Args:
+            timeout (float, optional): En fazla bekleme (saniye)
+
+        Returns:
+            bool: Yer açıldıysa True
+        """
+        with self._capacity:
+            return self._capacity.wait_for(lambda: not self.saturated(), timeout)
+
+    def in_flight(self):
+        """Kabul edilmiş ve henüz bitmemiş belge sayısı"""
+        return self._in_flight
+
+    def stats(self):
+        """Aşama başına kuyruk ve çalışan iş sayıları"""
+        return {stage: self.queues[stage].stats() for stage in STAGES}
+
+    # ------------------------------------------------------------ aşamalar
+
+    def _run_stage(self, stage):
+        stage_queue = self.queues[stage]
+        next_stage = STAGES[STAGES.index(stage) + 1] if stage != STAGES[-1] else None
+        while True:
+            got = stage_queue.get()
+            if got is None:
+                return
+            priority, job = got
+            with self._capacity:
+                self._capacity.notify_all()
+
+            wait = time.perf_counter() - job.enqueued_at
+            METRICS.observe(f"queue_wait_{stage}", wait)
+            job.stage_times['queue_wait'] = job.stage_times.get('queue_wait', 0.0) + wait
+            try:
+                with METRICS.collect_stage_times(job.stage_times):
+                    self._handlers[stage](job)
+            except Exception as e:
+                logger.error(f"{stage} aşaması hatası ({job.path}): {e}")
+                self._fail(job, e)
+            finally:
+                stage_queue.task_done(priority)
+
+            if job.failed:
+                continue
+            if next_stage is None:
+                continue
+            job.enqueued_at = time.perf_counter()
+            try:
+                # Sonraki aşama doluysa bu iş parçacığı da bekler; geri basınç kabule kadar yayılır
+                self.queues[next_stage].put(job, job.priority)
+            except RuntimeError as e:
+                # Beklemeden kapatıldı (close(wait=False))
+                self._fail(job, e)
+
+    def _classify(self, job):
+        logger.info(f"Belge işleniyor: {job.path}")
+        classify_step(job.results, job.path, self.classifier)
+
+    def _ocr(self, job):
+        if extract_step(job.results, job.path, self.extractor):
+            duplicate_step(job.results, self.vector_db, self.check_duplicates)
+
+    def _index(self, job):
+        analysis_step(job.results, self.analyzer, skip_analysis=self.analyzer is None)
+        finish_step(job.results, job.path, job.start_time)
+        index_step(job.results, job.path, self.vector_db, self.check_duplicates)
+
+    def _persist(self, job):
+        result = job.results
+        result['processing_info']['stage_times'] = {
+            stage: round(seconds, 4) for stage, seconds in job.stage_times.items()
+        }
+        result['processing_info']['priority'] = job.priority
+
+        if self.mongo_client is not None:
+            try:
+                doc_id = self.mongo_client.save_document(format_result_for_mongodb(result))
+                if doc_id:
+                    result['mongodb_id'] = doc_id
+                else:
+                    logger.warning("Belge MongoDB'ye kaydedilemedi")
+            except Exception as e:
+                logger.error(f"MongoDB kayıt hatası: {e}")
+                result['mongodb_error'] = str(e)
+
+        processing_time = add_processing_summary(result, self.mode, job.start_time)
+        if self.result_log is not None:
+            self.result_log.append(result)
+
+        METRICS.inc('documents_total', status='success')
+        METRICS.observe(f"pipeline_{job.priority}", processing_time)
+        logger.info(f"Belge işleme tamamlandı: {job.path}, Süre: {processing_time:.2f} sn ({job.priority})")
+        self._job_finished()
+        job.future.set_result(result)
+
+    def _fail(self, job, error):
+        job.failed = True
+        METRICS.inc('documents_total', status='error')
+        self._job_finished()
+        job.future.set_result({
+            "status": "error",
+            "file_path": job.path,
+            "error": str(error)
+        })
+
+    def _job_finished(self):
+        with self._in_flight_lock:
+            self._in_flight -= 1
+
+    # ------------------------------------------------------------ kapanış
+
+    def close(self, wait=True):
+        """
+        Kabulü durdurur; wait ise kuyruktaki belgeler bitene kadar bekler
+
+        Args:
+            wait (bool): Aşama iş parçacıklarının bitmesini bekle
+        """
+        # Aşamalar sırayla kapatılır; önceki aşamanın iş parçacıkları bitmeden sonraki kapanmaz
+        for stage in STAGES:
+            self.queues[stage].close()
+            if wait:
+                for thread in self.threads:
+                    if thread.name.startswith(f"pipeline-{stage}-"):
+                        thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
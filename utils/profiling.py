@@ -0,0 +1,333 @@
+"""
+Belge bazlı profil çıkarma.
+
+Bir belgenin işlenmesi sırasında üç kaynak toplanır:
+    - Yığın örnekleyici: arka plan iş parçacığı sabit aralıklarla belgeyi
+      işleyen iş parçacığının (ve profiled_target ile başlattığı çalışanların,
+      ör. OCR/LLM zaman aşımı iş parçacıkları) yığınlarını okur ve
+      flamegraph.pl / speedscope ile açılabilen "collapsed stacks" dosyası
+      yazar. Ek yükü düşüktür, üretimde açık kalabilir.
+    - cProfile: fonksiyon bazında çağrı sayısı ve süreleri (.pstats). Tekrarlanan
+      görüntü çözme veya koleksiyon yükleme gibi sorunlar çağrı sayısında görünür.
+      Yalnızca çağıran iş parçacığını ölçer; OCR iş parçacığı yığın
+      örnekleyicide ve aşama özetinde görünür.
+    - torch profiler: (kuruluysa) operatör bazında Chrome trace (.torch.json).
+
+Her profil için ayrıca aşama özeti (.stages.json) yazılır: aşama süreleri,
+aşama çağrı sayıları ve en pahalı fonksiyonlar.
+
+Eşzamanlı işlemede (Process Documents, hat zamanlayıcısı, grup LLM servisi)
+başka belgelerin iş parçacıkları örneklenmez. Paylaşılan iş parçacıklarında
+(hat aşamaları, llm-batcher) yapılan iş ise hiçbir belgenin yığınlarına girmez;
+bu iş yalnızca belgenin stage_times alanında görünür. stage_calls ve torch
+profiler süreç geneli olduğundan yalnızca belgeler sırayla işlenirken belgeye
+özgüdür.
+
+Kullanım:
+    profiler = DocumentProfiler(mode='full')
+    with profiler.profile('belge.tif') as session:
+        result = process_single_document(...)
+    result['processing_info']['profile'] = session.save(result)
+"""
+import os
+import sys
+import json
+import time
+import random
+import pstats
+import cProfile
+import datetime
+import threading
+import logging
+from collections import Counter
+from contextlib import contextmanager
+
+from config.settings import PROFILING_CONFIG
+from utils.metrics import METRICS
+
+logger = logging.getLogger('DocumentProcessor.Profiling')
+
+# İş parçacığı kimliği -> o iş parçacığında profili çıkarılan oturum
+_active_sessions = {}
+_active_lock = threading.Lock()
+
+
+def profiled_target(target):
+    """
+    Çağıranın profil oturumu varsa, yeni iş parçacığının da aynı oturumda
+    örneklenmesi için hedef fonksiyonu sarar. Oturum yoksa hedefi aynen döndürür.
+
+    Args:
+        target (callable): threading.Thread hedefi
+
+    Returns:
+        callable
+    """
+    with _active_lock:
+        session = _active_sessions.get(threading.get_ident())
+    if session is None:
+        return target
+
+    def run(*args, **kwargs):
+        ident = threading.get_ident()
+        session.sampler.add_thread(ident)
+        try:
+            return target(*args, **kwargs)
+        finally:
+            session.sampler.remove_thread(ident)
+    return run
+
+
+class StackSampler:
+    def __init__(self, interval=None):
+        """
+        Args:
+            interval (float, optional): Örnekleme aralığı (saniye). Varsayılan
+                PROFILING_CONFIG['sample_interval'].
+        """
+        self.interval = interval or PROFILING_CONFIG['sample_interval']
+        self.stacks = Counter()
+        self.samples = 0
+        # Yalnızca bu iş parçacıkları örneklenir (belgeyi işleyen ve başlattığı çalışanlar)
+        self._threads = set()
+        self._threads_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_thread(self, ident):
+        with self._threads_lock:
+            self._threads.add(ident)
+
+    def remove_thread(self, ident):
+        with self._threads_lock:
+            self._threads.discard(ident)
+
+    @staticmethod
+    def _frame_label(frame):
+        code = frame.f_code
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+    def _sample(self):
+        with self._threads_lock:
+            threads = set(self._threads)
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident not in threads:
+                continue
+            name = names.get(ident, str(ident))
+            labels = []
+            while frame is not None:
+                labels.append(self._frame_label(frame))
+                frame = frame.f_back
+            labels.append(name)
+            self.stacks[';'.join(reversed(labels))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def write_collapsed(self, path):
+        """Yığınları 'çerçeve1;çerçeve2;... sayı' biçiminde yazar"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfileSession:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.started = datetime.datetime.now()
+        self.wall_time = 0.0
+        self.sampler = StackSampler(profiler.sample_interval)
+        self.cprofile = cProfile.Profile() if profiler.mode == 'full' else None
+        self.torch_profile = None
+        self._metrics_before = METRICS.snapshot()['stages']
+
+    def _start_torch(self):
+        try:
+            import torch
+            from torch.profiler import profile, ProfilerActivity
+        except ImportError:
+            return
+        activities = [ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(ProfilerActivity.CUDA)
+        self.torch_profile = profile(activities=activities)
+        self.torch_profile.__enter__()
+
+    def start(self):
+        self._start = time.perf_counter()
+        self._ident = threading.get_ident()
+        with _active_lock:
+            _active_sessions[self._ident] = self
+        self.sampler.add_thread(self._ident)
+        self.sampler.start()
+        if self.cprofile is not None:
+            try:
+                self.cprofile.enable()
+            except ValueError as e:
+                # Süreçte başka bir profil aracı etkinse yalnızca örnekleme yapılır
+                logger.warning(f"cProfile başlatılamadı: {e}")
+                self.cprofile = None
+                return
+            if self.profiler.torch_trace:
+                self._start_torch()
+
+    def stop(self):
+        if self.torch_profile is not None:
+            self.torch_profile.__exit__(None, None, None)
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        self.sampler.stop()
+        with _active_lock:
+            _active_sessions.pop(self._ident, None)
+        self.wall_time = time.perf_counter() - self._start
+
+    def _stage_calls(self):
+        """Profil süresince aşama başına zamanlayıcı çağrı sayısı"""
+        after = METRICS.snapshot()['stages']
+        return {
+            stage: data['count'] - self._metrics_before.get(stage, {}).get('count', 0)
+            for stage, data in after.items()
+            if data['count'] != self._metrics_before.get(stage, {}).get('count', 0)
+        }
+
+    def _top_functions(self, limit):
+        """cProfile'dan kümülatif süreye göre en pahalı fonksiyonlar"""
+        stats = pstats.Stats(self.cprofile)
+        rows = []
+        for (file_name, line, func), (cc, nc, tt, ct, callers) in stats.stats.items():
+            rows.append({
+                'function': f"{os.path.basename(file_name)}:{line}:{func}",
+                'calls': nc,
+                'total_time': round(tt, 4),
+                'cumulative_time': round(ct, 4)
+            })
+        rows.sort(key=lambda row: row['cumulative_time'], reverse=True)
+        return rows[:limit]
+
+    def _top_torch_ops(self, limit):
+        averages = self.torch_profile.key_averages()
+        rows = [{
+            'op': event.key,
+            'calls': event.count,
+            'cpu_time_ms': round(event.cpu_time_total / 1000, 3)
+        } for event in averages]
+        rows.sort(key=lambda row: row['cpu_time_ms'], reverse=True)
+        return rows[:limit]
+
+    def save(self, result=None):
+        """
+        Profil dosyalarını yazar
+
+        Args:
+            result (dict, optional): İşleme sonucu (aşama süreleri özete eklenir)
+
+        Returns:
+            dict: Yazılan dosyaların yolları
+        """
+        prefix = self.profiler.prefix_for(self.name, self.started)
+        paths = {}
+
+        paths['collapsed'] = f"{prefix}.collapsed"
+        self.sampler.write_collapsed(paths['collapsed'])
+
+        limit = PROFILING_CONFIG['top_functions']
+        summary = {
+            'document': self.name,
+            'start_time': self.started.isoformat(),
+            'wall_time': round(self.wall_time, 4),
+            'mode': self.profiler.mode,
+            'samples': self.sampler.samples,
+            'sample_interval': self.sampler.interval,
+            'stage_times': ((result or {}).get('processing_info') or {}).get('stage_times', {}),
+            'stage_calls': self._stage_calls()
+        }
+
+        if self.cprofile is not None:
+            paths['pstats'] = f"{prefix}.pstats"
+            self.cprofile.dump_stats(paths['pstats'])
+            summary['top_functions'] = self._top_functions(limit)
+
+        if self.torch_profile is not None:
+            paths['torch_trace'] = f"{prefix}.torch.json"
+            self.torch_profile.export_chrome_trace(paths['torch_trace'])
+            summary['top_torch_ops'] = self._top_torch_ops(limit)
+
+        paths['stages'] = f"{prefix}.stages.json"
+        with open(paths['stages'], 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+        logger.info(f"Profil yazıldı: {paths['stages']}")
+        return paths
+
+
+class DocumentProfiler:
+    def __init__(self, output_dir=None, mode=None, rate=1.0, sample_interval=None, torch_trace=True,
+                 prefix=None):
+        """
+        Args:
+            output_dir (str, optional): Profil dosyalarının dizini. Varsayılan PROFILING_CONFIG['directory'].
+            mode (str, optional): 'sampling' (yalnızca yığın örnekleme, düşük ek yük) veya
+                'full' (cProfile ve torch profiler dahil). Varsayılan PROFILING_CONFIG['mode'].
+            rate (float): Profili çıkarılacak belge oranı (0.0-1.0)
+            sample_interval (float, optional): Yığın örnekleme aralığı (saniye)
+            torch_trace (bool): 'full' modda torch profiler kullanılsın mı
+            prefix (str, optional): Sabit dosya öneki (ör. sonuç dosyasının yanına yazmak için)
+        """
+        self.output_dir = output_dir or PROFILING_CONFIG['directory']
+        self.mode = mode or PROFILING_CONFIG['mode']
+        self.rate = rate
+        self.sample_interval = sample_interval or PROFILING_CONFIG['sample_interval']
+        self.torch_trace = torch_trace
+        self.prefix = prefix
+        if self.mode not in ('sampling', 'full'):
+            raise ValueError(f"Geçersiz profil modu: {self.mode}")
+
+    def should_profile(self):
+        """Bu belgenin profilinin çıkarılıp çıkarılmayacağına karar verir"""
+        return self.rate >= 1.0 or (self.rate > 0 and random.random() < self.rate)
+
+    def prefix_for(self, name, started):
+        """Profil dosyaları için yol öneki"""
+        if self.prefix:
+            os.makedirs(os.path.dirname(os.path.abspath(self.prefix)), exist_ok=True)
+            return self.prefix
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = started.strftime('%Y%m%d_%H%M%S_%f')
+        return os.path.join(self.output_dir, f"{stamp}_{os.path.basename(name)}")
+
+    @contextmanager
+    def profile(self, name):
+        """
+        Blok süresince profil toplar. Oran dışında kalan belgelerde None verir.
+
+        Args:
+            name (str): Belge adı/yolu (dosya adlarında kullanılır)
+
+        Yields:
+            ProfileSession veya None
+        """
+        if not self.should_profile():
+            yield None
+            return
+
+        session = ProfileSession(self, name)
+        session.start()
+        try:
+            yield session
+        finally:
+            session.stop()
@@ -0,0 +1,226 @@
+"""
+Aşama kökeni (provenance): sonucu üreten modellerin kimlikleri.
+
+Kalıcı her sonuç, çalışan aşamaların model kimliğini 'provenance' altında taşır:
+    classifier: Swin ağırlık dosyasının SHA-256 özeti (kademeli modda ucuz model ve eşiği de)
+    ocr:        EasyOCR sürümü ve dil listesi
+    embedding:  SentenceTransformer model adı ve sentence-transformers sürümü
+PROVENANCE_CONFIG['versions'] altındaki elle verilen sürüm etiketleri de
+kimliğe girer. Örneğin aynı adla yeniden indirilen bir gömme modeli için
+etiket artırılır. Her kaydın 'fingerprint' alanı kimliği tek bir değere
+indirger. Model yükseltmesinden sonra document_reprocessor.py yalnızca parmak
+izi değişen aşamaları yeniden çalıştırır.
+
+Kimlikler torch/easyocr içe aktarılmadan hesaplanır (paket sürümleri
+importlib.metadata'dan), böylece yeniden işleme planı modeller yüklenmeden
+çıkarılabilir.
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+from config.settings import MODEL_CONFIG, MODEL_PATH, OCR_CONFIG, VECTORDB_CONFIG, PROVENANCE_CONFIG
+
+logger = logging.getLogger('DocumentProcessor.Provenance')
+
+STAGES = ('classifier', 'ocr', 'embedding')
+
+_digest_lock = threading.Lock()
+_digests = {}   # (yol, boyut, mtime_ns) -> sha256
+
+
+def file_digest(path):
+    """
+    Dosyanın SHA-256 özeti. Sonuç (yol, boyut, değişme zamanı) anahtarıyla
+    saklanır; aynı ağırlık dosyası süreç içinde bir kez okunur.
+
+    Args:
+        path (str): Dosya yolu
+
+    Returns:
+        str: Onaltılık özet veya dosya yoksa None
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _digest_lock:
+        if key in _digests:
+            return _digests[key]
+
+    digest = hashlib.sha256()
+    chunk_bytes = PROVENANCE_CONFIG.get('hash_chunk_bytes', 4 * 1024 * 1024)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_bytes), b''):
+            digest.update(chunk)
+    value = digest.hexdigest()
+    with _digest_lock:
+        _digests[key] = value
+    return value
+
+
+def package_version(name):
+    """Kurulu paketin sürümü (paketi içe aktarmadan); kurulu değilse None"""
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        return None
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+def _stamp(stage, identity):
+    """Kimliğe sürüm etiketini ve parmak izini ekler"""
+    identity['version'] = PROVENANCE_CONFIG.get('versions', {}).get(stage)
+    canonical = json.dumps(identity, sort_keys=True, default=str)
+    identity['fingerprint'] = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+    return identity
+
+
+def classifier_provenance(model_path=None, cascade_path=None, cascade_threshold=None):
+    """
+    Sınıflandırma aşamasının kimliği
+
+    Args:
+        model_path (str, optional): Swin ağırlık dosyası. Varsayılan MODEL_PATH.
+        cascade_path (str, optional): Kademeli modda kullanılan ucuz model dosyası
+        cascade_threshold (float, optional): Ucuz modelin geçerli güven eşiği
+
+    Returns:
+        dict: {'model', 'weights', 'sha256', ['cascade'], 'version', 'fingerprint'}
+    """
+    model_path = model_path or MODEL_PATH
+    identity = {
+        'model': MODEL_CONFIG['pretrained_model'],
+        'weights': os.path.basename(model_path),
+        'sha256': file_digest(model_path)
+    }
+    if cascade_path:
+        identity['cascade'] = {
+            'weights': os.path.basename(cascade_path),
+            'sha256': file_digest(cascade_path),
+            'threshold': cascade_threshold
+        }
+    return _stamp('classifier', identity)
+
+
+def ocr_provenance(languages=None):
+    """
+    OCR aşamasının kimliği
+
+    Args:
+        languages (list, optional): EasyOCR dil listesi. Varsayılan OCR_CONFIG['languages'].
+
+    Returns:
+        dict: {'engine', 'engine_version', 'languages', 'version', 'fingerprint'}
+    """
+    languages = languages or OCR_CONFIG.get('languages', ['tr', 'en'])
+    return _stamp('ocr', {
+        'engine': 'easyocr',
+        'engine_version': package_version('easyocr'),
+        # Tanıma modeli dil kümesinden seçilir; sıra kimliği değiştirmez
+        'languages': sorted(languages)
+    })
+
+
+def embedding_provenance(model_name=None):
+    """
+    Gömme aşamasının kimliği
+
+    Args:
+        model_name (str, optional): SentenceTransformer modeli. Varsayılan VECTORDB_CONFIG['model_name'].
+
+    Returns:
+        dict: {'model', 'library_version', 'version', 'fingerprint'}
+    """
+    return _stamp('embedding', {
+        'model': model_name or VECTORDB_CONFIG['model_name'],
+        'library_version': package_version('sentence-transformers')
+    })
+
+
+def _configured_cascade():
+    """Yapılandırmaya göre sınıflandırıcının yükleyeceği ucuz model (yol, eşik) veya (None, None)"""
+    if not MODEL_CONFIG.get('cascade', False):
+        return None, None
+    path = MODEL_CONFIG.get('cascade_model_path')
+    if not path or not os.path.exists(path):
+        return None, None
+    threshold = MODEL_CONFIG.get('cascade_threshold')
+    if threshold is None:
+        try:
+            from models.cascade import PixelClassifier
+            threshold = PixelClassifier.load(path).threshold
+        except Exception as e:
+            logger.warning(f"Kademeli model okunamadı, sınıflandırıcı onsuz çalışacak: {e}")
+            return None, None
+    return path, threshold
+
+
+def current_provenance(model_path=None):
+    """
+    Yapılandırmadaki modellerle üretilecek sonuçların aşama kimlikleri
+    (modeller yüklenmeden)
+
+    Args:
+        model_path (str, optional): Swin ağırlık dosyası. Varsayılan MODEL_PATH.
+
+    Returns:
+        dict: {aşama: kimlik}
+    """
+    cascade_path, cascade_threshold = _configured_cascade()
+    return {
+        'classifier': classifier_provenance(model_path, cascade_path, cascade_threshold),
+        'ocr': ocr_provenance(),
+        'embedding': embedding_provenance()
+    }
+
+
+def record_stage(results, stage, component):
+    """
+    Aşamayı çalıştıran bileşenin kimliğini sonuca yazar. Kimliği olmayan
+    bileşenlerde (ör. ölçüm taslakları) hiçbir şey yapılmaz.
+
+    Args:
+        results (dict): Sonuç sözlüğü
+        stage (str): STAGES'ten biri
+        component: provenance özniteliği taşıyan model nesnesi
+    """
+    provenance = getattr(component, 'provenance', None)
+    if provenance:
+        record = dict(provenance)
+        record['recorded_at'] = datetime.now().isoformat()
+        results.setdefault('provenance', {})[stage] = record
+
+
+def stale_stages(stored, current, stages=STAGES, trust_unknown=None):
+    """
+    Saklanan kimliği güncel kimlikten farklı olan aşamalar
+
+    Args:
+        stored (dict): Kayıttaki 'provenance' (yoksa None)
+        current (dict): current_provenance() sonucu
+        stages (tuple): Bakılacak aşamalar
+        trust_unknown (tuple, optional): Kimliği kayıtta olmayan ama güncel sayılacak aşamalar.
+            Varsayılan PROVENANCE_CONFIG['trust_unknown'].
+
+    Returns:
+        set: Eskimiş aşamalar
+    """
+    stored = stored or {}
+    trust_unknown = PROVENANCE_CONFIG.get('trust_unknown', ()) if trust_unknown is None else trust_unknown
+    stale = set()
+    for stage in stages:
+        record = stored.get(stage)
+        if record is None:
+            if stage not in trust_unknown:
+                stale.add(stage)
+        elif record.get('fingerprint') != current[stage]['fingerprint']:
+            stale.add(stage)
+    return stale
@@ -0,0 +1,269 @@
+"""
+Çalışma zamanı kaynak planı.
+
+Aynı makinede birden çok işçi süreci çalıştığında her birinin varsayılan
+torch/OpenMP ayarı makinenin tüm çekirdeklerini kullanmaya çalışır; işçi
+eklendikçe iş parçacıkları birbirini bekler ve verim düşer. Planlayıcı
+başlangıçta çekirdekleri (CPU affinity ve cgroup kotası dahil) ve CUDA
+cihazlarını algılar, çekirdekleri işçiler arasında böler ve seçtiği planı
+günlüğe yazar.
+
+torch'un iş parçacığı havuzu süreç geneldir; sayısı süreç başında bir kez
+ayarlanır. Aşamalar sırayla çalışıyorsa her model işçinin tüm çekirdeklerini
+kullanır. Aşama zamanlayıcısında (utils/pipeline.py) model aşamaları aynı
+anda çalıştığından işçinin payı eşzamanlı aşama iş parçacıklarına bölünür
+(RESOURCE_CONFIG['concurrent_stages']).
+
+    İşçi sayısı   : RESOURCE_CONFIG['workers_per_host'] veya DOCFLOW_WORKERS
+    İşçi sırası   : RESOURCE_CONFIG['worker_index'] veya DOCFLOW_WORKER_INDEX
+
+Kullanım:
+    from utils.resources import component_device
+
+    device = component_device('classifier')
+
+Planı görmek için:
+    python -m utils.resources --workers 4 --worker_index 1
+"""
+import os
+import sys
+import json
+import argparse
+import threading
+import logging
+
+from config.settings import RESOURCE_CONFIG
+
+logger = logging.getLogger('DocumentProcessor.Resources')
+
+COMPONENTS = ('classifier', 'ocr', 'embedding', 'analyzer')
+
+# Süreç genelindeki sayısal kütüphanelerin iş parçacığı ayarları
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+_plan = None
+_plan_lock = threading.Lock()
+
+
+def _cgroup_cpu_limit():
+    """Konteynerin CPU kotası (çekirdek cinsinden); sınır yoksa None"""
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()[:2]
+        if quota != 'max':
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+        if quota > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _cpu_set():
+    """Sürecin çalışabileceği çekirdeklerin listesi"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def _cuda_devices():
+    try:
+        import torch
+    except ImportError:
+        return []
+    if not torch.cuda.is_available():
+        return []
+    devices = []
+    for i in range(torch.cuda.device_count()):
+        properties = torch.cuda.get_device_properties(i)
+        devices.append({
+            'index': i,
+            'name': properties.name,
+            'memory_gb': round(properties.total_memory / 1024 ** 3, 1)
+        })
+    return devices
+
+
+def detect_resources():
+    """
+    Makinenin kullanılabilir kaynaklarını algılar
+
+    Returns:
+        dict: {'cores': çekirdek sayısı, 'cpu_set': çekirdek numaraları, 'gpus': CUDA cihazları}
+    """
+    cpu_set = _cpu_set()
+    cores = len(cpu_set)
+    quota = _cgroup_cpu_limit()
+    if quota is not None:
+        cores = max(1, min(cores, int(quota)))
+    return {'cores': cores, 'cpu_set': cpu_set, 'gpus': _cuda_devices()}
+
+
+def plan_resources(workers=None, worker_index=None, resources=None, config=None):
+    """
+    İşçi ve bileşen bazında iş parçacığı ve cihaz planı çıkarır
+
+    Args:
+        workers (int, optional): Makinedeki işçi süreci sayısı
+        worker_index (int, optional): Bu işçinin sırası (0'dan başlar)
+        resources (dict, optional): detect_resources() çıktısı (verilmezse algılanır)
+        config (dict, optional): RESOURCE_CONFIG üzerine yazılacak değerler
+
+    Returns:
+        dict: Kaynak planı
+    """
+    config = {**RESOURCE_CONFIG, **(config or {})}
+    resources = resources or detect_resources()
+
+    if workers is None:
+        workers = config['workers_per_host'] or os.environ.get('DOCFLOW_WORKERS') or 1
+    if worker_index is None:
+        worker_index = config['worker_index']
+        if worker_index is None:
+            worker_index = os.environ.get('DOCFLOW_WORKER_INDEX', 0)
+    workers = max(1, int(workers))
+    worker_index = int(worker_index) % workers
+
+    cores = resources['cores']
+    usable = max(1, cores - config['reserved_cores'])
+    worker_threads = max(1, usable // workers)
+    if workers > usable:
+        logger.warning(f"İşçi sayısı ({workers}) kullanılabilir çekirdek sayısını ({usable}) aşıyor")
+
+    cpu_set = resources.get('cpu_set') or list(range(cores))
+    first = (worker_index * worker_threads) % len(cpu_set)
+    worker_cores = [cpu_set[(first + i) % len(cpu_set)] for i in range(worker_threads)]
+
+    gpus = resources['gpus']
+    device = 'cpu'
+    if config['use_gpu'] and gpus:
+        device = f"cuda:{gpus[worker_index % len(gpus)]['index']}"
+
+    # Aynı anda model çalıştıran aşama iş parçacıkları ortak havuzu paylaşır
+    concurrent_stages = max(1, int(config.get('concurrent_stages') or 1))
+    torch_threads = max(1, worker_threads // concurrent_stages)
+
+    return {
+        'cores': cores,
+        'gpus': gpus,
+        'workers': workers,
+        'worker_index': worker_index,
+        'worker_threads': worker_threads,
+        'worker_cores': worker_cores,
+        'device': device,
+        'concurrent_stages': concurrent_stages,
+        'torch_threads': torch_threads,
+        'interop_threads': config['interop_threads'],
+        'pin_cores': config['pin_cores'],
+        'components': {
+            name: {'device': device} for name in COMPONENTS
+        }
+    }
+
+
+def apply_plan(plan):
+    """
+    Planı süreç geneline uygular: ortam değişkenleri, torch iş parçacıkları,
+    OpenCV iş parçacıkları ve (istenirse) çekirdek sabitleme. torch havuzu
+    yalnızca burada ayarlanır; aşamalar çalışırken değiştirilmez.
+
+    Args:
+        plan (dict): plan_resources() çıktısı
+    """
+    threads = plan['torch_threads']
+    for name in THREAD_ENV_VARS:
+        # Alt süreçler ve henüz yüklenmemiş kütüphaneler de aynı sınırı görür
+        os.environ[name] = str(threads)
+
+    if plan['pin_cores'] and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, plan['worker_cores'])
+        except OSError as e:
+            logger.warning(f"Çekirdek sabitleme başarısız: {e}")
+
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(plan['interop_threads'])
+        except RuntimeError:
+            # Paralel iş başladıktan sonra değiştirilemez
+            logger.debug("torch inter-op iş parçacığı sayısı zaten ayarlanmış")
+    except ImportError:
+        pass
+
+    if 'cv2' in sys.modules:
+        sys.modules['cv2'].setNumThreads(threads)
+
+
+def format_plan(plan):
+    """Planı günlük için okunabilir metne çevirir"""
+    gpus = ', '.join(f"{gpu['index']}:{gpu['name']} ({gpu['memory_gb']} GB)" for gpu in plan['gpus']) or 'yok'
+    return (f"Kaynak planı: {plan['cores']} çekirdek, GPU: {gpus}; "
+            f"işçi {plan['worker_index'] + 1}/{plan['workers']} -> {plan['worker_threads']} iş parçacığı, "
+            f"cihaz {plan['device']}; torch: {plan['torch_threads']} iş parçacığı "
+            f"({plan['concurrent_stages']} eşzamanlı aşama)")
+
+
+def configure(workers=None, worker_index=None, config=None):
+    """
+    Planı (bir kez) çıkarır, uygular ve günlüğe yazar. Tekrar çağrıldığında
+    argüman verilmişse plan yeniden çıkarılır.
+
+    Args:
+        workers (int, optional): Makinedeki işçi süreci sayısı
+        worker_index (int, optional): Bu işçinin sırası
+        config (dict, optional): RESOURCE_CONFIG üzerine yazılacak değerler
+
+    Returns:
+        dict: Uygulanan plan
+    """
+    global _plan
+    with _plan_lock:
+        if _plan is None or workers is not None or worker_index is not None or config:
+            _plan = plan_resources(workers, worker_index, config=config)
+            apply_plan(_plan)
+            logger.info(format_plan(_plan))
+        return _plan
+
+
+def get_plan():
+    """Geçerli plan; henüz çıkarılmadıysa varsayılanlarla çıkarılır"""
+    return _plan or configure()
+
+
+def component_device(component):
+    """
+    Bileşenin çalışacağı cihaz
+
+    Args:
+        component (str): 'classifier', 'ocr', 'embedding' veya 'analyzer'
+
+    Returns:
+        str: 'cpu' veya 'cuda:N'
+    """
+    return get_plan()['components'][component]['device']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Çalışma zamanı kaynak planını göster")
+    parser.add_argument("--workers", type=int, help="Makinedeki işçi süreci sayısı")
+    parser.add_argument("--worker_index", type=int, help="İşçinin sırası (0'dan başlar)")
+    args = parser.parse_args()
+
+    plan = plan_resources(args.workers, args.worker_index)
+    print(format_plan(plan))
+    print(json.dumps(plan, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+"""
+Yalnızca eklemeli JSON Lines sonuç günlüğü.
+
+Her belge için ayrı, girintili bir JSON dosyası yazmak yerine sonuçlar tek
+satırlık kompakt JSON olarak segment dosyalarına eklenir. Segmentler boyut
+veya süre sınırına ulaşınca döndürülür. Her kayıt için (segment, ofset,
+uzunluk) bilgisi index.jsonl dosyasına eklenir; böylece dosya adına veya metin
+hash'ine göre sonuç, segment taranmadan doğrudan okunabilir.
+
+Yeni segment açılırken RESULT_LOG_CONFIG['max_segments'] sınırını aşan eski
+segmentler silinir. Silinen (veya dışarıdan kaldırılan) segmentlere ait
+indeks kayıtları da index.jsonl yeniden yazılarak budanır.
+
+Dizin yapısı:
+    processed_results/
+        results-20250314_160645_000000.jsonl
+        results-20250315_090112_000000.jsonl
+        index.jsonl
+"""
+import os
+import glob
+import json
+import time
+import hashlib
+import datetime
+import threading
+import logging
+
+from config.settings import RESULT_LOG_CONFIG
+
+try:
+    import fcntl
+except ImportError:  # Windows: tek yazıcı süreç varsayılır
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger('DocumentProcessor.ResultLog')
+
+SEGMENT_PREFIX = "results-"
+SEGMENT_SUFFIX = ".jsonl"
+INDEX_FILE = "index.jsonl"
+
+
+def _json_default(obj):
+    """json modülünün tanımadığı tipler için dönüşüm"""
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if hasattr(obj, 'tolist'):  # numpy dizileri ve skalerleri
+        return obj.tolist()
+    if isinstance(obj, bytes):
+        return obj.hex()
+    return str(obj)
+
+
+def dumps_compact(obj):
+    """
+    Sonucu tek satırlık kompakt JSON baytlarına çevirir.
+    orjson kuruluysa onu, değilse standart json modülünü kullanır.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'),
+                      default=_json_default).encode('utf-8')
+
+
+def loads(data):
+    """JSON baytlarını sözlüğe çevirir"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def text_hash(text):
+    """Metin hash'i - vektör veritabanındaki text_hash ile aynı (MD5)"""
+    return hashlib.md5((text or "").encode('utf-8')).hexdigest()
+
+
+class ResultLog:
+    def __init__(self, directory=None, max_segment_bytes=None, max_segment_age=None, max_segments=None):
+        """
+        Sonuç günlüğünü açar
+
+        Args:
+            directory (str, optional): Segmentlerin yazılacağı dizin. Varsayılan RESULT_LOG_CONFIG['directory'].
+            max_segment_bytes (int, optional): Segment boyut sınırı (bayt)
+            max_segment_age (int, optional): Segment yaş sınırı (saniye)
+            max_segments (int, optional): Tutulacak en fazla segment. Varsayılan
+                RESULT_LOG_CONFIG['max_segments'] (None: sınırsız).
+        """
+        self.directory = directory or RESULT_LOG_CONFIG['directory']
+        self.max_segment_bytes = max_segment_bytes or RESULT_LOG_CONFIG['max_segment_bytes']
+        self.max_segment_age = max_segment_age or RESULT_LOG_CONFIG['max_segment_age']
+        self.max_segments = max_segments or RESULT_LOG_CONFIG.get('max_segments')
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.index_path = os.path.join(self.directory, INDEX_FILE)
+        self._lock = threading.Lock()
+        self._segment_name = None
+        self._segment_file = None
+        self._segment_opened = 0.0
+
+        # Okuma indeksi: index.jsonl'den artımlı olarak yüklenir
+        self._by_file_name = {}
+        self._by_hash = {}
+        self._index_position = 0
+        self._index_inode = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def close(self):
+        """Açık segment dosyasını kapatır"""
+        with self._lock:
+            if self._segment_file:
+                self._segment_file.close()
+                self._segment_file = None
+                self._segment_name = None
+
+    # ------------------------------------------------------------------ yazma
+
+    def _segments(self):
+        """Segment dosya adlarını eskiden yeniye sıralı döndürür"""
+        pattern = os.path.join(self.directory, f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}")
+        return sorted(os.path.basename(path) for path in glob.glob(pattern))
+
+    def _segment_created(self, name):
+        """Segmentin oluşturulma zamanını (epoch) adından çıkarır"""
+        stamp = name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]
+        try:
+            return datetime.datetime.strptime(stamp, '%Y%m%d_%H%M%S_%f').timestamp()
+        except ValueError:
+            return os.path.getmtime(os.path.join(self.directory, name))
+
+    def _open_segment(self):
+        """Yazılacak segmenti seçer; sınır aşılmışsa yenisini başlatır"""
+        now = time.time()
+        if self._segment_file is not None:
+            too_big = self._segment_file.tell() >= self.max_segment_bytes
+            too_old = now - self._segment_opened >= self.max_segment_age
+            if not (too_big or too_old):
+                return
+            self._segment_file.close()
+            self._segment_file = None
+
+        # Son segment hâlâ sınırlar içindeyse ona devam et
+        segments = self._segments()
+        name = None
+        if segments:
+            last = segments[-1]
+            path = os.path.join(self.directory, last)
+            if (os.path.getsize(path) < self.max_segment_bytes
+                    and now - self._segment_created(last) < self.max_segment_age):
+                name = last
+
+        if name is None:
+            stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            name = f"{SEGMENT_PREFIX}{stamp}{SEGMENT_SUFFIX}"
+            logger.info(f"Yeni sonuç segmenti: {name}")
+            if segments:
+                self._prune(segments)
+
+        self._segment_name = name
+        self._segment_file = open(os.path.join(self.directory, name), 'ab')
+        self._segment_opened = self._segment_created(name)
+
+    def append(self, result):
+        """
+        Sonucu aktif segmentin sonuna ekler ve indeksi günceller
+
+        Args:
+            result (dict): İşleme sonucu
+
+        Returns:
+            dict: {'segment': ..., 'offset': ..., 'length': ...}
+        """
+        line = dumps_compact(result) + b"\n"
+        processing_info = result.get('processing_info') or {}
+        file_name = processing_info.get('file_name') or os.path.basename(str(result.get('file_path', '')))
+        extraction = result.get('extraction') or {}
+
+        with self._lock:
+            self._open_segment()
+            segment_file = self._segment_file
+
+            if fcntl is not None:
+                fcntl.flock(segment_file.fileno(), fcntl.LOCK_EX)
+            try:
+                segment_file.seek(0, os.SEEK_END)
+                offset = segment_file.tell()
+                segment_file.write(line)
+                segment_file.flush()
+
+                entry = {
+                    'file_name': file_name,
+                    'text_hash': text_hash(extraction['text']) if 'text' in extraction else None,
+                    'segment': self._segment_name,
+                    'offset': offset,
+                    'length': len(line),
+                    'time': datetime.datetime.now().isoformat()
+                }
+                self._append_index(dumps_compact(entry) + b"\n")
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(segment_file.fileno(), fcntl.LOCK_UN)
+
+        logger.debug(f"Sonuç eklendi: {file_name} -> {entry['segment']}@{offset}")
+        return {'segment': entry['segment'], 'offset': offset, 'length': len(line)}
+
+    def _locked_index(self):
+        """
+        index.jsonl'i ekleme kipinde özel kilitle açar. Budama dosyayı yenisiyle
+        değiştirmiş olabileceğinden kilit alındıktan sonra dosyanın hâlâ aynı
+        olduğu doğrulanır; değilse yenisi açılır.
+        """
+        while True:
+            index_file = open(self.index_path, 'ab')
+            if fcntl is None:
+                return index_file
+            fcntl.flock(index_file.fileno(), fcntl.LOCK_EX)
+            try:
+                if os.stat(self.index_path).st_ino == os.fstat(index_file.fileno()).st_ino:
+                    return index_file
+            except FileNotFoundError:
+                pass
+            index_file.close()
+
+    def _append_index(self, line):
+        """İndeks satırını ekler (budamayla yarışmadan)"""
+        with self._locked_index() as index_file:
+            index_file.write(line)
+
+    def _prune(self, segments):
+        """
+        max_segments sınırını aşan en eski segmentleri siler ve artık var olmayan
+        segmentlere işaret eden indeks kayıtlarını index.jsonl'den çıkarır
+
+        Args:
+            segments (list): Mevcut segmentler (eskiden yeniye); yeni açılacak segment hariç
+        """
+        if self.max_segments:
+            # Açılacak yeni segmentle birlikte sınır aşılmasın
+            for name in segments[:max(len(segments) - self.max_segments + 1, 0)]:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                    logger.info(f"Eski sonuç segmenti silindi: {name}")
+                except FileNotFoundError:
+                    pass
+        self.prune_index()
+
+    def prune_index(self):
+        """
+        Silinmiş segmentlere ait indeks kayıtlarını çıkarır. index.jsonl
+        geçici dosyaya yazılıp atomik olarak değiştirilir.
+
+        Returns:
+            int: Çıkarılan kayıt sayısı
+        """
+        if not os.path.exists(self.index_path):
+            return 0
+        existing = set(self._segments())
+        with self._locked_index() as index_file:
+            kept = []
+            removed = 0
+            with open(self.index_path, 'rb') as reader:
+                for line in reader:
+                    if not line.endswith(b"\n"):
+                        continue
+                    if loads(line)['segment'] in existing:
+                        kept.append(line)
+                    else:
+                        removed += 1
+            if removed:
+                tmp_path = f"{self.index_path}.tmp"
+                with open(tmp_path, 'wb') as tmp_file:
+                    tmp_file.writelines(kept)
+                    tmp_file.flush()
+                    os.fsync(tmp_file.fileno())
+                os.replace(tmp_path, self.index_path)
+                logger.info(f"Sonuç indeksi budandı: {removed} kayıt çıkarıldı, {len(kept)} kaldı")
+        return removed
+
+    # ------------------------------------------------------------------ okuma
+
+    def _refresh_index(self):
+        """index.jsonl'e son okumadan beri eklenen kayıtları belleğe alır"""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'rb') as index_file:
+            # Budama dosyayı yenisiyle değiştirdiyse indeks baştan okunur
+            inode = os.fstat(index_file.fileno()).st_ino
+            if inode != self._index_inode:
+                self._by_file_name = {}
+                self._by_hash = {}
+                self._index_position = 0
+                self._index_inode = inode
+            index_file.seek(self._index_position)
+            for line in index_file:
+                if not line.endswith(b"\n"):
+                    break  # Yazılmakta olan yarım satır
+                self._index_position += len(line)
+                entry = loads(line)
+                location = (entry['segment'], entry['offset'], entry['length'])
+                self._by_file_name[entry['file_name']] = location
+                if entry.get('text_hash'):
+                    self._by_hash[entry['text_hash']] = location
+
+    def _read_at(self, location):
+        """Segmentteki belirli ofsetten tek kaydı okur"""
+        segment, offset, length = location
+        with open(os.path.join(self.directory, segment), 'rb') as segment_file:
+            segment_file.seek(offset)
+            return loads(segment_file.read(length))
+
+    def get(self, file_name=None, text_hash=None):
+        """
+        Dosya adına veya metin hash'ine göre en son sonucu getirir
+
+        Args:
+            file_name (str, optional): Belge dosya adı
+            text_hash (str, optional): Çıkarılan metnin MD5 hash'i
+
+        Returns:
+            dict: Sonuç veya bulunamazsa None
+        """
+        with self._lock:
+            self._refresh_index()
+            location = None
+            if file_name is not None:
+                location = self._by_file_name.get(file_name)
+            elif text_hash is not None:
+                location = self._by_hash.get(text_hash)
+        if not location:
+            return None
+        try:
+            return self._read_at(location)
+        except FileNotFoundError:
+            # Segment budanmış; indeks bir sonraki yenilemede düzelir
+            return None
+
+    def iter_results(self):
+        """Tüm sonuçları eskiden yeniye sırayla döndürür (generator)"""
+        for segment in self._segments():
+            with open(os.path.join(self.directory, segment), 'rb') as segment_file:
+                for line in segment_file:
+                    if line.endswith(b"\n"):
+                        yield loads(line)
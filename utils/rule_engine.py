@@ -0,0 +1,376 @@
+"""
+Süreç içi yönlendirme kural motoru.
+
+config/routing_rules.json dosyasındaki bildirimsel kuralları bir Python karar
+fonksiyonuna derler. Kurallar Drools'taki gibi salience değerine göre (eşitse
+tanım sırasına göre) çalışır; her kural eşleşen kaydın alanlarına atama yapar
+ve sonra çalışan kural öncekini ezer. Tek kayıt için derlenmiş fonksiyon,
+kayıt grupları için numpy ile vektörize değerlendirme sağlanır.
+
+Kullanım:
+    python -m utils.rule_engine --check        # karar tablosu
+    python -m utils.rule_engine --check-drl    # karar tablosu + DRL eşdeğerliği
+"""
+import re
+import sys
+import json
+import logging
+import argparse
+import itertools
+import numpy as np
+
+from config.settings import CLASSES, ROUTING_RULES_PATH, ROUTING_DRL_PATH
+
+logger = logging.getLogger('DocumentRouter.RuleEngine')
+
+# Kurallarda kullanılabilen kayıt alanları ve varsayılan değerleri
+RECORD_FIELDS = {
+    'document_class': 'review',
+    'confidence': 0.0,
+    'text_length': 0
+}
+
+# Kuralların atayabileceği çıktı alanları
+OUTPUT_FIELDS = ('target_folder', 'needs_review', 'ocr_failed')
+
+# Karar tablosu: kayıt -> beklenen (target_folder, needs_review, ocr_failed).
+# Beklentiler eski document_router mantığından (sınıf klasörü, güven < 0.75 ise
+# review, metin < 50 ise ocr_failed; sonraki kontrol öncekini ezer) ve DRL'den alınır.
+DECISION_TABLE = [
+    ({'document_class': 'invoice', 'confidence': 0.9, 'text_length': 500}, ('invoice', False, False)),
+    ({'document_class': 'invoice', 'confidence': 0.5, 'text_length': 500}, ('review', True, False)),
+    ({'document_class': 'invoice', 'confidence': 0.9, 'text_length': 10}, ('ocr_failed', False, True)),
+    ({'document_class': 'invoice', 'confidence': 0.5, 'text_length': 10}, ('ocr_failed', True, True)),
+    ({'document_class': 'letter', 'confidence': 0.9, 'text_length': 500}, ('letter', False, False)),
+    ({'document_class': 'letter', 'confidence': 0.5, 'text_length': 500}, ('review', True, False)),
+    # Güvenli ama metni olmayan mektup: Mektup kuralı OCR kuralını ezmez
+    ({'document_class': 'letter', 'confidence': 0.9, 'text_length': 10}, ('ocr_failed', False, True)),
+    ({'document_class': 'letter', 'confidence': 0.5, 'text_length': 10}, ('ocr_failed', True, True)),
+    # Sınır değerleri
+    ({'document_class': 'letter', 'confidence': 0.75, 'text_length': 50}, ('letter', False, False)),
+    ({'document_class': 'letter', 'confidence': 0.7499, 'text_length': 49}, ('ocr_failed', True, True)),
+    ({'document_class': 'memo', 'confidence': 0.75, 'text_length': 49}, ('ocr_failed', False, True)),
+    ({'document_class': 'memo', 'confidence': 0.7499, 'text_length': 50}, ('review', True, False)),
+    # Eksik alanlar varsayılanlarla (review, 0.0, 0) değerlendirilir
+    ({'document_class': 'form', 'confidence': 1.0}, ('ocr_failed', False, True)),
+    ({'text_length': 500}, ('review', True, False)),
+    ({}, ('ocr_failed', True, True)),
+]
+
+OPERATORS = {
+    '==': np.equal,
+    '!=': np.not_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal
+}
+
+
+def load_rules(rules_path=None):
+    """
+    Kural dosyasını okur ve doğrular
+
+    Args:
+        rules_path (str, optional): Kural dosyası yolu. Varsayılan ROUTING_RULES_PATH.
+
+    Returns:
+        dict: {'defaults': {...}, 'rules': [...]}
+    """
+    rules_path = rules_path or ROUTING_RULES_PATH
+    with open(rules_path, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+
+    for rule in spec['rules']:
+        for condition in rule.get('when', []):
+            if condition['field'] not in RECORD_FIELDS:
+                raise ValueError(f"Kural '{rule['name']}': bilinmeyen alan: {condition['field']}")
+            if condition['op'] not in OPERATORS and condition['op'] not in ('in', 'not in'):
+                raise ValueError(f"Kural '{rule['name']}': bilinmeyen operatör: {condition['op']}")
+        for field, value in rule['then'].items():
+            if field not in OUTPUT_FIELDS:
+                raise ValueError(f"Kural '{rule['name']}': bilinmeyen çıktı alanı: {field}")
+            if isinstance(value, dict) and value.get('field') not in RECORD_FIELDS:
+                raise ValueError(f"Kural '{rule['name']}': bilinmeyen kaynak alan: {value}")
+
+    return spec
+
+
+class RuleEngine:
+    def __init__(self, spec=None, rules_path=None):
+        """
+        Kuralları derleyerek karar fonksiyonunu hazırlar
+
+        Args:
+            spec (dict, optional): Önceden yüklenmiş kural tanımı
+            rules_path (str, optional): Kural dosyası yolu (spec verilmezse)
+        """
+        spec = spec or load_rules(rules_path)
+        self.defaults = {field: spec.get('defaults', {}).get(field) for field in OUTPUT_FIELDS}
+
+        # Çalışma sırası: yüksek salience önce, eşitse tanım sırası
+        self.rules = sorted(spec['rules'], key=lambda rule: -rule.get('salience', 0))
+        self.decide = self._compile()
+
+    def _compile(self):
+        """Kuralları tek bir Python fonksiyonuna derler"""
+        lines = ["def decide(record):"]
+        for field, default in RECORD_FIELDS.items():
+            lines.append(f"    {field} = record.get({field!r})")
+            lines.append(f"    {field} = {default!r} if {field} is None else {field}")
+        lines.append("    confidence = float(confidence)")
+        lines.append("    text_length = int(text_length)")
+        lines.append(f"    result = {self.defaults!r}")
+
+        for rule in self.rules:
+            conditions = [f"({c['field']} {c['op']} {c['value']!r})" for c in rule.get('when', [])]
+            lines.append(f"    # {rule['name']}")
+            indent = "    "
+            if conditions:
+                lines.append(f"    if {' and '.join(conditions)}:")
+                indent = "        "
+            for field, value in rule['then'].items():
+                source = value['field'] if isinstance(value, dict) else repr(value)
+                lines.append(f"{indent}result[{field!r}] = {source}")
+
+        lines.append("    return result")
+        source = "\n".join(lines)
+
+        namespace = {}
+        exec(compile(source, "<routing_rules>", "exec"), namespace)
+        logger.debug(f"Kurallar derlendi:\n{source}")
+        return namespace['decide']
+
+    def _columns(self, records):
+        """Kayıt listesini alan başına numpy dizilerine dönüştürür"""
+        columns = {}
+        for field, default in RECORD_FIELDS.items():
+            values = [record.get(field) for record in records]
+            values = [default if value is None else value for value in values]
+            if field == 'confidence':
+                columns[field] = np.asarray(values, dtype=np.float64)
+            elif field == 'text_length':
+                columns[field] = np.asarray(values, dtype=np.int64)
+            else:
+                columns[field] = np.asarray(values, dtype=object)
+        return columns
+
+    def evaluate_batch(self, records):
+        """
+        Bir grup kaydı vektörize olarak değerlendirir
+
+        Args:
+            records (list): document_class, confidence, text_length alanlarını içeren kayıtlar
+
+        Returns:
+            list: Her kayıt için {'target_folder', 'needs_review', 'ocr_failed'}
+        """
+        count = len(records)
+        if count == 0:
+            return []
+
+        columns = self._columns(records)
+        outputs = {field: np.full(count, default, dtype=object) for field, default in self.defaults.items()}
+
+        for rule in self.rules:
+            mask = np.ones(count, dtype=bool)
+            for condition in rule.get('when', []):
+                column = columns[condition['field']]
+                if condition['op'] == 'in':
+                    mask &= np.isin(column, list(condition['value']))
+                elif condition['op'] == 'not in':
+                    mask &= ~np.isin(column, list(condition['value']))
+                else:
+                    mask &= OPERATORS[condition['op']](column, condition['value']).astype(bool)
+
+            if not mask.any():
+                continue
+
+            for field, value in rule['then'].items():
+                if isinstance(value, dict):
+                    outputs[field][mask] = columns[value['field']][mask]
+                else:
+                    outputs[field][mask] = value
+
+        return [
+            {field: outputs[field][i] for field in OUTPUT_FIELDS}
+            for i in range(count)
+        ]
+
+
+def _camel_to_snake(name):
+    """documentClass -> document_class"""
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', name).lower()
+
+
+def _parse_drl_value(raw):
+    """DRL sabit değerini veya $doc.getX() ifadesini çözer"""
+    raw = raw.strip()
+    getter = re.fullmatch(r'\$doc\.(?:get|is)(\w+)\(\)', raw)
+    if getter:
+        return {'field': _camel_to_snake(getter.group(1))}
+    if raw in ('true', 'false'):
+        return raw == 'true'
+    if raw.startswith('"') and raw.endswith('"'):
+        return raw[1:-1]
+    return float(raw) if '.' in raw else int(raw)
+
+
+def parse_drl(drl_path=None):
+    """
+    DocumentRouting.drl dosyasındaki kuralları kural motoru biçimine çevirir.
+    Sadece bu projedeki basit kalıp desteklenir: tek Document() deseni,
+    virgülle ayrılmış karşılaştırmalar ve $doc.setX(...) atamaları.
+
+    Args:
+        drl_path (str, optional): DRL dosyası yolu. Varsayılan ROUTING_DRL_PATH.
+
+    Returns:
+        dict: {'defaults': {...}, 'rules': [...]}
+    """
+    drl_path = drl_path or ROUTING_DRL_PATH
+    with open(drl_path, 'r', encoding='utf-8') as f:
+        source = re.sub(r'//[^\n]*', '', f.read())
+
+    rules = []
+    for match in re.finditer(r'rule\s+"([^"]+)"(.*?)\bwhen\b(.*?)\bthen\b(.*?)\bend\b', source, re.S):
+        name, attributes, when, then = match.groups()
+
+        salience = re.search(r'salience\s+(-?\d+)', attributes)
+        conditions = []
+        pattern = re.search(r'Document\((.*?)\)', when, re.S)
+        if pattern and pattern.group(1).strip():
+            for constraint in pattern.group(1).split(','):
+                field, op, value = re.fullmatch(r'\s*(\w+)\s*(==|!=|<=|>=|<|>)\s*(.+?)\s*', constraint).groups()
+                conditions.append({'field': _camel_to_snake(field), 'op': op, 'value': _parse_drl_value(value)})
+
+        actions = {}
+        for setter, value in re.findall(r'\$doc\.set(\w+)\((.*?)\);', then):
+            actions[_camel_to_snake(setter)] = _parse_drl_value(value)
+
+        rules.append({
+            'name': name,
+            'salience': int(salience.group(1)) if salience else 0,
+            'when': conditions,
+            'then': actions
+        })
+
+    # Java Document sınıfındaki alan varsayılanları
+    return {
+        'defaults': {'target_folder': None, 'needs_review': False, 'ocr_failed': False},
+        'rules': rules
+    }
+
+
+def check_decision_table(engine, table=None):
+    """
+    Motoru karar tablosuna karşı hem tek kayıt fonksiyonuyla hem de
+    vektörize yolla çalıştırır
+
+    Args:
+        engine (RuleEngine): Kontrol edilecek motor
+        table (list, optional): (kayıt, (target_folder, needs_review, ocr_failed)) çiftleri.
+            Varsayılan DECISION_TABLE.
+
+    Returns:
+        list: Beklenenden farklı sonuç veren kayıtlar (boşsa tablo sağlanıyor)
+    """
+    table = DECISION_TABLE if table is None else table
+    records = [record for record, _ in table]
+    batch = engine.evaluate_batch(records)
+
+    mismatches = []
+    for (record, expected), batch_result in zip(table, batch):
+        expected = dict(zip(OUTPUT_FIELDS, expected))
+        single_result = engine.decide(record)
+        if single_result != expected or batch_result != expected:
+            mismatches.append({
+                'record': record,
+                'expected': expected,
+                'python': single_result,
+                'python_batch': batch_result
+            })
+    return mismatches
+
+
+def check_drl_parity(rules_path=None, drl_path=None):
+    """
+    JSON kurallarını DRL kurallarıyla, sınır değerlerini kapsayan bir kayıt
+    ızgarası üzerinde karşılaştırır. Hem derlenmiş tek kayıt fonksiyonu hem de
+    vektörize yol kontrol edilir.
+
+    Returns:
+        list: Uyuşmayan kayıtlar (boşsa kurallar eşdeğerdir)
+    """
+    python_engine = RuleEngine(rules_path=rules_path)
+    drl_engine = RuleEngine(spec=parse_drl(drl_path))
+
+    classes = CLASSES + ['review', 'unknown']
+    confidences = [0.0, 0.5, 0.7499, 0.75, 0.7501, 0.9, 1.0]
+    text_lengths = [0, 1, 49, 50, 51, 5000]
+    records = [
+        {'document_class': c, 'confidence': conf, 'text_length': length}
+        for c, conf, length in itertools.product(classes, confidences, text_lengths)
+    ]
+
+    expected = [drl_engine.decide(record) for record in records]
+    batch = python_engine.evaluate_batch(records)
+
+    mismatches = []
+    for record, drl_result, batch_result in zip(records, expected, batch):
+        single_result = python_engine.decide(record)
+        if single_result != drl_result or batch_result != drl_result:
+            mismatches.append({
+                'record': record,
+                'drl': drl_result,
+                'python': single_result,
+                'python_batch': batch_result
+            })
+    return mismatches, len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yönlendirme kural motoru araçları")
+    parser.add_argument("--rules", help="Kural dosyası yolu (varsayılan: config/routing_rules.json)")
+    parser.add_argument("--drl", help="DRL dosyası yolu (varsayılan: DocumentRouting.drl)")
+    parser.add_argument("--check", action="store_true",
+                        help="JSON kurallarını (ve --check-drl ile DRL'yi) karar tablosuna karşı kontrol et")
+    parser.add_argument("--check-drl", action="store_true", help="JSON kurallarının DRL ile eşdeğerliğini kontrol et")
+    args = parser.parse_args()
+
+    if args.check or args.check_drl:
+        engines = [('JSON', RuleEngine(rules_path=args.rules))]
+        if args.check_drl:
+            engines.append(('DRL', RuleEngine(spec=parse_drl(args.drl))))
+        failed = False
+        for label, engine in engines:
+            mismatches = check_decision_table(engine)
+            for mismatch in mismatches:
+                print(json.dumps(mismatch, ensure_ascii=False))
+            if mismatches:
+                failed = True
+                print(f"{label} kuralları karar tablosunu sağlamıyor: {len(mismatches)}/{len(DECISION_TABLE)} durum")
+            else:
+                print(f"{label} kuralları karar tablosunu sağlıyor: {len(DECISION_TABLE)} durum")
+        if failed:
+            return 1
+
+    if args.check_drl:
+        mismatches, total = check_drl_parity(args.rules, args.drl)
+        if mismatches:
+            for mismatch in mismatches[:20]:
+                print(json.dumps(mismatch, ensure_ascii=False))
+            print(f"Eşdeğerlik kontrolü BAŞARISIZ: {len(mismatches)}/{total} kayıt uyuşmuyor")
+            return 1
+        print(f"Eşdeğerlik kontrolü başarılı: {total} kayıt, JSON ve DRL kuralları aynı sonucu veriyor")
+        return 0
+
+    if args.check:
+        return 0
+
+    parser.print_help()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,8 @@
 Belge vektör veritabanı işlemleri için yardımcı modül.
 Belgelerin metin içeriklerini vektör olarak saklar ve benzerlik aramaları yapar.
 """
+import os
+import json
 import logging
 from pymilvus import connections, Collection, FieldSchema, CollectionSchema, DataType, utility
 import numpy as np
@@ -9,9 +11,176 @@ from sentence_transformers import SentenceTransformer
 import hashlib
 from datetime import datetime
 from config.settings import VECTORDB_CONFIG
+from utils.metrics import timed
+from utils.resources import component_device
+from utils.provenance import embedding_provenance
 
 logger = logging.getLogger('DocumentProcessor.VectorDB')
 
+# İndeks türü -> yapılandırmada arama parametresi yoksa kullanılacak değerler
+DEFAULT_SEARCH_PARAMS = {
+    'FLAT': {},
+    'IVF_FLAT': {'nprobe': 10},
+    'IVF_SQ8': {'nprobe': 10},
+    'HNSW': {'ef': 64}
+}
+
+
+def connect_milvus(uri=None, alias="default"):
+    """
+    Milvus'a 'host:port' biçimindeki URI ile bağlanır
+
+    Args:
+        uri (str, optional): Varsayılan VECTORDB_CONFIG['uri']
+        alias (str): pymilvus bağlantı adı
+    """
+    uri = uri or VECTORDB_CONFIG['uri']
+    connections.connect(alias, host=uri.split(':')[0],
+                        port=uri.split(':')[1] if ':' in uri else "19530")
+    logger.info(f"Milvus bağlantısı kuruldu: {uri}")
+
+
+def index_params(index_type=None, params=None):
+    """
+    create_index için indeks tanımı
+
+    Args:
+        index_type (str, optional): IVF_FLAT, IVF_SQ8 veya HNSW. Varsayılan VECTORDB_CONFIG['index_type'].
+        params (dict, optional): Kurulum parametreleri (IVF: nlist; HNSW: M, efConstruction).
+            Varsayılan VECTORDB_CONFIG['index_params'].
+
+    Returns:
+        dict: {'metric_type', 'index_type', 'params'}
+    """
+    return {
+        "metric_type": VECTORDB_CONFIG.get('metric_type', "COSINE"),
+        "index_type": index_type or VECTORDB_CONFIG['index_type'],
+        "params": dict(params if params is not None else VECTORDB_CONFIG['index_params'])
+    }
+
+
+def load_tuned_params(collection_name, path=None):
+    """
+    tune_vector_index.py --apply ile canlı koleksiyona uygulanan ayar
+
+    Args:
+        collection_name (str): Koleksiyon adı
+        path (str, optional): Ayar dosyası. Varsayılan VECTORDB_CONFIG['tuned_params_path'].
+
+    Returns:
+        dict: {'index_type', 'index_params', 'search_params', 'applied_at'} veya kayıt yoksa None
+    """
+    path = path or VECTORDB_CONFIG.get('tuned_params_path')
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get(collection_name)
+    except (OSError, ValueError) as e:
+        logger.warning(f"İndeks ayar dosyası okunamadı ({path}): {e}")
+        return None
+
+
+def save_tuned_params(collection_name, index_type, build_params, search, path=None):
+    """
+    Canlı koleksiyona uygulanan indeks ve arama ayarını kaydeder. Dosya
+    koleksiyon adına göre anahtarlanır; diğer koleksiyonların kayıtları korunur.
+
+    Args:
+        collection_name (str): Koleksiyon adı
+        index_type (str): Kurulan indeks türü
+        build_params (dict): Kurulum parametreleri
+        search (dict): Arama parametreleri (IVF: nprobe; HNSW: ef)
+        path (str, optional): Ayar dosyası. Varsayılan VECTORDB_CONFIG['tuned_params_path'].
+
+    Returns:
+        str: Yazılan dosyanın yolu
+    """
+    path = path or VECTORDB_CONFIG['tuned_params_path']
+    settings = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            settings = json.load(f)
+    settings[collection_name] = {
+        'index_type': index_type,
+        'index_params': dict(build_params),
+        'search_params': dict(search),
+        'applied_at': datetime.now().isoformat()
+    }
+    # Okuyan süreçler yarım yazılmış dosya görmesin
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(settings, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+    return path
+
+
+def search_params(index_type=None, params=None, collection_name=None):
+    """
+    search için arama parametreleri. Öncelik sırası: verilen params,
+    koleksiyona --apply ile uygulanmış ayar (indeks türü uyuşuyorsa),
+    VECTORDB_CONFIG['search_params'] (indeks türü uyuşuyorsa), türün
+    varsayılanları. Yapılandırmadaki değerler başka bir indeks türüne
+    aitse (ör. indeks HNSW ile yeniden kurulmuş ama ayar güncellenmemiş)
+    kullanılmaz.
+
+    Args:
+        index_type (str, optional): Koleksiyondaki indeksin türü. Varsayılan VECTORDB_CONFIG['index_type'].
+        params (dict, optional): Arama parametreleri (IVF: nprobe; HNSW: ef)
+        collection_name (str, optional): Kayıtlı ayarına bakılacak koleksiyon
+
+    Returns:
+        dict: {'metric_type', 'params'}
+    """
+    index_type = index_type or VECTORDB_CONFIG['index_type']
+    if params is None and collection_name:
+        tuned = load_tuned_params(collection_name)
+        if tuned and tuned.get('index_type') == index_type:
+            params = tuned['search_params']
+    if params is None:
+        if index_type == VECTORDB_CONFIG['index_type']:
+            params = VECTORDB_CONFIG['search_params']
+        else:
+            params = DEFAULT_SEARCH_PARAMS.get(index_type, {})
+    return {"metric_type": VECTORDB_CONFIG.get('metric_type', "COSINE"), "params": dict(params)}
+
+
+def rebuild_index(collection, index_type=None, params=None, field="embedding"):
+    """
+    Koleksiyonun vektör indeksini verilen ayarla yeniden kurar. Kurulum
+    süresince koleksiyon bellekten çıkarılır; aramalar beklemelidir.
+
+    Args:
+        collection (pymilvus.Collection): Koleksiyon
+        index_type (str, optional): İndeks türü (bkz. index_params)
+        params (dict, optional): Kurulum parametreleri
+        field (str): Vektör alanı
+
+    Returns:
+        dict: Kurulan indeks tanımı
+    """
+    definition = index_params(index_type, params)
+    try:
+        collection.release()
+    except Exception as e:
+        logger.debug(f"Koleksiyon serbest bırakma atlandı: {e}")
+    if collection.has_index():
+        collection.drop_index()
+    collection.create_index(field, definition)
+    utility.wait_for_index_building_complete(collection.name)
+    logger.info(f"İndeks yeniden kuruldu: {collection.name}, {definition['index_type']} {definition['params']}")
+    return definition
+
+
+def current_index_type(collection, default=None):
+    """Koleksiyondaki vektör indeksinin türü (indeks yoksa default)"""
+    for index in collection.indexes:
+        index_type = index.params.get('index_type')
+        if index_type:
+            return index_type
+    return default
+
+
 class DocumentVectorDB:
     def __init__(self, collection_name=None, connect_uri=None):
         """
@@ -26,19 +195,29 @@ class DocumentVectorDB:
         self.model_name = VECTORDB_CONFIG['model_name']
         
         # Embedding modeli yükle
-        self.model = SentenceTransformer(self.model_name)
+        self.model = SentenceTransformer(self.model_name, device=component_device('embedding'))
         self.vector_dim = self.model.get_sentence_embedding_dimension()
         
         logger.info(f"Vektör modeli yüklendi: {self.model_name}, boyut: {self.vector_dim}")
+        self.provenance = embedding_provenance(self.model_name)
         
         # Milvus'a bağlan
         try:
-            connections.connect("default", host=self.connect_uri.split(':')[0], 
-                               port=self.connect_uri.split(':')[1] if ':' in self.connect_uri else "19530")
-            logger.info(f"Milvus bağlantısı kuruldu: {self.connect_uri}")
+            connect_milvus(self.connect_uri)
             
             # Koleksiyon var mı kontrol et, yoksa oluştur
             self._init_collection()
+            
+            # Arama parametreleri koleksiyondaki gerçek indeks türüne göre seçilir
+            self.index_type = current_index_type(self.collection, VECTORDB_CONFIG['index_type'])
+            self.search_params = search_params(self.index_type, collection_name=self.collection_name)
+            tuned = load_tuned_params(self.collection_name)
+            if tuned and tuned.get('index_type') == self.index_type:
+                logger.info(f"Uygulanmış indeks ayarı kullanılıyor ({tuned.get('applied_at')}): "
+                            f"{self.index_type}, arama parametreleri: {self.search_params['params']}")
+            elif self.index_type != VECTORDB_CONFIG['index_type']:
+                logger.warning(f"Koleksiyon indeksi {self.index_type}, yapılandırma {VECTORDB_CONFIG['index_type']}; "
+                               f"arama parametreleri: {self.search_params['params']}")
         except Exception as e:
             logger.error(f"Milvus bağlantı hatası: {e}")
             raise
@@ -63,13 +242,8 @@ class DocumentVectorDB:
             schema = CollectionSchema(fields)
             self.collection = Collection(name=self.collection_name, schema=schema)
             
-            # İndeks oluştur
-            index_params = {
-                "metric_type": "COSINE",
-                "index_type": "IVF_FLAT",
-                "params": {"nlist": VECTORDB_CONFIG['nlist']}
-            }
-            self.collection.create_index("embedding", index_params)
+            # İndeks oluştur (ayar seçimi: benchmarks/tune_vector_index.py)
+            self.collection.create_index("embedding", index_params())
             logger.info(f"Koleksiyon ve indeks oluşturuldu: {self.collection_name}")
             
     def add_document(self, doc_id, doc_class, file_path, text_content, processed_date=None):
@@ -101,7 +275,8 @@ class DocumentVectorDB:
             # Metin içeriğini vektöre dönüştür
             preview = text_content[:1500] if text_content else ""
             logger.debug(f"Metin vektörize ediliyor ({len(text_content)} karakter)")
-            embedding = self.model.encode(text_content).tolist()
+            with timed('embedding'):
+                embedding = self.model.encode(text_content).tolist()
             logger.debug(f"Vektörize edildi: {len(embedding)} boyutlu vektör")
             
             # Tarih kontrolü
@@ -127,10 +302,11 @@ class DocumentVectorDB:
             ]
             
             logger.debug(f"Milvus insert çağrılıyor...")
-            insert_result = self.collection.insert(entities)
-            logger.debug(f"Insert sonucu: {insert_result}")
-            
-            self.collection.flush()  # Veriyi diske yazmayı garantile
+            with timed('milvus_insert'):
+                insert_result = self.collection.insert(entities)
+                logger.debug(f"Insert sonucu: {insert_result}")
+                
+                self.collection.flush()  # Veriyi diske yazmayı garantile
             logger.info(f"Belge vektör veritabanına eklendi: {doc_id}")
             
             # İşlem sonunda koleksiyonu serbest bırak
@@ -148,6 +324,81 @@ class DocumentVectorDB:
             logger.error(traceback.format_exc())
             return False
         
+    def add_documents(self, documents):
+        """
+        Birden çok belgeyi tek gömme çağrısı ve tek insert ile Milvus'a ekler.
+        flush yapılmaz; çağıran grup sonunda flush() çağırır.
+
+        Args:
+            documents (list): {'doc_id', 'doc_class', 'file_path', 'text_content', 'processed_date'} sözlükleri
+
+        Returns:
+            list: Eklenen doc_id'ler (içeriği çok kısa olanlar eklenmez). Hata durumunda istisna fırlatılır.
+        """
+        documents = [doc for doc in documents
+                     if doc['text_content'] and len(doc['text_content'].strip()) >= 20]
+        if not documents:
+            return []
+
+        texts = [doc['text_content'] for doc in documents]
+        with timed('embedding'):
+            embeddings = self.model.encode(texts)
+        processed_date = datetime.now().isoformat()
+        entities = [
+            [doc['doc_id'] for doc in documents],
+            [doc['doc_class'] for doc in documents],
+            [doc['file_path'] for doc in documents],
+            [doc.get('processed_date') or processed_date for doc in documents],
+            [hashlib.md5(text.encode('utf-8')).hexdigest() for text in texts],
+            [text[:1500] for text in texts],
+            [embedding.tolist() for embedding in embeddings]
+        ]
+        with timed('milvus_insert'):
+            self.collection.insert(entities)
+        logger.info(f"{len(documents)} belge vektör veritabanına eklendi")
+        return [doc['doc_id'] for doc in documents]
+
+    def delete_documents(self, doc_ids):
+        """
+        Belgelerin vektörlerini tek bir silme ifadesiyle siler (yeniden
+        indeksleme öncesi). flush yapılmaz; silme, aynı doc_id ile sonradan
+        yapılan insert'ten önce uygulanır.
+
+        Args:
+            doc_ids (list): Belge ID'leri
+
+        Returns:
+            bool: Başarılı ise True
+        """
+        if not doc_ids:
+            return True
+        try:
+            ids = ", ".join(f'"{doc_id}"' for doc_id in doc_ids)
+            with timed('milvus_delete'):
+                self.collection.delete(f'doc_id in [{ids}]')
+            logger.info(f"{len(doc_ids)} belge vektör veritabanından silindi")
+            return True
+        except Exception as e:
+            logger.error(f"Vektör veritabanı silme hatası: {e}")
+            return False
+
+    def delete_document(self, doc_id):
+        """
+        Belgenin vektörünü siler (yeniden indeksleme öncesi)
+        
+        Args:
+            doc_id (str): Belge ID'si
+            
+        Returns:
+            bool: Başarılı ise True
+        """
+        return self.delete_documents([doc_id])
+
+    def flush(self):
+        """Bekleyen insert ve silmeleri diske yazar"""
+        with timed('milvus_flush'):
+            self.collection.flush()
+        
     def find_similar_documents(self, text_query, limit=5, min_score=0.85):
         """
         Metne en benzer belgeleri bulur
@@ -165,21 +416,18 @@ class DocumentVectorDB:
             self.collection.load()
             
             # Sorgu metnini vektöre dönüştür
-            query_embedding = self.model.encode(text_query).tolist()
+            with timed('embedding'):
+                query_embedding = self.model.encode(text_query).tolist()
             
             # Milvus'ta arama yap
-            search_params = {
-                "metric_type": "COSINE", 
-                "params": {"nprobe": VECTORDB_CONFIG['nprobe']}
-            }
-            
-            results = self.collection.search(
-                data=[query_embedding],
-                anns_field="embedding",
-                param=search_params,
-                limit=limit,
-                output_fields=["doc_id", "class", "file_path", "content_preview", "text_hash"]
-            )
+            with timed('milvus_query'):
+                results = self.collection.search(
+                    data=[query_embedding],
+                    anns_field="embedding",
+                    param=self.search_params,
+                    limit=limit,
+                    output_fields=["doc_id", "class", "file_path", "content_preview", "text_hash"]
+                )
             
             # Sonuçları işle
             similar_docs = []
@@ -230,7 +478,8 @@ class DocumentVectorDB:
         try:
             # Önce hash ile tam eşleşme ara
             direct_hit_query = f'text_hash == "{text_hash}"'
-            direct_hits = self.collection.query(direct_hit_query, output_fields=["doc_id", "file_path"])
+            with timed('milvus_query'):
+                direct_hits = self.collection.query(direct_hit_query, output_fields=["doc_id", "file_path"])
             
             if direct_hits:
                 return {